@@ -6,13 +6,15 @@ import uuid
 import hashlib
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
-import qrcode
 import base64
-from io import BytesIO
 
 # Importações dos serviços
+from services import brcode
 from services.auth_service import AuthService
+from services.brcode import RECEBEDOR_PADRAO
 from services.database_service import DatabaseService
+from services.fees import centavos
+from services.qr import QrRenderer
 from lib.decorators import require_auth, require_admin, require_approved_user, get_current_user_id
 
 # Configurações
@@ -278,6 +280,7 @@ def approve_user(user_id):
     try:
         # Atualizar status do usuário
         if db_service.update_user(user_id, {'status': 'ativo'}):
+            auth_service.user_cache.invalidar(user_id)
             # Criar log
             admin_user_id = get_current_user_id()
             db_service.create_log({
@@ -302,6 +305,7 @@ def reject_user(user_id):
     try:
         # Atualizar status do usuário
         if db_service.update_user(user_id, {'status': 'rejeitado'}):
+            auth_service.user_cache.invalidar(user_id)
             # Criar log
             admin_user_id = get_current_user_id()
             db_service.create_log({
@@ -345,17 +349,14 @@ def seller_page():
 def registro_page():
     return render_template('registro.html')
 
+# Imagens dos QR Codes PIX (pool de processos + cache por conteúdo; QR_WORKERS)
+qr_renderer = QrRenderer()
+
 # Simulação de PIX (mantida do código original)
 def create_local_pix_payment(amount, description):
     payment_id = str(uuid.uuid4())
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(f"PIX:{payment_id}")
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    img_buffer = BytesIO()
-    img.save(img_buffer, format='PNG')
-    img_str = base64.b64encode(img_buffer.getvalue()).decode()
+    payload = brcode.gerar(RECEBEDOR_PADRAO, centavos(amount), payment_id)
+    img_str = base64.b64encode(qr_renderer.renderizar(payload).conteudo).decode()
     
     return {
         'payment_id': payment_id,
@@ -375,6 +376,12 @@ def create_pix():
         
         if not amount:
             return jsonify({"error": "Valor é obrigatório"}), 400
+        try:
+            valido = centavos(amount) >= 1
+        except (TypeError, ValueError, OverflowError):
+            valido = False
+        if not valido:
+            return jsonify({"error": "Valor deve ser positivo, de pelo menos R$ 0,01"}), 400
         
         # Criar pagamento PIX local
         pix_data = create_local_pix_payment(amount, description)
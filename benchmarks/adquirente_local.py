@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Adquirente local: gera e envia webhooks assinados para /webhooks/<adquirente>
+
+Faz o papel de uma adquirente em desenvolvimento e nos benchmarks: monta
+eventos no formato genérico ({"id", "type", "data": {"payment_id"}}),
+assina com o mesmo segredo do gateway (WEBHOOK_SECRET_<ADQUIRENTE>) e
+envia, podendo repetir eventos como as adquirentes reais fazem.
+
+Uso (com o gateway rodando e WEBHOOK_SECRET_LOCAL definido nos dois):
+    python benchmarks/adquirente_local.py <payment_id> [type] [url]
+
+type: payment.paid (padrão), payment.failed, payment.canceled,
+payment.refunded; url: http://localhost:5000/webhooks/local
+"""
+
+import itertools
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+from typing import Dict, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.webhooks import assinar
+
+ADQUIRENTE = 'local'
+SEGREDO = os.environ.get('WEBHOOK_SECRET_LOCAL', 'segredo-da-adquirente-local')
+URL = 'http://localhost:5000/webhooks/local'
+
+class AdquirenteLocal:
+    """Eventos assinados de uma adquirente de teste"""
+
+    def __init__(self, segredo: str = SEGREDO, adquirente: str = ADQUIRENTE):
+        self.segredo = segredo
+        self.adquirente = adquirente
+        self._sequencia = itertools.count(1)
+
+    def evento(self, payment_id: str, tipo: str = 'payment.paid',
+               event_id: Optional[str] = None) -> Tuple[bytes, Dict[str, str]]:
+        """Corpo e headers de um webhook"""
+        corpo = json.dumps({
+            'id': event_id or f'evt_{next(self._sequencia)}_{uuid.uuid4().hex[:8]}',
+            'type': tipo,
+            'created': int(time.time()),
+            'data': {'payment_id': payment_id},
+        }).encode()
+        return corpo, self.headers(corpo)
+
+    def headers(self, corpo: bytes, timestamp: Optional[str] = None) -> Dict[str, str]:
+        timestamp = timestamp or str(int(time.time()))
+        return {'Content-Type': 'application/json', 'X-Webhook-Timestamp': timestamp,
+                'X-Webhook-Signature': assinar(self.segredo, corpo, timestamp)}
+
+    def enviar(self, url: str, payment_id: str, tipo: str = 'payment.paid',
+               event_id: Optional[str] = None) -> Tuple[int, Dict]:
+        """Envia o evento por HTTP; retorna (status HTTP, resposta)"""
+        corpo, headers = self.evento(payment_id, tipo, event_id)
+        pedido = urllib.request.Request(url, data=corpo, headers=headers, method='POST')
+        try:
+            with urllib.request.urlopen(pedido, timeout=10) as resposta:
+                return resposta.status, json.loads(resposta.read() or b'{}')
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read() or b'{}')
+
+def main(argv) -> int:
+    if not argv:
+        print(__doc__)
+        return 2
+    payment_id = argv[0]
+    tipo = argv[1] if len(argv) > 1 else 'payment.paid'
+    url = argv[2] if len(argv) > 2 else URL
+    status, resposta = AdquirenteLocal().enviar(url, payment_id, tipo)
+    print(f"{'✅' if status == 200 else '❌'} {status} {resposta}")
+    return 0 if status == 200 else 1
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark da autenticação por API key
+
+Compara, com índices de tamanhos diferentes:
+
+    SQLite  SELECT id FROM usuarios WHERE api_key = ? (conexão do pool)
+    índice  ApiKeyIndex.autenticar() (SHA-256 + dict em memória)
+
+e o caminho que as integrações usavam antes: login com usuário e senha
+(PBKDF2) para obter um token.
+
+Uso: python benchmarks/bench_api_keys.py [requisicoes]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='bench_api_keys_')
+os.environ['DATABASE_PATH'] = os.path.join(TMP_DIR, 'bench.db')
+
+from gateway_completo import gateway
+from services.api_keys import hash_chave, prefixo
+
+TAMANHOS = (100, 10000, 100000)
+
+def popular(total):
+    def inserir(cursor):
+        inicio = cursor.execute('SELECT COALESCE(MAX(id), 0) FROM usuarios').fetchone()[0] + 1
+        chaves = [(f'integ_{i}', f'integ_{i}@bench', f'chave_{i:08d}') for i in range(inicio, inicio + total)]
+        cursor.executemany('''
+            INSERT INTO usuarios (username, email, password_hash, tipo, status, api_key)
+            VALUES (?, ?, 'x', 'seller', 'ativo', ?)
+        ''', chaves)
+        usuarios = cursor.execute('SELECT id, api_key FROM usuarios WHERE id >= ?', (inicio,)).fetchall()
+        cursor.executemany('INSERT INTO api_keys (user_id, key_hash, prefixo) VALUES (?, ?, ?)',
+                           [(user_id, hash_chave(chave), prefixo(chave)) for user_id, chave in usuarios])
+        return chaves[-1][2]
+    return gateway.db.write_transaction(inserir)
+
+def medir(func, requisicoes):
+    func()
+    inicio = time.perf_counter()
+    for _ in range(requisicoes):
+        func()
+    return (time.perf_counter() - inicio) / requisicoes * 1e6
+
+def main():
+    requisicoes = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"📊 Autenticação por API key ({requisicoes} requisições)")
+    print(f"{'chaves':>8} {'SQLite µs':>10} {'índice µs':>10}")
+
+    cadastradas = 0
+    for tamanho in TAMANHOS:
+        chave = popular(tamanho - cadastradas)
+        cadastradas = tamanho
+        gateway.api_keys.carregar()
+
+        def sqlite():
+            conn = gateway.db.get_connection()
+            conn.execute('SELECT id FROM usuarios WHERE api_key = ?', (chave,)).fetchone()
+            conn.close()
+
+        t_sqlite = medir(sqlite, requisicoes)
+        t_indice = medir(lambda: gateway.api_keys.autenticar(chave), requisicoes)
+        print(f"{tamanho:>8} {t_sqlite:>10.2f} {t_indice:>10.2f}")
+
+    t_login = medir(lambda: gateway.autenticar_usuario('seller', 'seller123'), 5)
+    print(f"✅ login com senha (antes): {t_login / 1000:.0f} ms por requisição")
+    print(f"   api_keys: {gateway.api_keys.stats()}")
+
+if __name__ == '__main__':
+    main()
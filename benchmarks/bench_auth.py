@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark dos decorators de autenticação nas rotas de admin
+
+Antes: @require_auth + @require_admin, cada um decodificando o JWT, e uma
+conexão com SELECT tipo FROM usuarios por requisição.
+Depois: @require_admin sozinho, um decode por requisição e tipo/status/versão
+do token lidos do auth_cache (consulta ao banco só a cada AUTH_CACHE_TTL)
+e claims do token_cache (verificação HS256 só na primeira requisição).
+
+Mede só o custo dos decorators, com uma rota vazia e sem o resto do Flask
+(cada chamada roda dentro de um test_request_context já aberto).
+
+Uso: python benchmarks/bench_auth.py [requisicoes]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='bench_auth_')
+os.environ['DATABASE_PATH'] = os.path.join(TMP_DIR, 'bench.db')
+
+import jwt
+from flask import jsonify, request
+
+from gateway_completo import app, gateway, require_admin
+from services.repositories import UsuariosRepository
+
+def verify_token_antigo(token):
+    try:
+        return jwt.decode(token, gateway.security.secret_key, algorithms=['HS256'])['user_id']
+    except jwt.PyJWTError:
+        return None
+
+def require_auth_antigo(f):
+    def decorated_function(*args, **kwargs):
+        token = request.headers.get('Authorization')
+        if not token:
+            return jsonify({'erro': 'Token não fornecido'}), 401
+        user_id = verify_token_antigo(token.replace('Bearer ', ''))
+        if not user_id:
+            return jsonify({'erro': 'Token inválido'}), 401
+        request.user_id = user_id
+        return f(*args, **kwargs)
+    return decorated_function
+
+def require_admin_antigo(f):
+    def decorated_function(*args, **kwargs):
+        token = request.headers.get('Authorization')
+        if not token:
+            return jsonify({'erro': 'Token não fornecido'}), 401
+        user_id = verify_token_antigo(token.replace('Bearer ', ''))
+        if not user_id:
+            return jsonify({'erro': 'Token inválido'}), 401
+        conn = gateway.db.get_connection()
+        tipo = UsuariosRepository(conn).tipo(user_id)
+        conn.close()
+        if tipo != 'admin':
+            return jsonify({'erro': 'Acesso negado'}), 403
+        request.user_id = user_id
+        return f(*args, **kwargs)
+    return decorated_function
+
+def rota():
+    return 'ok'
+
+def medir(nome, func, headers, requisicoes):
+    with app.test_request_context('/api/admin/empresas', headers=headers):
+        assert func() == 'ok'
+    inicio = time.perf_counter()
+    for _ in range(requisicoes):
+        # Um contexto novo por requisição: request.auth não sobrevive entre elas
+        with app.test_request_context('/api/admin/empresas', headers=headers):
+            func()
+    media = (time.perf_counter() - inicio) / requisicoes * 1e6
+    print(f"{nome:<28} {media:9.1f} µs por requisição")
+    return media
+
+def main():
+    requisicoes = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    login = gateway.autenticar_usuario('admin', 'admin123')
+    headers = {'Authorization': 'Bearer ' + login['token']}
+
+    print(f"📊 Decorators de /api/admin/* ({requisicoes} requisições)")
+    t_vazio = medir('só o request context', rota, headers, requisicoes)
+    t_antigo = medir('auth+admin (2 decodes + SQL)', require_auth_antigo(require_admin_antigo(rota)),
+                     headers, requisicoes)
+    t_novo = medir('require_admin (cache)', require_admin(rota), headers, requisicoes)
+    print(f"✅ custo dos decorators: {t_antigo - t_vazio:.1f} µs -> {max(t_novo - t_vazio, 0):.1f} µs")
+    print(f"   auth_cache: {gateway.auth_cache.stats()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do BR Code PIX (services/brcode.py)
+
+1. CRC16-CCITT de um payload: bit a bit (8 deslocamentos por byte) contra
+   a tabela de 256 entradas; os dois conferidos com "123456789" (0x29B1) e
+   com o exemplo do manual do BR Code.
+2. Payload completo: montado do zero a cada pagamento (todos os campos e o
+   CRC do payload inteiro) contra o BrCodeBuilder (trecho fixo e CRC
+   parcial calculados uma vez por recebedor).
+3. gerar_lote() com PAGAMENTOS payloads de RECEBEDORES recebedores.
+
+Uso: python benchmarks/bench_brcode.py [pagamentos] [recebedores]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import brcode
+from services.brcode import BrCodeBuilder, campo, crc16, gerar_lote, recebedor, txid, valido, valor_brcode
+
+EXEMPLO_MANUAL = ('00020126580014br.gov.bcb.pix0136123e4567-e12b-12d1-a456-4266554400005204000053039865802BR'
+                  '5913Fulano de Tal6008BRASILIA62070503***63041D3D')
+
+def crc16_bitwise(dados: bytes, crc: int = 0xFFFF) -> int:
+    """CRC16-CCITT bit a bit (referência)"""
+    for byte in dados:
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+            crc &= 0xFFFF
+    return crc
+
+def payload_ingenuo(dados, valor_centavos, id_transacao, crc=crc16_bitwise):
+    """Todos os campos e o CRC do payload inteiro a cada pagamento"""
+    conta = campo('00', brcode.GUI_PIX) + campo('01', dados.chave)
+    corpo = (campo('00', '01') + campo('01', '12') + campo('26', conta) + campo('52', '0000')
+             + campo('53', '986') + campo('54', valor_brcode(valor_centavos)) + campo('58', 'BR')
+             + campo('59', dados.nome) + campo('60', dados.cidade)
+             + (campo('61', dados.cep) if dados.cep else '')
+             + campo('62', campo('05', txid(id_transacao))) + '6304')
+    return f'{corpo}{crc(corpo.encode()):04X}'
+
+def medir(nome, func, vezes, base=None):
+    func()
+    inicio = time.perf_counter()
+    for _ in range(vezes):
+        func()
+    media = (time.perf_counter() - inicio) / vezes * 1e6
+    ganho = f"  {base / media:5.1f}x" if base else ''
+    print(f"{nome:<34} {media:8.2f} µs{ganho}")
+    return media
+
+def main():
+    pagamentos = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    recebedores = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    assert crc16(b'123456789') == crc16_bitwise(b'123456789') == 0x29B1
+    assert valido(EXEMPLO_MANUAL)
+
+    seller = recebedor('12345678000195', 'Comércio de Testes Ltda', 'São Paulo', '01310-100')
+    construtor = BrCodeBuilder(seller)
+    payload = construtor.payload(4290, 'pix0a1b2c3d')
+    assert payload == payload_ingenuo(seller, 4290, 'pix0a1b2c3d')
+    dados = payload.encode()
+
+    print(f"📊 CRC16 de um payload ({len(dados)} bytes)")
+    bitwise = medir('bit a bit', lambda: crc16_bitwise(dados), 5000)
+    medir('tabela', lambda: crc16(dados), 5000, bitwise)
+
+    print("📊 Um payload")
+    ingenuo = medir('do zero, CRC bit a bit', lambda: payload_ingenuo(seller, 4290, 'pix0a1b2c3d'), 5000)
+    medir('do zero, CRC com tabela',
+          lambda: payload_ingenuo(seller, 4290, 'pix0a1b2c3d', crc16), 5000, ingenuo)
+    medir('BrCodeBuilder (prefixo pronto)', lambda: construtor.payload(4290, 'pix0a1b2c3d'), 5000, ingenuo)
+
+    rng = random.Random(42)
+    lista = [recebedor(f'{n:014d}', f'Seller {n}', 'Brasilia') for n in range(recebedores)]
+    itens = [(rng.choice(lista), rng.randint(100, 500000), f'pix{n:08x}') for n in range(pagamentos)]
+
+    print(f"📊 Lote: {pagamentos} payloads de {recebedores} recebedores")
+    inicio = time.perf_counter()
+    esperados = [payload_ingenuo(*item) for item in itens]
+    antes = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    lote = gerar_lote(itens)
+    agora = time.perf_counter() - inicio
+    assert lote == esperados and all(map(valido, lote))
+    print(f"do zero, CRC bit a bit   {pagamentos / antes:10.0f} payloads/s")
+    print(f"gerar_lote()             {pagamentos / agora:10.0f} payloads/s  {antes / agora:5.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark da busca no marketplace: LIKE '%termo%' x FTS5 (produtos_fts)
+
+Gera um catálogo sintético (1 milhão de produtos por padrão) com nomes e
+descrições sorteados de um vocabulário, inserido com os triggers da
+migração 0006 ativos, e compara a primeira página de cada busca:
+
+    LIKE  varredura de produtos com name/header LIKE '%termo%'
+    FTS5  ProdutosRepository.buscar_marketplace() (MATCH + bm25)
+
+Uso: python benchmarks/bench_busca.py [produtos] [repeticoes]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='bench_busca_')
+os.environ['DATABASE_PATH'] = os.path.join(TMP_DIR, 'bench.db')
+
+from gateway_completo import DatabaseManager
+from services.busca import expressao_busca
+from services.repositories import SEM_FILTROS, ProdutosRepository
+
+LOTE = 50000
+CHECKOUT_BASE = 'http://localhost:5000/checkout/'
+
+PALAVRAS = ('curso', 'ebook', 'mentoria', 'planilha', 'kit', 'guia', 'treinamento', 'pacote',
+            'marketing', 'vendas', 'finanças', 'investimentos', 'culinária', 'confeitaria',
+            'fotografia', 'design', 'programação', 'python', 'inglês', 'espanhol', 'yoga',
+            'emagrecimento', 'música', 'violão', 'maquiagem', 'artesanato', 'jardinagem',
+            'café', 'vinhos', 'cerveja', 'empreendedorismo', 'produtividade', 'concursos')
+ADJETIVOS = ('completo', 'avançado', 'básico', 'prático', 'definitivo', 'rápido', 'online',
+             'profissional', 'essencial', 'intensivo')
+
+# (nome, texto digitado, padrão LIKE)
+BUSCAS = (
+    ('termo comum', 'curso', '%curso%'),
+    ('termo médio', 'premium', '%premium%'),
+    ('termo raro', 'orquídea', '%orquídea%'),
+    ('prefixo', 'confei', '%confei%'),
+    ('duas palavras', 'café completo', '%café%completo%'),
+)
+
+LIKE_SQL = '''
+    SELECT p.id, p.product_id, p.name, p.price, p.header, p.product_image,
+           p.views, p.sales, u.username as seller_name, p.created_at
+    FROM produtos p JOIN usuarios u ON p.user_id = u.id
+    WHERE p.show_marketplace = 1 AND p.status = 'ativo'
+      AND (p.name LIKE ? OR p.header LIKE ?)
+    ORDER BY p.created_at DESC, p.id DESC
+    LIMIT 51
+'''
+
+def produto(i, sorteio):
+    nome = f'{sorteio.choice(PALAVRAS).capitalize()} de {sorteio.choice(PALAVRAS)} {sorteio.choice(ADJETIVOS)}'
+    if i % 100 == 0:
+        nome += ' premium'
+    if i % 100000 == 0:
+        nome += ' com orquídeas'
+    header = ' '.join(sorteio.choice(PALAVRAS + ADJETIVOS) for _ in range(12))
+    return (f'prod_{i}', 2, nome, 97.0, header, 1, 'ativo')
+
+def popular(db, produtos):
+    sorteio = random.Random(42)
+    inicio = time.perf_counter()
+    for base in range(0, produtos, LOTE):
+        linhas = [produto(i, sorteio) for i in range(base, min(base + LOTE, produtos))]
+        db.write_transaction(lambda cursor: cursor.executemany('''
+            INSERT INTO produtos (product_id, user_id, name, price, header, show_marketplace, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', linhas))
+    return time.perf_counter() - inicio
+
+def medir(func, repeticoes):
+    func()
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = func()
+    return (time.perf_counter() - inicio) / repeticoes * 1000, resultado
+
+def main():
+    produtos = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    db = DatabaseManager()
+
+    duracao = popular(db, produtos)
+    tamanho = os.path.getsize(os.environ['DATABASE_PATH']) / 1024 / 1024
+    print(f"📦 {produtos} produtos inseridos com os triggers de busca em {duracao:.1f}s "
+          f"({produtos / duracao:.0f}/s, banco com {tamanho:.0f} MB)")
+
+    conn = db.get_connection()
+    repositorio = ProdutosRepository(conn)
+    print(f"{'busca':<14} {'LIKE ms':>10} {'FTS5 ms':>10} {'total FTS5':>11}")
+    for nome, texto, padrao in BUSCAS:
+        expressao = expressao_busca(texto)
+        t_like, _ = medir(lambda: conn.execute(LIKE_SQL, (padrao, padrao)).fetchall(), repeticoes)
+        t_fts, pagina = medir(lambda: repositorio.buscar_marketplace(expressao, CHECKOUT_BASE, SEM_FILTROS),
+                              repeticoes)
+        total = f"{pagina.total}{'' if pagina.total_exato else '+'}"
+        print(f"{nome:<14} {t_like:>10.2f} {t_fts:>10.2f} {total:>11}   ({t_like / t_fts:.1f}x)")
+    conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de latência por requisição: DatabaseManager antigo x pool de conexões
+
+Antes: cada requisição criava um DatabaseManager, recriava o schema, gerava
+dois hashes de senha e abria uma conexão nova.
+Depois: singleton com schema criado na inicialização e conexões do pool.
+
+Uso: python benchmarks/bench_db_pool.py [requisicoes]
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='bench_pool_')
+os.environ['DATABASE_PATH'] = os.path.join(TMP_DIR, 'bench.db')
+
+import gateway_completo
+from gateway_completo import DatabaseManager
+from werkzeug.security import generate_password_hash
+
+CONSULTA = 'SELECT id, tipo, status FROM usuarios WHERE id = ?'
+
+def requisicao_antiga(database):
+    """Reproduz o caminho antigo: schema + 2 hashes + conexão nova"""
+    conn = sqlite3.connect(database)
+    cursor = conn.cursor()
+    cursor.execute('CREATE TABLE IF NOT EXISTS usuarios (id INTEGER PRIMARY KEY)')
+    generate_password_hash('admin123')
+    generate_password_hash('seller123')
+    conn.commit()
+    conn.close()
+    
+    conn = sqlite3.connect(database)
+    conn.row_factory = sqlite3.Row
+    conn.execute(CONSULTA, (1,)).fetchone()
+    conn.close()
+
+def requisicao_pool():
+    """Caminho novo: conexão do pool do singleton"""
+    conn = DatabaseManager().get_connection()
+    conn.execute(CONSULTA, (1,)).fetchone()
+    conn.close()
+
+def medir(nome, func, n):
+    latencias = []
+    for _ in range(n):
+        inicio = time.perf_counter()
+        func()
+        latencias.append(time.perf_counter() - inicio)
+    latencias.sort()
+    media = sum(latencias) / n * 1000
+    p95 = latencias[int(n * 0.95) - 1] * 1000
+    print(f"{nome:<10} média {media:9.3f} ms   p95 {p95:9.3f} ms")
+    return media
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    database = gateway_completo.DATABASE
+    print(f"📊 {n} requisições por cenário (banco: {database})")
+    antes = medir('antes', lambda: requisicao_antiga(database), n)
+    depois = medir('depois', requisicao_pool, n)
+    print(f"🚀 Ganho: {antes / depois:.0f}x")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark das taxas por seller (services/fees.py)
+
+1. Consulta: FeeSchedule.taxa_centavos() com SELLERS taxas próprias por
+   método, comparada à consulta da tabela taxas a cada transação.
+2. Lote: a mesma coluna de transações linha a linha e por calcular_lote().
+3. Recálculo histórico: TRANSACOES transações com a taxa antiga (o
+   percentual da adquirente) reprocessadas linha a linha em Python (SELECT +
+   executemany) e por recalcular() (UPDATE por faixa de ids), conferindo o
+   saldo do ledger de um seller. Os dois caminhos disparam os mesmos
+   triggers do ledger e do vendas_diarias.
+
+Uso: python benchmarks/bench_fees.py [sellers] [transacoes]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='bench_fees_')
+os.environ['DATABASE_PATH'] = os.path.join(TMP_DIR, 'bench.db')
+
+from gateway_completo import gateway
+from services.fees import centavos
+from services.ledger import saldo
+from services.repositories import TaxasRepository
+
+METODOS = ('pix', 'credito', 'debito', 'boleto')
+TAXA_SQL = '''
+    SELECT taxa_percentual, taxa_fixa FROM taxas
+    WHERE ativo = 1 AND tipo_pagamento = ? AND (user_id = ? OR user_id IS NULL)
+    ORDER BY user_id IS NULL, id DESC LIMIT 1
+'''
+
+def medir(nome, func, quantidade):
+    inicio = time.perf_counter()
+    func()
+    duracao = time.perf_counter() - inicio
+    print(f"{nome:<26} {duracao / quantidade * 1e6:8.2f} µs por transação")
+    return duracao
+
+def main():
+    sellers = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    transacoes = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    random.seed(3)
+
+    def cadastrar(cursor):
+        taxas = TaxasRepository(cursor.connection)
+        for user_id in range(1, sellers + 1):
+            for metodo in random.sample(METODOS, 2):
+                taxas.definir(user_id, metodo, round(random.uniform(0.5, 4), 2), random.choice((0, 0.25, 0.5)))
+    gateway.db.write_transaction(cadastrar)
+    fees = gateway.fees
+    fees.atualizar()
+    print(f"📋 {fees.stats()['rules']} regras ({sellers} sellers)")
+
+    user_ids = [random.randint(1, sellers) for _ in range(transacoes)]
+    metodos = [random.choice(METODOS) for _ in range(transacoes)]
+    valores = [random.randint(100, 500000) for _ in range(transacoes)]
+    amostra = min(transacoes, 20000)
+
+    print(f"📊 Consulta ({amostra} transações)")
+    conn = gateway.db.get_connection()
+    try:
+        def por_sql():
+            for user_id, metodo, valor in zip(user_ids[:amostra], metodos[:amostra], valores[:amostra]):
+                percentual, fixa = conn.execute(TAXA_SQL, (metodo, user_id)).fetchone()
+                round(valor * percentual / 100) + centavos(fixa)
+        medir('SELECT na tabela taxas', por_sql, amostra)
+    finally:
+        conn.close()
+    medir('FeeSchedule', lambda: [fees.taxa_centavos(u, m, v) for u, m, v in
+                                  zip(user_ids[:amostra], metodos[:amostra], valores[:amostra])], amostra)
+
+    print(f"📊 Coluna de {transacoes} transações")
+    linha = [None]
+    lote = [None]
+    medir('linha a linha', lambda: linha.__setitem__(0, [
+        fees.taxa_centavos(u, m, v) for u, m, v in zip(user_ids, metodos, valores)]), transacoes)
+    medir('calcular_lote', lambda: lote.__setitem__(0, fees.calcular_lote(user_ids, metodos, valores)), transacoes)
+    print(f"   resultados iguais: {linha[0] == lote[0]}")
+
+    # Histórico com a taxa antiga: percentual da adquirente de cada método
+    antigas = {'pix': 0.99, 'credito': 2.9, 'debito': 2.9, 'boleto': 2.99}
+    linhas = []
+    for user_id, metodo, valor in zip(user_ids, metodos, valores):
+        reais = valor / 100
+        taxa = round(reais * antigas[metodo] / 100, 2)
+        linhas.append((str(uuid.uuid4()), user_id, metodo, reais, reais, taxa, round(reais - taxa, 2), 'aprovado'))
+    gateway.db.write_transaction(lambda cursor: cursor.executemany('''
+        INSERT INTO transacoes (transaction_id, user_id, payment_method, amount, valor,
+        taxa_cobrada, valor_liquido, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', linhas))
+
+    seller = user_ids[0]
+    esperado = sum(v - t for u, v, t in zip(user_ids, valores, lote[0]) if u == seller) / 100
+
+    def linha_a_linha(cursor):
+        linhas = cursor.execute('SELECT id, user_id, payment_method, valor, taxa_cobrada FROM transacoes').fetchall()
+        mudancas = []
+        for linha_id, user_id, metodo, valor, atual in linhas:
+            taxa = fees.taxa_centavos(user_id, metodo, centavos(valor))
+            if taxa != centavos(atual):
+                mudancas.append((taxa / 100, (centavos(valor) - taxa) / 100, linha_id))
+        cursor.executemany('UPDATE transacoes SET taxa_cobrada = ?, valor_liquido = ? WHERE id = ?', mudancas)
+        return len(mudancas)
+
+    def restaurar(cursor):
+        cursor.executemany('UPDATE transacoes SET taxa_cobrada = ?, valor_liquido = ? WHERE transaction_id = ?',
+                           [(taxa, liquido, transaction_id) for transaction_id, _, _, _, _, taxa, liquido, _ in linhas])
+
+    print(f"📊 Recálculo histórico ({transacoes} transações)")
+    conn = gateway.db.get_connection()
+    conn.isolation_level = None
+    try:
+        antes = saldo(conn, seller)
+        inicio = time.perf_counter()
+        alteradas = gateway.db.write_transaction(linha_a_linha)
+        duracao = time.perf_counter() - inicio
+        print(f"linha a linha              {duracao:6.2f}s  {alteradas} alteradas ({transacoes / duracao:.0f} transações/s)")
+        gateway.db.write_transaction(restaurar)
+
+        inicio = time.perf_counter()
+        resultado = fees.recalcular(conn)
+        duracao = time.perf_counter() - inicio
+        print(f"recalcular                 {duracao:6.2f}s  {resultado['alteradas']} alteradas ({transacoes / duracao:.0f} transações/s)")
+        depois = saldo(conn, seller)
+    finally:
+        conn.isolation_level = ''
+        conn.close()
+    print(f"   ledger seller {seller}: {antes:.2f} -> {depois:.2f} (esperado {esperado:.2f})")
+
+if __name__ == '__main__':
+    main()
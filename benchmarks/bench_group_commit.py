@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de carga: INSERT em transacoes com commit por requisição x group commit
+
+Cada cliente é uma thread que insere transações em sequência, esperando o
+id de cada uma antes da próxima (como uma requisição HTTP). Mede inserções
+por segundo e a latência p95 com 1, 8 e 64 clientes simultâneos.
+
+Uso: python benchmarks/bench_group_commit.py [insercoes_por_cliente]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='bench_group_commit_')
+os.environ['DATABASE_PATH'] = os.path.join(TMP_DIR, 'bench.db')
+os.environ['DB_POOL_SIZE'] = '80'
+
+from gateway_completo import DatabaseManager
+
+CLIENTES = (1, 8, 64)
+
+INSERT_SQL = '''
+    INSERT INTO transacoes (transaction_id, user_id, payment_method, amount, valor,
+    taxa_cobrada, valor_liquido, status, adquirente)
+    VALUES (?, 2, 'pix', 10.0, 10.0, 0.5, 9.5, 'aprovado', 'local')
+'''
+
+def rodar(db, clientes, por_cliente):
+    latencias = []
+    lock = threading.Lock()
+    barreira = threading.Barrier(clientes + 1)
+
+    def cliente():
+        locais = []
+        barreira.wait()
+        for _ in range(por_cliente):
+            inicio = time.perf_counter()
+            db.insert(INSERT_SQL, (uuid.uuid4().hex,))
+            locais.append(time.perf_counter() - inicio)
+        db.release_thread_connection()
+        with lock:
+            latencias.extend(locais)
+
+    threads = [threading.Thread(target=cliente) for _ in range(clientes)]
+    for t in threads:
+        t.start()
+    barreira.wait()
+    inicio = time.perf_counter()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    total = clientes * por_cliente
+    p95 = latencias[int(len(latencias) * 0.95) - 1] * 1000
+    return total / duracao, p95
+
+def main():
+    por_cliente = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    db = DatabaseManager()
+
+    print(f"📊 {por_cliente} inserções por cliente (banco em {TMP_DIR})")
+    print(f"{'clientes':>8}  {'modo':<12} {'ins/s':>10} {'p95 ms':>9}")
+    for clientes in CLIENTES:
+        db.stop_group_commit()
+        por_requisicao = rodar(db, clientes, por_cliente)
+        writer = db.start_group_commit()
+        agrupado = rodar(db, clientes, por_cliente)
+        stats = writer.stats()
+        db.stop_group_commit()
+
+        print(f"{clientes:>8}  {'por commit':<12} {por_requisicao[0]:>10.0f} {por_requisicao[1]:>9.2f}")
+        print(f"{clientes:>8}  {'group commit':<12} {agrupado[0]:>10.0f} {agrupado[1]:>9.2f}"
+              f"   ({stats['rows'] / max(stats['commits'], 1):.1f} linhas/commit, "
+              f"{agrupado[0] / por_requisicao[0]:.2f}x)")
+
+    db.pool.close_all()
+
+if __name__ == '__main__':
+    main()
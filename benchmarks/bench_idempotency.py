@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste de concorrência do header Idempotency-Key
+
+Dispara REQUISICOES requisições idênticas ao mesmo tempo (uma thread e um
+test client por requisição, liberadas juntas por uma barreira), com a
+adquirente simulada levando LATENCIA_MS para responder:
+
+    sem chave          /api/pagamento sem Idempotency-Key (uma cobrança por requisição)
+    /api/pagamento     mesma Idempotency-Key (espera exatamente 1 cobrança)
+    /api/pix/create    mesma Idempotency-Key, sem autenticação (escopo por IP)
+    dois processos     dois IdempotencyStore sobre o mesmo banco (locks em
+                       memória separados: a disputa é decidida pela reserva
+                       na tabela idempotency_keys)
+
+e confere a chave reaproveitada com outro corpo (422) e o custo de uma
+repetição servida do cache. Com a chave, cada rodada tem de criar
+exatamente 1 cobrança, com uma única resposta e REQUISICOES - 1
+repetições; qualquer conferência que falhe encerra com código 1.
+
+Uso: python benchmarks/bench_idempotency.py [requisicoes]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='bench_idempotency_')
+os.environ['DATABASE_PATH'] = os.path.join(TMP_DIR, 'bench.db')
+os.environ['RATE_LIMIT_PIX_CREATE'] = '100000/60'
+
+from gateway_completo import app, gateway
+from services.api_keys import hash_chave, prefixo
+from services.idempotency import ChaveReutilizada, IdempotencyStore
+
+LATENCIA_MS = float(os.environ.get('LATENCIA_MS', 20))
+API_KEY = 'bench_idempotency_chave_0001'
+
+def cadastrar_seller():
+    def inserir(cursor):
+        user_id = cursor.execute('''
+            INSERT INTO usuarios (username, email, password_hash, tipo, status, api_key)
+            VALUES ('integ_idem', 'integ_idem@bench', 'x', 'seller', 'ativo', ?)
+        ''', (API_KEY,)).lastrowid
+        cursor.execute('INSERT INTO api_keys (user_id, key_hash, prefixo) VALUES (?, ?, ?)',
+                       (user_id, hash_chave(API_KEY), prefixo(API_KEY)))
+        return user_id
+    user_id = gateway.db.write_transaction(inserir)
+    gateway.api_keys.carregar()
+    return user_id
+
+def contar(sql, params=()):
+    conn = gateway.db.get_connection()
+    try:
+        return conn.execute(sql, params).fetchone()[0]
+    finally:
+        conn.close()
+
+falhas = []
+
+def conferir(condicao, mensagem):
+    if not condicao:
+        falhas.append(mensagem)
+        print(f"❌ {mensagem}")
+
+def simultaneas(requisicoes, enviar):
+    """Executa enviar() em requisicoes threads liberadas ao mesmo tempo"""
+    barreira = threading.Barrier(requisicoes)
+    respostas = []
+
+    def cliente():
+        cliente = app.test_client()
+        barreira.wait()
+        respostas.append(enviar(cliente))
+
+    threads = [threading.Thread(target=cliente) for _ in range(requisicoes)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return respostas, time.perf_counter() - inicio
+
+def rodada(nome, requisicoes, enviar, cobrancas, idempotente=True):
+    antes = cobrancas()
+    respostas, duracao = simultaneas(requisicoes, enviar)
+    criadas = cobrancas() - antes
+    status = Counter(r.status_code for r in respostas)
+    corpos = {r.get_data(as_text=True) for r in respostas}
+    replays = sum(r.headers.get('Idempotent-Replayed') == 'true' for r in respostas)
+    print(f"{nome:<16} cobranças {criadas:4d}  status {dict(status)}  "
+          f"respostas distintas {len(corpos):3d}  repetições {replays:3d}  ({duracao:.2f}s)")
+    if idempotente:
+        conferir_rodada(nome, requisicoes, criadas, len(corpos), replays)
+    else:
+        conferir(criadas == requisicoes, f'{nome}: {criadas} cobranças (esperado {requisicoes})')
+
+def conferir_rodada(nome, requisicoes, criadas, distintas, replays):
+    conferir(criadas == 1, f'{nome}: {criadas} cobranças (esperado 1)')
+    conferir(distintas == 1, f'{nome}: {distintas} respostas distintas (esperado 1)')
+    conferir(replays == requisicoes - 1, f'{nome}: {replays} repetições (esperado {requisicoes - 1})')
+
+def main():
+    requisicoes = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    user_id = cadastrar_seller()
+
+    def adquirente_lenta(dados, valor, timeout):
+        time.sleep(LATENCIA_MS / 1000)
+        return {'status_pagamento': 'aprovado'}
+    for nome in gateway.payment.processadores:
+        gateway.payment.processadores[nome] = adquirente_lenta
+
+    pagamento = {'valor': 150.0, 'tipo_pagamento': 'credito'}
+    pix = {'amount': 42.0, 'customer_name': 'Cliente', 'customer_email': 'cliente@bench', 'product_id': 'p1'}
+    headers = {'X-API-Key': API_KEY}
+    pagamentos = lambda: contar('SELECT COUNT(*) FROM transacoes WHERE user_id = ?', (user_id,))
+    pix_criados = lambda: contar("SELECT COUNT(*) FROM transacoes WHERE payment_method = 'pix'")
+
+    print(f"📊 {requisicoes} requisições idênticas simultâneas (adquirente com {LATENCIA_MS:.0f} ms)")
+    rodada('sem chave', requisicoes,
+           lambda c: c.post('/api/pagamento', json=pagamento, headers=headers), pagamentos, idempotente=False)
+    chave = str(uuid.uuid4())
+    rodada('/api/pagamento', requisicoes,
+           lambda c: c.post('/api/pagamento', json=pagamento, headers=dict(headers, **{'Idempotency-Key': chave})),
+           pagamentos)
+    chave_pix = str(uuid.uuid4())
+    rodada('/api/pix/create', requisicoes,
+           lambda c: c.post('/api/pix/create', json=pix, headers={'Idempotency-Key': chave_pix}), pix_criados)
+
+    outro_corpo = app.test_client().post('/api/pagamento', json=dict(pagamento, valor=151.0),
+                                         headers=dict(headers, **{'Idempotency-Key': chave}))
+    print(f"   mesma chave, outro corpo: {outro_corpo.status_code} {outro_corpo.json}")
+    conferir(outro_corpo.status_code == 422, f'mesma chave com outro corpo: {outro_corpo.status_code} (esperado 422)')
+
+    # Dois processos: cada store tem o próprio lock por chave e o próprio cache
+    execucoes = []
+    stores = [IdempotencyStore(gateway.db.write_transaction) for _ in range(2)]
+
+    def cobrar():
+        time.sleep(LATENCIA_MS / 1000)
+        execucoes.append(1)
+        return 200, json.dumps({'cobranca': len(execucoes)})
+
+    barreira = threading.Barrier(requisicoes)
+    resultados = []
+
+    def processo(n):
+        barreira.wait()
+        resultados.append(stores[n % 2].executar('user:1', 'pagamento', 'chave-entre-processos', 'abc', cobrar))
+
+    threads = [threading.Thread(target=processo, args=(n,)) for n in range(requisicoes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    distintas = len({r.corpo for r in resultados})
+    replays = sum(r.replay for r in resultados)
+    print(f"{'dois processos':<16} cobranças {len(execucoes):4d}  respostas distintas "
+          f"{distintas:3d}  repetições {replays:3d}")
+    conferir_rodada('dois processos', requisicoes, len(execucoes), distintas, replays)
+    try:
+        stores[1].executar('user:1', 'pagamento', 'chave-entre-processos', 'outro', cobrar)
+        conferir(False, 'dois processos: chave reaproveitada com outro corpo foi aceita')
+    except ChaveReutilizada:
+        pass
+    print(f"   store A: {stores[0].stats()}")
+    print(f"   store B: {stores[1].stats()}")
+
+    cliente = app.test_client()
+    n = 2000
+    inicio = time.perf_counter()
+    for _ in range(n):
+        cliente.post('/api/pagamento', json=pagamento, headers=dict(headers, **{'Idempotency-Key': chave}))
+    print(f"✅ repetição do cache: {(time.perf_counter() - inicio) / n * 1e6:.0f} µs por requisição")
+    print(f"   idempotency: {gateway.idempotency.stats()}")
+    if falhas:
+        print(f"❌ {len(falhas)} conferências falharam")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
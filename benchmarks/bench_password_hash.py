@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de tráfego misto: rajada de logins + páginas de checkout
+
+Threads de login chamam POST /api/login em laço enquanto outras abrem
+GET /checkout/<produto>; mede a latência do checkout e a vazão de logins.
+
+    na thread  cada login faz o PBKDF2 na própria thread (equivale ao
+               comportamento anterior: um hash simultâneo por login)
+    pool       PasswordHasher com PASSWORD_HASH_WORKERS threads e fila
+
+Uso: python benchmarks/bench_password_hash.py [segundos] [threads_login] [threads_checkout]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='bench_hash_')
+os.environ['DATABASE_PATH'] = os.path.join(TMP_DIR, 'bench.db')
+# Os logins saem todos do mesmo IP: sem rate limit para medir o pool de hash
+os.environ['RATE_LIMIT_ENABLED'] = '0'
+
+from gateway_completo import app, gateway
+from services.password_hasher import PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_WORKERS, PasswordHasher
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+def rodada(nome, hasher, segundos, threads_login, threads_checkout):
+    gateway.password_hasher = hasher
+    fim = time.monotonic() + segundos
+    latencias, logins, recusados = [], [], []
+
+    def login():
+        cliente = app.test_client()
+        while time.monotonic() < fim:
+            resposta = cliente.post('/api/login', json={'username': 'seller', 'password': 'seller123'})
+            (logins if resposta.status_code == 200 else recusados).append(1)
+
+    def checkout():
+        cliente = app.test_client()
+        while time.monotonic() < fim:
+            inicio = time.perf_counter()
+            assert cliente.get('/checkout/bench_prod').status_code == 200
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            time.sleep(0.005)
+
+    threads = [threading.Thread(target=login) for _ in range(threads_login)]
+    threads += [threading.Thread(target=checkout) for _ in range(threads_checkout)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    hasher.stop()
+
+    print(f"{nome:<10} checkout p50 {statistics.median(latencias):7.1f} ms  "
+          f"p95 {percentil(latencias, 0.95):7.1f} ms  p99 {percentil(latencias, 0.99):7.1f} ms  "
+          f"({len(latencias)} req) | logins {len(logins) / segundos:5.1f}/s, {len(recusados)} recusados (503)")
+
+def main():
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    threads_login = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    threads_checkout = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    conn = gateway.db.get_connection()
+    conn.execute('''
+        INSERT INTO produtos (product_id, user_id, name, price, header, show_marketplace, status)
+        VALUES ('bench_prod', 2, 'Produto', 97.0, 'x', 1, 'ativo')
+    ''')
+    conn.commit()
+    conn.close()
+
+    print(f"📊 {threads_login} threads de login + {threads_checkout} de checkout por {segundos:.0f}s "
+          f"({os.cpu_count()} CPUs)")
+    rodada('na thread', PasswordHasher(workers=threads_login, max_pending=0),
+           segundos, threads_login, threads_checkout)
+    rodada('pool', PasswordHasher(workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING),
+           segundos, threads_login, threads_checkout)
+
+if __name__ == '__main__':
+    main()
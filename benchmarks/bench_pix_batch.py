@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de /api/pix/batch
+
+Cria COBRANCAS cobranças PIX de um seller (X-API-Key):
+
+    sequencial   uma chamada de /api/pix/create por cobrança (parse do JSON,
+                 payload, pré-carga do QR e commit próprio em cada uma)
+    lote         chamadas de /api/pix/batch com LOTE cobranças (validação,
+                 payloads e taxas de uma vez, um executemany por lote)
+
+e confere que todas as cobranças do lote foram gravadas com payload
+válido e que o QR Code de uma delas é gerado quando pedido.
+
+Uso: python benchmarks/bench_pix_batch.py [cobrancas] [lote]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='bench_pix_batch_')
+os.environ['DATABASE_PATH'] = os.path.join(TMP_DIR, 'bench.db')
+os.environ['RATE_LIMIT_ENABLED'] = '0'
+
+from gateway_completo import app, gateway, qr_renderer
+from services.api_keys import hash_chave, prefixo
+from services.brcode import valido
+
+API_KEY = 'bench_pix_batch_chave_0001'
+
+def cadastrar_seller():
+    def inserir(cursor):
+        user_id = cursor.execute('''
+            INSERT INTO usuarios (username, email, password_hash, tipo, status, api_key)
+            VALUES ('campanha', 'campanha@bench', 'x', 'seller', 'ativo', ?)
+        ''', (API_KEY,)).lastrowid
+        cursor.execute('INSERT INTO api_keys (user_id, key_hash, prefixo) VALUES (?, ?, ?)',
+                       (user_id, hash_chave(API_KEY), prefixo(API_KEY)))
+        return user_id
+    user_id = gateway.db.write_transaction(inserir)
+    gateway.api_keys.carregar()
+    return user_id
+
+def contar(user_id):
+    conn = gateway.db.get_connection()
+    try:
+        return conn.execute('SELECT COUNT(*) FROM transacoes WHERE user_id = ?', (user_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+def main():
+    cobrancas = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    lote = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    user_id = cadastrar_seller()
+    cliente = app.test_client()
+    headers = {'X-API-Key': API_KEY}
+    lista = [{'amount': 10 + n % 500, 'customer_name': f'Cliente {n}', 'customer_email': f'c{n}@bench',
+              'product_id': 'campanha'} for n in range(cobrancas)]
+
+    print(f"📊 {cobrancas} cobranças PIX")
+    inicio = time.perf_counter()
+    for cobranca in lista:
+        assert cliente.post('/api/pix/create', json=cobranca, headers=headers).status_code == 200
+    sequencial = time.perf_counter() - inicio
+    print(f"sequencial (/api/pix/create)   {sequencial:6.2f}s  {cobrancas / sequencial:8.0f} cobranças/s")
+    # Espera as pré-cargas de QR do create terminarem (não disputam CPU com o lote)
+    while qr_renderer.stats()['in_flight']:
+        time.sleep(0.1)
+
+    antes = contar(user_id)
+    resultados = []
+    inicio = time.perf_counter()
+    for n in range(0, cobrancas, lote):
+        resposta = cliente.post('/api/pix/batch', json={'charges': lista[n:n + lote]}, headers=headers)
+        assert resposta.status_code == 200, resposta.json
+        resultados.extend(resposta.json)
+    em_lote = time.perf_counter() - inicio
+    print(f"lote de {lote:<5} (/api/pix/batch) {em_lote:6.2f}s  {cobrancas / em_lote:8.0f} cobranças/s"
+          f"  {sequencial / em_lote:5.1f}x")
+
+    assert contar(user_id) - antes == cobrancas == len(resultados)
+    assert all(valido(r['qr_code']) for r in resultados)
+    assert cliente.get(resultados[-1]['qr_code_url']).status_code == 200
+    print(f"✅ {len(resultados)} cobranças gravadas; qr_renderer: {qr_renderer.stats()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste de carga de /api/pix/stream (Server-Sent Events)
+
+Sobe o app num servidor werkzeug com uma thread por conexão (como o
+app.run do gateway) e abre CONEXOES streams parados ao mesmo tempo, de
+sockets não bloqueantes, espalhados por PAGAMENTOS pagamentos:
+
+1. memória: RSS do processo antes e com todos os streams abertos (por
+   conexão) e conexões ao banco enquanto os streams esperam (nenhuma);
+2. aviso: publica CLOSED em todos os pagamentos e mede o tempo até o
+   último stream receber o evento e ser fechado pelo servidor;
+3. polling (fallback): /api/pix/status com e sem If-None-Match.
+
+Uso: python benchmarks/bench_pix_stream.py [conexoes] [pagamentos]
+"""
+
+import logging
+import os
+import selectors
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='bench_pix_stream_')
+os.environ['DATABASE_PATH'] = os.path.join(TMP_DIR, 'bench.db')
+os.environ['RATE_LIMIT_ENABLED'] = '0'
+os.environ['QR_WORKERS'] = '0'  # sem fork com milhares de threads
+os.environ.setdefault('PIX_STREAM_HEARTBEAT', '60')
+
+from werkzeug.serving import make_server
+
+from gateway_completo import app, gateway
+
+PIX = {'amount': 42.0, 'customer_name': 'Cliente', 'customer_email': 'cliente@bench', 'product_id': 'p1'}
+
+def rss_kb():
+    with open('/proc/self/status') as status:
+        for linha in status:
+            if linha.startswith('VmRSS:'):
+                return int(linha.split()[1])
+    return 0
+
+def conexoes_ao_banco(func):
+    """Executa func() contando as conexões obtidas do pool"""
+    contagem = [0]
+    original = gateway.db.get_connection
+
+    def contar():
+        contagem[0] += 1
+        return original()
+
+    gateway.db.get_connection = contar
+    try:
+        func()
+    finally:
+        gateway.db.get_connection = original
+    return contagem[0]
+
+def abrir_streams(porta, payment_ids, conexoes):
+    """Abre os streams e espera o primeiro evento de todos"""
+    seletor = selectors.DefaultSelector()
+    sockets = []
+    for n in range(conexoes):
+        sock = socket.create_connection(('127.0.0.1', porta))
+        sock.sendall(f'GET /api/pix/stream/{payment_ids[n % len(payment_ids)]} HTTP/1.1\r\n'
+                     f'Host: bench\r\nAccept: text/event-stream\r\n\r\n'.encode())
+        sock.setblocking(False)
+        seletor.register(sock, selectors.EVENT_READ, bytearray())
+        sockets.append(sock)
+    esperar(seletor, b'"status": "pending"')
+    return seletor, sockets
+
+def esperar(seletor, marcador, timeout=120):
+    """Lê os sockets até todos terem recebido marcador (ou fechado)"""
+    faltando = {chave.fileobj for chave in seletor.get_map().values()}
+    prazo = time.monotonic() + timeout
+    while faltando and time.monotonic() < prazo:
+        for chave, _ in seletor.select(1):
+            try:
+                dados = chave.fileobj.recv(65536)
+            except BlockingIOError:
+                continue
+            chave.data.extend(dados)
+            if marcador in chave.data or not dados:
+                faltando.discard(chave.fileobj)
+                chave.data.clear()
+    return len(faltando)
+
+def main():
+    conexoes = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    pagamentos = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    threading.stack_size(512 * 1024)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    cliente = app.test_client()
+    payment_ids = [cliente.post('/api/pix/create', json=PIX).json['payment_id'] for _ in range(pagamentos)]
+
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    servidor.daemon_threads = True
+    servidor.request_queue_size = conexoes
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    porta = servidor.server_port
+
+    # Aquece: um stream completo, para o RSS base já incluir o código carregado
+    seletor, sockets = abrir_streams(porta, payment_ids[:1], 1)
+    for sock in sockets:
+        sock.close()
+    time.sleep(0.5)
+
+    print(f"📊 {conexoes} streams parados sobre {pagamentos} pagamentos")
+    base = rss_kb()
+    threads_base = threading.active_count()
+    inicio = time.perf_counter()
+    seletor, sockets = abrir_streams(porta, payment_ids, conexoes)
+    abertura = time.perf_counter() - inicio
+    abertos = rss_kb()
+    print(f"abertura                     {abertura:6.2f}s")
+    print(f"threads                      {threads_base} -> {threading.active_count()}")
+    print(f"RSS                          {base / 1024:7.1f} MB -> {abertos / 1024:7.1f} MB "
+          f"({(abertos - base) / conexoes:5.1f} KB por conexão)")
+    print(f"   pix_status: {gateway.pix_status.stats()}")
+
+    parado = conexoes_ao_banco(lambda: time.sleep(2))
+    print(f"conexões ao banco em 2s      {parado}")
+
+    inicio = time.perf_counter()
+    for payment_id in payment_ids:
+        gateway.pix_status.publicar(payment_id, 'CLOSED')
+    sem_evento = esperar(seletor, b'"is_paid": true')
+    print(f"aviso de CLOSED a todos      {(time.perf_counter() - inicio) * 1000:6.0f} ms  ({sem_evento} sem evento)")
+    for sock in sockets:
+        sock.close()
+    time.sleep(1)
+    print(f"   pix_status: {gateway.pix_status.stats()}")
+
+    # Fallback: polling com e sem ETag
+    payment_id = cliente.post('/api/pix/create', json=PIX).json['payment_id']
+    etag = cliente.get(f'/api/pix/status/{payment_id}').headers['ETag']
+    for nome, headers in (('polling sem If-None-Match', {}), ('polling com If-None-Match', {'If-None-Match': etag})):
+        n = 1000
+        inicio = time.perf_counter()
+        usadas = conexoes_ao_banco(
+            lambda: [cliente.get(f'/api/pix/status/{payment_id}', headers=headers) for _ in range(n)])
+        print(f"{nome:<28} {(time.perf_counter() - inicio) / n * 1e6:6.0f} µs  "
+              f"{usadas / n:4.1f} conexões ao banco por requisição")
+    servidor.shutdown()
+
+if __name__ == '__main__':
+    main()
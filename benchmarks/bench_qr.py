@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark dos QR Codes PIX (services/qr.py)
+
+1. Renderização de um QR: PNG do PIL (caminho anterior, box_size=10), PNG
+   de 1 bit e SVG do QrRenderer; tempo e tamanho.
+2. /api/pix/create: a resposta antes (com a renderização PIL embutida) e
+   agora (só o payload; a imagem é pré-carregada no pool).
+3. Checkout completo com THREADS clientes: create + GET qr.png, comparado
+   ao create com a imagem embutida; e o GET repetido com If-None-Match.
+
+Uso: python benchmarks/bench_qr.py [pagamentos] [threads]
+"""
+
+import base64
+import os
+import sys
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='bench_qr_')
+os.environ['DATABASE_PATH'] = os.path.join(TMP_DIR, 'bench.db')
+os.environ['RATE_LIMIT_ENABLED'] = '0'
+
+import qrcode
+
+import gateway_completo
+from gateway_completo import app, qr_renderer
+from services.qr import matriz, png, svg
+
+PAYLOAD = ('00020126580014br.gov.bcb.pix0136pix_0a1b2c3d520400005303986540510.005802BR'
+           '5913Teste Empresa6008Brasilia62070503***6304')
+PIX = {'amount': 42.0, 'customer_name': 'Cliente', 'customer_email': 'cliente@bench', 'product_id': 'p1'}
+
+def png_pil(payload):
+    """Renderização anterior do create_local_pix_payment"""
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    buffer = BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def medir(nome, func, vezes):
+    func()
+    inicio = time.perf_counter()
+    for _ in range(vezes):
+        resultado = func()
+    media = (time.perf_counter() - inicio) / vezes * 1000
+    tamanho = f"{len(resultado):6d} bytes" if isinstance(resultado, bytes) else ''
+    print(f"{nome:<28} {media:7.2f} ms  {tamanho}")
+    return media
+
+def em_threads(threads, pagamentos, func):
+    """pagamentos divididos entre as threads; retorna pagamentos por segundo"""
+    por_thread = pagamentos // threads
+
+    def cliente():
+        c = app.test_client()
+        for _ in range(por_thread):
+            func(c)
+
+    lista = [threading.Thread(target=cliente) for _ in range(threads)]
+    inicio = time.perf_counter()
+    for thread in lista:
+        thread.start()
+    for thread in lista:
+        thread.join()
+    return por_thread * threads / (time.perf_counter() - inicio)
+
+def main():
+    pagamentos = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    cliente = app.test_client()
+
+    print(f"📊 Um QR Code ({len(PAYLOAD)} caracteres de payload)")
+    medir('PNG PIL (antes)', lambda: png_pil(PAYLOAD), 50)
+    medir('matriz do QR (qrcode)', lambda: matriz(PAYLOAD) and None, 50)
+    modulos = matriz(PAYLOAD)
+    medir('  + PNG 1 bit', lambda: png(modulos), 200)
+    medir('  + SVG', lambda: svg(modulos), 200)
+
+    # Antes: create renderizava e embutia o PNG na resposta
+    criar_local = gateway_completo.create_local_pix_payment
+
+    def create_com_imagem(payment_data):
+        resultado = criar_local(payment_data)
+        resultado['qr_code_image'] = f"data:image/png;base64,{base64.b64encode(png_pil(resultado['qr_code'])).decode()}"
+        return resultado
+
+    print(f"📊 /api/pix/create ({qr_renderer.workers} processos de renderização)")
+    gateway_completo.create_local_pix_payment = create_com_imagem
+    medir('com imagem PIL (antes)', lambda: cliente.post('/api/pix/create', json=PIX), 50)
+    gateway_completo.create_local_pix_payment = criar_local
+    medir('só payload (agora)', lambda: cliente.post('/api/pix/create', json=PIX), 50)
+
+    print(f"📊 Checkout: {pagamentos} pagamentos em {threads} threads")
+    gateway_completo.create_local_pix_payment = create_com_imagem
+    antes = em_threads(threads, pagamentos, lambda c: c.post('/api/pix/create', json=PIX))
+    gateway_completo.create_local_pix_payment = criar_local
+
+    def checkout(c):
+        resposta = c.post('/api/pix/create', json=PIX).json
+        c.get(resposta['qr_code_url'])
+
+    agora = em_threads(threads, pagamentos, checkout)
+    print(f"create com imagem PIL (antes) {antes:7.0f} pagamentos/s")
+    print(f"create + GET qr.png (agora)   {agora:7.0f} pagamentos/s")
+
+    url = cliente.post('/api/pix/create', json=PIX).json['qr_code_url']
+    etag = cliente.get(url).headers['ETag']
+    medir('GET qr.png (cache)', lambda: cliente.get(url).data, 500)
+    medir('GET qr.png (304)', lambda: cliente.get(url, headers={'If-None-Match': etag}).data, 500)
+    print(f"   qr_renderer: {qr_renderer.stats()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do rate limiter (services/rate_limit.py)
+
+1. Store: MemoryBucketStore (três array('d') + dict chave -> slot) x um
+   dict de dicts por bucket, com um IP distinto por bucket: memória
+   (tracemalloc) e custo de consumir().
+2. Rajada de logins de um mesmo IP com senha errada: tempo total de CPU do
+   servidor com e sem o limite (sem ele, cada tentativa roda o PBKDF2).
+
+Uso: python benchmarks/bench_rate_limit.py [buckets] [tentativas_login]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='bench_rate_')
+os.environ['DATABASE_PATH'] = os.path.join(TMP_DIR, 'bench.db')
+
+from gateway_completo import app, rate_limiter
+from services.rate_limit import MemoryBucketStore
+
+class DictBucketStore:
+    """Referência: um dict {'tokens', 'atualizado'} por bucket"""
+
+    def __init__(self):
+        self._buckets = {}
+
+    def consumir(self, chave, capacidade, taxa, agora=None):
+        agora = time.monotonic() if agora is None else agora
+        bucket = self._buckets.setdefault(chave, {'tokens': capacidade, 'atualizado': agora})
+        bucket['tokens'] = min(capacidade, bucket['tokens'] + (agora - bucket['atualizado']) * taxa)
+        bucket['atualizado'] = agora
+        if bucket['tokens'] >= 1:
+            bucket['tokens'] -= 1
+            return 0.0
+        return (1 - bucket['tokens']) / taxa
+
+def medir_store(nome, store, chaves):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    for chave in chaves:
+        store.consumir(chave, 10, 10 / 60)
+    for chave in chaves:
+        store.consumir(chave, 10, 10 / 60)
+    duracao = time.perf_counter() - inicio
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{nome:<8} {duracao / (2 * len(chaves)) * 1e6:8.2f} µs por consumir()  "
+          f"{memoria / len(chaves):7.0f} bytes por bucket")
+
+def rajada_login(tentativas):
+    cliente = app.test_client()
+    inicio = time.process_time()
+    codigos = [cliente.post('/api/login', json={'username': 'seller', 'password': 'errada'},
+                            environ_base={'REMOTE_ADDR': '203.0.113.7'}).status_code
+               for _ in range(tentativas)]
+    return time.process_time() - inicio, codigos.count(429)
+
+def main():
+    buckets = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    tentativas = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+
+    chaves = [f'login:ip:10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}' for i in range(buckets)]
+    print(f"📊 {buckets} buckets (um por IP)")
+    medir_store('arrays', MemoryBucketStore(), chaves)
+    medir_store('dicts', DictBucketStore(), chaves)
+
+    print(f"📊 {tentativas} logins com senha errada do mesmo IP")
+    rate_limiter.enabled = False
+    cpu_sem, _ = rajada_login(tentativas)
+    rate_limiter.enabled = True
+    cpu_com, recusadas = rajada_login(tentativas)
+    print(f"sem limite {cpu_sem:6.2f}s de CPU")
+    print(f"com limite {cpu_com:6.2f}s de CPU ({recusadas} respostas 429)")
+    print(f"   {rate_limiter.stats()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark da listagem de empresas: dict montado por índice x repositório
+
+Antes: fetchall() em sqlite3.Row, dict por linha montado com row[0]..row[13]
+e serialização pelo JSON padrão do Flask.
+Depois: UsuariosRepository.empresas() (registros criados pelo row_factory)
+e serializar(), com a lista inteira numa página só e com a primeira página
+do cursor (PAGINACAO_LIMITE_PADRAO linhas e total limitado).
+
+Uso: python benchmarks/bench_repositories.py [sellers] [repeticoes]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='bench_repos_')
+os.environ['DATABASE_PATH'] = os.path.join(TMP_DIR, 'bench.db')
+
+from gateway_completo import DatabaseManager
+from services.repositories import SEM_FILTROS, UsuariosRepository, serializar
+
+def popular(db, sellers):
+    def inserir(cursor):
+        cursor.executemany('''
+            INSERT INTO usuarios (username, email, password_hash, tipo, status, api_key)
+            VALUES (?, ?, 'x', 'seller', 'ativo', ?)
+        ''', ((f'seller_{i}', f'seller_{i}@bench', f'key_{i}') for i in range(sellers)))
+        cursor.execute('''
+            INSERT INTO kyc (user_id, tipo_pessoa, cpf_cnpj, nome_razao_social, status)
+            SELECT id, 'PJ', '00.000.000/0001-00', 'Empresa ' || id, 'aprovado'
+            FROM usuarios WHERE tipo = 'seller'
+        ''')
+    db.write_transaction(inserir)
+
+EMPRESAS = UsuariosRepository.EMPRESAS
+EMPRESAS_SQL = (f'SELECT {EMPRESAS.colunas} {EMPRESAS.origem} '
+                f'WHERE {" AND ".join(EMPRESAS.condicoes)} ORDER BY u.created_at DESC')
+
+def antigo(conn):
+    rows = conn.execute(EMPRESAS_SQL).fetchall()
+    empresas = []
+    for row in rows:
+        empresas.append({
+            'id': row[0],
+            'username': row[1],
+            'email': row[2],
+            'status': row[3],
+            'created_at': row[4],
+            'tipo_pessoa': row[5],
+            'nome_razao_social': row[6],
+            'cpf_cnpj': row[7],
+            'porte_juridico': row[8],
+            'setor_atividade': row[9],
+            'faturamento_mensal': row[10],
+            'kyc_status': row[11],
+            'kyc_created_at': row[12],
+            'status_kyc_display': row[13]
+        })
+    return json.dumps({'success': True, 'empresas': empresas, 'total': len(empresas)}, sort_keys=True)
+
+def repositorio(conn):
+    pagina = UsuariosRepository(conn).empresas(SEM_FILTROS._replace(limite=10 ** 9))
+    return serializar({'success': True, 'empresas': pagina.itens, 'total': len(pagina.itens)})
+
+def pagina(conn):
+    pagina = UsuariosRepository(conn).empresas()
+    return serializar({'success': True, 'empresas': pagina.itens, 'next_cursor': pagina.next_cursor,
+                       'total': pagina.total, 'total_exato': pagina.total_exato})
+
+def medir(nome, func, conn, repeticoes):
+    func(conn)
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        func(conn)
+    media = (time.perf_counter() - inicio) / repeticoes * 1000
+    print(f"{nome:<12} {media:9.2f} ms por requisição")
+    return media
+
+def main():
+    sellers = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    db = DatabaseManager()
+    popular(db, sellers)
+
+    conn = db.get_connection()
+    print(f"📊 /api/admin/empresas com {sellers} sellers ({repeticoes} repetições)")
+    t_antigo = medir('row[i]+dict', antigo, conn, repeticoes)
+    t_repo = medir('repositório', repositorio, conn, repeticoes)
+    print(f"✅ {t_antigo / t_repo:.2f}x")
+    t_pagina = medir('1ª página', pagina, conn, repeticoes)
+    print(f"✅ {t_antigo / t_pagina:.1f}x")
+    conn.close()
+
+if __name__ == '__main__':
+    main()
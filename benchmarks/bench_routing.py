@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do roteamento entre adquirentes (services/routing.py)
+
+1. Custo da decisão: AcquirerRouter.rotas() com as janelas cheias.
+2. Degradação: pagamentos de crédito com adquirentes simuladas; no meio da
+   rodada a preferida passa a falhar (timeout) em 50% das chamadas e as
+   seguintes migram para a próxima rota. Mostra a distribuição por fase, os
+   failovers e as decisões gravadas em lote pelo RoutingLogWriter (as
+   pontuações usam a taxa da adquirente sobre o valor, então valores baixos
+   favorecem quem não cobra taxa fixa).
+
+Uso: python benchmarks/bench_routing.py [decisoes] [pagamentos_por_fase]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='bench_routing_')
+os.environ['DATABASE_PATH'] = os.path.join(TMP_DIR, 'bench.db')
+
+from gateway_completo import gateway
+
+def adquirente(falhas=0.0):
+    def processar(dados, valor, timeout):
+        if random.random() < falhas:
+            raise TimeoutError(f'sem resposta em {timeout}s')
+        return {'status_pagamento': 'aprovado'}
+    return processar
+
+def fase(nome, pagamentos):
+    inicio = time.perf_counter()
+    usadas = Counter(gateway.payment.processar_pagamento(
+        {'valor': random.uniform(20, 500), 'tipo_pagamento': 'credito'}, 2).get('adquirente', 'falha')
+        for _ in range(pagamentos))
+    duracao = time.perf_counter() - inicio
+    print(f"{nome:<10} {dict(usadas)}  ({duracao / pagamentos * 1e6:.0f} µs por pagamento)")
+
+def main():
+    decisoes = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    pagamentos = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    router = gateway.payment.router
+    random.seed(7)
+
+    # Janelas com histórico: latências variadas nas três adquirentes de crédito
+    for nome in ('stripe', 'paypal', 'mercadopago'):
+        for _ in range(5000):
+            router.registrar(nome, random.random() > 0.02, random.expovariate(1 / 300))
+
+    inicio = time.perf_counter()
+    for _ in range(decisoes):
+        router.rotas('credito', 150.0)
+    print(f"📊 {decisoes} decisões: {(time.perf_counter() - inicio) / decisoes * 1e6:.2f} µs por decisão")
+
+    processadores = gateway.payment.processadores
+    for nome in ('stripe', 'paypal', 'mercadopago'):
+        processadores[nome] = adquirente()
+    print(f"📊 {pagamentos} pagamentos de crédito por fase")
+    fase('normal', pagamentos)
+    processadores['mercadopago'] = adquirente(falhas=0.5)
+    fase('degradada', pagamentos)
+    fase('adaptada', pagamentos)
+
+    gateway.routing_log.flush()
+    print(f"   router: {router.stats()}")
+    print(f"   routing_log: {gateway.routing_log.stats()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de leitura/escrita concorrente: perfil SQLite padrão x perfil WAL
+
+Escritores inserem transações (como o checkout) enquanto leitores consultam
+o dashboard do seller. Cada cenário usa um banco novo e um ConnectionPool
+próprio com o perfil indicado.
+
+Uso: python benchmarks/bench_sqlite_profile.py [segundos] [escritores] [leitores]
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='bench_profile_')
+os.environ['DATABASE_PATH'] = os.path.join(TMP_DIR, 'bootstrap.db')
+
+from gateway_completo import ConnectionPool, SQLITE_PROFILE, run_write_transaction
+
+PERFIL_PADRAO = {'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 5000}
+
+def criar_banco(database):
+    conn = sqlite3.connect(database)
+    conn.execute('''
+        CREATE TABLE transacoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transaction_id TEXT UNIQUE NOT NULL,
+            user_id INTEGER,
+            status TEXT NOT NULL,
+            valor REAL NOT NULL,
+            valor_liquido REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+def inserir(cursor):
+    cursor.execute('''
+        INSERT INTO transacoes (transaction_id, user_id, status, valor, valor_liquido)
+        VALUES (?, ?, 'aprovado', 10.0, 9.7)
+    ''', (uuid.uuid4().hex, 1))
+
+def executar(nome, profile, segundos, escritores, leitores, com_retry):
+    database = os.path.join(TMP_DIR, f'{nome}.db')
+    criar_banco(database)
+    pool = ConnectionPool(database, size=escritores + leitores, profile=profile)
+    fim = time.perf_counter() + segundos
+    contagem = {'escritas': 0, 'leituras': 0, 'erros': 0}
+    lock = threading.Lock()
+    
+    def escritor():
+        feitas = erros = 0
+        while time.perf_counter() < fim:
+            conn = pool.acquire()
+            try:
+                if com_retry:
+                    run_write_transaction(conn, inserir)
+                else:
+                    inserir(conn.cursor())
+                    conn.commit()
+                feitas += 1
+            except sqlite3.OperationalError:
+                erros += 1
+            finally:
+                conn.close()
+        with lock:
+            contagem['escritas'] += feitas
+            contagem['erros'] += erros
+    
+    def leitor():
+        feitas = erros = 0
+        while time.perf_counter() < fim:
+            conn = pool.acquire()
+            try:
+                conn.execute('''
+                    SELECT COUNT(*), COALESCE(SUM(valor_liquido), 0)
+                    FROM transacoes WHERE user_id = ? AND status = 'aprovado'
+                ''', (1,)).fetchone()
+                feitas += 1
+            except sqlite3.OperationalError:
+                erros += 1
+            finally:
+                conn.close()
+        with lock:
+            contagem['leituras'] += feitas
+            contagem['erros'] += erros
+    
+    threads = [threading.Thread(target=escritor) for _ in range(escritores)]
+    threads += [threading.Thread(target=leitor) for _ in range(leitores)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    pool.close_all()
+    
+    print(f"{nome:<8} escritas/s {contagem['escritas'] / segundos:9.0f}   "
+          f"leituras/s {contagem['leituras'] / segundos:9.0f}   erros {contagem['erros']}")
+    return contagem
+
+if __name__ == '__main__':
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    escritores = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    leitores = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    print(f"📊 {segundos:.0f}s, {escritores} escritores, {leitores} leitores")
+    executar('padrao', PERFIL_PADRAO, segundos, escritores, leitores, com_retry=False)
+    executar('wal', SQLITE_PROFILE, segundos, escritores, leitores, com_retry=True)
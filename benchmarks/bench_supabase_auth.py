@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Concorrência e vazão do AuthService contra um Supabase local
+
+Sobe um servidor HTTP/1.1 (keep-alive) no lugar do Supabase com
+/auth/v1/user, /auth/v1/token, /auth/v1/logout e /rest/v1/usuarios, cada
+chamada com LATENCIA_MS de atraso, e compara a validação remota de tokens:
+
+    compartilhado  set_session() + get_user() no cliente único do módulo
+                   (caminho anterior: duas chamadas e sessão global)
+    por requisição create_client() novo a cada requisição (isolado, mas sem
+                   reaproveitar conexões)
+    auth_client    AuthService._get_user_remoto(): contexto próprio por
+                   requisição sobre o pool HTTP compartilhado
+
+Cada thread usa o token de um usuário diferente; "vazamentos" conta as
+respostas com o usuário de outra thread, e "tabelas como" mostra com que
+Authorization o cliente compartilhado consulta a tabela usuarios depois da
+rodada (deve continuar a anon key, não o token do último usuário). Por fim
+confere o mesmo depois de um login e logout pelo AuthService, e que o
+logout só é dado como feito com a sessão encerrada (204, 401 ou 404), não
+com outros erros do GoTrue (403, 500).
+
+O auth_client não pode ter vazamentos nem erros, e as tabelas têm de ser
+consultadas com a anon key depois dele, do login e do logout; qualquer
+conferência que falhe encerra com código 1 (o compartilhado só é medido).
+
+Uso: python benchmarks/bench_supabase_auth.py [threads] [requisicoes_por_thread]
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+
+SEGREDO = 'segredo-do-supabase-local'
+LATENCIA_MS = float(os.environ.get('LATENCIA_MS', 2))
+ANON_KEY = jwt.encode({'role': 'anon', 'iss': 'supabase'}, SEGREDO, algorithm='HS256')
+
+def token_usuario(n, exp=3600):
+    agora = int(time.time())
+    return jwt.encode({'sub': f'usuario-{n}', 'email': f'usuario{n}@gateway.com', 'aud': 'authenticated',
+                       'role': 'authenticated', 'iat': agora, 'exp': agora + exp}, SEGREDO, algorithm='HS256')
+
+def usuario_json(claims):
+    return {'id': claims['sub'], 'email': claims['email'], 'aud': 'authenticated', 'role': 'authenticated',
+            'app_metadata': {}, 'user_metadata': {}, 'created_at': '2024-01-01T00:00:00Z'}
+
+class Supabase(BaseHTTPRequestHandler):
+    """GoTrue + PostgREST mínimos; guarda o Authorization visto pelo /rest"""
+
+    protocol_version = 'HTTP/1.1'
+    conexoes = set()
+    authorization_rest = []
+
+    def setup(self):
+        super().setup()
+        Supabase.conexoes.add(self.client_address)
+
+    def do_GET(self):
+        time.sleep(LATENCIA_MS / 1000)
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))  # o postgrest manda corpo no GET
+        url = urlparse(self.path)
+        if url.path == '/auth/v1/user':
+            try:
+                claims = jwt.decode(self._bearer(), SEGREDO, algorithms=['HS256'], audience='authenticated')
+            except jwt.PyJWTError:
+                return self._json({'msg': 'invalid JWT'}, 401)
+            self._json(usuario_json(claims))
+        elif url.path == '/rest/v1/usuarios':
+            Supabase.authorization_rest.append(self._bearer())
+            user_id = parse_qs(url.query)['id'][0].removeprefix('eq.')
+            self._json([{'id': user_id, 'tipo': 'seller', 'status': 'ativo'}])
+        else:
+            self._json({'msg': 'not found'}, 404)
+
+    def do_POST(self):
+        time.sleep(LATENCIA_MS / 1000)
+        corpo = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if self.path.startswith('/auth/v1/token'):
+            n = corpo['email'].removeprefix('usuario').split('@')[0]
+            token = token_usuario(n)
+            self._json({'access_token': token, 'refresh_token': f'refresh-{n}', 'expires_in': 3600,
+                        'token_type': 'bearer', 'user': usuario_json(jwt.decode(token, options={'verify_signature': False}))})
+        elif self.path == '/auth/v1/logout':
+            # Tokens "status-<n>" simulam erros do GoTrue no logout
+            status = self._bearer().removeprefix('status-')
+            if status.isdigit():
+                return self._json({'msg': f'erro {status}'}, int(status))
+            self.send_response(204)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            self._json({'msg': 'not found'}, 404)
+
+    def _bearer(self):
+        return self.headers.get('Authorization', '').replace('Bearer ', '')
+
+    def _json(self, dados, status=200):
+        corpo = json.dumps(dados).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+def tabelas_como(auth_service):
+    """Identidade usada pelo cliente compartilhado numa consulta de tabela"""
+    Supabase.authorization_rest.clear()
+    auth_service._get_user_data('usuario-0')
+    bearer = Supabase.authorization_rest[-1]
+    return 'anon key' if bearer == ANON_KEY else jwt.decode(bearer, options={'verify_signature': False})['sub']
+
+falhas = []
+
+def conferir(condicao, mensagem):
+    if not condicao:
+        falhas.append(mensagem)
+        print(f"❌ {mensagem}")
+
+def rodada(nome, validar, threads, requisicoes, auth_service):
+    """Cada thread valida o token do seu usuário; conta vazamentos e erros"""
+    vazamentos, erros = [], []
+    Supabase.conexoes.clear()
+
+    def cliente(n):
+        token = token_usuario(n)
+        for _ in range(requisicoes):
+            try:
+                user_id = validar(token)
+            except Exception:
+                erros.append(1)
+                continue
+            if user_id != f'usuario-{n}':
+                vazamentos.append(1)
+
+    inicio = time.perf_counter()
+    lista = [threading.Thread(target=cliente, args=(n,)) for n in range(threads)]
+    for thread in lista:
+        thread.start()
+    for thread in lista:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+    total = threads * requisicoes
+    conexoes = len(Supabase.conexoes)
+    identidade = tabelas_como(auth_service)
+    print(f"{nome:<15} {total / duracao:7.0f} req/s  vazamentos {len(vazamentos):4d}  erros {len(erros):4d}  "
+          f"conexões TCP {conexoes:4d}  tabelas como {identidade}")
+    return len(vazamentos), len(erros), identidade
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    requisicoes = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Supabase)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    os.environ['SUPABASE_URL'] = f'http://127.0.0.1:{servidor.server_port}'
+    os.environ['SUPABASE_KEY'] = ANON_KEY
+
+    from supabase import create_client
+    from config.supabase import supabase
+    from services.auth_service import AuthService
+    auth_service = AuthService()
+
+    def compartilhado(token):
+        # O código anterior passava None, que o gotrue 1.3 recusa (e um
+        # refresh_token vazio invalida a sessão gravada); com um valor qualquer
+        # a sessão global funciona como o código pretendia
+        supabase.auth.set_session(token, 'refresh')
+        return supabase.auth.get_user().user.id
+
+    def por_requisicao(token):
+        cliente = create_client(os.environ['SUPABASE_URL'], ANON_KEY)
+        try:
+            return cliente.auth.get_user(token).user.id
+        finally:
+            cliente.auth.close()
+
+    def pelo_auth_client(token):
+        return auth_service._get_user_remoto(token)['user'].id
+
+    print(f"📊 {threads} threads x {requisicoes} validações remotas (latência simulada {LATENCIA_MS:.0f} ms)")
+    vazamentos, erros, identidade = rodada('auth_client', pelo_auth_client, threads, requisicoes, auth_service)
+    conferir(vazamentos == 0, f'auth_client: {vazamentos} vazamentos de token')
+    conferir(erros == 0, f'auth_client: {erros} erros')
+    conferir(identidade == 'anon key', f'auth_client: tabelas consultadas como {identidade}')
+    rodada('por requisição', por_requisicao, threads, requisicoes, auth_service)
+
+    login = auth_service.sign_in('usuario7@gateway.com', 'senha')
+    identidade = tabelas_como(auth_service)
+    print(f"🔐 login usuario-7: {login['success']}, tabelas como {identidade}")
+    conferir(login['success'] and identidade == 'anon key', f'login: tabelas consultadas como {identidade}')
+    logout = auth_service.sign_out(login['access_token'])
+    identidade = tabelas_como(auth_service)
+    print(f"   logout: {logout}, tabelas como {identidade}")
+    conferir(logout and identidade == 'anon key', f'logout: {logout}, tabelas consultadas como {identidade}')
+    for status, esperado in ((401, True), (404, True), (403, False), (500, False)):
+        resultado = auth_service.sign_out(f'status-{status}')
+        print(f"   logout com {status} do GoTrue: {resultado}")
+        conferir(resultado is esperado, f'logout com {status}: {resultado} (esperado {esperado})')
+
+    # Por último: a sessão global contamina o cliente compartilhado
+    rodada('compartilhado', compartilhado, threads, requisicoes, auth_service)
+    supabase.auth._remove_session()  # cancela o timer de renovação deixado pelo set_session()
+    if falhas:
+        print(f"❌ {len(falhas)} conferências falharam")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark e verificação do AuthService.get_user contra um emissor local
+
+Sobe um servidor HTTP local no lugar do Supabase com:
+
+    /auth/v1/.well-known/jwks.json  JWKS com uma chave HS256 ("oct")
+    /auth/v1/user                   valida o token (como o get_user remoto)
+    /rest/v1/usuarios?id=eq.<id>    linha de usuarios (como o _get_user_data)
+
+e compara, por requisição autenticada:
+
+    remoto  GET /auth/v1/user + GET /rest/v1/usuarios (caminho anterior)
+    local   SupabaseTokenVerifier.verify() + UserAuthCache (caminho novo,
+            montado como em AuthService.get_user)
+
+Antes das medições confere os casos de borda: assinatura forjada, token
+expirado, emissor errado, rotação de chave (kid novo) e kid forjado, e
+que, com o TTL vencido e um JWKS lento, só uma thread espera a releitura
+enquanto as demais seguem com a chave em cache.
+
+Uso: python benchmarks/bench_supabase_jwt.py [requisicoes]
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+import requests
+
+from services.auth_cache import UserAuthCache
+from services.supabase_jwt import SigningKeyCache, SupabaseTokenVerifier, VerificacaoIndisponivel
+
+USUARIO_ID = '6f1c8f7e-0000-4000-8000-000000000001'
+CHAVES = {'k1': 'segredo-do-emissor-local-k1'}
+
+def jwk(kid, segredo):
+    return dict(json.loads(jwt.algorithms.HMACAlgorithm.to_jwk(segredo.encode())), kid=kid, alg='HS256')
+
+class Emissor(BaseHTTPRequestHandler):
+    """Supabase local: JWKS, get_user e tabela usuarios"""
+
+    atraso_jwks = 0.0  # segundos
+
+    def do_GET(self):
+        if self.path == '/auth/v1/.well-known/jwks.json':
+            time.sleep(Emissor.atraso_jwks)
+            self._json({'keys': [jwk(kid, segredo) for kid, segredo in CHAVES.items()]})
+        elif self.path == '/auth/v1/user':
+            token = self.headers.get('Authorization', '').replace('Bearer ', '')
+            kid = jwt.get_unverified_header(token).get('kid')
+            claims = jwt.decode(token, CHAVES[kid], algorithms=['HS256'], audience='authenticated')
+            self._json({'id': claims['sub'], 'email': claims['email']})
+        elif self.path.startswith('/rest/v1/usuarios'):
+            self._json([{'id': USUARIO_ID, 'tipo': 'seller', 'status': 'ativo'}])
+        else:
+            self.send_error(404)
+
+    def _json(self, dados):
+        corpo = json.dumps(dados).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+def emitir(emissor, kid='k1', segredo=None, exp=3600, iss=None):
+    agora = int(time.time())
+    claims = {'sub': USUARIO_ID, 'email': 'seller@gateway.com', 'role': 'authenticated',
+              'aud': 'authenticated', 'iss': iss or f'{emissor}/auth/v1', 'iat': agora, 'exp': agora + exp}
+    return jwt.encode(claims, segredo or CHAVES[kid], algorithm='HS256', headers={'kid': kid})
+
+def medir(nome, func, requisicoes):
+    func()
+    inicio = time.perf_counter()
+    for _ in range(requisicoes):
+        func()
+    media = (time.perf_counter() - inicio) / requisicoes * 1000
+    print(f"{nome:<8} {media:8.3f} ms por requisição")
+    return media
+
+def main():
+    requisicoes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Emissor)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    emissor = f'http://127.0.0.1:{servidor.server_port}'
+    sessao = requests.Session()
+
+    def usuario_remoto(user_id):
+        return sessao.get(f'{emissor}/rest/v1/usuarios?id=eq.{user_id}').json()[0]
+
+    chaves = SigningKeyCache(f'{emissor}/auth/v1/.well-known/jwks.json', min_refresh=0)
+    verifier = SupabaseTokenVerifier(jwt_secret=None, jwks=chaves, issuer=f'{emissor}/auth/v1')
+    user_cache = UserAuthCache(usuario_remoto)
+
+    def get_user_local(token):
+        claims = verifier.verify(token)
+        return claims and {'user': verifier.usuario(claims), 'user_data': user_cache.get(claims['sub'])}
+
+    def get_user_remoto(token):
+        user = sessao.get(f'{emissor}/auth/v1/user', headers={'Authorization': f'Bearer {token}'}).json()
+        return {'user': user, 'user_data': usuario_remoto(user['id'])}
+
+    token = emitir(emissor)
+    print(f"🔐 Emissor local em {emissor}")
+    print(f"   válido: {get_user_local(token)['user_data']['status']}")
+    print(f"   assinatura forjada: {get_user_local(emitir(emissor, segredo='outro'))}")
+    print(f"   expirado: {get_user_local(emitir(emissor, exp=-10))}")
+    print(f"   emissor errado: {get_user_local(emitir(emissor, iss='https://outro/auth/v1'))}")
+    CHAVES['k2'] = 'segredo-do-emissor-local-k2'
+    print(f"   chave rotacionada (kid k2): {get_user_local(emitir(emissor, kid='k2'))['user'].id == USUARIO_ID}")
+    try:
+        get_user_local(emitir(emissor, kid='forjado', segredo='x'))
+    except VerificacaoIndisponivel as e:
+        print(f"   kid desconhecido: caminho remoto ({e})")
+    print(f"   jwks: {chaves.stats()}")
+
+    # TTL vencido com o JWKS levando 1 s: uma thread relê, as outras não esperam
+    lentas = SigningKeyCache(f'{emissor}/auth/v1/.well-known/jwks.json', ttl=0, min_refresh=0)
+    lentas.get('k1')
+    Emissor.atraso_jwks = 1.0
+    tempos = []
+
+    def buscar():
+        inicio = time.perf_counter()
+        lentas.get('k1')
+        tempos.append(time.perf_counter() - inicio)
+    threads = [threading.Thread(target=buscar) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    Emissor.atraso_jwks = 0.0
+    esperaram = sum(t >= 0.5 for t in tempos)
+    print(f"   TTL vencido, JWKS lento: {esperaram} de {len(tempos)} threads esperaram a releitura "
+          f"({lentas.stats()['fetches'] - 1} leitura)")
+
+    print(f"📊 get_user ({requisicoes} requisições, mesmo token)")
+    t_remoto = medir('remoto', lambda: get_user_remoto(token), requisicoes)
+    t_local = medir('local', lambda: get_user_local(token), requisicoes)
+    print(f"✅ {t_remoto / t_local:.0f}x (sem a latência de rede real até o Supabase)")
+    print(f"   user_cache: {user_cache.stats()}")
+    servidor.shutdown()
+
+if __name__ == '__main__':
+    main()
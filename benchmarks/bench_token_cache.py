@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do cache de tokens verificados (SecurityManager.token_cache)
+
+Simula sessões do checkout/painel: cada token é enviado N vezes (10 mil por
+padrão), intercalado com os das outras sessões, e mede decode_token():
+
+    sem cache  jwt.decode com verificação HS256 a cada chamada
+    com cache  SHA-256 do token + consulta ao LRU (decode só na 1ª chamada)
+
+Uso: python benchmarks/bench_token_cache.py [tokens] [requisicoes_por_token]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='bench_tokens_')
+os.environ['DATABASE_PATH'] = os.path.join(TMP_DIR, 'bench.db')
+
+from gateway_completo import SecurityManager
+from services.auth_cache import TokenCache
+
+def medir(nome, security, tokens, requisicoes):
+    inicio = time.perf_counter()
+    for _ in range(requisicoes):
+        for token in tokens:
+            assert security.decode_token(token) is not None
+    total = time.perf_counter() - inicio
+    media = total / (requisicoes * len(tokens)) * 1e6
+    print(f"{nome:<10} {media:8.2f} µs por verificação ({total:.2f}s)")
+    return media
+
+def main():
+    sessoes = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    requisicoes = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+    security = SecurityManager()
+    tokens = [security.generate_token(i, 'seller', 'ativo') for i in range(1, sessoes + 1)]
+    print(f"📊 decode_token: {sessoes} tokens x {requisicoes} requisições")
+
+    security.token_cache = TokenCache(max_entries=0)
+    t_sem = medir('sem cache', security, tokens, requisicoes)
+    security.token_cache = TokenCache()
+    t_com = medir('com cache', security, tokens, requisicoes)
+    print(f"✅ {t_sem / t_com:.1f}x")
+    print(f"   token_cache: {security.token_cache.stats()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark dos webhooks das adquirentes (services/webhooks.py)
+
+Cria PAGAMENTOS cobranças PIX de um produto e a adquirente local
+(benchmarks/adquirente_local.py) envia os eventos assinados:
+
+1. ack: tempo de resposta de /webhooks/local com o consumidor parado (só
+   assinatura e INSERT na fila) e de WebhookQueue.receber() sozinho;
+2. repetidos: 10% dos eventos reenviados respondem duplicado=true e não
+   entram na fila;
+3. aplicação: os eventos da fila aplicados um por transação (batch_size=1)
+   contra lotes de WEBHOOK_BATCH_SIZE; um quinto dos pagamentos recebe
+   paid, refunded e paid de novo, e o status final tem de ser o último;
+4. confere transacoes.status, produtos.sales e o replay (reaplicar a fila
+   inteira não muda nada).
+
+Uso: python benchmarks/bench_webhooks.py [pagamentos]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix='bench_webhooks_')
+os.environ['DATABASE_PATH'] = os.path.join(TMP_DIR, 'bench.db')
+os.environ['RATE_LIMIT_ENABLED'] = '0'
+os.environ['QR_WORKERS'] = '0'
+os.environ['WEBHOOK_SECRET_LOCAL'] = 'segredo-do-benchmark'
+
+from benchmarks.adquirente_local import AdquirenteLocal
+from gateway_completo import app, gateway
+from services.webhooks import WebhookQueue
+
+PRODUTO = 'bench_webhooks'
+
+def cadastrar_produto():
+    gateway.db.write_transaction(lambda cursor: cursor.execute('''
+        INSERT INTO produtos (product_id, name, price, header) VALUES (?, 'Produto', 42.0, 'Produto')
+    ''', (PRODUTO,)))
+
+def consultar(sql, params=()):
+    conn = gateway.db.get_connection()
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+def enviar(cliente, eventos):
+    """Envia (corpo, headers) pela rota; retorna as latências em µs"""
+    latencias = []
+    for corpo, headers in eventos:
+        inicio = time.perf_counter()
+        resposta = cliente.post('/webhooks/local', data=corpo, headers=headers)
+        latencias.append((time.perf_counter() - inicio) * 1e6)
+        assert resposta.status_code == 200, resposta.json
+    return latencias
+
+def resumo(latencias):
+    latencias = sorted(latencias)
+    return (f"média {statistics.mean(latencias):6.0f} µs  p50 {latencias[len(latencias) // 2]:6.0f} µs  "
+            f"p99 {latencias[int(len(latencias) * 0.99)]:6.0f} µs")
+
+def main():
+    pagamentos = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    cadastrar_produto()
+    cliente = app.test_client()
+    pix = {'amount': 42.0, 'customer_name': 'Cliente', 'customer_email': 'cliente@bench', 'product_id': PRODUTO}
+    payment_ids = [cliente.post('/api/pix/create', json=pix).json['payment_id'] for _ in range(2 * pagamentos)]
+    adquirente = AdquirenteLocal(os.environ['WEBHOOK_SECRET_LOCAL'])
+
+    # Metade dos pagamentos para cada forma de aplicar; um quinto com estorno e novo pagamento
+    def eventos_de(ids):
+        eventos = [adquirente.evento(payment_id) for payment_id in ids]
+        for payment_id in ids[:len(ids) // 5]:
+            eventos.append(adquirente.evento(payment_id, 'payment.refunded'))
+            eventos.append(adquirente.evento(payment_id, 'payment.paid'))
+        return eventos
+    individuais, em_lote = eventos_de(payment_ids[:pagamentos]), eventos_de(payment_ids[pagamentos:])
+
+    gateway.webhooks.stop()
+    print(f"📊 {len(individuais) + len(em_lote)} webhooks de {2 * pagamentos} pagamentos")
+    latencias = enviar(cliente, individuais + em_lote)
+    print(f"ack /webhooks/local          {resumo(latencias)}")
+
+    repetidos = (individuais + em_lote)[::10]
+    for corpo, headers in repetidos:
+        assert cliente.post('/webhooks/local', data=corpo, headers=headers).json['duplicado']
+    fila = WebhookQueue(gateway.db.write_transaction)
+    extra = [adquirente.evento(payment_id, 'payment.created') for payment_id in payment_ids[:500]]
+    diretas = []
+    for corpo, headers in extra:
+        inicio = time.perf_counter()
+        fila.receber('local', corpo, headers['X-Webhook-Timestamp'], headers['X-Webhook-Signature'])
+        diretas.append((time.perf_counter() - inicio) * 1e6)
+    print(f"WebhookQueue.receber()       {resumo(diretas)}")
+    print(f"repetidos                    {len(repetidos)} reenviados, "
+          f"{gateway.webhooks.stats()['duplicates']} marcados duplicados")
+
+    # Aplicação: primeiro os eventos dos pagamentos individuais (um por transação)
+    total_individuais = len(individuais)
+    um_a_um = WebhookQueue(gateway.db.write_transaction, batch_size=1)
+    inicio = time.perf_counter()
+    for _ in range(total_individuais):
+        um_a_um.processar_lote()
+    tempo_um = time.perf_counter() - inicio
+    restantes = consultar('SELECT COUNT(*) FROM webhook_eventos WHERE processado_em IS NULL')[0][0]
+    lotes = WebhookQueue(gateway.db.write_transaction)
+    inicio = time.perf_counter()
+    aplicados = lotes.processar_pendentes()
+    tempo_lote = time.perf_counter() - inicio
+    assert aplicados == restantes
+    print(f"um evento por transação      {total_individuais / tempo_um:8.0f} eventos/s")
+    print(f"lotes de {lotes.batch_size:<5}               {aplicados / tempo_lote:8.0f} eventos/s  "
+          f"{(aplicados / tempo_lote) / (total_individuais / tempo_um):5.1f}x")
+
+    aprovadas = consultar('SELECT COUNT(*) FROM transacoes WHERE product_id = ? AND status = ?', (PRODUTO, 'aprovado'))
+    vendas = consultar('SELECT sales FROM produtos WHERE product_id = ?', (PRODUTO,))[0][0]
+    assert aprovadas[0][0] == vendas == 2 * pagamentos, (aprovadas, vendas)
+    print(f"status final e vendas        {vendas} aprovadas, produtos.sales = {vendas}")
+
+    marcados = lotes.replay()
+    lotes.processar_pendentes()
+    assert consultar('SELECT sales FROM produtos WHERE product_id = ?', (PRODUTO,))[0][0] == vendas
+    print(f"replay                       {marcados} eventos reaplicados, vendas inalteradas")
+    print(f"   individuais: {um_a_um.stats()}")
+    print(f"   lotes:       {lotes.stats()}")
+
+if __name__ == '__main__':
+    main()
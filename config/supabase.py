@@ -1,4 +1,8 @@
 import os
+import httpx
+from gotrue import SyncGoTrueClient
+from gotrue.constants import DEFAULT_HEADERS
+from gotrue.http_clients import SyncClient
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
@@ -9,9 +13,37 @@ load_dotenv()
 SUPABASE_URL = os.getenv('SUPABASE_URL', 'https://your-project.supabase.co')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY', 'your-anon-key')
 
-# Cliente Supabase
+# Conexões do pool HTTP do Supabase Auth e timeout das chamadas (segundos)
+SUPABASE_AUTH_MAX_CONNECTIONS = int(os.getenv('SUPABASE_AUTH_MAX_CONNECTIONS', 20))
+SUPABASE_AUTH_TIMEOUT = float(os.getenv('SUPABASE_AUTH_TIMEOUT', 10))
+
+# Cliente Supabase (tabelas). Nunca recebe sessão de usuário: login, logout e
+# validação de token usam auth_client()
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# Pool HTTP do Supabase Auth, compartilhado pelos contextos de autenticação
+auth_http_client = SyncClient(
+    timeout=SUPABASE_AUTH_TIMEOUT,
+    limits=httpx.Limits(max_connections=SUPABASE_AUTH_MAX_CONNECTIONS,
+                        max_keepalive_connections=SUPABASE_AUTH_MAX_CONNECTIONS)
+)
+AUTH_HEADERS = {**DEFAULT_HEADERS, 'apiKey': SUPABASE_KEY, 'Authorization': f'Bearer {SUPABASE_KEY}'}
+
+def auth_client() -> SyncGoTrueClient:
+    """Contexto de autenticação de uma requisição
+    
+    Sessão só em memória e sem renovação automática, então o token de uma
+    requisição não vaza para outra; as conexões vêm do auth_http_client.
+    Não chamar close(): ele fecharia o pool compartilhado.
+    """
+    return SyncGoTrueClient(
+        url=f'{SUPABASE_URL}/auth/v1',
+        headers=AUTH_HEADERS,
+        auto_refresh_token=False,
+        persist_session=False,
+        http_client=auth_http_client
+    )
+
 # Configurações de tabelas
 TABLES = {
     'usuarios': 'usuarios',
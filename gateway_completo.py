@@ -13,17 +13,55 @@ import sqlite3
 import hmac
 import requests
 import time
+import queue
+import random
+import threading
+import functools
+import math
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as PrazoEsgotado
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_file
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash
 from werkzeug.utils import secure_filename
 import uuid
-import qrcode
 import base64
-from io import BytesIO
+
+from services.api_keys import API_KEY_GRACE_PERIOD, ApiKeyIndex, hash_chave, prefixo as prefixo_api_key
+from services.audit_log import AuditLogWriter
+from services.auth_cache import TokenCache, UserAuthCache
+from services import brcode
+from services.brcode import PIX_CIDADE, RECEBEDOR_PADRAO
+from services.busca import expressao_busca
+from services.fees import FeeSchedule, centavos
+from services.group_commit import GroupCommitWriter
+from services.idempotency import (IDEMPOTENCY_KEY_MAX_LENGTH, ChaveReutilizada, EmAndamento, IdempotencyStore,
+                                  fingerprint as fingerprint_corpo)
+from services.ledger import saldo as saldo_seller
+from services.migrations import migrate_sqlite
+from services.password_hasher import PASSWORD_HASH_METHOD, HashingSaturado, PasswordHasher
+from services.qr import MIMETYPES as FORMATOS_QR, QR_CACHE_MAX_AGE, QrRenderer
+from services.rate_limit import RateLimiter, criar_store, regra
+from services.repositories import (
+    ApiKeysRepository, FiltroInvalido, KycRepository, LogsRepository, MetasRepository, ProdutosRepository,
+    SaquesRepository, TaxasRepository, TransacoesRepository, UsuariosRepository, filtros_da_query, serializar
+)
+from services.rollups import intervalo_mes, vendas_periodo
+from services.routing import ROUTING_WORKERS, AcquirerRouter, RoutingLogWriter
+from services.webhooks import AdquirenteDesconhecida, AssinaturaInvalida, EventoInvalido, WebhookQueue
+from services.status_notifier import (PIX_STREAM_HEARTBEAT, PIX_STREAM_MAX_AGE, LimiteAssinaturas,
+                                      StatusNotifier, etag as etag_status)
+
+class GatewayJSONProvider(DefaultJSONProvider):
+    """jsonify() passa pelo serializador único dos repositórios"""
+    
+    def dumps(self, obj, **kwargs):
+        return serializar(obj)
 
 app = Flask(__name__)
+app.json = GatewayJSONProvider(app)
 app.secret_key = os.urandom(24)
 CORS(app)
 
@@ -38,313 +76,435 @@ if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
 # Configuração do banco de dados
-DATABASE = 'gateway_pagamentos.db'
+DATABASE = os.environ.get('DATABASE_PATH', 'gateway_pagamentos.db')
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+DB_CACHED_STATEMENTS = int(os.environ.get('DB_CACHED_STATEMENTS', 256))  # statements compilados por conexão
+
+# Perfil SQLite aplicado a toda conexão do pool
+SQLITE_PROFILE = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),  # ms
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64000)),  # negativo = KiB
+    'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'MEMORY'),
+    'wal_autocheckpoint': int(os.environ.get('SQLITE_WAL_AUTOCHECKPOINT', 1000)),  # páginas
+}
+
+# Política de checkpoint do WAL
+DB_CHECKPOINT_INTERVAL = float(os.environ.get('DB_CHECKPOINT_INTERVAL', 60))  # segundos, 0 desativa
+DB_WAL_TRUNCATE_BYTES = int(os.environ.get('DB_WAL_TRUNCATE_BYTES', 64 * 1024 * 1024))
+
+# Retry de transações de escrita em SQLITE_BUSY
+DB_WRITE_RETRIES = int(os.environ.get('DB_WRITE_RETRIES', 5))
+DB_RETRY_BASE_DELAY = float(os.environ.get('DB_RETRY_BASE_DELAY', 0.01))
+DB_RETRY_MAX_DELAY = float(os.environ.get('DB_RETRY_MAX_DELAY', 0.5))
+
+# Group commit das inserções de transações (desativado por padrão)
+DB_GROUP_COMMIT = os.environ.get('DB_GROUP_COMMIT', '0').lower() in ('1', 'true', 'yes')
+DB_GROUP_COMMIT_TIMEOUT = float(os.environ.get('DB_GROUP_COMMIT_TIMEOUT', 30))  # segundos
+
+# Máximo de cobranças por chamada de /api/pix/batch
+PIX_BATCH_MAX = int(os.environ.get('PIX_BATCH_MAX', 1000))
+
+def is_busy_error(error):
+    """Indica se o erro é SQLITE_BUSY/SQLITE_LOCKED"""
+    mensagem = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in mensagem or 'busy' in mensagem)
+
+def run_write_transaction(conn, func, *args, retries=None, **kwargs):
+    """Executa func(cursor, ...) em BEGIN IMMEDIATE, repetindo com backoff em SQLITE_BUSY"""
+    if conn.in_transaction:
+        # Já dentro de uma transação externa: quem abriu é responsável pelo commit
+        return func(conn.cursor(), *args, **kwargs)
+    
+    retries = DB_WRITE_RETRIES if retries is None else retries
+    delay = DB_RETRY_BASE_DELAY
+    for tentativa in range(retries + 1):
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            resultado = func(conn.cursor(), *args, **kwargs)
+            conn.commit()
+            return resultado
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            if not is_busy_error(e) or tentativa == retries:
+                raise
+            time.sleep(delay * (1 + random.random()))
+            delay = min(delay * 2, DB_RETRY_MAX_DELAY)
+
+class PooledConnection(sqlite3.Connection):
+    """Conexão SQLite que volta para o pool ao ser fechada"""
+    
+    def close(self):
+        """Devolve a conexão ao pool em vez de fechá-la"""
+        self._pool.release(self)
+    
+    def _fechar(self):
+        """Fecha a conexão de fato"""
+        super().close()
+
+class ConnectionPool:
+    """Pool de conexões SQLite thread-safe com reuso por thread"""
+    
+    def __init__(self, database, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, profile=None):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.profile = SQLITE_PROFILE if profile is None else profile
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._local = threading.local()
+    
+    def _connect(self):
+        """Abre uma nova conexão física"""
+        conn = sqlite3.connect(self.database, factory=PooledConnection, check_same_thread=False,
+                               cached_statements=DB_CACHED_STATEMENTS)
+        conn._pool = self
+        conn.row_factory = sqlite3.Row
+        for pragma, valor in self.profile.items():
+            conn.execute(f'PRAGMA {pragma} = {valor}')
+        return conn
+    
+    def acquire(self):
+        """Obtém uma conexão; a mesma thread recebe sempre a mesma conexão"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            return conn
+        
+        if not self._slots.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError('Pool de conexões esgotado')
+        
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                conn = self._connect()
+            except Exception:
+                self._slots.release()
+                raise
+        
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+    
+    def release(self, conn):
+        """Libera uma referência da conexão obtida pela thread atual"""
+        if getattr(self._local, 'conn', None) is not conn:
+            return
+        self._local.depth -= 1
+        if self._local.depth <= 0:
+            self._devolver(conn)
+    
+    def release_thread(self):
+        """Devolve ao pool a conexão da thread atual, mesmo se não foi fechada"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._devolver(conn)
+    
+    def _devolver(self, conn):
+        """Desfaz transação pendente e recoloca a conexão na fila"""
+        self._local.conn = None
+        self._local.depth = 0
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+        except sqlite3.Error:
+            conn._fechar()
+        finally:
+            self._slots.release()
+    
+    def close_all(self):
+        """Fecha todas as conexões ociosas"""
+        while True:
+            try:
+                self._idle.get_nowait()._fechar()
+            except queue.Empty:
+                break
 
 class DatabaseManager:
-    """Gerenciador do banco de dados"""
+    """Gerenciador do banco de dados (instância única por processo)"""
     
-    def __init__(self):
-        self.init_database()
+    _instance = None
+    _instance_lock = threading.Lock()
+    
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    instance = super().__new__(cls)
+                    instance.database = DATABASE
+                    instance.pool = ConnectionPool(DATABASE, DB_POOL_SIZE, DB_POOL_TIMEOUT)
+                    instance._checkpoint_stop = threading.Event()
+                    instance._checkpoint_thread = None
+                    instance.group_commit = None
+                    instance.init_database()
+                    instance.start_checkpointer()
+                    if DB_GROUP_COMMIT:
+                        instance.start_group_commit()
+                    cls._instance = instance
+        return cls._instance
     
     def init_database(self):
-        """Inicializa o banco de dados"""
-        conn = sqlite3.connect(DATABASE)
+        """Inicializa o banco de dados (executado uma vez na inicialização)"""
+        conn = self.pool.acquire()
+        
+        # Schema versionado (services/migrations.py é a fonte única)
+        migrate_sqlite(conn)
         cursor = conn.cursor()
         
-        # Tabela de usuários (Admin e Seller)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS usuarios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                tipo TEXT NOT NULL DEFAULT 'seller', -- 'admin' ou 'seller'
-                status TEXT NOT NULL DEFAULT 'pendente', -- 'pendente', 'ativo', 'suspenso'
-                api_key TEXT UNIQUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_active BOOLEAN DEFAULT 1
-            )
-        ''')
-        
-        # Tabela de KYC (Know Your Customer) - Expandida
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS kyc (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                tipo_pessoa TEXT NOT NULL, -- 'PF' ou 'PJ'
-                cpf_cnpj TEXT,
-                nome_razao_social TEXT,
-                porte_juridico TEXT, -- MEI, LTDA, etc
-                data_nascimento TEXT,
-                telefone TEXT,
-                endereco TEXT,
-                cidade TEXT,
-                estado TEXT,
-                cep TEXT,
-                
-                -- Dados do Responsável (PJ)
-                nome_responsavel TEXT,
-                cpf_responsavel TEXT,
-                nome_mae TEXT,
-                data_nascimento_responsavel TEXT,
-                
-                -- Dados de Atividade
-                setor_atividade TEXT,
-                faturamento_mensal TEXT,
-                
-                -- Documentos
-                documento_responsavel TEXT, -- caminho do arquivo
-                contrato_social TEXT, -- caminho do arquivo (PJ)
-                documento_frente TEXT, -- caminho do arquivo
-                documento_verso TEXT,
-                comprovante_residencia TEXT,
-                
-                -- Status e Controle
-                status TEXT DEFAULT 'pendente', -- 'pendente', 'aprovado', 'rejeitado', 'rascunho'
-                observacoes TEXT,
-                aprovado_por INTEGER,
-                aprovado_em TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES usuarios (id),
-                FOREIGN KEY (aprovado_por) REFERENCES usuarios (id)
-            )
-        ''')
-        
-        # Tabela de configurações de taxas
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS taxas (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                tipo_pagamento TEXT NOT NULL, -- 'credito', 'debito', 'pix', 'boleto'
-                taxa_percentual REAL DEFAULT 2.99,
-                taxa_fixa REAL DEFAULT 0.00,
-                ativo BOOLEAN DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES usuarios (id)
-            )
-        ''')
-        
-        # Tabela de transações
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS transacoes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                payment_id TEXT UNIQUE,
-                transaction_id TEXT UNIQUE NOT NULL,
-                user_id INTEGER,
-                product_id TEXT,
-                amount REAL NOT NULL,
-                currency TEXT DEFAULT 'BRL',
-                payment_method TEXT NOT NULL, -- 'credito', 'debito', 'pix', 'boleto'
-                status TEXT NOT NULL, -- 'pendente', 'aprovado', 'rejeitado', 'cancelado'
-                customer_name TEXT,
-                customer_email TEXT,
-                merchant_reference_id TEXT,
-                valor REAL NOT NULL,
-                taxa_cobrada REAL NOT NULL,
-                valor_liquido REAL NOT NULL,
-                dados_pagamento TEXT, -- JSON com dados do pagamento
-                adquirente TEXT, -- 'stripe', 'paypal', 'mercadopago', etc
-                dados_retorno TEXT, -- JSON com retorno da adquirente
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES usuarios (id)
-            )
-        ''')
-        
-        # Tabela de saques
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS saques (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                valor REAL NOT NULL,
-                taxa_saque REAL NOT NULL,
-                valor_liquido REAL NOT NULL,
-                tipo TEXT NOT NULL, -- 'manual', 'automatico'
-                status TEXT NOT NULL, -- 'pendente', 'processado', 'rejeitado'
-                dados_pix TEXT, -- JSON com dados PIX
-                observacoes TEXT,
-                processado_por INTEGER,
-                processado_em TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES usuarios (id),
-                FOREIGN KEY (processado_por) REFERENCES usuarios (id)
-            )
-        ''')
-        
-        # Tabela de metas de venda
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS metas (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                meta_valor REAL NOT NULL, -- 100k, 250k, 500k, 1M, 5M
-                valor_atual REAL DEFAULT 0.0,
-                data_inicio DATE,
-                data_fim DATE,
-                status TEXT DEFAULT 'ativa', -- 'ativa', 'concluida', 'cancelada'
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES usuarios (id)
-            )
-        ''')
-        
-        # Tabela de produtos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS produtos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                product_id TEXT UNIQUE NOT NULL,
-                user_id INTEGER,
-                name TEXT NOT NULL,
-                price REAL NOT NULL,
-                header TEXT NOT NULL,
-                thank_page_type TEXT DEFAULT 'default', -- 'default' ou 'custom'
-                thank_page_url TEXT,
-                support_email TEXT,
-                warranty_time INTEGER,
-                warranty_unit TEXT,
-                product_image TEXT, -- caminho da imagem
-                product_banner TEXT,
-                final_banner TEXT,
-                show_marketplace BOOLEAN DEFAULT 1,
-                status TEXT DEFAULT 'ativo', -- 'ativo', 'inativo', 'deletado'
-                views INTEGER DEFAULT 0,
-                sales INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES usuarios (id)
-            )
-        ''')
-        
-        # Tabela de logs
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                acao TEXT NOT NULL,
-                detalhes TEXT,
-                ip_address TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES usuarios (id)
-            )
-        ''')
-        
-        # Inserção idempotente para admin (segura contra reloader)
-        admin_password = generate_password_hash('admin123')
-        cursor.execute('''
-            INSERT OR IGNORE INTO usuarios (username, email, password_hash, tipo, status, api_key)
-            VALUES ('admin', 'admin@gateway.com', ?, 'admin', 'ativo', ?)
-        ''', (admin_password, hashlib.sha256(uuid.uuid4().bytes).hexdigest()))
-
-        # Inserção idempotente para seller (segura contra reloader)
-        seller_password = generate_password_hash('seller123')
-        cursor.execute('''
-            INSERT OR IGNORE INTO usuarios (username, email, password_hash, tipo, status, api_key)
-            VALUES ('seller', 'seller@gateway.com', ?, 'seller', 'ativo', ?)
-        ''', (seller_password, hashlib.sha256(uuid.uuid4().bytes).hexdigest()))
+        # Inserção idempotente para admin e seller (segura contra reloader)
+        self._seed_usuario(cursor, 'admin', 'admin@gateway.com', 'admin123', 'admin')
+        self._seed_usuario(cursor, 'seller', 'seller@gateway.com', 'seller123', 'seller')
         
         # Usuários de teste removidos para trabalhar apenas com dados reais
         
         conn.commit()
         conn.close()
     
+    def _seed_usuario(self, cursor, username, email, senha, tipo):
+        """Cria usuário padrão só se ainda não existir (evita hash desnecessário)"""
+        cursor.execute('SELECT 1 FROM usuarios WHERE username = ?', (username,))
+        if cursor.fetchone():
+            return
+        api_key = hashlib.sha256(uuid.uuid4().bytes).hexdigest()
+        cursor.execute('''
+            INSERT OR IGNORE INTO usuarios (username, email, password_hash, tipo, status, api_key)
+            VALUES (?, ?, ?, ?, 'ativo', ?)
+        ''', (username, email, generate_password_hash(senha, method=PASSWORD_HASH_METHOD), tipo, api_key))
+        ApiKeysRepository(cursor.connection).criar(cursor.lastrowid, hash_chave(api_key), prefixo_api_key(api_key))
+    
     def get_connection(self):
-        """Retorna conexão com o banco"""
-        conn = sqlite3.connect(DATABASE)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """Retorna conexão do pool (fechar a conexão devolve ao pool)"""
+        return self.pool.acquire()
+    
+    def release_thread_connection(self):
+        """Devolve ao pool a conexão da thread atual"""
+        self.pool.release_thread()
+    
+    def write_transaction(self, func, *args, **kwargs):
+        """Executa func(cursor, ...) numa transação de escrita com retry em SQLITE_BUSY"""
+        conn = self.get_connection()
+        try:
+            return run_write_transaction(conn, func, *args, **kwargs)
+        finally:
+            conn.close()
+    
+    def insert(self, sql, params=()):
+        """Executa um INSERT e retorna o id da linha
+        
+        Com group commit ativo a linha vai para a thread de gravação e entra no
+        próximo lote; sem ele, cada chamada faz o próprio commit.
+        """
+        if self.group_commit is not None:
+            return self.group_commit.execute(sql, params, timeout=DB_GROUP_COMMIT_TIMEOUT)
+        return self.write_transaction(lambda cursor: cursor.execute(sql, params).lastrowid)
+    
+    def start_group_commit(self, **kwargs):
+        """Ativa o group commit para insert()"""
+        if self.group_commit is None:
+            self.group_commit = GroupCommitWriter(self.write_transaction, **kwargs).start()
+        return self.group_commit
+    
+    def stop_group_commit(self):
+        """Grava o que está pendente e volta aos commits por requisição"""
+        if self.group_commit is not None:
+            writer, self.group_commit = self.group_commit, None
+            writer.stop()
+    
+    def checkpoint(self, mode='PASSIVE'):
+        """Executa checkpoint do WAL; retorna (busy, páginas no log, páginas copiadas)"""
+        conn = sqlite3.connect(self.database, timeout=SQLITE_PROFILE['busy_timeout'] / 1000)
+        try:
+            return tuple(conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone())
+        finally:
+            conn.close()
+    
+    def start_checkpointer(self, interval=DB_CHECKPOINT_INTERVAL):
+        """Inicia a thread de checkpoint periódico (apenas em modo WAL)"""
+        if interval <= 0 or str(self.pool.profile.get('journal_mode', '')).upper() != 'WAL':
+            return
+        if self._checkpoint_thread and self._checkpoint_thread.is_alive():
+            return
+        self._checkpoint_stop.clear()
+        self._checkpoint_thread = threading.Thread(
+            target=self._checkpoint_loop, args=(interval,), name='wal-checkpoint', daemon=True
+        )
+        self._checkpoint_thread.start()
+    
+    def stop_checkpointer(self):
+        """Para a thread de checkpoint periódico"""
+        self._checkpoint_stop.set()
+        if self._checkpoint_thread:
+            self._checkpoint_thread.join()
+            self._checkpoint_thread = None
+    
+    def _checkpoint_loop(self, interval):
+        """PASSIVE a cada intervalo; TRUNCATE quando o WAL passa do limite"""
+        wal_path = self.database + '-wal'
+        while not self._checkpoint_stop.wait(interval):
+            try:
+                mode = 'PASSIVE'
+                if os.path.exists(wal_path) and os.path.getsize(wal_path) > DB_WAL_TRUNCATE_BYTES:
+                    mode = 'TRUNCATE'
+                self.checkpoint(mode)
+            except sqlite3.Error as e:
+                print(f"Erro no checkpoint do WAL: {str(e)}")
 
 class SecurityManager:
     """Gerenciador de segurança"""
     
-    def __init__(self):
+    def __init__(self, audit_log=None):
         # Usa segredo persistente para que os tokens continuem válidos após reload
         # Em produção, defina a variável de ambiente JWT_SECRET
         self.secret_key = os.environ.get('JWT_SECRET', 'dev-static-jwt-secret')
+        self.audit_log = audit_log or AuditLogWriter(DatabaseManager().write_transaction)
+        self.token_cache = TokenCache()
     
-    def generate_token(self, user_id):
-        """Gera token JWT"""
+    def generate_token(self, user_id, tipo=None, status=None, token_version=0):
+        """Gera token JWT com tipo, status e versão do token (ver) do usuário"""
         payload = {
             'user_id': user_id,
+            'tipo': tipo,
+            'status': status,
+            'ver': token_version,
             'exp': datetime.now() + timedelta(hours=24)
         }
         return jwt.encode(payload, self.secret_key, algorithm='HS256')
     
-    def verify_token(self, token):
-        """Verifica token JWT"""
+    def decode_token(self, token):
+        """Verifica o token JWT e retorna as claims (None se inválido)
+
+        Tokens já verificados vêm do token_cache até o exp.
+        """
+        chave = TokenCache.chave(token)
+        claims = self.token_cache.get(chave)
+        if claims is not None:
+            return claims
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=['HS256'])
-            return payload['user_id']
-        except:
+            claims = jwt.decode(token, self.secret_key, algorithms=['HS256'])
+        except jwt.PyJWTError:
             return None
+        self.token_cache.put(chave, claims)
+        return claims
+    
+    def revoke_tokens(self, user_id):
+        """Descarta do token_cache os tokens do usuário"""
+        self.token_cache.revogar_usuario(user_id)
+    
+    def verify_token(self, token):
+        """Verifica token JWT"""
+        payload = self.decode_token(token)
+        return payload['user_id'] if payload else None
     
     def generate_api_key(self):
         """Gera chave API única"""
         return hashlib.sha256(uuid.uuid4().bytes).hexdigest()
     
     def log_activity(self, user_id, acao, detalhes, ip_address):
-        """Registra atividade no log"""
-        db = DatabaseManager()
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO logs (user_id, acao, detalhes, ip_address)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, acao, detalhes, ip_address))
-        
-        conn.commit()
-        conn.close()
+        """Registra atividade no log (gravação assíncrona em lote)"""
+        return self.audit_log.submit(user_id, acao, detalhes, ip_address)
 
 class PaymentGateway:
     """Gateway de pagamentos com múltiplas adquirentes"""
     
-    def __init__(self):
+    def __init__(self, routing_log=None, fees=None):
+        # Taxas e métodos de pagamento habilitados em cada adquirente
         self.adquirentes = {
-            'stripe': {'taxa': 2.9, 'taxa_fixa': 0.30},
-            'paypal': {'taxa': 3.5, 'taxa_fixa': 0.35},
-            'mercadopago': {'taxa': 2.99, 'taxa_fixa': 0.00},
-            'pix': {'taxa': 0.99, 'taxa_fixa': 0.00}
+            'stripe': {'taxa': 2.9, 'taxa_fixa': 0.30, 'metodos': ('credito', 'debito')},
+            'paypal': {'taxa': 3.5, 'taxa_fixa': 0.35, 'metodos': ('credito',)},
+            'mercadopago': {'taxa': 2.99, 'taxa_fixa': 0.00, 'metodos': ('credito', 'debito', 'pix', 'boleto')},
+            'pix': {'taxa': 0.99, 'taxa_fixa': 0.00, 'metodos': ('pix',)}
         }
+        self.router = AcquirerRouter(self.adquirentes)
+        self.routing_log = routing_log
+        # Taxa cobrada do seller (tabela taxas); a taxa da adquirente só entra no roteamento
+        self.fees = fees or FeeSchedule(DatabaseManager().get_connection).carregar()
+        # Chamada a cada adquirente: (dados, valor, timeout) -> resposta com
+        # 'status_pagamento'; levanta exceção em erro ou timeout
+        self.processadores = {nome: self._simular_adquirente for nome in self.adquirentes}
+        # As chamadas rodam neste pool para o prazo (router.timeout) valer
+        # mesmo com a adquirente travada
+        self._executor = ThreadPoolExecutor(max_workers=ROUTING_WORKERS, thread_name_prefix='adquirente')
+    
+    def _simular_adquirente(self, dados, valor, timeout):
+        """Simula a resposta da adquirente"""
+        return {'status_pagamento': 'aprovado'}
+    
+    def _chamar_adquirente(self, adquirente, dados, valor):
+        """Resposta da adquirente dentro do prazo; levanta exceção em erro ou timeout"""
+        timeout = self.router.timeout
+        inicio = time.perf_counter()
+        futuro = self._executor.submit(self.processadores[adquirente], dados, valor, timeout)
+        try:
+            resposta = futuro.result(timeout=timeout)
+        except PrazoEsgotado:
+            futuro.cancel()
+            raise TimeoutError(f'sem resposta em {timeout:g}s')
+        if time.perf_counter() - inicio > timeout:
+            raise TimeoutError(f'resposta após o timeout de {timeout:g}s')
+        return resposta
     
     def processar_pagamento(self, dados, user_id):
-        """Processa pagamento com adquirente"""
+        """Processa pagamento pela melhor rota, com failover para as seguintes"""
         try:
-            # Simular processamento com adquirente
-            adquirente = dados.get('adquirente', 'stripe')
             valor = dados.get('valor', 0.0)
+            metodo = dados.get('tipo_pagamento')
             
-            # Calcular taxas
-            taxa_config = self.adquirentes.get(adquirente, self.adquirentes['stripe'])
-            taxa_valor = (valor * taxa_config['taxa'] / 100) + taxa_config['taxa_fixa']
-            valor_liquido = valor - taxa_valor
+            # Ordem das adquirentes por custo, taxa de sucesso e p95
+            inicio = time.perf_counter()
+            rotas = self.router.rotas(metodo, valor, dados.get('adquirente'))
+            decisao_us = (time.perf_counter() - inicio) * 1e6
+            if not rotas:
+                return {'erro': f'Nenhuma adquirente habilitada para {metodo}'}
             
-            # Simular resposta da adquirente
             transaction_id = str(uuid.uuid4())
-            
+            rota, resposta, erros = None, None, []
+            for tentativa in rotas[:self.router.max_tentativas]:
+                if erros:
+                    self.router.registrar_failover()
+                inicio_tentativa = time.perf_counter()
+                try:
+                    resposta = self._chamar_adquirente(tentativa.adquirente, dados, valor)
+                except Exception as e:
+                    erros.append(f'{tentativa.adquirente}: {str(e)}')
+                self.router.registrar(tentativa.adquirente, resposta is not None,
+                                      (time.perf_counter() - inicio_tentativa) * 1000)
+                if resposta is not None:
+                    rota = tentativa
+                    break
+            
+            tentativas = len(erros) + (1 if rota else 0)
+            status = resposta['status_pagamento'] if resposta else 'falha'
+            if self.routing_log:
+                self.routing_log.registrar(transaction_id, user_id, metodo, valor, rotas,
+                                           rota and rota.adquirente, tentativas, status,
+                                           (time.perf_counter() - inicio) * 1000, decisao_us)
+            if rota is None:
+                return {'erro': f'Falha nas adquirentes: {"; ".join(erros)}'}
+            
+            taxa_cobrada, valor_liquido = self.fees.taxa(user_id, metodo, valor)
             return {
                 'status': 'sucesso',
                 'transaction_id': transaction_id,
                 'valor': valor,
-                'taxa_cobrada': taxa_valor,
+                'taxa_cobrada': taxa_cobrada,
                 'valor_liquido': valor_liquido,
-                'adquirente': adquirente,
-                'status_pagamento': 'aprovado'
+                'adquirente': rota.adquirente,
+                'tentativas': tentativas,
+                'status_pagamento': status
             }
         except Exception as e:
             return {'erro': f'Erro no processamento: {str(e)}'}
     
     def gerar_qr_code_pix(self, dados_pix):
-        """Gera QR Code para PIX"""
+        """Gera QR Code para PIX (PNG em base64, pelo qr_renderer)"""
         try:
-            qr = qrcode.QRCode(version=1, box_size=10, border=5)
-            qr.add_data(dados_pix)
-            qr.make(fit=True)
-            
-            img = qr.make_image(fill_color="black", back_color="white")
-            buffer = BytesIO()
-            img.save(buffer, format='PNG')
-            buffer.seek(0)
-            
-            return base64.b64encode(buffer.getvalue()).decode()
+            return base64.b64encode(qr_renderer.renderizar(dados_pix).conteudo).decode()
         except Exception as e:
             return None
 
@@ -571,27 +731,53 @@ class GatewayPagamentos:
     
     def __init__(self):
         self.db = DatabaseManager()
-        self.security = SecurityManager()
-        self.payment = PaymentGateway()
+        self.audit_log = AuditLogWriter(self.db.write_transaction).start()
+        self.security = SecurityManager(self.audit_log)
+        self.auth_cache = UserAuthCache(self._estado_auth)
+        self.password_hasher = PasswordHasher()
+        self.api_keys = ApiKeyIndex(self.db.write_transaction, self.db.get_connection).carregar().start()
+        self.routing_log = RoutingLogWriter(self.db.write_transaction).start()
+        self.fees = FeeSchedule(self.db.get_connection).carregar().start()
+        self.payment = PaymentGateway(self.routing_log, self.fees)
+        self.idempotency = IdempotencyStore(self.db.write_transaction).start()
+        self.pix_status = StatusNotifier()
+        self.webhooks = WebhookQueue(self.db.write_transaction, ao_aplicar=self.pix_status.publicar).start()
         self.rapdyn = RapdynPayments()  # Integração Rapdyn
     
+    def _estado_auth(self, user_id):
+        """Carrega tipo, status e versão do token (usado pelo auth_cache)"""
+        conn = self.db.get_connection()
+        try:
+            return UsuariosRepository(conn).auth(user_id)
+        finally:
+            conn.close()
+    
+    def _salvar_hash_senha(self, user_id, hash_antigo, hash_novo):
+        """Grava o hash refeito com o custo atual (chamado pelo password_hasher)"""
+        self.db.write_transaction(
+            lambda cursor: UsuariosRepository(cursor.connection).atualizar_hash_senha(user_id, hash_antigo, hash_novo))
+    
     def registrar_usuario(self, username, email, password, tipo='seller'):
         """Registra novo usuário"""
         try:
+            # Hash no pool de senhas, antes de pegar a conexão
+            password_hash = self.password_hasher.hash(password)
+            api_key = self.security.generate_api_key()
+            
             conn = self.db.get_connection()
             cursor = conn.cursor()
             
-            password_hash = generate_password_hash(password)
-            api_key = self.security.generate_api_key()
-            
             cursor.execute('''
                 INSERT INTO usuarios (username, email, password_hash, tipo, api_key)
                 VALUES (?, ?, ?, ?, ?)
             ''', (username, email, password_hash, tipo, api_key))
             
             user_id = cursor.lastrowid
+            key_hash = hash_chave(api_key)
+            key_id = ApiKeysRepository(conn).criar(user_id, key_hash, prefixo_api_key(api_key))
             conn.commit()
             conn.close()
+            self.api_keys.adicionar(key_id, user_id, key_hash)
             
             return {
                 'status': 'sucesso',
@@ -601,6 +787,8 @@ class GatewayPagamentos:
             }
         except sqlite3.IntegrityError:
             return {'erro': 'Usuário ou email já existe'}
+        except HashingSaturado:
+            raise
         except Exception as e:
             return {'erro': f'Erro ao registrar: {str(e)}'}
     
@@ -611,18 +799,23 @@ class GatewayPagamentos:
             cursor = conn.cursor()
             
             cursor.execute('''
-                SELECT id, username, password_hash, api_key, tipo, status
+                SELECT id, username, password_hash, api_key, tipo, status, token_version
                 FROM usuarios WHERE username = ? AND is_active = 1
             ''', (username,))
             
             user = cursor.fetchone()
             conn.close()
             
-            if user and check_password_hash(user[2], password):  # user[2] = password_hash
+            if user and self.password_hasher.verify(user[2], password):  # user[2] = password_hash
                 if user[5] != 'ativo':  # user[5] = status
                     return {'erro': 'Conta não está ativa'}
                 
-                token = self.security.generate_token(user[0])  # user[0] = id
+                # Hash gerado com outro custo: refaz em segundo plano com o atual
+                if self.password_hasher.precisa_rehash(user[2]):
+                    self.password_hasher.rehash_em_segundo_plano(
+                        password, functools.partial(self._salvar_hash_senha, user[0], user[2]))
+                
+                token = self.security.generate_token(user[0], user[4], user[5], user[6])
                 return {
                     'status': 'sucesso',
                     'token': token,
@@ -633,6 +826,8 @@ class GatewayPagamentos:
                 }
             else:
                 return {'erro': 'Credenciais inválidas'}
+        except HashingSaturado:
+            raise
         except Exception as e:
             return {'erro': f'Erro na autenticação: {str(e)}'}
     
@@ -648,29 +843,24 @@ class GatewayPagamentos:
             
             if resultado.get('status') == 'sucesso':
                 # Registrar transação
-                conn = self.db.get_connection()
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    INSERT INTO transacoes (transaction_id, user_id, tipo_pagamento, valor, 
+                self.db.insert('''
+                    INSERT INTO transacoes (transaction_id, user_id, payment_method, amount, valor, 
                     taxa_cobrada, valor_liquido, status, dados_pagamento, adquirente, dados_retorno)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     resultado['transaction_id'],
                     user_id,
                     dados['tipo_pagamento'],
                     resultado['valor'],
+                    resultado['valor'],
                     resultado['taxa_cobrada'],
                     resultado['valor_liquido'],
-                    'aprovado',
+                    resultado['status_pagamento'],
                     json.dumps(dados),
                     resultado['adquirente'],
                     json.dumps(resultado)
                 ))
                 
-                conn.commit()
-                conn.close()
-                
                 # Log da atividade
                 self.security.log_activity(
                     user_id, 
@@ -688,65 +878,36 @@ class GatewayPagamentos:
         """Obtém dados do dashboard do seller"""
         try:
             conn = self.db.get_connection()
-            cursor = conn.cursor()
             
-            # Vendas do dia
-            hoje = datetime.now().strftime('%Y-%m-%d')
-            cursor.execute('''
-                SELECT COUNT(*) as total, SUM(valor) as valor_total
-                FROM transacoes 
-                WHERE user_id = ? AND DATE(created_at) = ? AND status = 'aprovado'
-            ''', (user_id, hoje))
-            vendas_dia = cursor.fetchone()
+            # Vendas do dia e do mês (rollup vendas_diarias)
+            agora = datetime.now()
+            hoje = agora.strftime('%Y-%m-%d')
+            vendas_dia = vendas_periodo(conn, user_id, hoje, hoje)
+            vendas_mes = vendas_periodo(conn, user_id, *intervalo_mes(agora.date()))
             
-            # Vendas do mês
-            mes_atual = datetime.now().strftime('%Y-%m')
-            cursor.execute('''
-                SELECT COUNT(*) as total, SUM(valor) as valor_total
-                FROM transacoes 
-                WHERE user_id = ? AND strftime('%Y-%m', created_at) = ? AND status = 'aprovado'
-            ''', (user_id, mes_atual))
-            vendas_mes = cursor.fetchone()
-            
-            # Saldo atual
-            cursor.execute('''
-                SELECT COALESCE(SUM(valor_liquido), 0) as saldo
-                FROM transacoes 
-                WHERE user_id = ? AND status = 'aprovado'
-            ''', (user_id,))
-            saldo = cursor.fetchone()
+            # Saldo atual (tabela saldos, mantida pelo ledger)
+            saldo_atual = saldo_seller(conn, user_id)
             
             # Últimas transações
-            cursor.execute('''
-                SELECT * FROM transacoes 
-                WHERE user_id = ? 
-                ORDER BY created_at DESC 
-                LIMIT 10
-            ''', (user_id,))
-            transacoes = cursor.fetchall()
+            transacoes = TransacoesRepository(conn).recentes(user_id, 10)
             
             # Metas ativas
-            cursor.execute('''
-                SELECT * FROM metas 
-                WHERE user_id = ? AND status = 'ativa'
-                ORDER BY meta_valor ASC
-            ''', (user_id,))
-            metas = cursor.fetchall()
+            metas = MetasRepository(conn).ativas(user_id)
             
             conn.close()
             
             return {
                 'vendas_dia': {
-                    'total': vendas_dia[0] or 0,
-                    'valor': vendas_dia[1] or 0.0
+                    'total': vendas_dia['total'],
+                    'valor': vendas_dia['valor']
                 },
                 'vendas_mes': {
-                    'total': vendas_mes[0] or 0,
-                    'valor': vendas_mes[1] or 0.0
+                    'total': vendas_mes['total'],
+                    'valor': vendas_mes['valor']
                 },
-                'saldo_atual': saldo[0] or 0.0,
-                'transacoes': [dict(zip([col[0] for col in cursor.description], t)) for t in transacoes],
-                'metas': [dict(zip([col[0] for col in cursor.description], m)) for m in metas]
+                'saldo_atual': saldo_atual,
+                'transacoes': transacoes,
+                'metas': metas
             }
         except Exception as e:
             return {'erro': f'Erro ao obter dashboard: {str(e)}'}
@@ -755,121 +916,245 @@ class GatewayPagamentos:
         """Obtém dados do dashboard do admin"""
         try:
             conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            # Total de sellers
-            cursor.execute('SELECT COUNT(*) as total FROM usuarios WHERE tipo = "seller"')
-            total_sellers = cursor.fetchone()
-            
-            # Sellers pendentes
-            cursor.execute('SELECT COUNT(*) as total FROM usuarios WHERE tipo = "seller" AND status = "pendente"')
-            sellers_pendentes = cursor.fetchone()
+            usuarios = UsuariosRepository(conn)
             
-            # KYC pendentes
-            cursor.execute('SELECT COUNT(*) as total FROM kyc WHERE status = "pendente"')
-            kyc_pendentes = cursor.fetchone()
-            
-            # Transações hoje
+            # Transações hoje (rollup vendas_diarias)
             hoje = datetime.now().strftime('%Y-%m-%d')
-            cursor.execute('''
-                SELECT COUNT(*) as total, SUM(valor) as valor_total
-                FROM transacoes 
-                WHERE DATE(created_at) = ? AND status = 'aprovado'
-            ''', (hoje,))
-            transacoes_hoje = cursor.fetchone()
-            
-            # Saques pendentes
-            cursor.execute('SELECT COUNT(*) as total FROM saques WHERE status = "pendente"')
-            saques_pendentes = cursor.fetchone()
-            
-            conn.close()
+            transacoes_hoje = vendas_periodo(conn, None, hoje, hoje)
             
-            return {
-                'total_sellers': total_sellers[0] or 0,
-                'sellers_pendentes': sellers_pendentes[0] or 0,
-                'kyc_pendentes': kyc_pendentes[0] or 0,
+            dashboard = {
+                'total_sellers': usuarios.contar_sellers(),
+                'sellers_pendentes': usuarios.contar_sellers('pendente'),
+                'kyc_pendentes': KycRepository(conn).contar('pendente'),
                 'transacoes_hoje': {
-                    'total': transacoes_hoje[0] or 0,
-                    'valor': transacoes_hoje[1] or 0.0
+                    'total': transacoes_hoje['total'],
+                    'valor': transacoes_hoje['valor']
                 },
-                'saques_pendentes': saques_pendentes[0] or 0
+                'saques_pendentes': SaquesRepository(conn).contar('pendente')
             }
+            
+            conn.close()
+            
+            return dashboard
         except Exception as e:
             return {'erro': f'Erro ao obter dashboard admin: {str(e)}'}
 
 # Instância global
 gateway = GatewayPagamentos()
 
+# Imagens dos QR Codes PIX (pool de processos + cache por conteúdo; QR_WORKERS)
+qr_renderer = QrRenderer()
+
+# Token buckets das rotas públicas (capacidade/segundos; RATE_LIMIT_BACKEND)
+rate_limiter = RateLimiter(criar_store(), {
+    'login': regra(os.environ.get('RATE_LIMIT_LOGIN', '10/60')),
+    'registrar': regra(os.environ.get('RATE_LIMIT_REGISTRAR', '5/300')),
+    'pix_create': regra(os.environ.get('RATE_LIMIT_PIX_CREATE', '60/60'), ('api_key', 'user', 'ip')),
+    'pix_batch': regra(os.environ.get('RATE_LIMIT_PIX_BATCH', '10/60'), ('api_key', 'user')),
+})
+
+@app.teardown_appcontext
+def release_db_connection(exception=None):
+    """Garante que a conexão da requisição volte ao pool"""
+    gateway.db.release_thread_connection()
+
 # Middleware de autenticação
+# Resultado da autenticação, guardado em request.auth
+Autenticacao = namedtuple('Autenticacao', 'user_id tipo status claims')
+
+def autenticar_requisicao():
+    """Decodifica o token uma vez por requisição
+
+    Retorna (Autenticacao, None) ou (None, resposta de erro). Tipo e status
+    vêm do auth_cache (estado atual do usuário, não o da emissão do token);
+    um token com versão diferente da do usuário foi revogado.
+    """
+    auth = getattr(request, 'auth', None)
+    if auth is not None:
+        return auth, None
+    
+    token = request.headers.get('Authorization')
+    if not token:
+        return None, (jsonify({'erro': 'Token não fornecido'}), 401)
+    
+    claims = gateway.security.decode_token(token.replace('Bearer ', ''))
+    if not claims:
+        return None, (jsonify({'erro': 'Token inválido'}), 401)
+    
+    estado = gateway.auth_cache.get(claims['user_id'])
+    if estado is None or estado.token_version != claims.get('ver', 0):
+        return None, (jsonify({'erro': 'Token revogado'}), 401)
+    
+    request.auth = Autenticacao(claims['user_id'], estado.tipo, estado.status, claims)
+    request.user_id = claims['user_id']
+    return request.auth, None
+
+def autenticar_api_key():
+    """Autentica pelo header X-API-Key (integrações servidor-a-servidor)
+
+    Retorna (Autenticacao, None) ou (None, resposta de erro). A chave é
+    conferida no índice em memória; tipo e status do seller vêm do auth_cache.
+    """
+    chave = gateway.api_keys.autenticar(request.headers.get('X-API-Key', ''))
+    estado = gateway.auth_cache.get(chave.user_id) if chave else None
+    if estado is None:
+        return None, (jsonify({'erro': 'API key inválida'}), 401)
+    if estado.status != 'ativo':
+        return None, (jsonify({'erro': 'Conta não está ativa'}), 403)
+    
+    request.auth = Autenticacao(chave.user_id, estado.tipo, estado.status, {'api_key_id': chave.key_id})
+    request.user_id = chave.user_id
+    return request.auth, None
+
 def require_auth(f):
     """Decorator para autenticação"""
     def decorated_function(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            return jsonify({'erro': 'Token não fornecido'}), 401
-        
-        user_id = gateway.security.verify_token(token.replace('Bearer ', ''))
-        if not user_id:
-            return jsonify({'erro': 'Token inválido'}), 401
-        
-        request.user_id = user_id
+        auth, erro = autenticar_requisicao()
+        if erro:
+            return erro
+        return f(*args, **kwargs)
+    decorated_function.__name__ = f.__name__
+    return decorated_function
+
+def require_api_auth(f):
+    """Decorator para rotas de integração: aceita X-API-Key ou token JWT"""
+    def decorated_function(*args, **kwargs):
+        if 'X-API-Key' in request.headers:
+            auth, erro = autenticar_api_key()
+        else:
+            auth, erro = autenticar_requisicao()
+        if erro:
+            return erro
         return f(*args, **kwargs)
     decorated_function.__name__ = f.__name__
     return decorated_function
 
-# Middleware para admin
+def optional_api_key(f):
+    """Decorator para rotas públicas: com X-API-Key, autentica o seller"""
+    def decorated_function(*args, **kwargs):
+        if 'X-API-Key' in request.headers:
+            auth, erro = autenticar_api_key()
+            if erro:
+                return erro
+        return f(*args, **kwargs)
+    decorated_function.__name__ = f.__name__
+    return decorated_function
+
+def rate_limit(rota):
+    """Decorator de token bucket (abaixo dos decorators de autenticação)"""
+    def decorator(f):
+        def decorated_function(*args, **kwargs):
+            auth = getattr(request, 'auth', None)
+            espera = rate_limiter.verificar(rota, {
+                'api_key': auth.claims.get('api_key_id') if auth else None,
+                'user': auth.user_id if auth else None,
+                'ip': request.remote_addr
+            })
+            if espera:
+                return jsonify({'erro': 'Muitas requisições, tente novamente em instantes'}), 429, \
+                    {'Retry-After': str(math.ceil(espera))}
+            return f(*args, **kwargs)
+        decorated_function.__name__ = f.__name__
+        return decorated_function
+    return decorator
+
+def idempotente(rota):
+    """Decorator do header Idempotency-Key (abaixo dos decorators de autenticação)
+    
+    A mesma chave, do mesmo seller (ou IP, sem autenticação) na mesma rota,
+    executa a rota uma vez; as repetições recebem a resposta gravada.
+    """
+    def decorator(f):
+        def decorated_function(*args, **kwargs):
+            chave = request.headers.get('Idempotency-Key')
+            if chave is None:
+                return f(*args, **kwargs)
+            if not chave or len(chave) > IDEMPOTENCY_KEY_MAX_LENGTH:
+                return jsonify({'erro': f'Idempotency-Key deve ter de 1 a {IDEMPOTENCY_KEY_MAX_LENGTH} caracteres'}), 400
+            
+            auth = getattr(request, 'auth', None)
+            escopo = f'user:{auth.user_id}' if auth else f'ip:{request.remote_addr}'
+            
+            def executar():
+                resposta = app.make_response(f(*args, **kwargs))
+                return resposta.status_code, resposta.get_data(as_text=True)
+            
+            try:
+                resultado = gateway.idempotency.executar(
+                    escopo, rota, chave, fingerprint_corpo(request.get_data()), executar)
+            except ChaveReutilizada as e:
+                return jsonify({'erro': str(e)}), 422
+            except EmAndamento as e:
+                return jsonify({'erro': str(e)}), 409, {'Retry-After': '1'}
+            
+            return Response(resultado.corpo, resultado.status_http, mimetype='application/json',
+                            headers={'Idempotent-Replayed': 'true' if resultado.replay else 'false'})
+        decorated_function.__name__ = f.__name__
+        return decorated_function
+    return decorator
+
+# Middleware para admin (autentica e exige tipo admin; dispensa @require_auth)
 def require_admin(f):
     """Decorator para verificar se é admin"""
     def decorated_function(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            return jsonify({'erro': 'Token não fornecido'}), 401
-        
-        user_id = gateway.security.verify_token(token.replace('Bearer ', ''))
-        if not user_id:
-            return jsonify({'erro': 'Token inválido'}), 401
-        
-        # Verificar se é admin
-        conn = gateway.db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT tipo FROM usuarios WHERE id = ?', (user_id,))
-        user = cursor.fetchone()
-        conn.close()
-        
-        if not user or user[0] != 'admin':
+        auth, erro = autenticar_requisicao()
+        if erro:
+            return erro
+        if auth.tipo != 'admin':
             return jsonify({'erro': 'Acesso negado'}), 403
-        
-        request.user_id = user_id
         return f(*args, **kwargs)
     decorated_function.__name__ = f.__name__
     return decorated_function
 
+def resposta_paginada(chave, pagina):
+    """Resposta padrão das listagens paginadas por cursor"""
+    return jsonify({
+        'success': True,
+        chave: pagina.itens,
+        'next_cursor': pagina.next_cursor,
+        'total': pagina.total,
+        'total_exato': pagina.total_exato
+    })
+
 # Funções auxiliares para PIX local
-def create_local_pix_payment(payment_data):
+def recebedor_pix(seller_id):
+    """Recebedor do BR Code: dados do KYC aprovado do seller, ou a conta da plataforma"""
+    conn = gateway.db.get_connection()
+    try:
+        kyc = KycRepository(conn).recebedor(seller_id)
+    finally:
+        conn.close()
+    if kyc is None or not kyc.cpf_cnpj or not kyc.nome_razao_social:
+        return RECEBEDOR_PADRAO
+    chave = ''.join(c for c in kyc.cpf_cnpj if c.isdigit())
+    return brcode.recebedor(chave, kyc.nome_razao_social, kyc.cidade or PIX_CIDADE, kyc.cep)
+
+def centavos_pix(valor):
+    """Valor de uma cobrança PIX em centavos (None se não for ao menos R$ 0,01)"""
+    if isinstance(valor, bool):
+        return None
+    try:
+        quantia = centavos(valor)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return quantia if 1 <= quantia < 10 ** 13 else None
+
+def create_local_pix_payment(payment_data, recebedor=RECEBEDOR_PADRAO):
     """Cria pagamento PIX local para demonstração"""
     try:
-        # Gerar dados PIX simulados
         payment_id = f"pix_{uuid.uuid4().hex[:8]}"
-        qr_code = f"00020126580014br.gov.bcb.pix0136{payment_id}520400005303986540510.005802BR5913Teste Empresa6008Brasilia62070503***6304"
-        
-        # Gerar QR Code
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(qr_code)
-        qr.make(fit=True)
+        # BR Code com o valor do pagamento e o payment_id como txid
+        qr_code = brcode.gerar(recebedor, centavos(payment_data.get('amount')), payment_id)
         
-        # Criar imagem do QR Code
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Converter para base64
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        qr_code_image = base64.b64encode(buffer.getvalue()).decode()
+        # A imagem é servida por /api/pix/<id>/qr.png; começa a renderizar já
+        qr_renderer.precarregar(qr_code)
         
         return {
             'success': True,
             'payment_id': payment_id,
             'qr_code': qr_code,
-            'qr_code_image': f"data:image/png;base64,{qr_code_image}",
+            'qr_code_url': f'/api/pix/{payment_id}/qr.png',
+            'qr_code_svg_url': f'/api/pix/{payment_id}/qr.svg',
             'pix_code': qr_code,
             'status': 'pending',
             'amount': payment_data.get('amount'),
@@ -881,29 +1166,6 @@ def create_local_pix_payment(payment_data):
             'error': f'Erro ao criar PIX local: {str(e)}'
         }
 
-def get_local_pix_status(payment_id):
-    """Obtém status do PIX local"""
-    try:
-        # Simular verificação de status
-        return {
-            'success': True,
-            'status': {
-                'status': 'SUCCESS'
-            },
-            'data': {
-                'id': payment_id,
-                'status': 'pending',
-                'amount': 0,
-                'currency': 'BRL'
-            }
-        }
-    except Exception as e:
-        return {
-            'success': False,
-            'error': f'Erro ao verificar status: {str(e)}'
-        }
-
-# Funções auxiliares para upload
 def allowed_file(filename):
     """Verifica se a extensão do arquivo é permitida"""
     return '.' in filename and \
@@ -922,8 +1184,12 @@ def save_uploaded_file(file, prefix=''):
         return new_filename
     return None
 
+# Resposta 503 quando o pool de hash de senhas está cheio
+SERVIDOR_OCUPADO = 'Servidor ocupado, tente novamente em instantes'
+
 # Rotas da API
 @app.route('/api/registrar', methods=['POST'])
+@rate_limit('registrar')
 def registrar():
     """Registra novo usuário com dados KYC iniciais"""
     try:
@@ -958,7 +1224,6 @@ def registrar():
         if resultado.get('status') == 'sucesso':
             # Criar registro KYC inicial
             conn = DatabaseManager().get_connection()
-            cursor = conn.cursor()
             
             kyc_data = {
                 'user_id': resultado.get('user_id'),
@@ -970,20 +1235,7 @@ def registrar():
                 'status': 'pendente_aprovacao'
             }
             
-            cursor.execute('''
-                INSERT INTO kyc (
-                    user_id, tipo_pessoa, nome_razao_social, cpf_cnpj, 
-                    porte_juridico, telefone, status
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                kyc_data['user_id'],
-                kyc_data['tipo_pessoa'],
-                kyc_data['nome_razao_social'],
-                kyc_data['cpf_cnpj'],
-                kyc_data['porte_juridico'],
-                kyc_data['telefone'],
-                kyc_data['status']
-            ))
+            KycRepository(conn).criar_inicial(kyc_data)
             
             conn.commit()
             conn.close()
@@ -997,21 +1249,28 @@ def registrar():
         else:
             return jsonify(resultado), 400
             
+    except HashingSaturado:
+        return jsonify({'success': False, 'message': SERVIDOR_OCUPADO}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erro ao registrar: {str(e)}'}), 500
 
 @app.route('/api/login', methods=['POST'])
+@rate_limit('login')
 def login():
     """Autentica usuário"""
     dados = request.json
-    resultado = gateway.autenticar_usuario(
-        dados.get('username'),
-        dados.get('password')
-    )
+    try:
+        resultado = gateway.autenticar_usuario(
+            dados.get('username'),
+            dados.get('password')
+        )
+    except HashingSaturado:
+        return jsonify({'erro': SERVIDOR_OCUPADO}), 503, {'Retry-After': '1'}
     return jsonify(resultado)
 
 @app.route('/api/pagamento', methods=['POST'])
-@require_auth
+@require_api_auth
+@idempotente('pagamento')
 def processar_pagamento():
     """Processa pagamento"""
     dados = request.json
@@ -1022,9 +1281,53 @@ def processar_pagamento():
     )
     return jsonify(resultado)
 
+@app.route('/api/api-keys', methods=['GET'])
+@require_auth
+def list_api_keys():
+    """Lista as API keys aceitas do usuário (ativa e em carência), sem a chave"""
+    try:
+        conn = DatabaseManager().get_connection()
+        chaves = ApiKeysRepository(conn).aceitas(request.user_id)
+        conn.close()
+        
+        return jsonify({'success': True, 'api_keys': chaves})
+    
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Erro ao listar API keys: {str(e)}'}), 500
+
+@app.route('/api/api-keys/rotate', methods=['POST'])
+@require_auth
+def rotate_api_key():
+    """Gera uma API key nova; as anteriores valem por mais API_KEY_GRACE_PERIOD segundos"""
+    try:
+        user_id = request.user_id
+        api_key = gateway.security.generate_api_key()
+        key_hash = hash_chave(api_key)
+        expira_em = time.time() + API_KEY_GRACE_PERIOD
+        
+        key_id = gateway.db.write_transaction(
+            lambda cursor: ApiKeysRepository(cursor.connection).rotacionar(
+                user_id, api_key, key_hash, prefixo_api_key(api_key), expira_em))
+        gateway.api_keys.rotacionar(user_id, key_id, key_hash, expira_em)
+        
+        gateway.security.log_activity(user_id, 'rotacionar_api_key', f'Nova API key {prefixo_api_key(api_key)}...', request.remote_addr)
+        
+        return jsonify({
+            'success': True,
+            'message': 'API key gerada com sucesso',
+            'api_key': api_key,
+            'anteriores_expiram_em': datetime.utcfromtimestamp(int(expira_em)).strftime('%Y-%m-%d %H:%M:%S')
+        })
+    
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Erro ao gerar API key: {str(e)}'}), 500
+
 @app.route('/api/pix/create', methods=['POST'])
+@optional_api_key
+@rate_limit('pix_create')
+@idempotente('pix_create')
 def create_pix_payment():
-    """Cria pagamento PIX via Rapyd"""
+    """Cria pagamento PIX via Rapyd (com X-API-Key, em nome do seller da chave)"""
     try:
         data = request.get_json()
         
@@ -1037,6 +1340,12 @@ def create_pix_payment():
                     'error': f'Campo obrigatório não informado: {field}'
                 }), 400
         
+        if centavos_pix(data.get('amount')) is None:
+            return jsonify({
+                'success': False,
+                'error': 'amount deve ser um valor positivo de pelo menos R$ 0,01'
+            }), 400
+        
         # Gerar ID único para referência
         merchant_reference_id = f"pix_{uuid.uuid4().hex[:8]}"
         
@@ -1052,15 +1361,16 @@ def create_pix_payment():
             'cancel_payment_url': f"{request.host_url}payment/cancel"
         }
         
+        seller_id = getattr(request, 'user_id', None) or data.get('user_id', 1)  # Default seller
+        
         # Criar pagamento PIX local
-        result = create_local_pix_payment(payment_data)
+        result = create_local_pix_payment(payment_data, recebedor_pix(seller_id))
         
         if result.get('success'):
-            # Salvar transação no banco
-            conn = gateway.db.get_connection()
-            cursor = conn.cursor()
+            taxa_cobrada, valor_liquido = gateway.fees.taxa(seller_id, 'pix', result.get('amount'))
             
-            cursor.execute('''
+            # Salvar transação no banco
+            gateway.db.insert('''
                 INSERT INTO transacoes (
                     payment_id, transaction_id, user_id, product_id, amount, currency, 
                     payment_method, status, customer_name, customer_email,
@@ -1070,7 +1380,7 @@ def create_pix_payment():
             ''', (
                 result.get('payment_id'),
                 merchant_reference_id,  # transaction_id
-                data.get('user_id', 1),  # Default seller
+                seller_id,
                 data.get('product_id'),
                 result.get('amount'),
                 result.get('currency', 'BRL'),
@@ -1080,28 +1390,32 @@ def create_pix_payment():
                 data.get('customer_email'),
                 merchant_reference_id,
                 result.get('amount'),
-                0.0,  # taxa_cobrada
-                result.get('amount'),  # valor_liquido
+                taxa_cobrada,
+                valor_liquido,
                 json.dumps(data),
                 'local',
                 json.dumps(result),
                 datetime.now()
             ))
+            gateway.pix_status.lembrar(result.get('payment_id'), result.get('status', 'pending'))
             
-            conn.commit()
-            conn.close()
-            
-            return jsonify({
+            resposta = {
                 'success': True,
                 'payment_id': result.get('payment_id'),
                 'qr_code': result.get('qr_code'),
-                'qr_code_image': result.get('qr_code_image'),
+                'qr_code_url': result.get('qr_code_url'),
+                'qr_code_svg_url': result.get('qr_code_svg_url'),
                 'pix_code': result.get('pix_code'),
                 'status': result.get('status'),
                 'amount': result.get('amount'),
                 'currency': result.get('currency'),
                 'merchant_reference_id': merchant_reference_id
-            })
+            }
+            if data.get('qr_code_inline'):
+                # Integrações antigas: imagem embutida na resposta (espera a renderização)
+                imagem = qr_renderer.renderizar(result.get('qr_code'))
+                resposta['qr_code_image'] = f"data:image/png;base64,{base64.b64encode(imagem.conteudo).decode()}"
+            return jsonify(resposta)
         else:
             return jsonify({
                 'success': False,
@@ -1114,21 +1428,145 @@ def create_pix_payment():
             'error': f'Erro interno: {str(e)}'
         }), 500
 
+def validar_cobrancas_pix(cobrancas):
+    """Erros das cobranças de um lote, numa única passada: [{'index', 'error'}]"""
+    erros = []
+    for indice, cobranca in enumerate(cobrancas):
+        if not isinstance(cobranca, dict):
+            erros.append({'index': indice, 'error': 'Cobrança deve ser um objeto'})
+            continue
+        faltando = next((campo for campo in ('amount', 'customer_name', 'customer_email', 'product_id')
+                         if not cobranca.get(campo)), None)
+        if faltando:
+            erros.append({'index': indice, 'error': f'Campo obrigatório não informado: {faltando}'})
+            continue
+        valor = cobranca['amount']
+        if not isinstance(valor, (int, float)) or centavos_pix(valor) is None:
+            erros.append({'index': indice, 'error': 'amount deve ser um número positivo de pelo menos R$ 0,01'})
+    return erros
+
+@app.route('/api/pix/batch', methods=['POST'])
+@require_api_auth
+@rate_limit('pix_batch')
+@idempotente('pix_batch')
+def create_pix_batch():
+    """Cria até PIX_BATCH_MAX cobranças PIX do seller numa única transação
+    
+    Corpo: {"charges": [{amount, customer_name, customer_email, product_id}, ...]}.
+    Todas as cobranças são validadas antes de gravar: com algum erro nada é
+    criado e a resposta lista os erros por índice. A resposta é um array
+    JSON, na ordem das cobranças, enviado aos poucos; as imagens dos QR
+    Codes só são renderizadas quando pedidas em qr_code_url.
+    """
+    try:
+        data = request.get_json(silent=True)
+        cobrancas = data.get('charges') if isinstance(data, dict) else None
+        if not isinstance(cobrancas, list) or not cobrancas:
+            return jsonify({'success': False, 'error': 'Informe as cobranças em charges'}), 400
+        if len(cobrancas) > PIX_BATCH_MAX:
+            return jsonify({'success': False, 'error': f'Máximo de {PIX_BATCH_MAX} cobranças por lote'}), 400
+        
+        erros = validar_cobrancas_pix(cobrancas)
+        if erros:
+            return jsonify({'success': False, 'error': 'Cobranças inválidas', 'errors': erros}), 400
+        
+        seller_id = request.user_id
+        quantidade = len(cobrancas)
+        valores = [centavos(cobranca['amount']) for cobranca in cobrancas]
+        # 16 dígitos hexadecimais: milhares de ids por lote sem colisão no UNIQUE
+        payment_ids = [f"pix_{uuid.uuid4().hex[:16]}" for _ in range(quantidade)]
+        payloads = brcode.builder(recebedor_pix(seller_id)).payloads(valores, payment_ids)
+        taxas = gateway.fees.calcular_lote([seller_id] * quantidade, ['pix'] * quantidade, valores)
+        agora = datetime.now()
+        
+        # O JSON de cada resultado é gravado em dados_retorno e reaproveitado na resposta
+        resultados = []
+        linhas = []
+        for cobranca, payment_id, qr_code, valor, taxa in zip(cobrancas, payment_ids, payloads, valores, taxas):
+            merchant_reference_id = f"pix_{uuid.uuid4().hex[:8]}"
+            resultado = json.dumps({
+                'payment_id': payment_id,
+                'qr_code': qr_code,
+                'qr_code_url': f'/api/pix/{payment_id}/qr.png',
+                'qr_code_svg_url': f'/api/pix/{payment_id}/qr.svg',
+                'pix_code': qr_code,
+                'status': 'pending',
+                'amount': cobranca['amount'],
+                'currency': 'BRL',
+                'merchant_reference_id': merchant_reference_id
+            })
+            resultados.append(resultado)
+            linhas.append((
+                payment_id, merchant_reference_id, seller_id, cobranca['product_id'], cobranca['amount'],
+                'BRL', 'pix', 'pending', cobranca['customer_name'], cobranca['customer_email'],
+                merchant_reference_id, cobranca['amount'], taxa / 100, (valor - taxa) / 100,
+                json.dumps(cobranca), 'local', resultado, agora
+            ))
+        
+        gateway.db.write_transaction(lambda cursor: TransacoesRepository(cursor.connection).criar_lote(linhas))
+        for payment_id in payment_ids:
+            gateway.pix_status.lembrar(payment_id, 'pending')
+        
+        def gerar():
+            yield '['
+            for indice, resultado in enumerate(resultados):
+                yield ',' + resultado if indice else resultado
+            yield ']'
+        
+        return Response(gerar(), mimetype='application/json', headers={'X-Batch-Count': str(quantidade)})
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erro interno: {str(e)}'
+        }), 500
+
+@app.route('/api/pix/<payment_id>/qr.<formato>', methods=['GET'])
+def get_pix_qr_code(payment_id, formato):
+    """Imagem do QR Code PIX (png ou svg), renderizada sob demanda e cacheável"""
+    try:
+        if formato not in FORMATOS_QR:
+            return jsonify({'success': False, 'error': 'Formato inválido (use png ou svg)'}), 404
+        
+        conn = gateway.db.get_connection()
+        try:
+            payload = TransacoesRepository(conn).pix_payload(payment_id)
+        finally:
+            conn.close()
+        if not payload:
+            return jsonify({'success': False, 'error': 'Pagamento não encontrado'}), 404
+        
+        # O payload de um pagamento não muda: ETag pelo conteúdo e cache longo
+        cabecalhos = {'Cache-Control': f'public, max-age={QR_CACHE_MAX_AGE}, immutable'}
+        etag = qr_renderer.chave(payload, formato)
+        if etag in request.if_none_match:
+            resposta = Response(status=304, headers=cabecalhos)
+        else:
+            imagem = qr_renderer.renderizar(payload, formato)
+            resposta = Response(imagem.conteudo, mimetype=imagem.mimetype, headers=cabecalhos)
+        resposta.set_etag(etag)
+        return resposta
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Erro ao gerar QR Code: {str(e)}'}), 500
+
 @app.route('/api/pix/status/<payment_id>', methods=['GET'])
 def get_pix_status(payment_id):
-    """Verifica status do pagamento PIX"""
+    """Verifica status do pagamento PIX (fallback do /api/pix/stream)
+    
+    Com If-None-Match igual à ETag do status em cache, responde 304 sem
+    consultar o banco.
+    """
     try:
+        status_cache = gateway.pix_status.status(payment_id)
+        if status_cache is not None and etag_status(payment_id, status_cache) in request.if_none_match:
+            resposta = Response(status=304, headers={'Cache-Control': 'no-cache'})
+            resposta.set_etag(etag_status(payment_id, status_cache))
+            return resposta
+        
         # Verificar no banco de dados primeiro
         conn = gateway.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT status, amount, currency, customer_name, created_at 
-            FROM transacoes 
-            WHERE payment_id = ?
-        ''', (payment_id,))
-        
-        transaction = cursor.fetchone()
+        transaction = TransacoesRepository(conn).status_pagamento(payment_id)
         conn.close()
         
         if not transaction:
@@ -1137,46 +1575,23 @@ def get_pix_status(payment_id):
                 'error': 'Pagamento não encontrado'
             }), 404
         
-        # Verificar status atualizado localmente
-        local_status = get_local_pix_status(payment_id)
+        # O status muda pelos webhooks das adquirentes (gateway.webhooks)
+        gateway.pix_status.lembrar(payment_id, transaction.status)
+        resposta = jsonify({
+            'success': True,
+            'payment_id': payment_id,
+            'status': transaction.status,
+            'amount': transaction.amount,
+            'currency': transaction.currency,
+            'customer_name': transaction.customer_name,
+            'created_at': transaction.created_at,
+            'is_paid': pagamento_pago(transaction.status)
+        })
         
-        if local_status.get('status', {}).get('status') == 'SUCCESS':
-            payment_data = local_status.get('data', {})
-            current_status = payment_data.get('status', 'pending')
-            
-            # Atualizar status no banco se mudou
-            if current_status != transaction[0]:
-                conn = gateway.db.get_connection()
-                cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE transacoes 
-                    SET status = ? 
-                    WHERE payment_id = ?
-                ''', (current_status, payment_id))
-                conn.commit()
-                conn.close()
-            
-            return jsonify({
-                'success': True,
-                'payment_id': payment_id,
-                'status': current_status,
-                'amount': transaction[1],
-                'currency': transaction[2],
-                'customer_name': transaction[3],
-                'created_at': transaction[4],
-                'is_paid': current_status == 'CLOSED'
-            })
-        else:
-            return jsonify({
-                'success': True,
-                'payment_id': payment_id,
-                'status': transaction[0],
-                'amount': transaction[1],
-                'currency': transaction[2],
-                'customer_name': transaction[3],
-                'created_at': transaction[4],
-                'is_paid': transaction[0] == 'CLOSED'
-            })
+        # no-cache: o navegador revalida a cada polling e recebe 304 sem corpo
+        resposta.headers['Cache-Control'] = 'no-cache'
+        resposta.set_etag(etag_status(payment_id, transaction.status))
+        return resposta
             
     except Exception as e:
         return jsonify({
@@ -1184,6 +1599,89 @@ def get_pix_status(payment_id):
             'error': f'Erro ao verificar status: {str(e)}'
         }), 500
 
+def pagamento_pago(status):
+    """'aprovado' (webhooks, ledger) ou 'CLOSED' (status da Rapyd gravado pelas integrações antigas)"""
+    return status in ('aprovado', 'CLOSED')
+
+def evento_sse(evento, dados):
+    return f"event: {evento}\ndata: {json.dumps(dados)}\n\n"
+
+@app.route('/api/pix/stream/<payment_id>', methods=['GET'])
+def stream_pix_status(payment_id):
+    """Status do pagamento PIX por Server-Sent Events
+    
+    Envia o status atual e um evento a cada mudança (publicada no
+    gateway.pix_status, sem consultar o banco enquanto espera), com
+    heartbeat a cada PIX_STREAM_HEARTBEAT segundos. Fecha quando o
+    pagamento é pago ou após PIX_STREAM_MAX_AGE segundos (o EventSource
+    reconecta). Com streams demais, 503: o checkout volta ao polling.
+    """
+    try:
+        # Assina antes de ler o status: uma mudança entre a leitura e a assinatura não se perde
+        assinatura = gateway.pix_status.assinar(payment_id)
+    except LimiteAssinaturas as e:
+        return jsonify({'success': False, 'error': str(e)}), 503, {'Retry-After': '30'}
+    
+    try:
+        status = gateway.pix_status.status(payment_id)
+        if status is None:
+            conn = gateway.db.get_connection()
+            try:
+                transaction = TransacoesRepository(conn).status_pagamento(payment_id)
+            finally:
+                conn.close()
+            if not transaction:
+                assinatura.cancelar()
+                return jsonify({'success': False, 'error': 'Pagamento não encontrado'}), 404
+            status = transaction.status
+            gateway.pix_status.lembrar(payment_id, status)
+    except Exception as e:
+        assinatura.cancelar()
+        return jsonify({'success': False, 'error': f'Erro ao verificar status: {str(e)}'}), 500
+    assinatura.status = status
+    
+    def gerar():
+        try:
+            atual = status
+            yield f"retry: {int(PIX_STREAM_HEARTBEAT * 1000)}\n"
+            yield evento_sse('status', {'payment_id': payment_id, 'status': atual, 'is_paid': pagamento_pago(atual)})
+            prazo = time.monotonic() + PIX_STREAM_MAX_AGE
+            while not pagamento_pago(atual) and time.monotonic() < prazo:
+                novo = assinatura.esperar(min(PIX_STREAM_HEARTBEAT, max(0, prazo - time.monotonic())))
+                if novo is None:
+                    yield ': heartbeat\n\n'
+                    continue
+                atual = novo
+                yield evento_sse('status', {'payment_id': payment_id, 'status': atual, 'is_paid': pagamento_pago(atual)})
+        finally:
+            # Também quando o cliente desconecta (GeneratorExit no próximo envio)
+            assinatura.cancelar()
+    
+    return Response(gerar(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/webhooks/<adquirente>', methods=['POST'])
+def receber_webhook(adquirente):
+    """Webhook de status de pagamento de uma adquirente
+    
+    Só confere a assinatura e grava o evento na fila (webhook_eventos); a
+    thread de gateway.webhooks aplica o status nas transações em lote.
+    Eventos repetidos respondem 200 com duplicado=true.
+    """
+    try:
+        novo = gateway.webhooks.receber(adquirente.lower(), request.get_data(),
+                                        request.headers.get('X-Webhook-Timestamp'),
+                                        request.headers.get('X-Webhook-Signature'))
+    except AdquirenteDesconhecida as e:
+        return jsonify({'erro': str(e)}), 404
+    except AssinaturaInvalida as e:
+        return jsonify({'erro': str(e)}), 401
+    except EventoInvalido as e:
+        return jsonify({'erro': str(e)}), 400
+    except Exception as e:
+        return jsonify({'erro': f'Erro ao receber webhook: {str(e)}'}), 500
+    return jsonify({'success': True, 'duplicado': not novo})
+
 @app.route('/api/dashboard/seller')
 @require_auth
 def dashboard_seller():
@@ -1191,6 +1689,29 @@ def dashboard_seller():
     resultado = gateway.obter_dashboard_seller(request.user_id)
     return jsonify(resultado)
 
+@app.route('/api/dashboard/seller/vendas')
+@require_auth
+def dashboard_seller_vendas():
+    """Vendas do seller em um período (?inicio=YYYY-MM-DD&fim=YYYY-MM-DD)"""
+    try:
+        hoje = datetime.now().date()
+        inicio = request.args.get('inicio', hoje.replace(day=1).isoformat())
+        fim = request.args.get('fim', hoje.isoformat())
+        
+        # Valida o formato das datas
+        datetime.strptime(inicio, '%Y-%m-%d')
+        datetime.strptime(fim, '%Y-%m-%d')
+        
+        conn = gateway.db.get_connection()
+        vendas = vendas_periodo(conn, request.user_id, inicio, fim)
+        conn.close()
+        
+        return jsonify({'success': True, 'inicio': inicio, 'fim': fim, 'vendas': vendas})
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Datas devem estar no formato YYYY-MM-DD'}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Erro ao obter vendas: {str(e)}'}), 500
+
 @app.route('/api/dashboard/admin')
 @require_admin
 def dashboard_admin():
@@ -1238,15 +1759,7 @@ def create_product():
         
         # Salvar no banco de dados
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO produtos (
-                product_id, user_id, name, price, header, thank_page_type, 
-                thank_page_url, support_email, warranty_time, warranty_unit,
-                product_image, product_banner, final_banner, show_marketplace
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        ProdutosRepository(conn).inserir((
             product_id,
             request.user_id,
             name,
@@ -1287,39 +1800,15 @@ def create_product():
 def list_products():
     """Lista produtos do usuário"""
     try:
+        filtros = filtros_da_query(request.args)
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT product_id, name, price, header, status, show_marketplace, 
-                   views, sales, created_at
-            FROM produtos 
-            WHERE user_id = ? AND status != 'deletado'
-            ORDER BY created_at DESC
-        ''', (request.user_id,))
-        
-        products = []
-        for row in cursor.fetchall():
-            products.append({
-                'product_id': row[0],
-                'name': row[1],
-                'price': row[2],
-                'header': row[3],
-                'status': row[4],
-                'show_marketplace': bool(row[5]),
-                'views': row[6],
-                'sales': row[7],
-                'created_at': row[8],
-                'checkout_url': f"{request.host_url}checkout/{row[0]}"
-            })
-        
+        pagina = ProdutosRepository(conn).do_seller(request.user_id, f"{request.host_url}checkout/", filtros)
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'products': products
-        })
+        return resposta_paginada('products', pagina)
         
+    except FiltroInvalido as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erro ao listar produtos: {str(e)}'}), 500
 
@@ -1327,79 +1816,54 @@ def list_products():
 def marketplace():
     """Lista produtos do marketplace"""
     try:
+        filtros = filtros_da_query(request.args)
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
+        pagina = ProdutosRepository(conn).marketplace(f"{request.host_url}checkout/", filtros)
+        conn.close()
         
-        cursor.execute('''
-            SELECT p.product_id, p.name, p.price, p.header, p.product_image,
-                   p.views, p.sales, p.created_at, u.username as seller_name
-            FROM produtos p
-            JOIN usuarios u ON p.user_id = u.id
-            WHERE p.show_marketplace = 1 AND p.status = 'ativo'
-            ORDER BY p.created_at DESC
-        ''')
-        
-        products = []
-        for row in cursor.fetchall():
-            products.append({
-                'product_id': row[0],
-                'name': row[1],
-                'price': row[2],
-                'header': row[3],
-                'product_image': row[4],
-                'views': row[5],
-                'sales': row[6],
-                'seller_name': row[8],
-                'created_at': row[7],
-                'checkout_url': f"{request.host_url}checkout/{row[0]}"
-            })
+        return resposta_paginada('products', pagina)
         
+    except FiltroInvalido as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Erro ao carregar marketplace: {str(e)}'}), 500
+
+@app.route('/api/marketplace/search', methods=['GET'])
+def buscar_marketplace():
+    """Busca textual no marketplace (q), do mais relevante ao menos"""
+    try:
+        expressao = expressao_busca(request.args.get('q'))
+        filtros = filtros_da_query(request.args)
+        conn = DatabaseManager().get_connection()
+        pagina = ProdutosRepository(conn).buscar_marketplace(expressao, f"{request.host_url}checkout/", filtros)
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'products': products
-        })
+        return resposta_paginada('products', pagina)
         
+    except FiltroInvalido as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
-        return jsonify({'success': False, 'message': f'Erro ao carregar marketplace: {str(e)}'}), 500
+        return jsonify({'success': False, 'message': f'Erro na busca do marketplace: {str(e)}'}), 500
 
 # APIs do Admin
 @app.route('/api/admin/pending-users', methods=['GET'])
-@require_auth
 @require_admin
 def get_pending_users():
     """Lista usuários pendentes de aprovação"""
     try:
+        filtros = filtros_da_query(request.args)
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, username, email, tipo, created_at, status 
-            FROM usuarios 
-            WHERE status IN ('pendente', 'pendente_aprovacao')
-            ORDER BY created_at DESC
-        ''')
-        
-        users = []
-        for row in cursor.fetchall():
-            users.append({
-                'id': row[0],
-                'username': row[1],
-                'email': row[2],
-                'tipo': row[3],
-                'created_at': row[4],
-                'status': row[5]
-            })
-        
+        pagina = UsuariosRepository(conn).pendentes(filtros)
         conn.close()
-        return jsonify({'success': True, 'users': users})
         
+        return resposta_paginada('users', pagina)
+        
+    except FiltroInvalido as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erro ao buscar usuários: {str(e)}'}), 500
 
 @app.route('/api/admin/approve-user', methods=['POST'])
-@require_auth
 @require_admin
 def approve_user():
     """Aprova um usuário pendente"""
@@ -1411,42 +1875,35 @@ def approve_user():
             return jsonify({'success': False, 'message': 'ID do usuário é obrigatório'}), 400
         
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
         
         # Verificar se o usuário existe e está pendente
-        cursor.execute('SELECT username, email, tipo FROM usuarios WHERE id = ? AND status IN ("pendente", "pendente_aprovacao")', (user_id,))
-        user = cursor.fetchone()
+        usuarios = UsuariosRepository(conn)
+        user = usuarios.pendente_para_aprovacao(user_id)
         
         if not user:
+            conn.close()
             return jsonify({'success': False, 'message': 'Usuário não encontrado ou já aprovado'}), 404
         
         # Aprovar usuário
-        cursor.execute('UPDATE usuarios SET status = "ativo" WHERE id = ?', (user_id,))
-        
-        # Registrar log de aprovação
-        cursor.execute('''
-            INSERT INTO logs (user_id, acao, detalhes, ip_address)
-            VALUES (?, ?, ?, ?)
-        ''', (request.user_id, 'aprovar_usuario', f'Aprovou usuário {user[0]} (ID: {user_id})', request.remote_addr))
+        usuarios.atualizar_status(user_id, 'ativo')
         
         conn.commit()
         conn.close()
+        gateway.auth_cache.invalidar(user_id)
+        
+        # Registrar log de aprovação
+        gateway.security.log_activity(request.user_id, 'aprovar_usuario', f'Aprovou usuário {user.username} (ID: {user_id})', request.remote_addr)
         
         return jsonify({
             'success': True,
-            'message': f'Usuário {user[0]} aprovado com sucesso',
-            'user': {
-                'username': user[0],
-                'email': user[1],
-                'tipo': user[2]
-            }
+            'message': f'Usuário {user.username} aprovado com sucesso',
+            'user': user
         })
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erro ao aprovar usuário: {str(e)}'}), 500
 
 @app.route('/api/admin/reject-user', methods=['POST'])
-@require_auth
 @require_admin
 def reject_user():
     """Rejeita um usuário pendente"""
@@ -1458,70 +1915,53 @@ def reject_user():
             return jsonify({'success': False, 'message': 'ID do usuário é obrigatório'}), 400
         
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
         
         # Verificar se o usuário existe e está pendente
-        cursor.execute('SELECT username FROM usuarios WHERE id = ? AND status IN ("pendente", "pendente_aprovacao")', (user_id,))
-        user = cursor.fetchone()
+        usuarios = UsuariosRepository(conn)
+        user = usuarios.pendente_para_aprovacao(user_id)
         
         if not user:
+            conn.close()
             return jsonify({'success': False, 'message': 'Usuário não encontrado ou já processado'}), 404
         
-        # Rejeitar usuário
-        cursor.execute('UPDATE usuarios SET status = "rejeitado" WHERE id = ?', (user_id,))
-        
-        # Registrar log de rejeição
-        cursor.execute('''
-            INSERT INTO logs (user_id, acao, detalhes, ip_address)
-            VALUES (?, ?, ?, ?)
-        ''', (request.user_id, 'rejeitar_usuario', f'Rejeitou usuário {user[0]} (ID: {user_id})', request.remote_addr))
+        # Rejeitar usuário e revogar os tokens já emitidos
+        usuarios.atualizar_status(user_id, 'rejeitado')
+        usuarios.revogar_tokens(user_id)
         
         conn.commit()
         conn.close()
+        gateway.auth_cache.invalidar(user_id)
+        gateway.security.revoke_tokens(user_id)
+        
+        # Registrar log de rejeição
+        gateway.security.log_activity(request.user_id, 'rejeitar_usuario', f'Rejeitou usuário {user.username} (ID: {user_id})', request.remote_addr)
         
         return jsonify({
             'success': True,
-            'message': f'Usuário {user[0]} rejeitado'
+            'message': f'Usuário {user.username} rejeitado'
         })
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erro ao rejeitar usuário: {str(e)}'}), 500
 
 @app.route('/api/admin/archived-users', methods=['GET'])
-@require_auth
 @require_admin
 def get_archived_users():
     """Lista usuários arquivados (rejeitados)"""
     try:
+        filtros = filtros_da_query(request.args)
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, username, email, tipo, created_at, status 
-            FROM usuarios 
-            WHERE status = 'rejeitado'
-            ORDER BY created_at DESC
-        ''')
-        
-        users = []
-        for row in cursor.fetchall():
-            users.append({
-                'id': row[0],
-                'username': row[1],
-                'email': row[2],
-                'tipo': row[3],
-                'created_at': row[4],
-                'status': row[5]
-            })
-        
+        pagina = UsuariosRepository(conn).arquivados(filtros)
         conn.close()
-        return jsonify({'success': True, 'users': users})
         
+        return resposta_paginada('users', pagina)
+        
+    except FiltroInvalido as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erro ao buscar usuários arquivados: {str(e)}'}), 500
 
 @app.route('/api/admin/delete-user', methods=['POST'])
-@require_auth
 @require_admin
 def delete_user():
     """Exclui definitivamente um usuário arquivado"""
@@ -1533,89 +1973,189 @@ def delete_user():
             return jsonify({'success': False, 'message': 'ID do usuário é obrigatório'}), 400
         
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
         
         # Verificar se o usuário existe e está rejeitado
-        cursor.execute('SELECT username FROM usuarios WHERE id = ? AND status = "rejeitado"', (user_id,))
-        user = cursor.fetchone()
+        usuarios = UsuariosRepository(conn)
+        user = usuarios.arquivado(user_id)
         
         if not user:
+            conn.close()
             return jsonify({'success': False, 'message': 'Usuário não encontrado ou não está arquivado'}), 404
         
-        # Excluir usuário e dados relacionados
-        cursor.execute('DELETE FROM kyc WHERE user_id = ?', (user_id,))
-        cursor.execute('DELETE FROM logs WHERE user_id = ?', (user_id,))
-        cursor.execute('DELETE FROM usuarios WHERE id = ?', (user_id,))
+        # Grava logs pendentes antes de excluir os do usuário
+        gateway.audit_log.flush()
         
-        # Registrar log de exclusão
-        cursor.execute('''
-            INSERT INTO logs (user_id, acao, detalhes, ip_address)
-            VALUES (?, ?, ?, ?)
-        ''', (request.user_id, 'excluir_usuario', f'Excluiu usuário {user[0]} (ID: {user_id})', request.remote_addr))
+        # Excluir usuário e dados relacionados
+        KycRepository(conn).excluir_do_usuario(user_id)
+        LogsRepository(conn).excluir_do_usuario(user_id)
+        ApiKeysRepository(conn).excluir_do_usuario(user_id)
+        usuarios.excluir(user_id)
         
         conn.commit()
         conn.close()
+        gateway.auth_cache.invalidar(user_id)
+        gateway.security.revoke_tokens(user_id)
+        gateway.api_keys.remover_usuario(user_id)
+        
+        # Registrar log de exclusão
+        gateway.security.log_activity(request.user_id, 'excluir_usuario', f'Excluiu usuário {user.username} (ID: {user_id})', request.remote_addr)
         
         return jsonify({
             'success': True,
-            'message': f'Usuário {user[0]} excluído definitivamente'
+            'message': f'Usuário {user.username} excluído definitivamente'
         })
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erro ao excluir usuário: {str(e)}'}), 500
 
+@app.route('/api/admin/logs/metrics', methods=['GET'])
+@require_admin
+def get_audit_log_metrics():
+    """Métricas da fila de gravação de logs"""
+    return jsonify({'success': True, 'metrics': gateway.audit_log.stats()})
+
+@app.route('/api/admin/auth/metrics', methods=['GET'])
+@require_admin
+def get_auth_metrics():
+    """Métricas da autenticação (caches de tokens e de usuários, pool de hash de senhas)"""
+    return jsonify({
+        'success': True,
+        'metrics': {
+            'token_cache': gateway.security.token_cache.stats(),
+            'auth_cache': gateway.auth_cache.stats(),
+            'password_hasher': gateway.password_hasher.stats(),
+            'api_keys': gateway.api_keys.stats()
+        }
+    })
+
+@app.route('/api/admin/rate-limit/metrics', methods=['GET'])
+@require_admin
+def get_rate_limit_metrics():
+    """Requisições permitidas e recusadas (429) por rota"""
+    return jsonify({'success': True, 'metrics': rate_limiter.stats()})
+
+@app.route('/api/admin/routing/metrics', methods=['GET'])
+@require_admin
+def get_routing_metrics():
+    """Taxa de sucesso e p95 por adquirente, failovers e fila do log de decisões"""
+    return jsonify({
+        'success': True,
+        'metrics': {
+            'router': gateway.payment.router.stats(),
+            'routing_log': gateway.routing_log.stats()
+        }
+    })
+
+@app.route('/api/admin/idempotency/metrics', methods=['GET'])
+@require_admin
+def get_idempotency_metrics():
+    """Execuções, repetições servidas e conflitos de Idempotency-Key"""
+    return jsonify({'success': True, 'metrics': gateway.idempotency.stats()})
+
+@app.route('/api/admin/qr/metrics', methods=['GET'])
+@require_admin
+def get_qr_metrics():
+    """Cache e pool de renderização dos QR Codes PIX"""
+    return jsonify({'success': True, 'metrics': qr_renderer.stats()})
+
+@app.route('/api/admin/pix-status/metrics', methods=['GET'])
+@require_admin
+def get_pix_status_metrics():
+    """Cache de status e streams SSE abertos dos pagamentos PIX"""
+    return jsonify({'success': True, 'metrics': gateway.pix_status.stats()})
+
+@app.route('/api/admin/webhooks/metrics', methods=['GET'])
+@require_admin
+def get_webhooks_metrics():
+    """Eventos recebidos, repetidos, aplicados e lotes da fila de webhooks"""
+    return jsonify({'success': True, 'metrics': gateway.webhooks.stats()})
+
+@app.route('/api/admin/webhooks/replay', methods=['POST'])
+@require_admin
+def replay_webhooks():
+    """Reaplica, em ordem, os eventos de webhook a partir de desde_id"""
+    try:
+        data = request.get_json() or {}
+        try:
+            desde_id = int(data.get('desde_id', 0))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'desde_id deve ser um número'}), 400
+        marcados = gateway.webhooks.replay(desde_id, data.get('adquirente'))
+        gateway.security.log_activity(request.user_id, 'replay_webhooks',
+                                      f'{marcados} eventos a partir de {desde_id}', request.remote_addr)
+        return jsonify({'success': True, 'message': f'{marcados} eventos marcados para reaplicar', 'eventos': marcados})
+    
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Erro ao reaplicar webhooks: {str(e)}'}), 500
+
+@app.route('/api/admin/taxas', methods=['GET'])
+@require_admin
+def list_taxas():
+    """Taxas ativas: padrões por método e, com ?user_id=, as do seller"""
+    try:
+        user_id = request.args.get('user_id', type=int)
+        conn = gateway.db.get_connection()
+        try:
+            taxas = TaxasRepository(conn).ativas(user_id)
+        finally:
+            conn.close()
+        return jsonify({'success': True, 'taxas': taxas, 'metrics': gateway.fees.stats()})
+    
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Erro ao listar taxas: {str(e)}'}), 500
+
+@app.route('/api/admin/taxas', methods=['POST'])
+@require_admin
+def set_taxa():
+    """Define a taxa de um seller (ou o padrão do método, sem user_id)"""
+    try:
+        data = request.get_json() or {}
+        user_id = data.get('user_id')
+        tipo_pagamento = data.get('tipo_pagamento')
+        try:
+            percentual = float(data.get('taxa_percentual'))
+            fixa = float(data.get('taxa_fixa', 0))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'taxa_percentual e taxa_fixa devem ser números'}), 400
+        
+        if not tipo_pagamento:
+            return jsonify({'success': False, 'message': 'tipo_pagamento é obrigatório'}), 400
+        if not 0 <= percentual <= 100 or fixa < 0:
+            return jsonify({'success': False, 'message': 'Taxa fora do intervalo permitido'}), 400
+        
+        taxa_id = gateway.db.write_transaction(
+            lambda cursor: TaxasRepository(cursor.connection).definir(user_id, tipo_pagamento, percentual, fixa))
+        gateway.fees.atualizar()
+        
+        alvo = f'seller {user_id}' if user_id else 'padrão'
+        gateway.security.log_activity(request.user_id, 'definir_taxa',
+                                      f'{tipo_pagamento} ({alvo}): {percentual}% + R$ {fixa:.2f}', request.remote_addr)
+        
+        return jsonify({'success': True, 'message': 'Taxa definida com sucesso', 'taxa_id': taxa_id})
+    
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Erro ao definir taxa: {str(e)}'}), 500
+
 @app.route('/api/admin/user-details/<int:user_id>', methods=['GET'])
-@require_auth
 @require_admin
 def get_user_details(user_id):
     """Obtém detalhes completos de um usuário para aprovação"""
     try:
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
         
         # Dados do usuário
-        cursor.execute('''
-            SELECT id, username, email, tipo, status, created_at
-            FROM usuarios 
-            WHERE id = ?
-        ''', (user_id,))
-        
-        user = cursor.fetchone()
+        user = UsuariosRepository(conn).detalhe(user_id)
         if not user:
+            conn.close()
             return jsonify({'success': False, 'message': 'Usuário não encontrado'}), 404
         
-        # Dados do KYC
-        cursor.execute('''
-            SELECT *
-            FROM kyc 
-            WHERE user_id = ?
-        ''', (user_id,))
-        
-        kyc = cursor.fetchone()
-        
-        # Logs do usuário
-        cursor.execute('''
-            SELECT acao, detalhes, created_at
-            FROM logs 
-            WHERE user_id = ?
-            ORDER BY created_at DESC
-            LIMIT 10
-        ''', (user_id,))
-        
-        logs = cursor.fetchall()
+        # Dados do KYC e últimos logs
+        kyc = KycRepository(conn).por_usuario(user_id)
+        logs = LogsRepository(conn).recentes(user_id, 10)
         
         conn.close()
         
-        user_details = {
-            'id': user[0],
-            'username': user[1],
-            'email': user[2],
-            'tipo': user[3],
-            'status': user[4],
-            'created_at': user[5],
-            'kyc': kyc,
-            'logs': [{'acao': log[0], 'detalhes': log[1], 'created_at': log[2]} for log in logs]
-        }
+        user_details = dict(user._asdict(), kyc=kyc, logs=logs)
         
         return jsonify({
             'success': True,
@@ -1627,111 +2167,59 @@ def get_user_details(user_id):
 
 # APIs para Gerenciamento de Empresas e KYC
 @app.route('/api/admin/empresas', methods=['GET'])
-@require_auth
 @require_admin
 def get_empresas():
     """Lista todas as empresas cadastradas"""
     try:
+        filtros = filtros_da_query(request.args)
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
+        pagina = UsuariosRepository(conn).empresas(filtros)
+        conn.close()
         
-        cursor.execute('''
-            SELECT 
-                u.id,
-                u.username,
-                u.email,
-                u.status,
-                u.created_at,
-                COALESCE(k.tipo_pessoa, 'Não informado') as tipo_pessoa,
-                COALESCE(k.nome_razao_social, 'Não informado') as nome_razao_social,
-                COALESCE(k.cpf_cnpj, 'Não informado') as cpf_cnpj,
-                COALESCE(k.porte_juridico, 'Não aplicável') as porte_juridico,
-                COALESCE(k.setor_atividade, 'Não informado') as setor_atividade,
-                COALESCE(k.faturamento_mensal, 'Não informado') as faturamento_mensal,
-                COALESCE(k.status, 'pendente') as kyc_status,
-                COALESCE(k.created_at, u.created_at) as kyc_created_at,
-                CASE 
-                    WHEN k.status = 'aprovado' THEN 'Aprovado'
-                    WHEN k.status = 'rejeitado' THEN 'Rejeitado'
-                    WHEN k.status = 'rascunho' THEN 'Rascunho'
-                    WHEN k.status = 'pendente' THEN 'Pendente'
-                    ELSE 'Pendente'
-                END as status_kyc_display
-            FROM usuarios u
-            LEFT JOIN kyc k ON u.id = k.user_id
-            WHERE u.tipo = 'seller'
-            ORDER BY u.created_at DESC
-        ''')
-        
-        empresas = []
-        for row in cursor.fetchall():
-            empresas.append({
-                'id': row[0],
-                'username': row[1],
-                'email': row[2],
-                'status': row[3],
-                'created_at': row[4],
-                'tipo_pessoa': row[5],
-                'nome_razao_social': row[6],
-                'cpf_cnpj': row[7],
-                'porte_juridico': row[8],
-                'setor_atividade': row[9],
-                'faturamento_mensal': row[10],
-                'kyc_status': row[11],
-                'kyc_created_at': row[12],
-                'status_kyc_display': row[13]
-            })
+        return resposta_paginada('empresas', pagina)
         
+    except FiltroInvalido as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Erro ao listar empresas: {str(e)}'}), 500
+
+@app.route('/api/admin/empresas/search', methods=['GET'])
+@require_admin
+def buscar_empresas():
+    """Busca empresas por username, email, razão social ou CPF/CNPJ (q)"""
+    try:
+        expressao = expressao_busca(request.args.get('q'))
+        filtros = filtros_da_query(request.args)
+        conn = DatabaseManager().get_connection()
+        pagina = UsuariosRepository(conn).buscar_empresas(expressao, filtros)
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'empresas': empresas,
-            'total': len(empresas)
-        })
+        return resposta_paginada('empresas', pagina)
         
+    except FiltroInvalido as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
-        return jsonify({'success': False, 'message': f'Erro ao listar empresas: {str(e)}'}), 500
+        return jsonify({'success': False, 'message': f'Erro na busca de empresas: {str(e)}'}), 500
 
 @app.route('/api/admin/empresa/<int:user_id>', methods=['GET'])
-@require_auth
 @require_admin
 def get_empresa_detalhes(user_id):
     """Obtém detalhes completos de uma empresa"""
     try:
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
         
         # Dados do usuário
-        cursor.execute('''
-            SELECT id, username, email, status, created_at
-            FROM usuarios 
-            WHERE id = ? AND tipo = 'seller'
-        ''', (user_id,))
-        
-        user = cursor.fetchone()
+        user = UsuariosRepository(conn).empresa(user_id)
         if not user:
+            conn.close()
             return jsonify({'success': False, 'message': 'Empresa não encontrada'}), 404
         
         # Dados do KYC
-        cursor.execute('''
-            SELECT *
-            FROM kyc 
-            WHERE user_id = ?
-        ''', (user_id,))
-        
-        kyc = cursor.fetchone()
+        kyc = KycRepository(conn).por_usuario(user_id)
         
         conn.close()
         
-        empresa = {
-            'id': user[0],
-            'username': user[1],
-            'email': user[2],
-            'status': user[3],
-            'created_at': user[4],
-            'kyc': kyc
-        }
+        empresa = dict(user._asdict(), kyc=kyc)
         
         return jsonify({
             'success': True,
@@ -1759,57 +2247,9 @@ def save_kyc():
                 return jsonify({'success': False, 'message': f'Campo obrigatório não informado: {field}'}), 400
         
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
         
-        # Verificar se já existe KYC para este usuário
-        cursor.execute('SELECT id FROM kyc WHERE user_id = ?', (request.user_id,))
-        existing_kyc = cursor.fetchone()
-        
-        if existing_kyc:
-            # Atualizar KYC existente
-            cursor.execute('''
-                UPDATE kyc SET
-                    nome_responsavel = ?,
-                    cpf_responsavel = ?,
-                    nome_mae = ?,
-                    data_nascimento_responsavel = ?,
-                    setor_atividade = ?,
-                    faturamento_mensal = ?,
-                    status = ?,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE user_id = ?
-            ''', (
-                data.get('nome_responsavel'),
-                data.get('cpf_responsavel'),
-                data.get('nome_mae'),
-                data.get('data_nascimento_responsavel'),
-                data.get('setor_atividade'),
-                data.get('faturamento_mensal'),
-                                           data.get('status', 'pendente_aprovacao'),
-                request.user_id
-            ))
-        else:
-            # Criar novo KYC
-            cursor.execute('''
-                INSERT INTO kyc (
-                    user_id, tipo_pessoa, cpf_cnpj, nome_razao_social, porte_juridico,
-                    nome_responsavel, cpf_responsavel, nome_mae, data_nascimento_responsavel,
-                    setor_atividade, faturamento_mensal, status
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                request.user_id,
-                data.get('tipo_pessoa'),
-                data.get('cpf_cnpj'),
-                data.get('nome_razao_social'),
-                data.get('porte_juridico'),
-                data.get('nome_responsavel'),
-                data.get('cpf_responsavel'),
-                data.get('nome_mae'),
-                data.get('data_nascimento_responsavel'),
-                data.get('setor_atividade'),
-                data.get('faturamento_mensal'),
-                                     data.get('status', 'pendente_aprovacao')
-            ))
+        # Atualiza o KYC existente ou cria um novo
+        KycRepository(conn).salvar(request.user_id, data)
         
         conn.commit()
         conn.close()
@@ -1828,35 +2268,14 @@ def get_kyc_complete():
     """Obtém dados KYC para completar cadastro"""
     try:
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT tipo_pessoa, nome_razao_social, cpf_cnpj, porte_juridico,
-                   nome_responsavel, cpf_responsavel, nome_mae, data_nascimento_responsavel,
-                   setor_atividade, faturamento_mensal, status
-            FROM kyc 
-            WHERE user_id = ?
-        ''', (request.user_id,))
-        
-        kyc = cursor.fetchone()
+        kyc = KycRepository(conn).cadastro(request.user_id)
         conn.close()
         
         if kyc:
             return jsonify({
                 'success': True,
-                'kyc': {
-                    'tipo_pessoa': kyc[0],
-                    'nome_razao_social': kyc[1],
-                    'cpf_cnpj': kyc[2],
-                    'porte_juridico': kyc[3],
-                    'nome_responsavel': kyc[4],
-                    'cpf_responsavel': kyc[5],
-                    'nome_mae': kyc[6],
-                    'data_nascimento_responsavel': kyc[7],
-                    'setor_atividade': kyc[8],
-                    'faturamento_mensal': kyc[9],
-                    'status': kyc[10]
-                }
+                'kyc': kyc
             })
         else:
             return jsonify({
@@ -1881,18 +2300,16 @@ def upload_kyc_document():
         if file.filename == '':
             return jsonify({'success': False, 'message': 'Nenhum arquivo selecionado'}), 400
         
+        if document_type not in KycRepository.COLUNAS_DOCUMENTO:
+            return jsonify({'success': False, 'message': 'Tipo de documento inválido'}), 400
+        
         if file and allowed_file(file.filename):
             filename = save_uploaded_file(file, f'kyc_{document_type}')
             
             # Atualizar banco de dados
             conn = DatabaseManager().get_connection()
-            cursor = conn.cursor()
             
-            cursor.execute(f'''
-                UPDATE kyc 
-                SET {document_type} = ?
-                WHERE user_id = ?
-            ''', (filename, request.user_id))
+            KycRepository(conn).salvar_documento(request.user_id, document_type, filename)
             
             conn.commit()
             conn.close()
@@ -1914,25 +2331,18 @@ def get_user_status():
     """Obtém status do usuário para controle de acesso"""
     try:
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT status, tipo
-            FROM usuarios 
-            WHERE id = ?
-        ''', (request.user_id,))
-        
-        user = cursor.fetchone()
+        user = UsuariosRepository(conn).status(request.user_id)
         conn.close()
         
         if user:
             return jsonify({
                 'success': True,
-                'status': user[0],
-                'tipo': user[1],
-                'is_approved': user[0] == 'ativo',
-                'is_pending': user[0] in ['pendente', 'pendente_aprovacao'],
-                'is_rejected': user[0] == 'rejeitado'
+                'status': user.status,
+                'tipo': user.tipo,
+                'is_approved': user.status == 'ativo',
+                'is_pending': user.status in ['pendente', 'pendente_aprovacao'],
+                'is_rejected': user.status == 'rejeitado'
             })
         else:
             return jsonify({'success': False, 'message': 'Usuário não encontrado'}), 404
@@ -1946,122 +2356,37 @@ def get_kyc_status():
     """Obtém status do KYC do usuário"""
     try:
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT status, tipo_pessoa, nome_razao_social, cpf_cnpj, 
-                   nome_responsavel, cpf_responsavel, nome_mae, data_nascimento_responsavel,
-                   setor_atividade, faturamento_mensal, porte_juridico,
-                   documento_responsavel, contrato_social
-            FROM kyc 
-            WHERE user_id = ?
-        ''', (request.user_id,))
-        
-        kyc = cursor.fetchone()
+        kyc = KycRepository(conn).status(request.user_id)
         conn.close()
         
-        if kyc:
-            return jsonify({
-                'success': True,
-                'kyc': {
-                    'status': kyc[0],
-                    'tipo_pessoa': kyc[1],
-                    'nome_razao_social': kyc[2],
-                    'cpf_cnpj': kyc[3],
-                    'nome_responsavel': kyc[4],
-                    'cpf_responsavel': kyc[5],
-                    'nome_mae': kyc[6],
-                    'data_nascimento_responsavel': kyc[7],
-                    'setor_atividade': kyc[8],
-                    'faturamento_mensal': kyc[9],
-                    'porte_juridico': kyc[10],
-                    'documento_responsavel': kyc[11],
-                    'contrato_social': kyc[12]
-                }
-            })
-        else:
-            return jsonify({
-                'success': True,
-                'kyc': None
-            })
+        return jsonify({
+            'success': True,
+            'kyc': kyc
+        })
             
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erro ao obter status KYC: {str(e)}'}), 500
 
 # APIs para Aprovação de KYC
 @app.route('/api/admin/kyc/pending', methods=['GET'])
-@require_auth
 @require_admin
 def get_pending_kyc():
     """Lista KYC pendentes de aprovação"""
     try:
+        filtros = filtros_da_query(request.args)
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT 
-                k.id,
-                k.user_id,
-                u.username,
-                u.email,
-                k.tipo_pessoa,
-                k.nome_razao_social,
-                k.cpf_cnpj,
-                k.porte_juridico,
-                k.nome_responsavel,
-                k.cpf_responsavel,
-                k.nome_mae,
-                k.data_nascimento_responsavel,
-                k.setor_atividade,
-                k.faturamento_mensal,
-                k.documento_responsavel,
-                k.contrato_social,
-                k.status,
-                k.created_at,
-                k.updated_at
-            FROM kyc k
-            JOIN usuarios u ON k.user_id = u.id
-            WHERE k.status IN ('pendente', 'rascunho')
-            ORDER BY k.created_at ASC
-        ''')
-        
-        pending_kyc = []
-        for row in cursor.fetchall():
-            pending_kyc.append({
-                'id': row[0],
-                'user_id': row[1],
-                'username': row[2],
-                'email': row[3],
-                'tipo_pessoa': row[4],
-                'nome_razao_social': row[5],
-                'cpf_cnpj': row[6],
-                'porte_juridico': row[7],
-                'nome_responsavel': row[8],
-                'cpf_responsavel': row[9],
-                'nome_mae': row[10],
-                'data_nascimento_responsavel': row[11],
-                'setor_atividade': row[12],
-                'faturamento_mensal': row[13],
-                'documento_responsavel': row[14],
-                'contrato_social': row[15],
-                'status': row[16],
-                'created_at': row[17],
-                'updated_at': row[18]
-            })
-        
+        pagina = KycRepository(conn).pendentes(filtros)
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'pending_kyc': pending_kyc,
-            'total': len(pending_kyc)
-        })
+        return resposta_paginada('pending_kyc', pagina)
         
+    except FiltroInvalido as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': f'Erro ao listar KYC pendentes: {str(e)}'}), 500
 
 @app.route('/api/admin/kyc/approve', methods=['POST'])
-@require_auth
 @require_admin
 def approve_kyc():
     """Aprova KYC de um usuário"""
@@ -2074,28 +2399,16 @@ def approve_kyc():
             return jsonify({'success': False, 'message': 'ID do KYC é obrigatório'}), 400
         
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
         
-        # Atualizar status do KYC
-        cursor.execute('''
-            UPDATE kyc 
-            SET status = 'aprovado', 
-                aprovado_por = ?, 
-                aprovado_em = CURRENT_TIMESTAMP,
-                observacoes = ?,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (request.user_id, observacoes, kyc_id))
-        
-        # Atualizar status do usuário
-        cursor.execute('''
-            UPDATE usuarios 
-            SET status = 'ativo'
-            WHERE id = (SELECT user_id FROM kyc WHERE id = ?)
-        ''', (kyc_id,))
+        # Atualizar status do KYC e do usuário
+        kyc = KycRepository(conn)
+        kyc.decidir(kyc_id, 'aprovado', request.user_id, observacoes)
+        user_id = kyc.usuario_do_kyc(kyc_id)
+        UsuariosRepository(conn).atualizar_status(user_id, 'ativo')
         
         conn.commit()
         conn.close()
+        gateway.auth_cache.invalidar(user_id)
         
         return jsonify({
             'success': True,
@@ -2106,7 +2419,6 @@ def approve_kyc():
         return jsonify({'success': False, 'message': f'Erro ao aprovar KYC: {str(e)}'}), 500
 
 @app.route('/api/admin/kyc/reject', methods=['POST'])
-@require_auth
 @require_admin
 def reject_kyc():
     """Rejeita KYC de um usuário"""
@@ -2119,18 +2431,9 @@ def reject_kyc():
             return jsonify({'success': False, 'message': 'ID do KYC é obrigatório'}), 400
         
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
         
         # Atualizar status do KYC
-        cursor.execute('''
-            UPDATE kyc 
-            SET status = 'rejeitado', 
-                aprovado_por = ?, 
-                aprovado_em = CURRENT_TIMESTAMP,
-                observacoes = ?,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (request.user_id, observacoes, kyc_id))
+        KycRepository(conn).decidir(kyc_id, 'rejeitado', request.user_id, observacoes)
         
         conn.commit()
         conn.close()
@@ -2144,7 +2447,6 @@ def reject_kyc():
         return jsonify({'success': False, 'message': f'Erro ao rejeitar KYC: {str(e)}'}), 500
 
 @app.route('/api/admin/kyc/document/<filename>', methods=['GET'])
-@require_auth
 @require_admin
 def get_kyc_document(filename):
     """Obtém documento KYC para visualização"""
@@ -2165,7 +2467,6 @@ def get_kyc_document(filename):
 
 # APIs Rapdyn para Adquirentes
 @app.route('/api/admin/rapdyn/payment-methods', methods=['GET'])
-@require_auth
 @require_admin
 def get_rapdyn_payment_methods():
     """Lista métodos de pagamento Rapdyn"""
@@ -2177,7 +2478,6 @@ def get_rapdyn_payment_methods():
         return jsonify({'success': False, 'message': f'Erro ao buscar métodos de pagamento: {str(e)}'}), 500
 
 @app.route('/api/admin/rapdyn/test-connection', methods=['POST'])
-@require_auth
 @require_admin
 def test_rapdyn_connection():
     """Testa conexão com API Rapdyn"""
@@ -2209,7 +2509,6 @@ def test_rapdyn_connection():
         return jsonify({'success': False, 'message': f'Erro ao testar conexão: {str(e)}'}), 500
 
 @app.route('/api/admin/rapdyn/configure', methods=['POST'])
-@require_auth
 @require_admin
 def configure_rapdyn():
     """Configura token Rapdyn"""
@@ -2234,7 +2533,6 @@ def configure_rapdyn():
         return jsonify({'success': False, 'message': f'Erro ao configurar Rapdyn: {str(e)}'}), 500
 
 @app.route('/api/admin/rapdyn/payments', methods=['GET'])
-@require_auth
 @require_admin
 def get_rapdyn_payments():
     """Lista pagamentos Rapdyn"""
@@ -2247,7 +2545,6 @@ def get_rapdyn_payments():
         return jsonify({'success': False, 'message': f'Erro ao buscar pagamentos: {str(e)}'}), 500
 
 @app.route('/api/admin/rapdyn/webhook', methods=['GET'])
-@require_auth
 @require_admin
 def get_rapdyn_webhook():
     """Obtém configuração do webhook Rapdyn"""
@@ -2259,7 +2556,6 @@ def get_rapdyn_webhook():
         return jsonify({'success': False, 'message': f'Erro ao buscar webhook: {str(e)}'}), 500
 
 @app.route('/api/admin/rapdyn/webhook', methods=['POST'])
-@require_auth
 @require_admin
 def set_rapdyn_webhook():
     """Configura webhook Rapdyn"""
@@ -2307,33 +2603,23 @@ def checkout_page(product_id):
     """Página de checkout do produto"""
     try:
         conn = DatabaseManager().get_connection()
-        cursor = conn.cursor()
         
         # Buscar dados do produto
-        cursor.execute('''
-            SELECT p.*, u.username as seller_name, u.email as seller_email
-            FROM produtos p
-            JOIN usuarios u ON p.user_id = u.id
-            WHERE p.product_id = ? AND p.status = 'ativo'
-        ''', (product_id,))
-        
-        product = cursor.fetchone()
+        produtos = ProdutosRepository(conn)
+        product = produtos.para_checkout(product_id)
         
         if not product:
             conn.close()
             return render_template('404.html'), 404
         
         # Incrementar visualizações
-        cursor.execute('''
-            UPDATE produtos SET views = views + 1 
-            WHERE product_id = ?
-        ''', (product_id,))
+        produtos.registrar_visualizacao(product_id)
         
         conn.commit()
         conn.close()
         
         # Converter para dict para template
-        product_data = dict(product)
+        product_data = product._asdict()
         
         return render_template('checkout.html', product=product_data)
         
@@ -2356,7 +2642,6 @@ def payment_cancel():
     return render_template('payment_cancel.html')
 
 if __name__ == '__main__':
-    gateway = GatewayPagamentos()
     print("🚀 Iniciando Gateway de Pagamentos White Label...")
     print("📊 Banco de dados: SQLite")
     print("🔐 Segurança: JWT + Hash")
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Autenticação servidor-a-servidor por API key
+
+A tabela api_keys guarda só o SHA-256 de cada chave (key_hash), o prefixo
+para exibição e o prazo de expiração. O ApiKeyIndex mantém em memória
+key_hash -> (id da chave, seller, expiração), carregado na inicialização e
+atualizado na rotação, então autenticar uma requisição é um hash e uma
+consulta ao dict, sem SQLite. A comparação final usa hmac.compare_digest.
+
+Rotação: a chave nova passa a valer na hora e as anteriores continuam
+aceitas por API_KEY_GRACE_PERIOD segundos, para a integração trocar a chave
+sem janela de erro.
+
+O uso de cada chave (contador e último uso) é somado em memória e gravado
+em lote a cada API_KEY_FLUSH_INTERVAL segundos pela mesma thread que
+recarrega o índice a cada API_KEY_RELOAD_INTERVAL segundos (chaves criadas
+por outros processos).
+"""
+
+import atexit
+import hashlib
+import hmac
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, Dict, Optional
+
+API_KEY_GRACE_PERIOD = int(os.environ.get('API_KEY_GRACE_PERIOD', 86400))  # segundos
+API_KEY_FLUSH_INTERVAL = float(os.environ.get('API_KEY_FLUSH_INTERVAL', 5))  # segundos
+API_KEY_RELOAD_INTERVAL = float(os.environ.get('API_KEY_RELOAD_INTERVAL', 60))  # segundos
+
+SQLITE_API_KEYS = [
+    '''
+        CREATE TABLE IF NOT EXISTS api_keys (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            key_hash TEXT NOT NULL UNIQUE,
+            prefixo TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP,
+            usage_count INTEGER NOT NULL DEFAULT 0,
+            last_used_at TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES usuarios (id)
+        )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_api_keys_user ON api_keys (user_id, expires_at)',
+]
+
+# Chaves ainda aceitas (ativas ou no período de carência), com expiração em epoch
+CARREGAR_SQL = '''
+    SELECT id, user_id, key_hash, CAST(strftime('%s', expires_at) AS INTEGER)
+    FROM api_keys
+    WHERE expires_at IS NULL OR expires_at > datetime('now')
+'''
+
+REGISTRAR_USO_SQL = '''
+    UPDATE api_keys
+    SET usage_count = usage_count + ?, last_used_at = datetime(?, 'unixepoch')
+    WHERE id = ?
+'''
+
+PREFIXO_TAMANHO = 8
+
+ChaveApi = namedtuple('ChaveApi', 'key_id user_id key_hash expira_em')
+
+def hash_chave(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+def prefixo(api_key: str) -> str:
+    return api_key[:PREFIXO_TAMANHO]
+
+def backfill(conn: sqlite3.Connection):
+    """Cadastra em api_keys a chave atual de cada usuário (migração 0008)"""
+    usuarios = conn.execute('SELECT id, api_key FROM usuarios WHERE api_key IS NOT NULL').fetchall()
+    conn.executemany(
+        'INSERT OR IGNORE INTO api_keys (user_id, key_hash, prefixo) VALUES (?, ?, ?)',
+        [(user_id, hash_chave(api_key), prefixo(api_key)) for user_id, api_key in usuarios]
+    )
+
+class ApiKeyIndex:
+    """key_hash -> ChaveApi em memória, com contadores de uso gravados em lote"""
+
+    def __init__(self, write_transaction: Callable, connect: Callable,
+                 flush_interval: float = API_KEY_FLUSH_INTERVAL,
+                 reload_interval: float = API_KEY_RELOAD_INTERVAL):
+        self.write_transaction = write_transaction
+        self.connect = connect
+        self.flush_interval = flush_interval
+        self.reload_interval = reload_interval
+        self._chaves: Dict[str, ChaveApi] = {}
+        self._uso: Dict[int, list] = {}  # key_id -> [contagem, último uso]
+        self._lock = threading.Lock()
+        # Incrementada a cada mudança local (já gravada no banco antes dela)
+        self._geracao = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'flushes': 0, 'flush_errors': 0, 'reloads': 0}
+
+    def carregar(self) -> 'ApiKeyIndex':
+        """(Re)carrega do banco as chaves aceitas"""
+        while True:
+            with self._lock:
+                geracao = self._geracao
+            conn = self.connect()
+            try:
+                chaves = {
+                    key_hash: ChaveApi(key_id, user_id, key_hash, expira_em)
+                    for key_id, user_id, key_hash, expira_em in conn.execute(CARREGAR_SQL)
+                }
+            finally:
+                conn.close()
+            with self._lock:
+                # Uma rotação durante a leitura pode não estar nela: lê de novo
+                if self._geracao == geracao:
+                    self._chaves = chaves
+                    self._stats['reloads'] += 1
+                    return self
+
+    def autenticar(self, api_key: str) -> Optional[ChaveApi]:
+        """Chave aceita para api_key (e conta o uso), ou None"""
+        key_hash = hash_chave(api_key)
+        agora = time.time()
+        with self._lock:
+            chave = self._chaves.get(key_hash)
+            if chave is None or not hmac.compare_digest(chave.key_hash, key_hash):
+                self._stats['misses'] += 1
+                return None
+            if chave.expira_em is not None and chave.expira_em <= agora:
+                self._stats['expired'] += 1
+                return None
+            uso = self._uso.setdefault(chave.key_id, [0, agora])
+            uso[0] += 1
+            uso[1] = agora
+            self._stats['hits'] += 1
+            return chave
+
+    def adicionar(self, key_id: int, user_id: int, key_hash: str):
+        with self._lock:
+            self._geracao += 1
+            self._chaves[key_hash] = ChaveApi(key_id, user_id, key_hash, None)
+
+    def rotacionar(self, user_id: int, key_id: int, key_hash: str, expira_em: float):
+        """Chave nova ativa; as ativas anteriores do usuário expiram em expira_em"""
+        with self._lock:
+            self._geracao += 1
+            for antiga in list(self._chaves.values()):
+                if antiga.user_id == user_id and antiga.expira_em is None:
+                    self._chaves[antiga.key_hash] = antiga._replace(expira_em=expira_em)
+            self._chaves[key_hash] = ChaveApi(key_id, user_id, key_hash, None)
+
+    def remover_usuario(self, user_id: int):
+        with self._lock:
+            self._geracao += 1
+            for chave in list(self._chaves.values()):
+                if chave.user_id == user_id:
+                    del self._chaves[chave.key_hash]
+                    self._uso.pop(chave.key_id, None)
+
+    def flush(self) -> int:
+        """Grava os contadores de uso acumulados; retorna quantas chaves"""
+        with self._lock:
+            uso, self._uso = self._uso, {}
+        if not uso:
+            return 0
+        linhas = [(contagem, int(ultimo), key_id) for key_id, (contagem, ultimo) in uso.items()]
+        try:
+            self.write_transaction(lambda cursor: cursor.executemany(REGISTRAR_USO_SQL, linhas))
+        except Exception as e:
+            # Devolve os contadores para a próxima tentativa
+            with self._lock:
+                for key_id, (contagem, ultimo) in uso.items():
+                    atual = self._uso.setdefault(key_id, [0, ultimo])
+                    atual[0] += contagem
+                    atual[1] = max(atual[1], ultimo)
+                self._stats['flush_errors'] += 1
+            print(f"⚠️ Erro ao gravar uso das API keys: {e}")
+            return 0
+        with self._lock:
+            self._stats['flushes'] += 1
+        return len(linhas)
+
+    def start(self) -> 'ApiKeyIndex':
+        """Inicia a thread de flush/recarga e registra o flush no encerramento"""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='api-key-index', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        """Para a thread e grava os contadores pendentes"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self.flush()
+
+    def _run(self):
+        proxima_recarga = time.monotonic() + self.reload_interval
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            if time.monotonic() >= proxima_recarga:
+                try:
+                    self.carregar()
+                except Exception as e:
+                    print(f"⚠️ Erro ao recarregar API keys: {e}")
+                proxima_recarga = time.monotonic() + self.reload_interval
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['keys'] = len(self._chaves)
+            stats['pending_usage'] = len(self._uso)
+        return stats
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gravação assíncrona e em lote da tabela logs
+
+As requisições apenas enfileiram a entrada; uma thread em segundo plano
+esvazia a fila e grava em lotes com executemany dentro de uma única
+transação. Quando a fila enche, a política de overflow decide o que fazer:
+
+    sync         grava a entrada na própria thread da requisição (padrão)
+    block        espera vaga na fila até block_timeout; depois descarta
+    drop_new     descarta a entrada nova
+    drop_oldest  descarta a entrada mais antiga da fila
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+AUDIT_LOG_QUEUE_SIZE = int(os.environ.get('AUDIT_LOG_QUEUE_SIZE', 10000))
+AUDIT_LOG_BATCH_SIZE = int(os.environ.get('AUDIT_LOG_BATCH_SIZE', 500))
+AUDIT_LOG_FLUSH_INTERVAL = float(os.environ.get('AUDIT_LOG_FLUSH_INTERVAL', 0.5))  # segundos
+AUDIT_LOG_OVERFLOW = os.environ.get('AUDIT_LOG_OVERFLOW', 'sync')
+AUDIT_LOG_BLOCK_TIMEOUT = float(os.environ.get('AUDIT_LOG_BLOCK_TIMEOUT', 0.05))  # segundos
+
+OVERFLOW_POLICIES = ('sync', 'block', 'drop_new', 'drop_oldest')
+
+INSERT_LOG_SQL = '''
+    INSERT INTO logs (user_id, acao, detalhes, ip_address)
+    VALUES (?, ?, ?, ?)
+'''
+
+LogEntry = Tuple[Any, str, Optional[str], Optional[str]]
+
+class AuditLogWriter:
+    """Fila limitada + thread que grava os logs em lote"""
+
+    # Subclasses gravam outras tabelas trocando o INSERT (uma tupla por entrada)
+    insert_sql = INSERT_LOG_SQL
+    thread_name = 'audit-log-writer'
+
+    def __init__(self, write_transaction: Callable, queue_size: int = AUDIT_LOG_QUEUE_SIZE,
+                 batch_size: int = AUDIT_LOG_BATCH_SIZE, flush_interval: float = AUDIT_LOG_FLUSH_INTERVAL,
+                 overflow: str = AUDIT_LOG_OVERFLOW, block_timeout: float = AUDIT_LOG_BLOCK_TIMEOUT):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f'Política de overflow inválida: {overflow}')
+
+        self.write_transaction = write_transaction
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'batches': 0,
+            'dropped': 0,
+            'sync_writes': 0,
+            'failed': 0,
+        }
+
+    def start(self) -> 'AuditLogWriter':
+        """Inicia a thread de gravação e registra o flush no encerramento"""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        """Para a thread e grava o que ainda estiver na fila"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self._drain()
+
+    def submit(self, user_id, acao: str, detalhes: Optional[str] = None,
+               ip_address: Optional[str] = None) -> bool:
+        """Enfileira uma entrada; retorna False se ela foi descartada"""
+        return self._enqueue((user_id, acao, detalhes, ip_address))
+
+    def _enqueue(self, entry: Tuple) -> bool:
+        if self._thread is None:
+            # Sem thread de gravação (não iniciado ou já encerrado): grava direto
+            return self._write_sync(entry)
+
+        try:
+            self._queue.put_nowait(entry)
+            self._count('enqueued')
+            return True
+        except queue.Full:
+            pass
+
+        if self.overflow == 'sync':
+            return self._write_sync(entry)
+
+        if self.overflow == 'block':
+            try:
+                self._queue.put(entry, timeout=self.block_timeout)
+                self._count('enqueued')
+                return True
+            except queue.Full:
+                self._count('dropped')
+                return False
+
+        if self.overflow == 'drop_oldest':
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self._count('dropped')
+                self._queue.put_nowait(entry)
+                self._count('enqueued')
+                return True
+            except (queue.Empty, queue.Full):
+                pass
+
+        self._count('dropped')
+        return False
+
+    def flush(self):
+        """Bloqueia até que tudo o que já foi enfileirado esteja gravado"""
+        if self._thread is None:
+            self._drain()
+        else:
+            self._queue.join()
+
+    def stats(self) -> Dict[str, int]:
+        """Profundidade da fila e contadores"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['queue_size'] = self._queue.maxsize
+        return stats
+
+    def _count(self, chave: str, quantidade: int = 1):
+        with self._lock:
+            self._stats[chave] += quantidade
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                primeiro = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            lote = [primeiro]
+            prazo = time.monotonic() + self.flush_interval
+            while len(lote) < self.batch_size:
+                restante = prazo - time.monotonic()
+                try:
+                    if restante <= 0:
+                        lote.append(self._queue.get_nowait())
+                    else:
+                        lote.append(self._queue.get(timeout=restante))
+                except queue.Empty:
+                    break
+
+            self._write_batch(lote)
+
+    def _drain(self):
+        """Grava, na thread atual, tudo o que restou na fila"""
+        while True:
+            lote: List[LogEntry] = []
+            try:
+                while len(lote) < self.batch_size:
+                    lote.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if not lote:
+                return
+            self._write_batch(lote)
+
+    def _write_batch(self, lote: List[LogEntry]):
+        try:
+            self.write_transaction(lambda cursor: cursor.executemany(self.insert_sql, lote))
+            self._count('written', len(lote))
+            self._count('batches')
+        except Exception as e:
+            self._count('failed', len(lote))
+            print(f"Erro ao gravar lote de logs ({len(lote)} entradas): {str(e)}")
+        finally:
+            for _ in lote:
+                self._queue.task_done()
+
+    def _write_sync(self, entry: LogEntry) -> bool:
+        try:
+            self.write_transaction(lambda cursor: cursor.execute(self.insert_sql, entry))
+            self._count('sync_writes')
+            self._count('written')
+            return True
+        except Exception as e:
+            self._count('failed')
+            print(f"Erro ao gravar log: {str(e)}")
+            return False
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache em processo do estado de autenticação dos usuários
+
+A cada requisição autenticada o decorator precisa do tipo, do status e da
+versão de token atuais do usuário. Em vez de uma consulta por requisição,
+o estado fica em memória por AUTH_CACHE_TTL segundos (inclusive "usuário
+não existe"). As rotas que mudam um usuário chamam invalidar() depois do
+commit: neste processo a mudança vale já na requisição seguinte; em outros
+processos, em no máximo AUTH_CACHE_TTL segundos.
+
+O TokenCache guarda as claims dos tokens JWT já verificados (chave: SHA-256
+do token), para que o mesmo token enviado centenas de vezes por sessão não
+repita a verificação HS256 a cada requisição.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+AUTH_CACHE_TTL = float(os.environ.get('AUTH_CACHE_TTL', 30))  # segundos
+AUTH_CACHE_MAX_ENTRIES = int(os.environ.get('AUTH_CACHE_MAX_ENTRIES', 10000))
+TOKEN_CACHE_MAX_ENTRIES = int(os.environ.get('TOKEN_CACHE_MAX_ENTRIES', 10000))  # 0 desativa
+
+class UserAuthCache:
+    """user_id -> estado carregado por loader(user_id), com TTL e limite de entradas"""
+
+    def __init__(self, loader: Callable[[Any], Any], ttl: float = AUTH_CACHE_TTL,
+                 max_entries: int = AUTH_CACHE_MAX_ENTRIES):
+        self.loader = loader
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # user_id -> (expira_em, estado)
+        self._lock = threading.Lock()
+        # Incrementada a cada invalidação: uma leitura do banco que começou
+        # antes dela não pode gravar um estado antigo no cache
+        self._geracao = 0
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0}
+
+    def get(self, user_id) -> Any:
+        """Estado atual do usuário (None se ele não existe)"""
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._entries.get(user_id)
+            if entrada is not None and entrada[0] > agora:
+                self._stats['hits'] += 1
+                return entrada[1]
+            self._stats['misses'] += 1
+            geracao = self._geracao
+
+        estado = self.loader(user_id)
+
+        with self._lock:
+            if self._geracao == geracao:
+                self._entries[user_id] = (agora + self.ttl, estado)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+        return estado
+
+    def invalidar(self, user_id):
+        """Descarta o estado do usuário (chamar depois do commit da mudança)"""
+        with self._lock:
+            self._geracao += 1
+            self._entries.pop(user_id, None)
+            self._stats['invalidations'] += 1
+
+    def limpar(self):
+        with self._lock:
+            self._geracao += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        return stats
+
+class TokenCache:
+    """LRU de tokens verificados: SHA-256 do token -> claims, válido até o exp
+
+    Só tokens válidos e com exp entram no cache; uma entrada nunca é servida
+    depois do exp (a verificação é refeita e o PyJWT recusa o token).
+    revogar_usuario() descarta todos os tokens de um usuário.
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # digest -> (exp, claims)
+        self._por_usuario: Dict[Any, set] = {}      # user_id -> {digest}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'revoked': 0, 'evictions': 0}
+
+    @staticmethod
+    def chave(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, chave: bytes) -> Optional[dict]:
+        """Claims do token ainda não expirado, ou None"""
+        with self._lock:
+            entrada = self._entries.get(chave)
+            if entrada is None:
+                self._stats['misses'] += 1
+                return None
+            if entrada[0] <= time.time():
+                self._remover(chave)
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(chave)
+            self._stats['hits'] += 1
+            return entrada[1]
+
+    def put(self, chave: bytes, claims: dict):
+        exp = claims.get('exp')
+        if self.max_entries <= 0 or not isinstance(exp, (int, float)):
+            return
+        with self._lock:
+            self._remover(chave)
+            self._entries[chave] = (exp, claims)
+            self._por_usuario.setdefault(claims.get('user_id'), set()).add(chave)
+            while len(self._entries) > self.max_entries:
+                self._remover(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def revogar_usuario(self, user_id):
+        """Descarta os tokens do usuário (rejeição, exclusão, troca de senha)"""
+        with self._lock:
+            for chave in list(self._por_usuario.get(user_id, ())):
+                self._remover(chave)
+                self._stats['revoked'] += 1
+
+    def limpar(self):
+        with self._lock:
+            self._entries.clear()
+            self._por_usuario.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        return stats
+
+    def _remover(self, chave: bytes):
+        entrada = self._entries.pop(chave, None)
+        if entrada is None:
+            return
+        user_id = entrada[1].get('user_id')
+        chaves = self._por_usuario.get(user_id)
+        if chaves is not None:
+            chaves.discard(chave)
+            if not chaves:
+                del self._por_usuario[user_id]
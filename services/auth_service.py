@@ -1,16 +1,25 @@
-from config.supabase import supabase
+from config.supabase import supabase, auth_client
 from typing import Optional, Dict, Any
 import jwt
 from datetime import datetime, timedelta
+from gotrue.errors import AuthApiError
+
+from services.auth_cache import UserAuthCache
+from services.supabase_jwt import SupabaseTokenVerifier, VerificacaoIndisponivel
 
 class AuthService:
     def __init__(self):
         self.supabase = supabase
+        # Um contexto de Auth por chamada (sessão própria, pool HTTP comum)
+        self.auth_client = auth_client
+        # Token verificado localmente + linha de usuarios em cache (TTL)
+        self.verifier = SupabaseTokenVerifier()
+        self.user_cache = UserAuthCache(self._get_user_data)
     
     def sign_up(self, email: str, password: str, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """Registra um novo usuário no Supabase Auth"""
         try:
-            response = self.supabase.auth.sign_up({
+            response = self.auth_client().sign_up({
                 "email": email,
                 "password": password,
                 "options": {
@@ -42,7 +51,7 @@ class AuthService:
     def sign_in(self, email: str, password: str) -> Dict[str, Any]:
         """Faz login do usuário no Supabase Auth"""
         try:
-            response = self.supabase.auth.sign_in_with_password({
+            response = self.auth_client().sign_in_with_password({
                 "email": email,
                 "password": password
             })
@@ -69,13 +78,31 @@ class AuthService:
             }
     
     def get_user(self, access_token: str) -> Optional[Dict[str, Any]]:
-        """Obtém dados do usuário usando o token de acesso"""
+        """Obtém dados do usuário usando o token de acesso
+        
+        O token é verificado localmente (services/supabase_jwt.py) e a linha
+        de usuarios vem do user_cache; o get_user() remoto só é chamado quando
+        o token não pode ser verificado aqui.
+        """
+        try:
+            claims = self.verifier.verify(access_token)
+        except VerificacaoIndisponivel:
+            return self._get_user_remoto(access_token)
+        
+        if claims is None:
+            return None
+        return {
+            "user": self.verifier.usuario(claims),
+            "user_data": self.user_cache.get(claims['sub'])
+        }
+    
+    def _get_user_remoto(self, access_token: str) -> Optional[Dict[str, Any]]:
+        """Valida o token no Supabase Auth (uma chamada de rede)"""
         try:
-            self.supabase.auth.set_session(access_token, None)
-            user = self.supabase.auth.get_user()
+            user = self.auth_client().get_user(access_token)
             
-            if user.user:
-                user_data = self._get_user_data(user.user.id)
+            if user and user.user:
+                user_data = self.user_cache.get(user.user.id)
                 return {
                     "user": user.user,
                     "user_data": user_data
@@ -87,9 +114,12 @@ class AuthService:
     def sign_out(self, access_token: str) -> bool:
         """Faz logout do usuário"""
         try:
-            self.supabase.auth.set_session(access_token, None)
-            self.supabase.auth.sign_out()
+            self.auth_client().admin.sign_out(access_token)
             return True
+        except AuthApiError as e:
+            # 401/404: sessão já encerrada no Supabase (mesmo resultado do
+            # sign_out() do cliente); os demais erros não desconectaram
+            return e.status in (401, 404)
         except Exception:
             return False
     
@@ -105,6 +135,7 @@ class AuthService:
                 'api_key': user_data.get('api_key'),
                 'created_at': datetime.now().isoformat()
             }).execute()
+            self.user_cache.invalidar(user_id)
         except Exception as e:
             print(f"Erro ao salvar dados do usuário: {e}")
     
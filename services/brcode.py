@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Payload PIX (BR Code, padrão EMV QRCPS-MPM do Banco Central)
+
+Cada campo é um TLV: ID de 2 dígitos, tamanho de 2 dígitos e valor. O
+payload de um pagamento:
+
+    00 Payload Format Indicator       "01"
+    01 Point of Initiation Method     "12" (QR de uso único)
+    26 Merchant Account Information   00 "br.gov.bcb.pix", 01 chave PIX,
+                                      02 descrição (opcional)
+    52 Merchant Category Code         "0000"
+    53 Moeda                          "986" (BRL)
+    54 Valor                          "10.00" (opcional)
+    58 País                           "BR"
+    59 Nome do recebedor              até 25 caracteres
+    60 Cidade do recebedor            até 15 caracteres
+    61 CEP                            (opcional)
+    62 Dados adicionais               05 txid (até 25 alfanuméricos, "***" sem txid)
+    63 CRC16                          4 dígitos hexadecimais
+
+O CRC é o CRC16-CCITT (polinômio 0x1021, valor inicial 0xFFFF) do payload
+inteiro até "6304" inclusive, calculado byte a byte com uma tabela de 256
+entradas.
+
+BrCodeBuilder guarda, por recebedor, o trecho fixo até o campo 53 e o CRC
+parcial dele: cada payload só calcula o CRC do trecho variável (valor,
+recebedor e txid). Os builders ficam num cache LRU por recebedor, e
+gerar_lote() monta milhares de payloads de uma vez.
+
+Sellers sem KYC aprovado recebem na conta da plataforma (PIX_CHAVE,
+PIX_NOME e PIX_CIDADE).
+"""
+
+import functools
+import os
+import re
+import unicodedata
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+PIX_CHAVE = os.environ.get('PIX_CHAVE', 'pix@whitelabel.local')
+PIX_NOME = os.environ.get('PIX_NOME', 'Teste Empresa')
+PIX_CIDADE = os.environ.get('PIX_CIDADE', 'Brasilia')
+
+GUI_PIX = 'br.gov.bcb.pix'
+TAMANHO_NOME = 25
+TAMANHO_CIDADE = 15
+TAMANHO_TXID = 25
+TXID_VAZIO = '***'
+
+Recebedor = namedtuple('Recebedor', 'chave nome cidade cep')
+
+def _tabela_crc(polinomio: int = 0x1021) -> Tuple[int, ...]:
+    tabela = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ polinomio) if crc & 0x8000 else (crc << 1)
+        tabela.append(crc & 0xFFFF)
+    return tuple(tabela)
+
+TABELA_CRC = _tabela_crc()
+
+def crc16(dados: bytes, crc: int = 0xFFFF) -> int:
+    """CRC16-CCITT (0x1021); crc permite continuar de um CRC parcial"""
+    tabela = TABELA_CRC
+    for byte in dados:
+        crc = ((crc << 8) & 0xFFFF) ^ tabela[(crc >> 8) ^ byte]
+    return crc
+
+def campo(identificador: str, valor: str) -> str:
+    """TLV de um campo (valor de até 99 caracteres)"""
+    if len(valor) > 99:
+        raise ValueError(f'Campo {identificador} do BR Code com mais de 99 caracteres')
+    return f'{identificador}{len(valor):02d}{valor}'
+
+def _texto(valor: Optional[str], limite: int) -> str:
+    """Sem acentos e só caracteres imprimíveis ASCII, cortado no limite"""
+    ascii_ = unicodedata.normalize('NFKD', valor or '').encode('ascii', 'ignore').decode()
+    return re.sub(r'[^\x20-\x7e]', '', ascii_).strip()[:limite]
+
+def recebedor(chave: str, nome: str, cidade: str, cep: Optional[str] = None) -> Recebedor:
+    """Recebedor normalizado para o BR Code (chave PIX, nome, cidade e CEP)"""
+    if not chave:
+        raise ValueError('Chave PIX do recebedor é obrigatória')
+    cep = re.sub(r'\D', '', cep or '') or None
+    return Recebedor(chave.strip(), _texto(nome, TAMANHO_NOME) or 'N/A',
+                     _texto(cidade, TAMANHO_CIDADE) or 'N/A', cep)
+
+def txid(valor: Optional[str]) -> str:
+    """txid aceito pelo BR Code: só letras e dígitos, até 25 (ou ***)"""
+    limpo = re.sub(r'[^A-Za-z0-9]', '', valor or '')[:TAMANHO_TXID]
+    return limpo or TXID_VAZIO
+
+def valor_brcode(valor_centavos: int) -> str:
+    """Campo 54: reais com 2 casas; o valor tem de ser positivo"""
+    if valor_centavos <= 0:
+        raise ValueError(f'Valor do BR Code deve ser positivo: {valor_centavos} centavos')
+    return f'{valor_centavos // 100}.{valor_centavos % 100:02d}'
+
+class BrCodeBuilder:
+    """Payloads de um recebedor; o trecho fixo e o CRC dele são calculados uma vez"""
+
+    def __init__(self, dados: Recebedor, descricao: Optional[str] = None):
+        self.recebedor = dados
+        conta = campo('00', GUI_PIX) + campo('01', dados.chave)
+        if descricao:
+            conta += campo('02', _texto(descricao, 99 - len(conta) - 4))
+        self._prefixo = (campo('00', '01') + campo('01', '12') + campo('26', conta)
+                         + campo('52', '0000') + campo('53', '986'))
+        self._crc_prefixo = crc16(self._prefixo.encode())
+        self._meio = (campo('58', 'BR') + campo('59', dados.nome) + campo('60', dados.cidade)
+                      + (campo('61', dados.cep) if dados.cep else ''))
+
+    def payload(self, valor_centavos: Optional[int] = None, id_transacao: Optional[str] = None) -> str:
+        # Sem valor (None): QR de valor aberto, o pagador informa o valor
+        sufixo = ((campo('54', valor_brcode(valor_centavos)) if valor_centavos is not None else '')
+                  + self._meio + campo('62', campo('05', txid(id_transacao))) + '6304')
+        return f'{self._prefixo}{sufixo}{crc16(sufixo.encode(), self._crc_prefixo):04X}'
+
+    def payloads(self, valores_centavos: Sequence[Optional[int]],
+                 ids_transacao: Sequence[Optional[str]]) -> List[str]:
+        """Um payload por (valor, txid)"""
+        return list(map(self.payload, valores_centavos, ids_transacao))
+
+@functools.lru_cache(maxsize=1024)
+def builder(dados: Recebedor) -> BrCodeBuilder:
+    return BrCodeBuilder(dados)
+
+def gerar(dados: Recebedor, valor_centavos: Optional[int] = None, id_transacao: Optional[str] = None,
+          descricao: Optional[str] = None) -> str:
+    """Payload de um pagamento"""
+    construtor = BrCodeBuilder(dados, descricao) if descricao else builder(dados)
+    return construtor.payload(valor_centavos, id_transacao)
+
+def gerar_lote(itens: Iterable[Tuple[Recebedor, Optional[int], Optional[str]]]) -> List[str]:
+    """Payloads de (recebedor, valor em centavos, txid), na ordem recebida"""
+    builders: Dict[Recebedor, BrCodeBuilder] = {}
+    resultado = []
+    for dados, valor_centavos, id_transacao in itens:
+        construtor = builders.get(dados)
+        if construtor is None:
+            construtor = builders[dados] = builder(dados)
+        resultado.append(construtor.payload(valor_centavos, id_transacao))
+    return resultado
+
+RECEBEDOR_PADRAO = recebedor(PIX_CHAVE, PIX_NOME, PIX_CIDADE)
+
+def valido(payload: str) -> bool:
+    """Confere o CRC do payload (campo 63 no fim)"""
+    return (len(payload) > 8 and payload[-8:-4] == '6304'
+            and payload[-4:].upper() == f'{crc16(payload[:-4].encode()):04X}')
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Busca textual (SQLite FTS5) no marketplace e nas empresas
+
+Duas tabelas virtuais FTS5, mantidas por triggers (migração 0006) na mesma
+transação de cada escrita:
+
+    produtos_fts  name e header dos produtos visíveis no marketplace
+                  (show_marketplace = 1 e status 'ativo'). Conteúdo externo:
+                  o texto fica só em produtos, o índice lê pela view
+                  produtos_busca
+    empresas_fts  username e email do seller, nome_razao_social e cpf_cnpj
+                  (só dígitos) do KYC, com rowid = usuarios.id. Guarda uma
+                  cópia da view empresas_busca, que junta duas tabelas
+
+O tokenizer unicode61 com remove_diacritics ignora acentos e caixa ("cafe"
+encontra "Café") e o índice de prefixos de 2 e 3 caracteres atende a busca
+enquanto o usuário digita. A relevância é o bm25 com peso maior para o nome
+do produto e para razão social/CNPJ.
+
+Uso:
+    python -m services.busca rebuild [banco.db]
+    python -m services.busca check [banco.db]
+"""
+
+import re
+import sqlite3
+import sys
+from typing import Dict, List
+
+from services.repositories import FiltroInvalido
+
+DEFAULT_DATABASE = 'gateway_pagamentos.db'
+
+BUSCA_MAX_CARACTERES = 200
+BUSCA_MAX_TERMOS = 8
+
+FTS_OPCOES = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+
+def _so_digitos(coluna: str) -> str:
+    """Expressão SQL que remove a pontuação de CPF/CNPJ"""
+    for caractere in ('.', '-', '/', ' '):
+        coluna = f"REPLACE({coluna}, '{caractere}', '')"
+    return coluna
+
+# Linhas indexáveis (conteúdo das tabelas FTS)
+PRODUTOS_BUSCA_VIEW = '''
+    CREATE VIEW IF NOT EXISTS produtos_busca AS
+    SELECT id, name, header
+    FROM produtos
+    WHERE show_marketplace = 1 AND status = 'ativo'
+'''
+
+EMPRESAS_BUSCA_VIEW = f'''
+    CREATE VIEW IF NOT EXISTS empresas_busca AS
+    SELECT u.id, u.username, u.email, k.nome_razao_social, {_so_digitos('k.cpf_cnpj')} as cpf_cnpj
+    FROM usuarios u
+    LEFT JOIN kyc k ON k.id = (SELECT MAX(id) FROM kyc WHERE user_id = u.id)
+    WHERE u.tipo = 'seller'
+'''
+
+_PRODUTO_VISIVEL = "{0}.show_marketplace = 1 AND {0}.status = 'ativo'"
+
+# Produtos: o comando 'delete' do FTS5 precisa dos valores antigos exatos,
+# por isso remoção e reinserção ficam no mesmo trigger, nessa ordem
+_PRODUTO_REMOVE_OLD = f'''
+    INSERT INTO produtos_fts (produtos_fts, rowid, name, header)
+    SELECT 'delete', OLD.id, OLD.name, OLD.header
+    WHERE {_PRODUTO_VISIVEL.format('OLD')};
+'''
+
+_PRODUTO_INDEXA_NEW = f'''
+    INSERT INTO produtos_fts (rowid, name, header)
+    SELECT NEW.id, NEW.name, NEW.header
+    WHERE {_PRODUTO_VISIVEL.format('NEW')};
+'''
+
+def _empresa_atualiza(user_id: str) -> str:
+    return f'''
+        DELETE FROM empresas_fts WHERE rowid = {user_id};
+        INSERT INTO empresas_fts (rowid, username, email, nome_razao_social, cpf_cnpj)
+        SELECT id, username, email, nome_razao_social, cpf_cnpj
+        FROM empresas_busca WHERE id = {user_id};
+    '''
+
+SQLITE_BUSCA = [
+    PRODUTOS_BUSCA_VIEW,
+    f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS produtos_fts USING fts5(
+            name, header,
+            content = 'produtos_busca', content_rowid = 'id',
+            {FTS_OPCOES}
+        )
+    ''',
+    # Pesos do bm25 por coluna (name, header), usados pela coluna rank
+    "INSERT INTO produtos_fts (produtos_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    f'''
+        CREATE TRIGGER IF NOT EXISTS trg_produtos_fts_insert
+        AFTER INSERT ON produtos
+        WHEN {_PRODUTO_VISIVEL.format('NEW')}
+        BEGIN
+            {_PRODUTO_INDEXA_NEW}
+        END
+    ''',
+    f'''
+        CREATE TRIGGER IF NOT EXISTS trg_produtos_fts_update
+        AFTER UPDATE OF id, name, header, show_marketplace, status ON produtos
+        WHEN OLD.id IS NOT NEW.id OR OLD.name IS NOT NEW.name OR OLD.header IS NOT NEW.header
+          OR ({_PRODUTO_VISIVEL.format('OLD')}) IS NOT ({_PRODUTO_VISIVEL.format('NEW')})
+        BEGIN
+            {_PRODUTO_REMOVE_OLD}
+            {_PRODUTO_INDEXA_NEW}
+        END
+    ''',
+    f'''
+        CREATE TRIGGER IF NOT EXISTS trg_produtos_fts_delete
+        AFTER DELETE ON produtos
+        WHEN {_PRODUTO_VISIVEL.format('OLD')}
+        BEGIN
+            {_PRODUTO_REMOVE_OLD}
+        END
+    ''',
+    EMPRESAS_BUSCA_VIEW,
+    f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS empresas_fts USING fts5(
+            username, email, nome_razao_social, cpf_cnpj,
+            {FTS_OPCOES}
+        )
+    ''',
+    "INSERT INTO empresas_fts (empresas_fts, rank) VALUES ('rank', 'bm25(4.0, 2.0, 10.0, 10.0)')",
+    f'''
+        CREATE TRIGGER IF NOT EXISTS trg_empresas_fts_usuario_insert
+        AFTER INSERT ON usuarios
+        WHEN NEW.tipo = 'seller'
+        BEGIN
+            {_empresa_atualiza('NEW.id')}
+        END
+    ''',
+    f'''
+        CREATE TRIGGER IF NOT EXISTS trg_empresas_fts_usuario_update
+        AFTER UPDATE OF id, username, email, tipo ON usuarios
+        BEGIN
+            DELETE FROM empresas_fts WHERE rowid = OLD.id;
+            {_empresa_atualiza('NEW.id')}
+        END
+    ''',
+    '''
+        CREATE TRIGGER IF NOT EXISTS trg_empresas_fts_usuario_delete
+        AFTER DELETE ON usuarios
+        BEGIN
+            DELETE FROM empresas_fts WHERE rowid = OLD.id;
+        END
+    ''',
+    f'''
+        CREATE TRIGGER IF NOT EXISTS trg_empresas_fts_kyc_insert
+        AFTER INSERT ON kyc
+        BEGIN
+            {_empresa_atualiza('NEW.user_id')}
+        END
+    ''',
+    f'''
+        CREATE TRIGGER IF NOT EXISTS trg_empresas_fts_kyc_update
+        AFTER UPDATE OF user_id, nome_razao_social, cpf_cnpj ON kyc
+        BEGIN
+            {_empresa_atualiza('OLD.user_id')}
+            {_empresa_atualiza('NEW.user_id')}
+        END
+    ''',
+    f'''
+        CREATE TRIGGER IF NOT EXISTS trg_empresas_fts_kyc_delete
+        AFTER DELETE ON kyc
+        BEGIN
+            {_empresa_atualiza('OLD.user_id')}
+        END
+    ''',
+]
+
+# Reconstrução completa a partir das views (carga inicial da migração 0006)
+REBUILD_SQL = [
+    "INSERT INTO produtos_fts (produtos_fts) VALUES ('rebuild')",
+    'DELETE FROM empresas_fts',
+    '''
+        INSERT INTO empresas_fts (rowid, username, email, nome_razao_social, cpf_cnpj)
+        SELECT id, username, email, nome_razao_social, cpf_cnpj FROM empresas_busca
+    ''',
+]
+
+_SEPARADOR_DOCUMENTO = re.compile(r'(?<=\d)[./-](?=\d)')
+_TOKEN = re.compile(r'\w+')
+
+def expressao_busca(texto: str) -> str:
+    """Converte o texto digitado em uma expressão MATCH do FTS5
+
+    Cada palavra vira uma frase entre aspas, então a sintaxe do FTS5 (aspas,
+    operadores, colunas) nunca chega crua ao MATCH. Só a última palavra,
+    que o usuário ainda pode estar digitando, é buscada como prefixo:
+    'café mo' vira "café" AND "mo"* e 'joao@emp' vira "joao emp"*.
+    CPF/CNPJ formatado é buscado pelos dígitos.
+    """
+    texto = (texto or '').strip()
+    if not texto:
+        raise FiltroInvalido('Informe o termo de busca em q')
+    if len(texto) > BUSCA_MAX_CARACTERES:
+        raise FiltroInvalido(f'Busca limitada a {BUSCA_MAX_CARACTERES} caracteres')
+
+    frases = []
+    for palavra in _SEPARADOR_DOCUMENTO.sub('', texto).split():
+        tokens = _TOKEN.findall(palavra.replace('_', ' '))
+        if tokens:
+            frases.append('"' + ' '.join(tokens) + '"')
+    if not frases:
+        raise FiltroInvalido('Informe ao menos uma letra ou número na busca')
+    if len(frases) > BUSCA_MAX_TERMOS:
+        raise FiltroInvalido(f'Busca limitada a {BUSCA_MAX_TERMOS} palavras')
+    frases[-1] += '*'
+    return ' AND '.join(frases)
+
+def rebuild(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Reconstrói os dois índices; retorna o número de linhas de cada um"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for comando in REBUILD_SQL:
+            conn.execute(comando)
+        totais = {
+            'produtos_fts': conn.execute('SELECT COUNT(*) FROM produtos_busca').fetchone()[0],
+            'empresas_fts': conn.execute('SELECT COUNT(*) FROM empresas_fts').fetchone()[0],
+        }
+        conn.commit()
+        return totais
+    except Exception:
+        conn.rollback()
+        raise
+
+def check(conn: sqlite3.Connection) -> List[str]:
+    """Compara os índices com as views; retorna a lista de problemas"""
+    problemas = []
+    for tabela in ('produtos_fts', 'empresas_fts'):
+        try:
+            conn.execute(f"INSERT INTO {tabela} ({tabela}) VALUES ('integrity-check')")
+        except sqlite3.DatabaseError as e:
+            problemas.append(f'{tabela}: {e}')
+
+    divergentes = conn.execute('''
+        SELECT COUNT(*) FROM (
+            SELECT rowid, username, email, nome_razao_social, cpf_cnpj FROM empresas_fts
+            EXCEPT SELECT id, username, email, nome_razao_social, cpf_cnpj FROM empresas_busca
+        )
+    ''').fetchone()[0]
+    faltando = conn.execute('''
+        SELECT COUNT(*) FROM (
+            SELECT id, username, email, nome_razao_social, cpf_cnpj FROM empresas_busca
+            EXCEPT SELECT rowid, username, email, nome_razao_social, cpf_cnpj FROM empresas_fts
+        )
+    ''').fetchone()[0]
+    if divergentes or faltando:
+        problemas.append(f'empresas_fts: {divergentes} linhas desatualizadas, {faltando} faltando')
+    conn.rollback()
+    return problemas
+
+def main(argv: List[str]) -> int:
+    comando = argv[0] if argv else 'check'
+    database = argv[1] if len(argv) > 1 else DEFAULT_DATABASE
+
+    conn = sqlite3.connect(database)
+    try:
+        if comando == 'rebuild':
+            totais = rebuild(conn)
+            print(f"✅ Índices reconstruídos: {totais['produtos_fts']} produtos, {totais['empresas_fts']} empresas")
+        elif comando == 'check':
+            problemas = check(conn)
+            for problema in problemas:
+                print(f"❌ {problema}")
+            if problemas:
+                return 1
+            print("✅ Índices de busca consistentes com produtos, usuarios e kyc")
+        else:
+            print(__doc__)
+            return 2
+    finally:
+        conn.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
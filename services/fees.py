@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Taxas por seller e método de pagamento (tabela taxas) compiladas em memória
+
+O FeeSchedule carrega as linhas ativas de taxas em um dict de inteiros:
+chave (user_id << 8 | método) -> regra (percentual em ppm << 32 | fixa em
+centavos). Linhas com user_id NULL são o padrão do método para todos os
+sellers; sem nenhuma das duas vale FEE_DEFAULT_PERCENT / FEE_DEFAULT_FIXED.
+Com mais de uma linha ativa para a mesma chave, vale a de maior id.
+
+A taxa é calculada em centavos inteiros, com arredondamento half-up e
+limitada ao valor da transação:
+
+    taxa = (valor_centavos * ppm + 500000) // 1000000 + fixa_centavos
+
+Atualização incremental: a coluna versao (migração 0010) recebe, por
+trigger, um número novo a cada INSERT ou UPDATE; a thread do FeeSchedule lê
+a cada FEE_REFRESH_INTERVAL segundos só as linhas com versao maior que a
+última vista. Para remover uma taxa, ativo = 0 (um DELETE só é visto na
+próxima carga completa).
+
+calcular_lote() calcula uma coluna inteira de transações em memória;
+recalcular() reprocessa o histórico no próprio SQLite, um UPDATE por faixa
+de ids com as regras numa tabela temporária (o ledger registra estorno e
+nova liquidação das transações aprovadas cuja taxa mudou).
+
+Uso:
+    python -m services.fees recalcular [banco.db] [desde] [ate]
+"""
+
+import atexit
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_DATABASE = 'gateway_pagamentos.db'
+
+FEE_DEFAULT_PERCENT = float(os.environ.get('FEE_DEFAULT_PERCENT', 2.99))
+FEE_DEFAULT_FIXED = float(os.environ.get('FEE_DEFAULT_FIXED', 0.00))
+FEE_REFRESH_INTERVAL = float(os.environ.get('FEE_REFRESH_INTERVAL', 5))  # segundos
+FEE_BATCH_SIZE = int(os.environ.get('FEE_BATCH_SIZE', 10000))
+
+BITS_METODO = 8
+MASCARA_FIXA = (1 << 32) - 1
+
+SQLITE_TAXAS_VERSAO = [
+    'ALTER TABLE taxas ADD COLUMN versao INTEGER NOT NULL DEFAULT 0',
+    'UPDATE taxas SET versao = id',
+    'CREATE INDEX IF NOT EXISTS idx_taxas_versao ON taxas (versao)',
+    '''
+        CREATE TRIGGER IF NOT EXISTS trg_taxas_versao_insert
+        AFTER INSERT ON taxas
+        BEGIN
+            UPDATE taxas SET versao = (SELECT MAX(versao) FROM taxas) + 1 WHERE id = NEW.id;
+        END
+    ''',
+    '''
+        CREATE TRIGGER IF NOT EXISTS trg_taxas_versao_update
+        AFTER UPDATE OF user_id, tipo_pagamento, taxa_percentual, taxa_fixa, ativo ON taxas
+        BEGIN
+            UPDATE taxas SET versao = (SELECT MAX(versao) FROM taxas) + 1 WHERE id = NEW.id;
+        END
+    ''',
+    # Padrões por método (os mesmos do schema do Supabase; cartão = crédito e débito)
+    '''
+        INSERT INTO taxas (user_id, tipo_pagamento, taxa_percentual, taxa_fixa)
+        SELECT NULL, padrao.tipo, padrao.percentual, 0.00
+        FROM (SELECT 'pix' as tipo, 1.99 as percentual
+              UNION ALL SELECT 'credito', 2.99
+              UNION ALL SELECT 'debito', 2.99
+              UNION ALL SELECT 'boleto', 3.99) padrao
+        WHERE NOT EXISTS (SELECT 1 FROM taxas t WHERE t.user_id IS NULL AND t.tipo_pagamento = padrao.tipo)
+    ''',
+]
+
+ALTERADAS_SQL = '''
+    SELECT id, user_id, tipo_pagamento, taxa_percentual, taxa_fixa, ativo, versao
+    FROM taxas
+    WHERE versao > ?
+    ORDER BY versao
+'''
+
+# Regras do FeeSchedule numa tabela temporária (user_id 0 = padrão do método)
+SQLITE_REGRAS_TEMP = [
+    'DROP TABLE IF EXISTS temp.regras_taxa',
+    '''
+        CREATE TEMP TABLE regras_taxa (
+            user_id INTEGER NOT NULL,
+            tipo_pagamento TEXT NOT NULL,
+            ppm INTEGER NOT NULL,
+            fixa INTEGER NOT NULL,
+            PRIMARY KEY (user_id, tipo_pagamento)
+        ) WITHOUT ROWID
+    ''',
+]
+
+INSERIR_REGRA_SQL = 'INSERT INTO regras_taxa (user_id, tipo_pagamento, ppm, fixa) VALUES (?, ?, ?, ?)'
+
+# Mesma fórmula de aplicar(), sobre um intervalo de ids; só grava as linhas cuja taxa mudou
+RECALCULAR_SQL = '''
+    UPDATE transacoes
+    SET taxa_cobrada = novo.taxa / 100.0, valor_liquido = (novo.valor - novo.taxa) / 100.0
+    FROM (
+        SELECT id, valor, atual,
+               CASE WHEN valor <= 0 THEN 0
+                    ELSE MIN((valor * ppm + 500000) / 1000000 + fixa, valor) END AS taxa
+        FROM (
+            SELECT t.id, CAST(ROUND(t.valor * 100) AS INTEGER) AS valor,
+                   COALESCE(s.ppm, p.ppm, ?) AS ppm, COALESCE(s.fixa, p.fixa, ?) AS fixa,
+                   CAST(ROUND(t.taxa_cobrada * 100) AS INTEGER) AS atual
+            FROM transacoes t
+            LEFT JOIN regras_taxa s ON s.user_id = t.user_id AND s.tipo_pagamento = t.payment_method
+            LEFT JOIN regras_taxa p ON p.user_id = 0 AND p.tipo_pagamento = t.payment_method
+            WHERE t.id > ? AND t.id <= ? AND t.created_at >= ? AND t.created_at < ?
+        )
+    ) AS novo
+    WHERE transacoes.id = novo.id AND novo.taxa != IFNULL(novo.atual, -1)
+'''
+
+def centavos(valor) -> int:
+    """Reais -> centavos, como o CAST(ROUND(valor * 100) AS INTEGER) do ledger"""
+    x = float(valor) * 100
+    return int(x + 0.5) if x >= 0 else int(x - 0.5)
+
+def empacotar(percentual: float, fixa: float) -> int:
+    """Regra (percentual, fixa em reais) -> ppm << 32 | fixa em centavos"""
+    return (max(0, round(percentual * 10000)) << 32) | max(0, centavos(fixa or 0))
+
+def aplicar(regra: int, valor_centavos: int) -> int:
+    """Taxa em centavos da regra sobre o valor (limitada ao valor)"""
+    if valor_centavos <= 0:
+        return 0
+    return min((valor_centavos * (regra >> 32) + 500000) // 1000000 + (regra & MASCARA_FIXA), valor_centavos)
+
+class FeeSchedule:
+    """(seller, método) -> regra de taxa em memória, atualizada pela coluna versao"""
+
+    def __init__(self, connect: Callable, refresh_interval: float = FEE_REFRESH_INTERVAL,
+                 padrao_percentual: float = FEE_DEFAULT_PERCENT, padrao_fixa: float = FEE_DEFAULT_FIXED):
+        self.connect = connect
+        self.refresh_interval = refresh_interval
+        self.padrao = empacotar(padrao_percentual, padrao_fixa)
+        # Lidos sem lock pelas requisições: trocados inteiros, nunca alterados no lugar
+        self._tabela: Dict[int, int] = {}
+        self._metodos: Dict[str, int] = {}
+        # Só a atualização usa: linha vencedora de cada chave e o inverso
+        self._vencedora: Dict[int, int] = {}
+        self._chave_da_linha: Dict[int, int] = {}
+        self._versao = -1
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'reloads': 0, 'refreshes': 0, 'rows_applied': 0, 'refresh_errors': 0}
+
+    def carregar(self) -> 'FeeSchedule':
+        """Carga completa da tabela taxas"""
+        with self._lock:
+            linhas = self._ler(-1)
+            self._tabela, self._metodos = {}, {}
+            self._vencedora, self._chave_da_linha = {}, {}
+            self._versao = -1
+            self._aplicar(linhas)
+            self._stats['reloads'] += 1
+        return self
+
+    def atualizar(self) -> int:
+        """Aplica as linhas alteradas desde a última leitura; retorna quantas"""
+        with self._lock:
+            linhas = self._ler(self._versao)
+            if not linhas:
+                return 0
+            if self._aplicar(linhas):
+                # A vencedora de alguma chave saiu sem substituta conhecida
+                linhas = self._ler(-1)
+                self._tabela, self._metodos = {}, {}
+                self._vencedora, self._chave_da_linha = {}, {}
+                self._versao = -1
+                self._aplicar(linhas)
+                self._stats['reloads'] += 1
+            self._stats['refreshes'] += 1
+            return len(linhas)
+
+    def _ler(self, versao: int) -> List[Tuple]:
+        conn = self.connect()
+        try:
+            return conn.execute(ALTERADAS_SQL, (versao,)).fetchall()
+        finally:
+            conn.close()
+
+    def _aplicar(self, linhas: Iterable[Tuple]) -> bool:
+        """Aplica as linhas (em ordem de versao) numa cópia da tabela
+
+        Retorna True se alguma chave perdeu a linha vencedora e nenhuma outra
+        linha lida a substituiu (precisa de carga completa).
+        """
+        tabela = dict(self._tabela)
+        metodos = dict(self._metodos)
+        sem_vencedora = set()
+        for linha_id, user_id, metodo, percentual, fixa, ativo, versao in linhas:
+            indice = metodos.setdefault(metodo, len(metodos) + 1)
+            chave = ((user_id or 0) << BITS_METODO) | indice
+            anterior = self._chave_da_linha.pop(linha_id, None)
+            if anterior is not None:
+                del tabela[anterior]
+                del self._vencedora[anterior]
+                sem_vencedora.add(anterior)
+            if ativo and linha_id > self._vencedora.get(chave, 0):
+                perdedora = self._vencedora.get(chave)
+                if perdedora is not None:
+                    del self._chave_da_linha[perdedora]
+                tabela[chave] = empacotar(percentual, fixa)
+                self._vencedora[chave] = linha_id
+                self._chave_da_linha[linha_id] = chave
+            self._versao = max(self._versao, versao)
+            self._stats['rows_applied'] += 1
+        self._metodos = metodos
+        self._tabela = tabela
+        return any(chave not in self._vencedora for chave in sem_vencedora)
+
+    def regra(self, user_id: Optional[int], metodo: str) -> int:
+        """Regra empacotada do seller para o método (com os padrões)"""
+        indice = self._metodos.get(metodo)
+        if indice is not None:
+            tabela = self._tabela
+            regra = tabela.get(((user_id or 0) << BITS_METODO) | indice)
+            if regra is None:
+                regra = tabela.get(indice)
+            if regra is not None:
+                return regra
+        return self.padrao
+
+    def taxa_centavos(self, user_id: Optional[int], metodo: str, valor_centavos: int) -> int:
+        return aplicar(self.regra(user_id, metodo), valor_centavos)
+
+    def taxa(self, user_id: Optional[int], metodo: str, valor) -> Tuple[float, float]:
+        """(taxa, valor líquido) em reais, calculados em centavos"""
+        valor_centavos = centavos(valor)
+        taxa_centavos = self.taxa_centavos(user_id, metodo, valor_centavos)
+        return taxa_centavos / 100, (valor_centavos - taxa_centavos) / 100
+
+    def calcular_lote(self, user_ids: Sequence[Optional[int]], metodos: Sequence[str],
+                      valores_centavos: Sequence[int]) -> List[int]:
+        """Taxas em centavos de colunas de transações (mesmo tamanho)"""
+        return list(map(aplicar, map(self.regra, user_ids, metodos), valores_centavos))
+
+    def recalcular(self, conn: sqlite3.Connection, desde: str = '0000-01-01', ate: str = '9999-12-31',
+                   lote: int = FEE_BATCH_SIZE) -> Dict[str, int]:
+        """Recalcula taxa_cobrada/valor_liquido das transações criadas em [desde, ate)
+
+        As regras vão para uma tabela temporária e cada faixa de lote ids é
+        recalculada por um único UPDATE (em uma transação), que grava só as
+        linhas cuja taxa mudou. conn deve estar em autocommit.
+        """
+        with self._lock:
+            tabela = dict(self._tabela)
+            nomes = {indice: metodo for metodo, indice in self._metodos.items()}
+        for comando in SQLITE_REGRAS_TEMP:
+            conn.execute(comando)
+        conn.executemany(INSERIR_REGRA_SQL, [
+            (chave >> BITS_METODO, nomes[chave & ((1 << BITS_METODO) - 1)], regra >> 32, regra & MASCARA_FIXA)
+            for chave, regra in tabela.items()
+        ])
+
+        primeiro, ultimo = conn.execute('SELECT MIN(id), MAX(id) FROM transacoes').fetchone()
+        faixas = alteradas = 0
+        inicio = (primeiro or 1) - 1
+        while ultimo is not None and inicio < ultimo:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                alteradas += conn.execute(RECALCULAR_SQL, (self.padrao >> 32, self.padrao & MASCARA_FIXA,
+                                                           inicio, inicio + lote, desde, ate)).rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            faixas += 1
+            inicio += lote
+        conn.execute('DROP TABLE temp.regras_taxa')
+        return {'faixas': faixas, 'alteradas': alteradas}
+
+    def start(self) -> 'FeeSchedule':
+        """Inicia a thread de atualização incremental"""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='fee-schedule', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.atualizar()
+            except Exception as e:
+                with self._lock:
+                    self._stats['refresh_errors'] += 1
+                print(f"⚠️ Erro ao atualizar taxas: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['rules'] = len(self._tabela)
+            stats['versao'] = self._versao
+        return stats
+
+def main(argv: List[str]) -> int:
+    if len(argv) < 2 or argv[1] != 'recalcular':
+        print(__doc__)
+        return 1
+
+    caminho = argv[2] if len(argv) > 2 else DEFAULT_DATABASE
+    periodo = argv[3:5]
+    conn = sqlite3.connect(caminho, isolation_level=None)
+    try:
+        fees = FeeSchedule(lambda: sqlite3.connect(caminho)).carregar()
+        inicio = time.perf_counter()
+        resultado = fees.recalcular(conn, *periodo)
+        print(f"✅ {resultado['alteradas']} transações com taxa recalculada ({resultado['faixas']} faixas de ids) "
+              f"em {time.perf_counter() - inicio:.2f}s")
+        return 0
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
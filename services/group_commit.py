@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Group commit para inserções concorrentes
+
+As threads das requisições enviam (sql, parâmetros) para uma única thread
+de gravação, que executa vários comandos na mesma transação e faz um só
+commit a cada max_batch linhas ou max_delay segundos. Cada chamador recebe
+um Future resolvido com o id da linha inserida (ou com a exceção daquela
+linha: cada comando roda em um SAVEPOINT próprio, então uma falha não
+desfaz as demais linhas do lote).
+
+Com o SQLite em WAL o custo de uma escrita curta é dominado pelo BEGIN
+IMMEDIATE/COMMIT e pela disputa do lock de escrita; com muitos clientes
+simultâneos o lote troca N commits disputados por um. Com max_delay 0 (padrão)
+o lote é o que se acumulou na fila enquanto o commit anterior rodava; em
+discos com fsync caro (synchronous=FULL) alguns milissegundos de espera
+aumentam o lote.
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+GROUP_COMMIT_MAX_BATCH = int(os.environ.get('GROUP_COMMIT_MAX_BATCH', 256))
+GROUP_COMMIT_MAX_DELAY = float(os.environ.get('GROUP_COMMIT_MAX_DELAY', 0))  # segundos
+
+WriteRequest = Tuple[str, Tuple, Future]
+
+class GroupCommitWriter:
+    """Thread única que agrupa escritas em uma transação por lote"""
+
+    def __init__(self, write_transaction: Callable, max_batch: int = GROUP_COMMIT_MAX_BATCH,
+                 max_delay: float = GROUP_COMMIT_MAX_DELAY):
+        self.write_transaction = write_transaction
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: queue.Queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {'rows': 0, 'commits': 0, 'errors': 0}
+        self._ultimo_lote = 0
+
+    def start(self) -> 'GroupCommitWriter':
+        """Inicia a thread de gravação e registra a parada no encerramento"""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='group-commit-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        """Para a thread depois de gravar o que já foi enviado"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, sql: str, params: Tuple = ()) -> Future:
+        """Envia um comando de escrita; o Future resolve com o lastrowid"""
+        future: Future = Future()
+        if self._thread is None:
+            future.set_exception(RuntimeError('GroupCommitWriter não está em execução'))
+            return future
+        self._queue.put((sql, params, future))
+        return future
+
+    def execute(self, sql: str, params: Tuple = (), timeout: Optional[float] = None) -> Any:
+        """Envia e espera o commit; retorna o lastrowid"""
+        return self.submit(sql, params).result(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """Linhas gravadas, commits, erros e profundidade da fila"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        return stats
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                lote = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+
+            # Só espera por mais linhas quando há concorrência (último lote com
+            # mais de uma); um cliente sozinho não paga max_delay por escrita
+            espera = self.max_delay if self._ultimo_lote > 1 else 0
+            prazo = time.monotonic() + espera
+            while len(lote) < self.max_batch:
+                try:
+                    lote.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._queue.get(timeout=restante))
+                except queue.Empty:
+                    break
+
+            self._ultimo_lote = len(lote)
+            self._commit(lote)
+
+    def _commit(self, lote: List[WriteRequest]):
+        def executar(cursor):
+            resultados = []
+            for sql, params, _ in lote:
+                cursor.execute('SAVEPOINT group_commit_row')
+                try:
+                    cursor.execute(sql, params)
+                    resultados.append((True, cursor.lastrowid))
+                except Exception as e:
+                    cursor.execute('ROLLBACK TO group_commit_row')
+                    resultados.append((False, e))
+                cursor.execute('RELEASE group_commit_row')
+            return resultados
+
+        try:
+            resultados = self.write_transaction(executar)
+        except Exception as e:
+            with self._lock:
+                self._stats['errors'] += len(lote)
+            for _, _, future in lote:
+                future.set_exception(e)
+            return
+
+        erros = 0
+        for (_, _, future), (ok, valor) in zip(lote, resultados):
+            if ok:
+                future.set_result(valor)
+            else:
+                erros += 1
+                future.set_exception(valor)
+        with self._lock:
+            self._stats['rows'] += len(lote) - erros
+            self._stats['errors'] += erros
+            self._stats['commits'] += 1
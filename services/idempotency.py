@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Chaves de idempotência (header Idempotency-Key) das rotas que criam cobranças
+
+A primeira requisição com uma chave reserva a chave na tabela
+idempotency_keys (status_http NULL, com prazo de IDEMPOTENCY_LOCK_TIMEOUT
+segundos), executa a rota e grava a resposta; as seguintes com a mesma
+chave, escopo (seller ou IP) e rota recebem a resposta gravada sem criar
+outra transação. Respostas 5xx e exceções liberam a chave, para que o
+cliente possa repetir.
+
+Requisições simultâneas com a mesma chave:
+
+- no mesmo processo, esperam num lock por chave e recebem a resposta da
+  original (do cache em memória);
+- em outro processo, encontram a reserva no banco e aguardam até
+  IDEMPOTENCY_WAIT segundos que ela seja concluída; depois disso, 409.
+
+A mesma chave com outro corpo é recusada (ChaveReutilizada). As respostas
+ficam válidas por IDEMPOTENCY_TTL segundos; as vencidas são apagadas pela
+thread do IdempotencyStore a cada IDEMPOTENCY_PURGE_INTERVAL segundos.
+"""
+
+import atexit
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Callable, Dict, Optional, Tuple
+
+IDEMPOTENCY_TTL = float(os.environ.get('IDEMPOTENCY_TTL', 86400))  # segundos
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 60))  # segundos
+IDEMPOTENCY_WAIT = float(os.environ.get('IDEMPOTENCY_WAIT', 10))  # segundos
+IDEMPOTENCY_CACHE_MAX_ENTRIES = int(os.environ.get('IDEMPOTENCY_CACHE_MAX_ENTRIES', 10000))
+IDEMPOTENCY_PURGE_INTERVAL = float(os.environ.get('IDEMPOTENCY_PURGE_INTERVAL', 300))  # segundos
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+INTERVALO_CONSULTA = 0.05  # segundos entre consultas à reserva de outro processo
+
+SQLITE_IDEMPOTENCY = [
+    '''
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            escopo TEXT NOT NULL, -- 'user:<id>' ou 'ip:<endereço>'
+            rota TEXT NOT NULL,
+            chave TEXT NOT NULL,
+            fingerprint TEXT NOT NULL, -- SHA-256 do corpo da requisição
+            status_http INTEGER, -- NULL enquanto a requisição original está em andamento
+            resposta TEXT,
+            expires_at REAL NOT NULL, -- unix time
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (escopo, rota, chave)
+        ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires ON idempotency_keys (expires_at)',
+]
+
+BUSCAR_SQL = '''
+    SELECT fingerprint, status_http, resposta, expires_at
+    FROM idempotency_keys
+    WHERE escopo = ? AND rota = ? AND chave = ?
+'''
+RESERVAR_SQL = '''
+    INSERT OR REPLACE INTO idempotency_keys (escopo, rota, chave, fingerprint, status_http, resposta, expires_at)
+    VALUES (?, ?, ?, ?, NULL, NULL, ?)
+'''
+CONCLUIR_SQL = '''
+    UPDATE idempotency_keys SET status_http = ?, resposta = ?, expires_at = ?
+    WHERE escopo = ? AND rota = ? AND chave = ?
+'''
+LIBERAR_SQL = 'DELETE FROM idempotency_keys WHERE escopo = ? AND rota = ? AND chave = ? AND status_http IS NULL'
+PURGAR_SQL = 'DELETE FROM idempotency_keys WHERE expires_at < ?'
+
+Resposta = namedtuple('Resposta', 'status_http corpo replay')
+
+class ChaveReutilizada(Exception):
+    """A chave já foi usada com outro corpo de requisição"""
+
+class EmAndamento(Exception):
+    """A requisição original (em outro processo) ainda não terminou"""
+
+def fingerprint(corpo: bytes) -> str:
+    return hashlib.sha256(corpo or b'').hexdigest()
+
+class IdempotencyStore:
+    """Respostas por (escopo, rota, chave): cache em memória sobre a tabela idempotency_keys"""
+
+    def __init__(self, write_transaction: Callable, ttl: float = IDEMPOTENCY_TTL,
+                 lock_timeout: float = IDEMPOTENCY_LOCK_TIMEOUT, espera: float = IDEMPOTENCY_WAIT,
+                 max_entries: int = IDEMPOTENCY_CACHE_MAX_ENTRIES,
+                 purge_interval: float = IDEMPOTENCY_PURGE_INTERVAL):
+        self.write_transaction = write_transaction
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.espera = espera
+        self.max_entries = max_entries
+        self.purge_interval = purge_interval
+        self._cache: OrderedDict = OrderedDict()  # (escopo, rota, chave) -> (expira_em, fingerprint, status, corpo)
+        self._em_andamento: Dict[Tuple, list] = {}  # chave -> [lock, requisições usando o lock]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'executed': 0, 'cache_replays': 0, 'db_replays': 0, 'waited': 0,
+                       'conflicts': 0, 'mismatches': 0, 'released': 0, 'purged': 0, 'evictions': 0}
+
+    def executar(self, escopo: str, rota: str, chave: str, impressao: str,
+                 func: Callable[[], Tuple[int, str]]) -> Resposta:
+        """Executa func() uma única vez por chave; as repetições recebem a resposta gravada
+
+        func retorna (status_http, corpo). Levanta ChaveReutilizada se a chave
+        veio com outro corpo e EmAndamento se outro processo não concluiu a
+        original a tempo.
+        """
+        id_chave = (escopo, rota, chave)
+        resposta = self._do_cache(id_chave, impressao)
+        if resposta is not None:
+            return resposta
+
+        lock = self._adquirir(id_chave)
+        try:
+            with lock:
+                # Quem segurava o lock pode ter acabado de concluir
+                resposta = self._do_cache(id_chave, impressao)
+                if resposta is not None:
+                    return resposta
+                return self._executar(id_chave, impressao, func)
+        finally:
+            self._soltar(id_chave)
+
+    def _executar(self, id_chave: Tuple, impressao: str, func: Callable) -> Resposta:
+        prazo = time.time() + self.espera
+        while True:
+            gravada = self.write_transaction(lambda cursor: self._reservar(cursor, id_chave, impressao))
+            if gravada is None:
+                break
+            if gravada[0] != impressao:
+                self._count('mismatches')
+                raise ChaveReutilizada('Idempotency-Key já usada com outro corpo')
+            if gravada[1] is not None:
+                self._guardar(id_chave, gravada[3], impressao, gravada[1], gravada[2])
+                self._count('db_replays')
+                return Resposta(gravada[1], gravada[2], True)
+            # Reservada por outro processo: espera a conclusão
+            if time.time() >= prazo:
+                self._count('conflicts')
+                raise EmAndamento('Requisição com a mesma Idempotency-Key em andamento')
+            time.sleep(INTERVALO_CONSULTA)
+
+        try:
+            status_http, corpo = func()
+        except Exception:
+            self._liberar(id_chave)
+            raise
+        if status_http >= 500:
+            self._liberar(id_chave)
+            return Resposta(status_http, corpo, False)
+
+        expira_em = time.time() + self.ttl
+        self.write_transaction(lambda cursor: cursor.execute(
+            CONCLUIR_SQL, (status_http, corpo, expira_em) + id_chave))
+        self._guardar(id_chave, expira_em, impressao, status_http, corpo)
+        self._count('executed')
+        return Resposta(status_http, corpo, False)
+
+    def _reservar(self, cursor, id_chave: Tuple, impressao: str) -> Optional[tuple]:
+        """Reserva a chave; se já existe (e não venceu), retorna a linha gravada"""
+        agora = time.time()
+        gravada = cursor.execute(BUSCAR_SQL, id_chave).fetchone()
+        if gravada is not None and gravada[3] > agora:
+            return tuple(gravada)
+        cursor.execute(RESERVAR_SQL, id_chave + (impressao, agora + self.lock_timeout))
+        return None
+
+    def _liberar(self, id_chave: Tuple):
+        self.write_transaction(lambda cursor: cursor.execute(LIBERAR_SQL, id_chave))
+        self._count('released')
+
+    def _do_cache(self, id_chave: Tuple, impressao: str) -> Optional[Resposta]:
+        with self._lock:
+            entrada = self._cache.get(id_chave)
+            if entrada is None:
+                return None
+            if entrada[0] <= time.time():
+                del self._cache[id_chave]
+                return None
+            self._cache.move_to_end(id_chave)
+            if entrada[1] != impressao:
+                self._stats['mismatches'] += 1
+                raise ChaveReutilizada('Idempotency-Key já usada com outro corpo')
+            self._stats['cache_replays'] += 1
+            return Resposta(entrada[2], entrada[3], True)
+
+    def _guardar(self, id_chave: Tuple, expira_em: float, impressao: str, status_http: int, corpo: str):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._cache[id_chave] = (expira_em, impressao, status_http, corpo)
+            self._cache.move_to_end(id_chave)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _adquirir(self, id_chave: Tuple) -> threading.Lock:
+        with self._lock:
+            entrada = self._em_andamento.get(id_chave)
+            if entrada is None:
+                entrada = self._em_andamento[id_chave] = [threading.Lock()]
+            else:
+                self._stats['waited'] += 1
+            entrada.append(None)
+            return entrada[0]
+
+    def _soltar(self, id_chave: Tuple):
+        with self._lock:
+            entrada = self._em_andamento[id_chave]
+            entrada.pop()
+            if len(entrada) == 1:
+                del self._em_andamento[id_chave]
+
+    def _count(self, chave: str):
+        with self._lock:
+            self._stats[chave] += 1
+
+    def purgar(self) -> int:
+        """Apaga as chaves vencidas (respostas e reservas abandonadas)"""
+        apagadas = self.write_transaction(lambda cursor: cursor.execute(PURGAR_SQL, (time.time(),)).rowcount)
+        with self._lock:
+            self._stats['purged'] += apagadas
+        return apagadas
+
+    def start(self) -> 'IdempotencyStore':
+        """Inicia a thread de limpeza das chaves vencidas"""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='idempotency-purge', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.purge_interval):
+            try:
+                self.purgar()
+            except Exception as e:
+                print(f"⚠️ Erro ao apagar chaves de idempotência vencidas: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['cached'] = len(self._cache)
+            stats['in_flight'] = len(self._em_andamento)
+        return stats
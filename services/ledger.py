@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Razão contábil (ledger) de partidas dobradas e saldo corrente por seller
+
+Cada evento gera lançamentos em ledger_lancamentos cuja soma é zero
+(valores em centavos, crédito positivo, débito negativo):
+
+    liquidacao     transação aprovada: recebiveis -valor, seller +líquido, receita_taxas +taxa
+    estorno        transação deixa de estar aprovada: inverso da liquidação
+    saque          saque processado: seller -valor, saques_pagos +líquido, receita_taxas +taxa
+    estorno_saque  saque deixa de estar processado: inverso do saque
+
+Os lançamentos e a tabela saldos são mantidos por triggers (migração 0004),
+na mesma transação da escrita em transacoes/saques. Ler o saldo é uma busca
+pela chave primária de saldos.
+
+Uso:
+    python -m services.ledger verify [banco.db] [tamanho_lote]
+    python -m services.ledger rebuild-saldos [banco.db]
+"""
+
+import sqlite3
+import sys
+from typing import Any, Dict, List
+
+DEFAULT_DATABASE = 'gateway_pagamentos.db'
+VERIFY_BATCH_SIZE = 10000
+
+# Carga inicial do ledger a partir do histórico (usada pela migração 0004)
+BACKFILL_SQL = [
+    '''
+        INSERT INTO ledger_lancamentos (evento, origem, origem_id, conta, user_id, valor_centavos)
+        SELECT 'liquidacao', 'transacao', t.id, c.conta,
+               CASE WHEN c.conta = 'seller' THEN IFNULL(t.user_id, 0) END,
+               CASE c.conta
+                   WHEN 'recebiveis' THEN -CAST(ROUND(t.valor * 100) AS INTEGER)
+                   WHEN 'seller' THEN CAST(ROUND(t.valor_liquido * 100) AS INTEGER)
+                   ELSE CAST(ROUND(t.valor * 100) AS INTEGER) - CAST(ROUND(t.valor_liquido * 100) AS INTEGER)
+               END
+        FROM transacoes t
+        CROSS JOIN (SELECT 'recebiveis' as conta UNION ALL SELECT 'seller' UNION ALL SELECT 'receita_taxas') c
+        WHERE t.status = 'aprovado'
+        ORDER BY t.id
+    ''',
+    '''
+        INSERT INTO ledger_lancamentos (evento, origem, origem_id, conta, user_id, valor_centavos)
+        SELECT 'saque', 'saque', s.id, c.conta,
+               CASE WHEN c.conta = 'seller' THEN IFNULL(s.user_id, 0) END,
+               CASE c.conta
+                   WHEN 'seller' THEN -CAST(ROUND(s.valor * 100) AS INTEGER)
+                   WHEN 'saques_pagos' THEN CAST(ROUND(s.valor_liquido * 100) AS INTEGER)
+                   ELSE CAST(ROUND(s.valor * 100) AS INTEGER) - CAST(ROUND(s.valor_liquido * 100) AS INTEGER)
+               END
+        FROM saques s
+        CROSS JOIN (SELECT 'seller' as conta UNION ALL SELECT 'saques_pagos' UNION ALL SELECT 'receita_taxas') c
+        WHERE s.status = 'processado'
+        ORDER BY s.id
+    ''',
+]
+
+REBUILD_SALDOS_SQL = [
+    'DELETE FROM saldos',
+    '''
+        INSERT INTO saldos (user_id, saldo_centavos, ultimo_lancamento_id, updated_at)
+        SELECT user_id, SUM(valor_centavos), MAX(id), CURRENT_TIMESTAMP
+        FROM ledger_lancamentos
+        WHERE conta = 'seller'
+        GROUP BY user_id
+    ''',
+]
+
+SALDO_SQL = 'SELECT saldo_centavos FROM saldos WHERE user_id = ?'
+
+def saldo(conn: sqlite3.Connection, user_id: int) -> float:
+    """Saldo disponível do seller em reais (O(1): busca pela chave de saldos)"""
+    row = conn.execute(SALDO_SQL, (user_id,)).fetchone()
+    return (row[0] if row else 0) / 100
+
+def rebuild_saldos(conn: sqlite3.Connection) -> int:
+    """Recalcula a tabela saldos a partir do ledger; retorna o número de sellers"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for comando in REBUILD_SALDOS_SQL:
+            conn.execute(comando)
+        total = conn.execute('SELECT COUNT(*) FROM saldos').fetchone()[0]
+        conn.commit()
+        return total
+    except Exception:
+        conn.rollback()
+        raise
+
+def verify(conn: sqlite3.Connection, batch_size: int = VERIFY_BATCH_SIZE) -> Dict[str, Any]:
+    """Reexecuta o ledger em lotes e compara com saldos e com as transações
+
+    Retorna um dict com os eventos desbalanceados, as divergências de saldo
+    e as transações aprovadas sem liquidação no ledger.
+    """
+    saldos_replay: Dict[int, int] = {}
+    eventos: Dict[tuple, int] = {}
+    ultimo_id = 0
+    lancamentos = 0
+
+    while True:
+        lote = conn.execute('''
+            SELECT id, evento, origem, origem_id, conta, user_id, valor_centavos
+            FROM ledger_lancamentos
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        ''', (ultimo_id, batch_size)).fetchall()
+        if not lote:
+            break
+
+        for lancamento_id, evento, origem, origem_id, conta, user_id, valor in lote:
+            if conta == 'seller':
+                saldos_replay[user_id] = saldos_replay.get(user_id, 0) + valor
+            chave = (evento, origem, origem_id)
+            eventos[chave] = eventos.get(chave, 0) + valor
+        ultimo_id = lote[-1][0]
+        lancamentos += len(lote)
+
+    desbalanceados = [
+        {'evento': k[0], 'origem': k[1], 'origem_id': k[2], 'soma_centavos': v}
+        for k, v in eventos.items() if v != 0
+    ]
+
+    saldos_tabela = dict(conn.execute('SELECT user_id, saldo_centavos FROM saldos').fetchall())
+    divergencias = [
+        {'user_id': user_id, 'ledger': saldos_replay.get(user_id, 0), 'saldos': saldos_tabela.get(user_id, 0)}
+        for user_id in sorted(set(saldos_replay) | set(saldos_tabela))
+        if saldos_replay.get(user_id, 0) != saldos_tabela.get(user_id, 0)
+    ]
+
+    # Transações aprovadas cujo saldo líquido no ledger não bate com a liquidação
+    sem_liquidacao = [row[0] for row in conn.execute('''
+        SELECT t.id
+        FROM transacoes t
+        LEFT JOIN (
+            SELECT origem_id, SUM(valor_centavos) as liquido
+            FROM ledger_lancamentos
+            WHERE origem = 'transacao' AND conta = 'seller'
+            GROUP BY origem_id
+        ) l ON l.origem_id = t.id
+        WHERE t.status = 'aprovado'
+          AND IFNULL(l.liquido, 0) != CAST(ROUND(t.valor_liquido * 100) AS INTEGER)
+    ''')]
+
+    return {
+        'lancamentos': lancamentos,
+        'desbalanceados': desbalanceados,
+        'divergencias_saldo': divergencias,
+        'transacoes_sem_liquidacao': sem_liquidacao,
+    }
+
+def main(argv: List[str]) -> int:
+    comando = argv[0] if argv else 'verify'
+    database = argv[1] if len(argv) > 1 else DEFAULT_DATABASE
+
+    conn = sqlite3.connect(database)
+    try:
+        if comando == 'verify':
+            batch_size = int(argv[2]) if len(argv) > 2 else VERIFY_BATCH_SIZE
+            resultado = verify(conn, batch_size)
+            for e in resultado['desbalanceados']:
+                print(f"❌ Evento desbalanceado: {e['evento']} {e['origem']} #{e['origem_id']} ({e['soma_centavos']} centavos)")
+            for d in resultado['divergencias_saldo']:
+                print(f"❌ Seller {d['user_id']}: ledger {d['ledger']} x saldos {d['saldos']} centavos")
+            for transacao_id in resultado['transacoes_sem_liquidacao']:
+                print(f"❌ Transação aprovada #{transacao_id} sem liquidação correspondente no ledger")
+            if resultado['desbalanceados'] or resultado['divergencias_saldo'] or resultado['transacoes_sem_liquidacao']:
+                return 1
+            print(f"✅ Ledger consistente ({resultado['lancamentos']} lançamentos)")
+        elif comando == 'rebuild-saldos':
+            total = rebuild_saldos(conn)
+            print(f"✅ Saldos recalculados para {total} sellers")
+        else:
+            print(__doc__)
+            return 2
+    finally:
+        conn.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,1211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Migrações versionadas do schema
+
+Fonte única do schema para o SQLite (gateway_completo.py) e para o
+Postgres/Supabase (app.py). Cada migração tem versão, nome e os comandos
+de cada backend; a tabela schema_migrations registra o que já foi aplicado.
+
+Uso:
+    python -m services.migrations status [banco.db]
+    python -m services.migrations migrate [banco.db]
+    python -m services.migrations postgres > setup_database.sql
+    python -m services.migrations check-plans [banco.db]
+"""
+
+import re
+import sqlite3
+import sys
+import textwrap
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.api_keys import SQLITE_API_KEYS, backfill as api_keys_backfill
+from services.busca import REBUILD_SQL as BUSCA_REBUILD_SQL, SQLITE_BUSCA
+from services.fees import SQLITE_TAXAS_VERSAO
+from services.idempotency import SQLITE_IDEMPOTENCY
+from services.ledger import BACKFILL_SQL as LEDGER_BACKFILL_SQL, REBUILD_SALDOS_SQL
+from services.rollups import REBUILD_SQL
+from services.routing import SQLITE_ROUTING
+from services.webhooks import SQLITE_WEBHOOKS
+
+DEFAULT_DATABASE = 'gateway_pagamentos.db'
+
+# ==================================================
+# 0001 - Schema inicial
+# ==================================================
+
+SQLITE_SCHEMA_INICIAL = [
+    # Tabela de usuários (Admin e Seller)
+    '''
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            tipo TEXT NOT NULL DEFAULT 'seller', -- 'admin' ou 'seller'
+            status TEXT NOT NULL DEFAULT 'pendente', -- 'pendente', 'ativo', 'suspenso'
+            api_key TEXT UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            is_active BOOLEAN DEFAULT 1
+        )
+    ''',
+    # Tabela de KYC (Know Your Customer) - Expandida
+    '''
+        CREATE TABLE IF NOT EXISTS kyc (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            tipo_pessoa TEXT NOT NULL, -- 'PF' ou 'PJ'
+            cpf_cnpj TEXT,
+            nome_razao_social TEXT,
+            porte_juridico TEXT, -- MEI, LTDA, etc
+            data_nascimento TEXT,
+            telefone TEXT,
+            endereco TEXT,
+            cidade TEXT,
+            estado TEXT,
+            cep TEXT,
+            
+            -- Dados do Responsável (PJ)
+            nome_responsavel TEXT,
+            cpf_responsavel TEXT,
+            nome_mae TEXT,
+            data_nascimento_responsavel TEXT,
+            
+            -- Dados de Atividade
+            setor_atividade TEXT,
+            faturamento_mensal TEXT,
+            
+            -- Documentos
+            documento_responsavel TEXT, -- caminho do arquivo
+            contrato_social TEXT, -- caminho do arquivo (PJ)
+            documento_frente TEXT, -- caminho do arquivo
+            documento_verso TEXT,
+            comprovante_residencia TEXT,
+            
+            -- Status e Controle
+            status TEXT DEFAULT 'pendente', -- 'pendente', 'aprovado', 'rejeitado', 'rascunho'
+            observacoes TEXT,
+            aprovado_por INTEGER,
+            aprovado_em TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES usuarios (id),
+            FOREIGN KEY (aprovado_por) REFERENCES usuarios (id)
+        )
+    ''',
+    # Tabela de configurações de taxas
+    '''
+        CREATE TABLE IF NOT EXISTS taxas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            tipo_pagamento TEXT NOT NULL, -- 'credito', 'debito', 'pix', 'boleto'
+            taxa_percentual REAL DEFAULT 2.99,
+            taxa_fixa REAL DEFAULT 0.00,
+            ativo BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES usuarios (id)
+        )
+    ''',
+    # Tabela de transações
+    '''
+        CREATE TABLE IF NOT EXISTS transacoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            payment_id TEXT UNIQUE,
+            transaction_id TEXT UNIQUE NOT NULL,
+            user_id INTEGER,
+            product_id TEXT,
+            amount REAL NOT NULL,
+            currency TEXT DEFAULT 'BRL',
+            payment_method TEXT NOT NULL, -- 'credito', 'debito', 'pix', 'boleto'
+            status TEXT NOT NULL, -- 'pendente', 'aprovado', 'rejeitado', 'cancelado'
+            customer_name TEXT,
+            customer_email TEXT,
+            merchant_reference_id TEXT,
+            valor REAL NOT NULL,
+            taxa_cobrada REAL NOT NULL,
+            valor_liquido REAL NOT NULL,
+            dados_pagamento TEXT, -- JSON com dados do pagamento
+            adquirente TEXT, -- 'stripe', 'paypal', 'mercadopago', etc
+            dados_retorno TEXT, -- JSON com retorno da adquirente
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES usuarios (id)
+        )
+    ''',
+    # Tabela de saques
+    '''
+        CREATE TABLE IF NOT EXISTS saques (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            valor REAL NOT NULL,
+            taxa_saque REAL NOT NULL,
+            valor_liquido REAL NOT NULL,
+            tipo TEXT NOT NULL, -- 'manual', 'automatico'
+            status TEXT NOT NULL, -- 'pendente', 'processado', 'rejeitado'
+            dados_pix TEXT, -- JSON com dados PIX
+            observacoes TEXT,
+            processado_por INTEGER,
+            processado_em TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES usuarios (id),
+            FOREIGN KEY (processado_por) REFERENCES usuarios (id)
+        )
+    ''',
+    # Tabela de metas de venda
+    '''
+        CREATE TABLE IF NOT EXISTS metas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            meta_valor REAL NOT NULL, -- 100k, 250k, 500k, 1M, 5M
+            valor_atual REAL DEFAULT 0.0,
+            data_inicio DATE,
+            data_fim DATE,
+            status TEXT DEFAULT 'ativa', -- 'ativa', 'concluida', 'cancelada'
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES usuarios (id)
+        )
+    ''',
+    # Tabela de produtos
+    '''
+        CREATE TABLE IF NOT EXISTS produtos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id TEXT UNIQUE NOT NULL,
+            user_id INTEGER,
+            name TEXT NOT NULL,
+            price REAL NOT NULL,
+            header TEXT NOT NULL,
+            thank_page_type TEXT DEFAULT 'default', -- 'default' ou 'custom'
+            thank_page_url TEXT,
+            support_email TEXT,
+            warranty_time INTEGER,
+            warranty_unit TEXT,
+            product_image TEXT, -- caminho da imagem
+            product_banner TEXT,
+            final_banner TEXT,
+            show_marketplace BOOLEAN DEFAULT 1,
+            status TEXT DEFAULT 'ativo', -- 'ativo', 'inativo', 'deletado'
+            views INTEGER DEFAULT 0,
+            sales INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES usuarios (id)
+        )
+    ''',
+    # Tabela de logs
+    '''
+        CREATE TABLE IF NOT EXISTS logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            acao TEXT NOT NULL,
+            detalhes TEXT,
+            ip_address TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES usuarios (id)
+        )
+    ''',
+]
+
+POSTGRES_SCHEMA_INICIAL = [
+    # Tabela de usuários
+    '''
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            username VARCHAR(255) NOT NULL,
+            email VARCHAR(255) UNIQUE NOT NULL,
+            nome_completo VARCHAR(255),
+            telefone VARCHAR(20),
+            tipo_conta VARCHAR(10),
+            cpf VARCHAR(14),
+            razao_social VARCHAR(255),
+            cnpj VARCHAR(18),
+            porte_juridico VARCHAR(50),
+            tipo VARCHAR(50) DEFAULT 'seller',
+            status VARCHAR(50) DEFAULT 'pendente_aprovacao',
+            api_key VARCHAR(255),
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        )
+    ''',
+    # Tabela de KYC
+    '''
+        CREATE TABLE IF NOT EXISTS kyc (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID REFERENCES usuarios(id) ON DELETE CASCADE,
+            documento_tipo VARCHAR(50),
+            documento_numero VARCHAR(255),
+            endereco TEXT,
+            cidade VARCHAR(100),
+            estado VARCHAR(2),
+            cep VARCHAR(10),
+            status VARCHAR(50) DEFAULT 'pendente',
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        )
+    ''',
+    # Tabela de produtos
+    '''
+        CREATE TABLE IF NOT EXISTS produtos (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID REFERENCES usuarios(id) ON DELETE CASCADE,
+            nome VARCHAR(255) NOT NULL,
+            descricao TEXT,
+            preco DECIMAL(10,2),
+            imagem_url VARCHAR(500),
+            categoria VARCHAR(100),
+            status VARCHAR(50) DEFAULT 'ativo',
+            show_marketplace BOOLEAN DEFAULT false,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        )
+    ''',
+    # Tabela de transações
+    '''
+        CREATE TABLE IF NOT EXISTS transacoes (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID REFERENCES usuarios(id) ON DELETE CASCADE,
+            payment_id VARCHAR(255) UNIQUE,
+            amount DECIMAL(10,2),
+            description TEXT,
+            status VARCHAR(50),
+            payment_method VARCHAR(50),
+            gateway_response TEXT,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        )
+    ''',
+    # Tabela de logs
+    '''
+        CREATE TABLE IF NOT EXISTS logs (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID REFERENCES usuarios(id) ON DELETE CASCADE,
+            action VARCHAR(100),
+            target_user_id UUID,
+            description TEXT,
+            ip_address VARCHAR(45),
+            user_agent TEXT,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        )
+    ''',
+    # Tabela de taxas
+    '''
+        CREATE TABLE IF NOT EXISTS taxas (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            nome VARCHAR(100) NOT NULL,
+            tipo VARCHAR(50) NOT NULL,
+            valor DECIMAL(5,2) NOT NULL,
+            ativo BOOLEAN DEFAULT true,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        )
+    ''',
+    # Tabela de saques
+    '''
+        CREATE TABLE IF NOT EXISTS saques (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID REFERENCES usuarios(id) ON DELETE CASCADE,
+            valor DECIMAL(10,2) NOT NULL,
+            conta_bancaria TEXT,
+            status VARCHAR(50) DEFAULT 'pendente',
+            data_solicitacao TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            data_processamento TIMESTAMP WITH TIME ZONE,
+            observacoes TEXT
+        )
+    ''',
+    # Tabela de metas
+    '''
+        CREATE TABLE IF NOT EXISTS metas (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID REFERENCES usuarios(id) ON DELETE CASCADE,
+            titulo VARCHAR(255) NOT NULL,
+            descricao TEXT,
+            valor_meta DECIMAL(10,2) NOT NULL,
+            valor_atual DECIMAL(10,2) DEFAULT 0,
+            data_inicio DATE NOT NULL,
+            data_fim DATE NOT NULL,
+            status VARCHAR(50) DEFAULT 'ativa',
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        )
+    ''',
+    # Habilitar RLS (Row Level Security)
+    '''
+        ALTER TABLE usuarios ENABLE ROW LEVEL SECURITY
+    ''',
+    '''
+        ALTER TABLE kyc ENABLE ROW LEVEL SECURITY
+    ''',
+    '''
+        ALTER TABLE produtos ENABLE ROW LEVEL SECURITY
+    ''',
+    '''
+        ALTER TABLE transacoes ENABLE ROW LEVEL SECURITY
+    ''',
+    '''
+        ALTER TABLE logs ENABLE ROW LEVEL SECURITY
+    ''',
+    '''
+        ALTER TABLE taxas ENABLE ROW LEVEL SECURITY
+    ''',
+    '''
+        ALTER TABLE saques ENABLE ROW LEVEL SECURITY
+    ''',
+    '''
+        ALTER TABLE metas ENABLE ROW LEVEL SECURITY
+    ''',
+    # Política para usuários verem apenas seus próprios dados
+    '''
+        CREATE POLICY "Usuários podem ver seus próprios dados" ON usuarios
+            FOR SELECT USING (auth.uid() = id)
+    ''',
+    # Política para admins verem todos os usuários
+    '''
+        CREATE POLICY "Admins podem ver todos os usuários" ON usuarios
+            FOR ALL USING (
+                EXISTS (
+                    SELECT 1 FROM usuarios 
+                    WHERE id = auth.uid() AND tipo = 'admin'
+                )
+            )
+    ''',
+    # Política para KYC
+    '''
+        CREATE POLICY "Usuários podem ver seu próprio KYC" ON kyc
+            FOR ALL USING (auth.uid() = user_id)
+    ''',
+    # Política para produtos
+    '''
+        CREATE POLICY "Usuários podem gerenciar seus produtos" ON produtos
+            FOR ALL USING (auth.uid() = user_id)
+    ''',
+    # Política para transações
+    '''
+        CREATE POLICY "Usuários podem ver suas transações" ON transacoes
+            FOR ALL USING (auth.uid() = user_id)
+    ''',
+    # Política para logs (apenas admins)
+    '''
+        CREATE POLICY "Admins podem ver logs" ON logs
+            FOR ALL USING (
+                EXISTS (
+                    SELECT 1 FROM usuarios 
+                    WHERE id = auth.uid() AND tipo = 'admin'
+                )
+            )
+    ''',
+    # Política para taxas (leitura pública)
+    '''
+        CREATE POLICY "Taxas são públicas" ON taxas
+            FOR SELECT USING (true)
+    ''',
+    # Política para saques
+    '''
+        CREATE POLICY "Usuários podem ver seus saques" ON saques
+            FOR ALL USING (auth.uid() = user_id)
+    ''',
+    # Política para metas
+    '''
+        CREATE POLICY "Usuários podem gerenciar suas metas" ON metas
+            FOR ALL USING (auth.uid() = user_id)
+    ''',
+    # Inserir taxas padrão
+    '''
+        INSERT INTO taxas (nome, tipo, valor) VALUES
+        ('Taxa PIX', 'pix', 1.99),
+        ('Taxa Cartão', 'cartao', 2.99),
+        ('Taxa Boleto', 'boleto', 3.99)
+        ON CONFLICT DO NOTHING
+    ''',
+    # Criar usuário administrador
+    '''
+        INSERT INTO usuarios (id, username, email, nome_completo, tipo, status, api_key) VALUES
+        (gen_random_uuid(), 'admin', 'admin@whitelabel.com', 'Administrador', 'admin', 'ativo', 'admin_key_123')
+        ON CONFLICT DO NOTHING
+    ''',
+    # Storage (opcional)
+    # Política para upload de arquivos
+    '''
+        CREATE POLICY "Usuários podem fazer upload" ON storage.objects
+            FOR INSERT WITH CHECK (auth.role() = 'authenticated')
+    ''',
+    # Política para visualizar arquivos
+    '''
+        CREATE POLICY "Arquivos são públicos" ON storage.objects
+            FOR SELECT USING (true)
+    ''',
+]
+
+# ==================================================
+# 0002 - Índices das consultas quentes
+# ==================================================
+
+SQLITE_INDICES_CONSULTAS = [
+    # Dashboard do seller: vendas do dia/mês e saldo (cobre valor e valor_liquido)
+    '''
+        CREATE INDEX IF NOT EXISTS idx_transacoes_user_status_created
+        ON transacoes (user_id, status, created_at, valor, valor_liquido)
+    ''',
+    # Dashboard do seller: últimas transações
+    '''
+        CREATE INDEX IF NOT EXISTS idx_transacoes_user_created
+        ON transacoes (user_id, created_at)
+    ''',
+    # Dashboard do seller: metas ativas
+    '''
+        CREATE INDEX IF NOT EXISTS idx_metas_user_status
+        ON metas (user_id, status, meta_valor)
+    ''',
+    # Detalhes do usuário: últimos logs
+    '''
+        CREATE INDEX IF NOT EXISTS idx_logs_user_created
+        ON logs (user_id, created_at)
+    ''',
+    # Detalhes do usuário / status do KYC
+    '''
+        CREATE INDEX IF NOT EXISTS idx_kyc_user
+        ON kyc (user_id)
+    ''',
+    # KYC pendentes
+    '''
+        CREATE INDEX IF NOT EXISTS idx_kyc_status_created
+        ON kyc (status, created_at)
+    ''',
+    # Marketplace
+    '''
+        CREATE INDEX IF NOT EXISTS idx_produtos_marketplace
+        ON produtos (show_marketplace, status, created_at)
+    ''',
+]
+
+POSTGRES_INDICES_CONSULTAS = [
+    '''
+        CREATE INDEX IF NOT EXISTS idx_transacoes_user_status_created
+        ON transacoes (user_id, status, created_at) INCLUDE (amount)
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_transacoes_user_created
+        ON transacoes (user_id, created_at)
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_metas_user_status
+        ON metas (user_id, status)
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_logs_user_created
+        ON logs (user_id, created_at)
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_kyc_user
+        ON kyc (user_id)
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_kyc_status_created
+        ON kyc (status, created_at)
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_produtos_marketplace
+        ON produtos (show_marketplace, status, created_at)
+    ''',
+]
+
+# ==================================================
+# 0003 - Rollup diário de vendas (vendas_diarias)
+# ==================================================
+
+_VENDAS_DIARIAS_COLUNAS = '''
+    user_id, dia, payment_method, quantidade,
+    valor_bruto_centavos, taxa_centavos, valor_liquido_centavos
+'''
+
+_VENDAS_DIARIAS_SOMA = '''
+    ON CONFLICT (user_id, dia, payment_method) DO UPDATE SET
+        quantidade = quantidade + excluded.quantidade,
+        valor_bruto_centavos = valor_bruto_centavos + excluded.valor_bruto_centavos,
+        taxa_centavos = taxa_centavos + excluded.taxa_centavos,
+        valor_liquido_centavos = valor_liquido_centavos + excluded.valor_liquido_centavos
+'''
+
+def _vendas_diarias_valores(ref: str) -> str:
+    return f'''
+        IFNULL({ref}.user_id, 0), DATE({ref}.created_at), {ref}.payment_method, 1,
+        CAST(ROUND({ref}.valor * 100) AS INTEGER),
+        CAST(ROUND({ref}.taxa_cobrada * 100) AS INTEGER),
+        CAST(ROUND({ref}.valor_liquido * 100) AS INTEGER)
+    '''
+
+_VENDAS_DIARIAS_SUBTRAI_OLD = '''
+    UPDATE vendas_diarias SET
+        quantidade = quantidade - 1,
+        valor_bruto_centavos = valor_bruto_centavos - CAST(ROUND(OLD.valor * 100) AS INTEGER),
+        taxa_centavos = taxa_centavos - CAST(ROUND(OLD.taxa_cobrada * 100) AS INTEGER),
+        valor_liquido_centavos = valor_liquido_centavos - CAST(ROUND(OLD.valor_liquido * 100) AS INTEGER)
+    WHERE OLD.status = 'aprovado'
+      AND user_id = IFNULL(OLD.user_id, 0)
+      AND dia = DATE(OLD.created_at)
+      AND payment_method = OLD.payment_method;
+'''
+
+SQLITE_VENDAS_DIARIAS = [
+    # Totais por seller, dia e método (valores em centavos)
+    '''
+        CREATE TABLE IF NOT EXISTS vendas_diarias (
+            user_id INTEGER NOT NULL,
+            dia DATE NOT NULL,
+            payment_method TEXT NOT NULL,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            valor_bruto_centavos INTEGER NOT NULL DEFAULT 0,
+            taxa_centavos INTEGER NOT NULL DEFAULT 0,
+            valor_liquido_centavos INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, dia, payment_method)
+        ) WITHOUT ROWID
+    ''',
+    # Dashboard do admin: transações aprovadas do dia
+    '''
+        CREATE INDEX IF NOT EXISTS idx_vendas_diarias_dia
+        ON vendas_diarias (dia)
+    ''',
+    # Triggers: o rollup muda na mesma transação da escrita em transacoes
+    f'''
+        CREATE TRIGGER IF NOT EXISTS trg_vendas_diarias_insert
+        AFTER INSERT ON transacoes
+        WHEN NEW.status = 'aprovado'
+        BEGIN
+            INSERT INTO vendas_diarias ({_VENDAS_DIARIAS_COLUNAS})
+            VALUES ({_vendas_diarias_valores('NEW')})
+            {_VENDAS_DIARIAS_SOMA};
+        END
+    ''',
+    f'''
+        CREATE TRIGGER IF NOT EXISTS trg_vendas_diarias_update
+        AFTER UPDATE OF status, user_id, payment_method, valor, taxa_cobrada, valor_liquido, created_at
+        ON transacoes
+        WHEN OLD.status = 'aprovado' OR NEW.status = 'aprovado'
+        BEGIN
+            {_VENDAS_DIARIAS_SUBTRAI_OLD}
+            INSERT INTO vendas_diarias ({_VENDAS_DIARIAS_COLUNAS})
+            SELECT {_vendas_diarias_valores('NEW')}
+            WHERE NEW.status = 'aprovado'
+            {_VENDAS_DIARIAS_SOMA};
+        END
+    ''',
+    f'''
+        CREATE TRIGGER IF NOT EXISTS trg_vendas_diarias_delete
+        AFTER DELETE ON transacoes
+        WHEN OLD.status = 'aprovado'
+        BEGIN
+            {_VENDAS_DIARIAS_SUBTRAI_OLD}
+        END
+    ''',
+    # Carga inicial a partir do histórico
+    'DELETE FROM vendas_diarias',
+    REBUILD_SQL,
+]
+
+# No Postgres/Supabase transacoes só tem amount: bruto = líquido = amount, taxa = 0
+POSTGRES_VENDAS_DIARIAS = [
+    '''
+        CREATE TABLE IF NOT EXISTS vendas_diarias (
+            user_id UUID NOT NULL,
+            dia DATE NOT NULL,
+            payment_method VARCHAR(50) NOT NULL,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            valor_bruto_centavos BIGINT NOT NULL DEFAULT 0,
+            taxa_centavos BIGINT NOT NULL DEFAULT 0,
+            valor_liquido_centavos BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, dia, payment_method)
+        )
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_vendas_diarias_dia
+        ON vendas_diarias (dia)
+    ''',
+    '''
+        CREATE OR REPLACE FUNCTION vendas_diarias_aplicar() RETURNS TRIGGER AS $fn$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'aprovado' THEN
+                UPDATE vendas_diarias SET
+                    quantidade = quantidade - 1,
+                    valor_bruto_centavos = valor_bruto_centavos - ROUND(OLD.amount * 100),
+                    valor_liquido_centavos = valor_liquido_centavos - ROUND(OLD.amount * 100)
+                WHERE user_id = OLD.user_id
+                  AND dia = OLD.created_at::date
+                  AND payment_method = OLD.payment_method;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'aprovado' THEN
+                INSERT INTO vendas_diarias (user_id, dia, payment_method, quantidade,
+                                            valor_bruto_centavos, taxa_centavos, valor_liquido_centavos)
+                VALUES (NEW.user_id, NEW.created_at::date, NEW.payment_method, 1,
+                        ROUND(NEW.amount * 100), 0, ROUND(NEW.amount * 100))
+                ON CONFLICT (user_id, dia, payment_method) DO UPDATE SET
+                    quantidade = vendas_diarias.quantidade + 1,
+                    valor_bruto_centavos = vendas_diarias.valor_bruto_centavos + excluded.valor_bruto_centavos,
+                    valor_liquido_centavos = vendas_diarias.valor_liquido_centavos + excluded.valor_liquido_centavos;
+            END IF;
+            RETURN NULL;
+        END
+        $fn$ LANGUAGE plpgsql
+    ''',
+    '''
+        CREATE TRIGGER trg_vendas_diarias
+        AFTER INSERT OR DELETE OR UPDATE OF status, user_id, payment_method, amount, created_at
+        ON transacoes
+        FOR EACH ROW EXECUTE FUNCTION vendas_diarias_aplicar()
+    ''',
+    '''
+        INSERT INTO vendas_diarias (user_id, dia, payment_method, quantidade,
+                                    valor_bruto_centavos, taxa_centavos, valor_liquido_centavos)
+        SELECT user_id, created_at::date, payment_method, COUNT(*),
+               SUM(ROUND(amount * 100)), 0, SUM(ROUND(amount * 100))
+        FROM transacoes
+        WHERE status = 'aprovado' AND user_id IS NOT NULL AND payment_method IS NOT NULL
+        GROUP BY user_id, created_at::date, payment_method
+        ON CONFLICT DO NOTHING
+    ''',
+]
+
+# ==================================================
+# 0004 - Ledger de partidas dobradas e saldos
+# ==================================================
+
+def _ledger_evento(evento: str, origem: str, ref: str, contas: List[Tuple[str, str]]) -> str:
+    """Lançamentos de um evento + atualização do saldo do seller (valores em centavos)"""
+    valores = ',\n'.join(
+        f"('{evento}', '{origem}', {ref}.id, '{conta}', "
+        f"{'IFNULL(' + ref + '.user_id, 0)' if conta == 'seller' else 'NULL'}, {valor})"
+        for conta, valor in contas
+    )
+    valor_seller = dict(contas)['seller']
+    return f'''
+        INSERT INTO ledger_lancamentos (evento, origem, origem_id, conta, user_id, valor_centavos)
+        VALUES {valores};
+        INSERT INTO saldos (user_id, saldo_centavos, ultimo_lancamento_id, updated_at)
+        VALUES (IFNULL({ref}.user_id, 0), {valor_seller}, last_insert_rowid(), CURRENT_TIMESTAMP)
+        ON CONFLICT (user_id) DO UPDATE SET
+            saldo_centavos = saldo_centavos + excluded.saldo_centavos,
+            ultimo_lancamento_id = excluded.ultimo_lancamento_id,
+            updated_at = excluded.updated_at;
+    '''
+
+def _ledger_transacao(evento: str, ref: str, sinal: int) -> str:
+    bruto = f'CAST(ROUND({ref}.valor * 100) AS INTEGER)'
+    liquido = f'CAST(ROUND({ref}.valor_liquido * 100) AS INTEGER)'
+    return _ledger_evento(evento, 'transacao', ref, [
+        ('recebiveis', f'{-sinal} * {bruto}'),
+        ('seller', f'{sinal} * {liquido}'),
+        ('receita_taxas', f'{sinal} * ({bruto} - {liquido})'),
+    ])
+
+def _ledger_saque(evento: str, ref: str, sinal: int) -> str:
+    bruto = f'CAST(ROUND({ref}.valor * 100) AS INTEGER)'
+    liquido = f'CAST(ROUND({ref}.valor_liquido * 100) AS INTEGER)'
+    return _ledger_evento(evento, 'saque', ref, [
+        ('seller', f'{-sinal} * {bruto}'),
+        ('saques_pagos', f'{sinal} * {liquido}'),
+        ('receita_taxas', f'{sinal} * ({bruto} - {liquido})'),
+    ])
+
+# Alguma coluna que afeta o lançamento mudou
+_LEDGER_MUDOU = '''(
+    NEW.status IS NOT OLD.status OR NEW.user_id IS NOT OLD.user_id
+    OR NEW.valor IS NOT OLD.valor OR NEW.valor_liquido IS NOT OLD.valor_liquido
+)'''
+
+SQLITE_LEDGER = [
+    # Lançamentos: soma zero por evento; crédito positivo, débito negativo
+    '''
+        CREATE TABLE IF NOT EXISTS ledger_lancamentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            evento TEXT NOT NULL, -- 'liquidacao', 'estorno', 'saque', 'estorno_saque'
+            origem TEXT NOT NULL, -- 'transacao' ou 'saque'
+            origem_id INTEGER NOT NULL,
+            conta TEXT NOT NULL, -- 'seller', 'recebiveis', 'receita_taxas', 'saques_pagos'
+            user_id INTEGER, -- dono da conta 'seller'
+            valor_centavos INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_ledger_origem
+        ON ledger_lancamentos (origem, origem_id)
+    ''',
+    # Saldo corrente por seller
+    '''
+        CREATE TABLE IF NOT EXISTS saldos (
+            user_id INTEGER PRIMARY KEY,
+            saldo_centavos INTEGER NOT NULL DEFAULT 0,
+            ultimo_lancamento_id INTEGER,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    # Transações: liquidação ao aprovar, estorno ao sair de 'aprovado'
+    f'''
+        CREATE TRIGGER IF NOT EXISTS trg_ledger_transacao_insert
+        AFTER INSERT ON transacoes
+        WHEN NEW.status = 'aprovado'
+        BEGIN
+            {_ledger_transacao('liquidacao', 'NEW', 1)}
+        END
+    ''',
+    f'''
+        CREATE TRIGGER IF NOT EXISTS trg_ledger_transacao_estorno
+        AFTER UPDATE OF status, user_id, valor, valor_liquido ON transacoes
+        WHEN OLD.status = 'aprovado' AND {_LEDGER_MUDOU}
+        BEGIN
+            {_ledger_transacao('estorno', 'OLD', -1)}
+        END
+    ''',
+    f'''
+        CREATE TRIGGER IF NOT EXISTS trg_ledger_transacao_liquidacao
+        AFTER UPDATE OF status, user_id, valor, valor_liquido ON transacoes
+        WHEN NEW.status = 'aprovado' AND {_LEDGER_MUDOU}
+        BEGIN
+            {_ledger_transacao('liquidacao', 'NEW', 1)}
+        END
+    ''',
+    f'''
+        CREATE TRIGGER IF NOT EXISTS trg_ledger_transacao_delete
+        AFTER DELETE ON transacoes
+        WHEN OLD.status = 'aprovado'
+        BEGIN
+            {_ledger_transacao('estorno', 'OLD', -1)}
+        END
+    ''',
+    # Saques: débito do seller ao processar, estorno ao sair de 'processado'
+    f'''
+        CREATE TRIGGER IF NOT EXISTS trg_ledger_saque_insert
+        AFTER INSERT ON saques
+        WHEN NEW.status = 'processado'
+        BEGIN
+            {_ledger_saque('saque', 'NEW', 1)}
+        END
+    ''',
+    f'''
+        CREATE TRIGGER IF NOT EXISTS trg_ledger_saque_estorno
+        AFTER UPDATE OF status, user_id, valor, valor_liquido ON saques
+        WHEN OLD.status = 'processado' AND {_LEDGER_MUDOU}
+        BEGIN
+            {_ledger_saque('estorno_saque', 'OLD', -1)}
+        END
+    ''',
+    f'''
+        CREATE TRIGGER IF NOT EXISTS trg_ledger_saque_processado
+        AFTER UPDATE OF status, user_id, valor, valor_liquido ON saques
+        WHEN NEW.status = 'processado' AND {_LEDGER_MUDOU}
+        BEGIN
+            {_ledger_saque('saque', 'NEW', 1)}
+        END
+    ''',
+    # Carga inicial a partir do histórico
+    *LEDGER_BACKFILL_SQL,
+    *REBUILD_SALDOS_SQL,
+]
+
+# ==================================================
+# 0005 - Índices da paginação por cursor (created_at, id)
+# ==================================================
+
+# No SQLite o rowid (id) já é a última coluna de todo índice, então
+# (..., created_at) ordena por (created_at, id).
+SQLITE_INDICES_PAGINACAO = [
+    # Empresas (sellers), com e sem filtro de status
+    '''
+        CREATE INDEX IF NOT EXISTS idx_usuarios_tipo_created
+        ON usuarios (tipo, created_at)
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_usuarios_tipo_status_created
+        ON usuarios (tipo, status, created_at)
+    ''',
+    # Usuários arquivados e pendentes filtrados por um status
+    '''
+        CREATE INDEX IF NOT EXISTS idx_usuarios_status_created
+        ON usuarios (status, created_at)
+    ''',
+    # Usuários pendentes (dois status, em uma única ordem)
+    '''
+        CREATE INDEX IF NOT EXISTS idx_usuarios_pendentes_created
+        ON usuarios (created_at)
+        WHERE status IN ('pendente', 'pendente_aprovacao')
+    ''',
+    # KYC pendentes (dois status, em uma única ordem)
+    '''
+        CREATE INDEX IF NOT EXISTS idx_kyc_pendentes_created
+        ON kyc (created_at)
+        WHERE status IN ('pendente', 'rascunho')
+    ''',
+    # Produtos do seller
+    '''
+        CREATE INDEX IF NOT EXISTS idx_produtos_user_created
+        ON produtos (user_id, created_at)
+    ''',
+]
+
+POSTGRES_INDICES_PAGINACAO = [
+    '''
+        CREATE INDEX IF NOT EXISTS idx_usuarios_tipo_created
+        ON usuarios (tipo, created_at, id)
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_usuarios_tipo_status_created
+        ON usuarios (tipo, status, created_at, id)
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_usuarios_status_created
+        ON usuarios (status, created_at, id)
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_usuarios_pendentes_created
+        ON usuarios (created_at, id)
+        WHERE status IN ('pendente', 'pendente_aprovacao')
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_kyc_pendentes_created
+        ON kyc (created_at, id)
+        WHERE status IN ('pendente', 'rascunho')
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_produtos_user_created
+        ON produtos (user_id, created_at, id)
+    ''',
+]
+
+# ==================================================
+# 0006 - Busca textual (FTS5) em produtos e empresas
+# ==================================================
+
+# Tabelas, views e triggers ficam em services/busca.py; aqui só a carga inicial
+SQLITE_BUSCA_TEXTUAL = [
+    *SQLITE_BUSCA,
+    *BUSCA_REBUILD_SQL,
+]
+
+# ==================================================
+# 0007 - Versão dos tokens por usuário
+# ==================================================
+
+# O JWT carrega a versão; incrementá-la revoga todos os tokens já emitidos
+SQLITE_TOKEN_VERSION = [
+    'ALTER TABLE usuarios ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0',
+]
+
+POSTGRES_TOKEN_VERSION = [
+    'ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0',
+]
+
+# ==================================================
+# 0008 - API keys com hash (autenticação servidor-a-servidor)
+# ==================================================
+
+# Tabela em services/api_keys.py; a carga das chaves atuais calcula o SHA-256
+# em Python
+SQLITE_API_KEYS_MIGRATION = [
+    *SQLITE_API_KEYS,
+    api_keys_backfill,
+]
+
+# ==================================================
+# 0009 - Decisões de roteamento entre adquirentes
+# ==================================================
+
+# Tabela em services/routing.py (gravada em lote pelo RoutingLogWriter)
+SQLITE_ROTEAMENTO = SQLITE_ROUTING
+
+# ==================================================
+# 0010 - Versão das taxas (atualização incremental do FeeSchedule)
+# ==================================================
+
+# Coluna versao, triggers e taxas padrão por método em services/fees.py
+SQLITE_TAXAS = SQLITE_TAXAS_VERSAO
+
+# ==================================================
+# 0011 - Chaves de idempotência das rotas de pagamento
+# ==================================================
+
+# Tabela em services/idempotency.py (usada pelo IdempotencyStore)
+SQLITE_IDEMPOTENCY_KEYS = SQLITE_IDEMPOTENCY
+
+# ==================================================
+# 0012 - Fila durável dos webhooks das adquirentes
+# ==================================================
+
+# Tabela em services/webhooks.py (usada pelo WebhookQueue)
+SQLITE_WEBHOOK_EVENTOS = SQLITE_WEBHOOKS
+
+# Lista ordenada de migrações. Um comando SQLite também pode ser uma função
+# que recebe a conexão (para migrações de dados).
+MIGRATIONS: List[Dict[str, Any]] = [
+    {
+        'version': 1,
+        'name': 'schema_inicial',
+        'sqlite': SQLITE_SCHEMA_INICIAL,
+        'postgres': POSTGRES_SCHEMA_INICIAL,
+    },
+    {
+        'version': 2,
+        'name': 'indices_consultas_quentes',
+        'sqlite': SQLITE_INDICES_CONSULTAS,
+        'postgres': POSTGRES_INDICES_CONSULTAS,
+    },
+    {
+        'version': 3,
+        'name': 'vendas_diarias',
+        'sqlite': SQLITE_VENDAS_DIARIAS,
+        'postgres': POSTGRES_VENDAS_DIARIAS,
+    },
+    {
+        'version': 4,
+        'name': 'ledger_saldos',
+        'sqlite': SQLITE_LEDGER,
+        # O app Supabase (app.py) não tem liquidação nem saques
+        'postgres': [],
+    },
+    {
+        'version': 5,
+        'name': 'indices_paginacao',
+        'sqlite': SQLITE_INDICES_PAGINACAO,
+        'postgres': POSTGRES_INDICES_PAGINACAO,
+    },
+    {
+        'version': 6,
+        'name': 'busca_textual',
+        'sqlite': SQLITE_BUSCA_TEXTUAL,
+        # O app Supabase (app.py) não tem as rotas de busca
+        'postgres': [],
+    },
+    {
+        'version': 7,
+        'name': 'usuarios_token_version',
+        'sqlite': SQLITE_TOKEN_VERSION,
+        'postgres': POSTGRES_TOKEN_VERSION,
+    },
+    {
+        'version': 8,
+        'name': 'api_keys',
+        'sqlite': SQLITE_API_KEYS_MIGRATION,
+        # O app Supabase (app.py) não tem /api/pagamento nem autenticação por API key
+        'postgres': [],
+    },
+    {
+        'version': 9,
+        'name': 'roteamento_decisoes',
+        'sqlite': SQLITE_ROTEAMENTO,
+        # O app Supabase (app.py) não processa pagamentos por adquirente
+        'postgres': [],
+    },
+    {
+        'version': 10,
+        'name': 'taxas_versao',
+        'sqlite': SQLITE_TAXAS,
+        # O app Supabase (app.py) não calcula taxas por transação
+        'postgres': [],
+    },
+    {
+        'version': 11,
+        'name': 'idempotency_keys',
+        'sqlite': SQLITE_IDEMPOTENCY_KEYS,
+        # Idempotency-Key só nas rotas do gateway_completo.py
+        'postgres': [],
+    },
+    {
+        'version': 12,
+        'name': 'webhook_eventos',
+        'sqlite': SQLITE_WEBHOOK_EVENTOS,
+        # O app Supabase (app.py) não recebe webhooks das adquirentes
+        'postgres': [],
+    },
+]
+
+VERSION_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+def current_version(conn: sqlite3.Connection) -> int:
+    """Retorna a última versão aplicada no banco SQLite (0 se nenhuma)"""
+    conn.execute(VERSION_TABLE_SQL)
+    row = conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_migrations').fetchone()
+    return row[0]
+
+def migrate_sqlite(conn: sqlite3.Connection, target: Optional[int] = None) -> List[int]:
+    """Aplica as migrações pendentes, cada uma em sua própria transação"""
+    conn.execute(VERSION_TABLE_SQL)
+    conn.commit()
+    
+    aplicadas = []
+    for migration in MIGRATIONS:
+        if target is not None and migration['version'] > target:
+            break
+        
+        # BEGIN IMMEDIATE serializa processos concorrentes (ex.: reloader do Flask)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            ja_aplicada = conn.execute(
+                'SELECT 1 FROM schema_migrations WHERE version = ?', (migration['version'],)
+            ).fetchone()
+            if ja_aplicada:
+                conn.rollback()
+                continue
+            
+            for comando in migration['sqlite']:
+                if callable(comando):
+                    comando(conn)
+                else:
+                    conn.execute(comando)
+            
+            conn.execute(
+                'INSERT INTO schema_migrations (version, name) VALUES (?, ?)',
+                (migration['version'], migration['name'])
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        aplicadas.append(migration['version'])
+    return aplicadas
+
+def _indent(sql: str, prefix: str) -> str:
+    return textwrap.indent(textwrap.dedent(sql).strip(), prefix)
+
+def postgres_script() -> str:
+    """Gera o script SQL idempotente para o SQL Editor do Supabase"""
+    partes = [
+        '-- ==================================================',
+        '-- CONFIGURAÇÃO DO BANCO DE DADOS - WHITE LABEL GATEWAY',
+        '-- ==================================================',
+        '-- Gerado por: python -m services.migrations postgres > setup_database.sql',
+        '-- Execute este SQL no SQL Editor do Supabase',
+        '',
+        textwrap.dedent(VERSION_TABLE_SQL).strip() + ';',
+    ]
+    for migration in MIGRATIONS:
+        comandos = [_indent(comando, '        ') + ';\n' for comando in migration['postgres']]
+        partes += [
+            '',
+            f"-- {migration['version']:04d}_{migration['name']}",
+            'DO $migration$',
+            'BEGIN',
+            f"    IF NOT EXISTS (SELECT 1 FROM schema_migrations WHERE version = {migration['version']}) THEN",
+            *comandos,
+            f"        INSERT INTO schema_migrations (version, name) VALUES ({migration['version']}, '{migration['name']}');",
+            '    END IF;',
+            'END',
+            '$migration$;',
+        ]
+    return '\n'.join(partes) + '\n'
+
+# ==================================================
+# Planos de execução das consultas quentes
+# ==================================================
+
+def hot_queries() -> List[Tuple[str, str, tuple]]:
+    """(nome, sql, parâmetros) das consultas que não podem virar varredura
+    completa, com o SQL que as rotas executam (constantes dos repositórios,
+    do rollup e do ledger)"""
+    from services.ledger import SALDO_SQL
+    from services.repositories import (KycRepository, LogsRepository, MetasRepository, ProdutosRepository,
+                                       SEM_FILTROS, TransacoesRepository, UsuariosRepository, montar_pagina)
+    from services.rollups import VENDAS_PERIODO_SELLER_SQL, VENDAS_PERIODO_SQL
+
+    consultas = [
+        ('auth_usuario', UsuariosRepository.AUTH_SQL, (1,)),
+        ('dashboard_vendas_periodo', VENDAS_PERIODO_SELLER_SQL, (1, '2024-01-01', '2024-01-31')),
+        ('admin_transacoes_hoje', VENDAS_PERIODO_SQL, ('2024-01-01', '2024-01-01')),
+        ('dashboard_saldo', SALDO_SQL, (1,)),
+        ('dashboard_ultimas_transacoes', TransacoesRepository.RECENTES_SQL, (1, 10)),
+        ('dashboard_metas', MetasRepository.ATIVAS_SQL, (1,)),
+        ('pix_status', TransacoesRepository.STATUS_PAGAMENTO_SQL, ('pix_0',)),
+        ('pix_payload', TransacoesRepository.PIX_PAYLOAD_SQL, ('pix_0',)),
+        ('detalhes_usuario_kyc', KycRepository.POR_USUARIO_SQL, (1,)),
+        ('detalhes_usuario_logs', LogsRepository.RECENTES_SQL, (1, 10)),
+    ]
+    # Buscas FTS5: só a varredura conta (a ordem por rank sempre usa B-tree temporária)
+    for nome, listagem, params_colunas, expressao in (
+        ('busca_marketplace', ProdutosRepository.BUSCA_MARKETPLACE, ('/checkout/',), '"cafe"*'),
+        ('busca_marketplace_recentes', ProdutosRepository.BUSCA_MARKETPLACE_RECENTES, ('/checkout/',), '"cafe"*'),
+        ('busca_empresas', UsuariosRepository.BUSCA_EMPRESAS, (), '"empresa"*'),
+        ('busca_empresas_recentes', UsuariosRepository.BUSCA_EMPRESAS_RECENTES, (), '"empresa"*'),
+    ):
+        sql_contagem, params_contagem, sql, params = montar_pagina(listagem, SEM_FILTROS, params_colunas,
+                                                                   (expressao,))
+        consultas.append((f'{nome}_contagem', sql_contagem, params_contagem))
+        consultas.append((nome, sql, params))
+    return consultas
+
+def paginated_queries() -> List[Tuple[str, str, tuple]]:
+    """Páginas com cursor das listagens: além de não varrer a tabela, não
+    podem ordenar em B-tree temporária (o índice precisa entregar a ordem)"""
+    from services.repositories import (KycRepository, ProdutosRepository, SEM_FILTROS,
+                                       UsuariosRepository, montar_pagina)
+
+    com_cursor = SEM_FILTROS._replace(cursor=('2024-01-01 00:00:00', 1))
+    consultas = []
+    for nome, listagem, filtros, params_colunas, params_condicoes in (
+        ('pagina_usuarios_pendentes', UsuariosRepository.PENDENTES, com_cursor, (), ()),
+        ('pagina_usuarios_arquivados', UsuariosRepository.ARQUIVADOS, com_cursor, (), ()),
+        ('pagina_empresas', UsuariosRepository.EMPRESAS, com_cursor, (), ()),
+        ('pagina_empresas_status', UsuariosRepository.EMPRESAS,
+         com_cursor._replace(status='ativo'), (), ()),
+        ('pagina_kyc_pendentes', KycRepository.PENDENTES, com_cursor, (), ()),
+        ('pagina_produtos_seller', ProdutosRepository.DO_SELLER, com_cursor, ('/checkout/',), (1,)),
+        ('pagina_marketplace', ProdutosRepository.MARKETPLACE, com_cursor, ('/checkout/',), ()),
+    ):
+        _, _, sql, params = montar_pagina(listagem, filtros, params_colunas, params_condicoes)
+        consultas.append((nome, sql, params))
+    return consultas
+
+# A tabela virtual FTS5 aparece como SCAN mesmo quando usa o índice (M = MATCH)
+_FULL_SCAN = re.compile(r'^SCAN (?!CONSTANT ROW)(\w+)\b(?! VIRTUAL TABLE INDEX \d+:M)')
+_TEMP_SORT = re.compile(r'^USE TEMP B-TREE FOR ORDER BY')
+
+def explain_query_plan(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> List[str]:
+    """Retorna as linhas de detalhe do EXPLAIN QUERY PLAN"""
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()]
+
+def check_query_plans(conn: sqlite3.Connection, queries=None) -> List[Tuple[str, str]]:
+    """Retorna (consulta, detalhe) de cada varredura completa de tabela encontrada"""
+    violacoes = []
+    for nome, sql, params in queries or hot_queries():
+        for detalhe in explain_query_plan(conn, sql, params):
+            if _FULL_SCAN.match(detalhe):
+                violacoes.append((nome, detalhe))
+    if queries is None:
+        for nome, sql, params in paginated_queries():
+            for detalhe in explain_query_plan(conn, sql, params):
+                if _FULL_SCAN.match(detalhe) or _TEMP_SORT.match(detalhe):
+                    violacoes.append((nome, detalhe))
+    return violacoes
+
+def main(argv: List[str]) -> int:
+    comando = argv[0] if argv else 'status'
+    database = argv[1] if len(argv) > 1 else DEFAULT_DATABASE
+    
+    if comando == 'postgres':
+        sys.stdout.write(postgres_script())
+        return 0
+    
+    conn = sqlite3.connect(database)
+    try:
+        if comando == 'status':
+            versao = current_version(conn)
+            print(f"📋 Versão do schema: {versao} (última disponível: {MIGRATIONS[-1]['version']})")
+        elif comando == 'migrate':
+            aplicadas = migrate_sqlite(conn)
+            print(f"✅ Migrações aplicadas: {aplicadas or 'nenhuma'}")
+        elif comando == 'check-plans':
+            migrate_sqlite(conn)
+            violacoes = check_query_plans(conn)
+            for nome, detalhe in violacoes:
+                print(f"❌ {nome}: {detalhe}")
+            if violacoes:
+                return 1
+            print(f"✅ {len(hot_queries()) + len(paginated_queries())} consultas sem varredura completa de tabela")
+        else:
+            print(__doc__)
+            return 2
+    finally:
+        conn.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hash de senhas em um pool de threads dedicado e limitado
+
+generate_password_hash/check_password_hash (PBKDF2) custam centenas de
+milissegundos de CPU. Rodando na thread da requisição, uma rajada de logins
+ocupa todos os núcleos e atrasa as demais rotas. Aqui o hash roda em no
+máximo PASSWORD_HASH_WORKERS threads (o hashlib libera o GIL durante o
+PBKDF2), com até PASSWORD_HASH_MAX_PENDING tarefas esperando; acima disso a
+chamada falha na hora com HashingSaturado e a rota responde 503.
+
+O custo vem de PASSWORD_HASH_METHOD (formato do werkzeug, por exemplo
+pbkdf2:sha256:600000). Hashes gravados com outro método continuam válidos;
+depois de um login correto o hash é refeito em segundo plano com o método
+atual (precisa_rehash + rehash_em_segundo_plano).
+"""
+
+import atexit
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))
+
+class HashingSaturado(Exception):
+    """Pool de hash cheio: a requisição deve ser recusada (503)"""
+
+class PasswordHasher:
+    """Pool limitado para gerar e verificar hashes de senha"""
+
+    def __init__(self, method: str = PASSWORD_HASH_METHOD, workers: int = PASSWORD_HASH_WORKERS,
+                 max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        # Vagas = em execução + na fila; sem vaga, a tarefa é recusada
+        self._vagas = threading.BoundedSemaphore(workers + max_pending)
+        self._lock = threading.Lock()
+        self._stats = {'hashes': 0, 'verifications': 0, 'rehashes': 0, 'rejected': 0, 'pending': 0}
+        atexit.register(self.stop)
+
+    def hash(self, password: str) -> str:
+        """Gera o hash com o método atual (bloqueia até o pool terminar)"""
+        return self._submit('hashes', generate_password_hash, password, method=self.method).result()
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        """Confere a senha com o hash gravado, qualquer que seja o método dele"""
+        return self._submit('verifications', check_password_hash, pwhash, password).result()
+
+    def precisa_rehash(self, pwhash: str) -> bool:
+        """O hash foi gerado com outro método/custo que o configurado"""
+        return pwhash.split('$', 1)[0] != self.method
+
+    def rehash_em_segundo_plano(self, password: str, salvar: Callable[[str], None]) -> bool:
+        """Gera o novo hash no pool e chama salvar(novo_hash) sem esperar
+
+        Com o pool cheio não faz nada (o próximo login tenta de novo).
+        """
+        try:
+            self._submit('rehashes', self._rehash, password, salvar)
+            return True
+        except HashingSaturado:
+            return False
+
+    def _rehash(self, password: str, salvar: Callable[[str], None]):
+        try:
+            salvar(generate_password_hash(password, method=self.method))
+        except Exception as e:
+            print(f"⚠️ Erro ao atualizar hash de senha: {e}")
+
+    def _submit(self, contador: str, func: Callable, *args, **kwargs) -> Future:
+        if not self._vagas.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise HashingSaturado('Muitas operações de senha simultâneas')
+        with self._lock:
+            self._stats[contador] += 1
+            self._stats['pending'] += 1
+        try:
+            future = self._executor.submit(func, *args, **kwargs)
+        except Exception:
+            self._liberar(None)
+            raise
+        future.add_done_callback(self._liberar)
+        return future
+
+    def _liberar(self, _future: Optional[Future]):
+        with self._lock:
+            self._stats['pending'] -= 1
+        self._vagas.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['workers'] = self.workers
+        stats['max_pending'] = self.max_pending
+        return stats
+
+    def stop(self, wait: bool = True):
+        """Encerra o pool depois das tarefas já aceitas (inclusive rehashes)"""
+        self._executor.shutdown(wait=wait)
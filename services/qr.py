@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Renderização dos QR Codes PIX fora da thread da requisição
+
+O QrRenderer gera a imagem do payload PIX (copia e cola) num pool de
+processos (QR_WORKERS; 0 gera na própria thread) e guarda o resultado num
+cache endereçado pelo conteúdo: a chave é o SHA-256 de formato, escala,
+borda e payload, e serve também de ETag. Pedidos simultâneos do mesmo QR
+esperam a mesma renderização.
+
+Formatos:
+
+    png  PNG em tons de cinza de 1 bit, montado direto da matriz do QR
+         Code, sem PIL (~1 KB contra ~1,6 KB do PNG do PIL)
+    svg  um único <path> com as sequências de módulos escuros de cada linha
+
+/api/pix/create devolve o payload na hora e chama precarregar(); a imagem
+é servida depois por /api/pix/<id>/qr.png (ou .svg), em geral já do cache.
+"""
+
+import atexit
+import hashlib
+import multiprocessing
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+
+import qrcode
+
+QR_WORKERS = int(os.environ.get('QR_WORKERS', min(2, os.cpu_count() or 1)))
+QR_CACHE_MAX_BYTES = int(os.environ.get('QR_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+QR_BOX_SIZE = int(os.environ.get('QR_BOX_SIZE', 10))  # pixels por módulo no PNG
+QR_BORDER = int(os.environ.get('QR_BORDER', 4))  # módulos de margem
+QR_RENDER_TIMEOUT = float(os.environ.get('QR_RENDER_TIMEOUT', 5))  # segundos
+QR_CACHE_MAX_AGE = int(os.environ.get('QR_CACHE_MAX_AGE', 86400))  # Cache-Control das imagens
+
+MIMETYPES = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+Imagem = namedtuple('Imagem', 'chave conteudo mimetype')
+
+def matriz(payload: str, borda: int = QR_BORDER) -> List[List[bool]]:
+    """Módulos do QR Code (True = escuro), com a margem"""
+    qr = qrcode.QRCode(border=borda, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+def _chunk(tipo: bytes, dados: bytes) -> bytes:
+    return struct.pack('>I', len(dados)) + tipo + dados + struct.pack('>I', zlib.crc32(tipo + dados))
+
+def png(modulos: List[List[bool]], escala: int = QR_BOX_SIZE) -> bytes:
+    """PNG em tons de cinza de 1 bit (0 = preto, 1 = branco)"""
+    lado = len(modulos) * escala
+    sobra = -lado % 8
+    linhas = []
+    for linha in modulos:
+        bits = ''.join(('0' if escuro else '1') * escala for escuro in linha) + '1' * sobra
+        # Byte de filtro 0 (nenhum) + pixels; cada linha de módulos vale escala linhas de pixels
+        linhas.append((b'\x00' + int(bits, 2).to_bytes(len(bits) // 8, 'big')) * escala)
+    return (b'\x89PNG\r\n\x1a\n'
+            + _chunk(b'IHDR', struct.pack('>IIBBBBB', lado, lado, 1, 0, 0, 0, 0))
+            + _chunk(b'IDAT', zlib.compress(b''.join(linhas), 6))
+            + _chunk(b'IEND', b''))
+
+def svg(modulos: List[List[bool]]) -> bytes:
+    """SVG com um retângulo por sequência de módulos escuros (escala livre)"""
+    lado = len(modulos)
+    caminho = []
+    for y, linha in enumerate(modulos):
+        x = 0
+        while x < lado:
+            if linha[x]:
+                inicio = x
+                while x < lado and linha[x]:
+                    x += 1
+                caminho.append(f'M{inicio} {y}h{x - inicio}v1H{inicio}z')
+            else:
+                x += 1
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {lado} {lado}" shape-rendering="crispEdges">'
+            f'<rect width="{lado}" height="{lado}" fill="#fff"/>'
+            f'<path d="{"".join(caminho)}" fill="#000"/></svg>').encode()
+
+def renderizar(payload: str, formato: str, escala: int, borda: int) -> bytes:
+    """Executado nos processos do pool"""
+    modulos = matriz(payload, borda)
+    return png(modulos, escala) if formato == 'png' else svg(modulos)
+
+class QrRenderer:
+    """QR Codes renderizados num pool de processos, com cache por conteúdo"""
+
+    def __init__(self, workers: int = QR_WORKERS, max_bytes: int = QR_CACHE_MAX_BYTES,
+                 escala: int = QR_BOX_SIZE, borda: int = QR_BORDER, timeout: float = QR_RENDER_TIMEOUT):
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.escala = escala
+        self.borda = borda
+        self.timeout = timeout
+        self._cache: OrderedDict = OrderedDict()  # chave -> bytes
+        self._bytes = 0
+        self._em_andamento: Dict[str, Future] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'shared': 0, 'rendered': 0, 'errors': 0,
+                       'pool_restarts': 0, 'evictions': 0}
+
+    def chave(self, payload: str, formato: str = 'png') -> str:
+        """Endereço do QR no cache (e ETag da imagem)"""
+        escala = self.escala if formato == 'png' else 0
+        return hashlib.sha256(f'{formato}:{escala}:{self.borda}:{payload}'.encode()).hexdigest()
+
+    def renderizar(self, payload: str, formato: str = 'png') -> Imagem:
+        """Imagem do payload, do cache ou renderizada no pool (espera até timeout)"""
+        chave = self.chave(payload, formato)
+        with self._lock:
+            conteudo = self._cache.get(chave)
+            if conteudo is not None:
+                self._cache.move_to_end(chave)
+                self._stats['hits'] += 1
+                return Imagem(chave, conteudo, MIMETYPES[formato])
+            self._stats['misses'] += 1
+        return Imagem(chave, self._pedir(chave, payload, formato).result(self.timeout), MIMETYPES[formato])
+
+    def precarregar(self, payload: str, formato: str = 'png'):
+        """Começa a renderizar sem esperar (a imagem vai para o cache)"""
+        chave = self.chave(payload, formato)
+        with self._lock:
+            if chave in self._cache:
+                return
+        self._pedir(chave, payload, formato)
+
+    def _pedir(self, chave: str, payload: str, formato: str) -> Future:
+        """Renderização em andamento da chave, ou uma nova"""
+        with self._lock:
+            futuro = self._em_andamento.get(chave)
+            if futuro is not None:
+                self._stats['shared'] += 1
+                return futuro
+            futuro = self._em_andamento[chave] = Future()
+        try:
+            origem = self._submeter(payload, formato)
+        except Exception as e:
+            origem = Future()
+            origem.set_exception(e)
+        origem.add_done_callback(lambda concluido: self._concluir(chave, futuro, concluido))
+        return futuro
+
+    def _submeter(self, payload: str, formato: str) -> Future:
+        args = (payload, formato, self.escala, self.borda)
+        if self.workers <= 0:
+            futuro = Future()
+            futuro.set_result(renderizar(*args))
+            return futuro
+        try:
+            return self._executor().submit(renderizar, *args)
+        except BrokenProcessPool:
+            # Um processo do pool morreu: recria o pool uma vez
+            with self._lock:
+                self._pool = None
+                self._stats['pool_restarts'] += 1
+            return self._executor().submit(renderizar, *args)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # fork: spawn/forkserver reexecutariam o gateway_completo.py (o
+                # __main__) em cada processo; o filho só roda renderizar(), que
+                # não usa nenhum lock das threads do app
+                contexto = multiprocessing.get_context('fork')
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=contexto)
+                atexit.register(self.stop)
+            return self._pool
+
+    def _concluir(self, chave: str, futuro: Future, concluido: Future):
+        erro = concluido.exception()
+        with self._lock:
+            self._em_andamento.pop(chave, None)
+            if erro is not None:
+                self._stats['errors'] += 1
+            else:
+                conteudo = concluido.result()
+                self._stats['rendered'] += 1
+                if chave not in self._cache and len(conteudo) <= self.max_bytes:
+                    self._cache[chave] = conteudo
+                    self._bytes += len(conteudo)
+                    while self._bytes > self.max_bytes:
+                        _, antigo = self._cache.popitem(last=False)
+                        self._bytes -= len(antigo)
+                        self._stats['evictions'] += 1
+        if erro is not None:
+            futuro.set_exception(erro)
+        else:
+            futuro.set_result(conteudo)
+
+    def stop(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._cache)
+            stats['bytes'] = self._bytes
+            stats['in_flight'] = len(self._em_andamento)
+            stats['workers'] = self.workers
+        return stats
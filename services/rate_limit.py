@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Limite de requisições por token bucket (login, cadastro, criação de PIX)
+
+Cada rota tem uma Regra: capacidade do bucket (rajada), tokens repostos por
+segundo e as identidades usadas como chave, na ordem de preferência
+('api_key', 'user', 'ip'). As identidades vêm da autenticação já feita
+(uma API key inválida é recusada antes e não ganha um bucket novo). A
+requisição consome um token do bucket rota:identidade; sem token, a rota
+responde 429 com Retry-After.
+
+O armazenamento é plugável (consumir(chave, capacidade, taxa) -> espera):
+
+    memory  MemoryBucketStore, por processo: arrays compactos (tokens,
+            última atualização, instante em que o bucket volta a encher)
+            com reposição preguiçosa no acesso e remoção periódica dos
+            buckets cheios, que equivalem a um bucket inexistente
+    redis   RedisBucketStore, compartilhado entre os workers (Redis ou
+            compatível local, RATE_LIMIT_REDIS_URL): um script Lua faz a
+            mesma conta atomicamente e o TTL da chave remove os ociosos
+
+Formato das regras no ambiente: "capacidade/segundos", por exemplo 10/60 é
+uma rajada de 10 requisições e 10 tokens repostos a cada 60 segundos.
+"""
+
+import os
+import threading
+import time
+from array import array
+from collections import namedtuple
+from typing import Dict, Optional, Sequence
+
+try:
+    import redis
+except ImportError:  # sem redis, só o backend memory
+    redis = None
+
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_REDIS_URL = os.environ.get('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
+RATE_LIMIT_EVICT_INTERVAL = float(os.environ.get('RATE_LIMIT_EVICT_INTERVAL', 60))  # segundos
+
+IDENTIDADES = ('api_key', 'user', 'ip')
+
+Regra = namedtuple('Regra', 'capacidade taxa identidades')
+
+def regra(especificacao: str, identidades: Sequence[str] = ('ip',)) -> Regra:
+    """Regra a partir de "capacidade/segundos" """
+    try:
+        capacidade, segundos = (float(parte) for parte in especificacao.split('/'))
+    except ValueError:
+        raise ValueError(f'Regra de rate limit inválida: {especificacao!r} (use capacidade/segundos)')
+    if capacidade < 1 or segundos <= 0:
+        raise ValueError(f'Regra de rate limit inválida: {especificacao!r}')
+    for identidade in identidades:
+        if identidade not in IDENTIDADES:
+            raise ValueError(f'Identidade de rate limit inválida: {identidade}')
+    return Regra(capacidade, capacidade / segundos, tuple(identidades))
+
+class MemoryBucketStore:
+    """Buckets do processo em três array('d') indexados por slot"""
+
+    def __init__(self, evict_interval: float = RATE_LIMIT_EVICT_INTERVAL):
+        self.evict_interval = evict_interval
+        self._slots: Dict[str, int] = {}
+        self._tokens = array('d')
+        self._atualizado = array('d')
+        self._cheio_em = array('d')
+        self._livres = []
+        self._lock = threading.Lock()
+        self._proxima_limpeza = time.monotonic() + evict_interval
+        self._stats = {'evictions': 0}
+
+    def consumir(self, chave: str, capacidade: float, taxa: float, agora: Optional[float] = None) -> float:
+        """Consome um token; retorna 0 se permitido ou os segundos até haver um"""
+        agora = time.monotonic() if agora is None else agora
+        with self._lock:
+            if agora >= self._proxima_limpeza:
+                self._limpar(agora)
+            slot = self._slots.get(chave)
+            if slot is None:
+                tokens = capacidade
+                slot = self._novo_slot(chave)
+            else:
+                tokens = min(capacidade, self._tokens[slot] + (agora - self._atualizado[slot]) * taxa)
+
+            espera = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                espera = (1 - tokens) / taxa
+            self._tokens[slot] = tokens
+            self._atualizado[slot] = agora
+            self._cheio_em[slot] = agora + (capacidade - tokens) / taxa
+            return espera
+
+    def _novo_slot(self, chave: str) -> int:
+        if self._livres:
+            slot = self._livres.pop()
+        else:
+            slot = len(self._tokens)
+            self._tokens.append(0.0)
+            self._atualizado.append(0.0)
+            self._cheio_em.append(0.0)
+        self._slots[chave] = slot
+        return slot
+
+    def _limpar(self, agora: float):
+        """Libera os slots dos buckets que já voltaram a encher"""
+        cheio_em = self._cheio_em
+        ociosas = [chave for chave, slot in self._slots.items() if cheio_em[slot] <= agora]
+        for chave in ociosas:
+            self._livres.append(self._slots.pop(chave))
+        self._stats['evictions'] += len(ociosas)
+        self._proxima_limpeza = agora + self.evict_interval
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, buckets=len(self._slots), slots=len(self._tokens))
+
+# KEYS[1] = bucket; ARGV = capacidade, taxa, agora. Retorna a espera em segundos
+REDIS_CONSUMIR_LUA = '''
+local capacidade = tonumber(ARGV[1])
+local taxa = tonumber(ARGV[2])
+local agora = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens = capacidade
+if bucket[1] then
+    tokens = math.min(capacidade, tonumber(bucket[1]) + (agora - tonumber(bucket[2])) * taxa)
+end
+local espera = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    espera = (1 - tokens) / taxa
+end
+redis.call('HSET', KEYS[1], 't', tokens, 'ts', agora)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacidade - tokens) / taxa * 1000) + 1000)
+return tostring(espera)
+'''
+
+class RedisBucketStore:
+    """Buckets compartilhados entre processos em um Redis (ou compatível)"""
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL, prefixo: str = 'rl:'):
+        if redis is None:
+            raise RuntimeError('RATE_LIMIT_BACKEND=redis requer o pacote redis (pip install redis)')
+        self.prefixo = prefixo
+        self._cliente = redis.Redis.from_url(url)
+        self._consumir = self._cliente.register_script(REDIS_CONSUMIR_LUA)
+
+    def consumir(self, chave: str, capacidade: float, taxa: float, agora: Optional[float] = None) -> float:
+        agora = time.time() if agora is None else agora
+        return float(self._consumir(keys=[self.prefixo + chave], args=[capacidade, taxa, agora]))
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+def criar_store(backend: str = RATE_LIMIT_BACKEND):
+    if backend == 'memory':
+        return MemoryBucketStore()
+    if backend == 'redis':
+        return RedisBucketStore()
+    raise ValueError(f'Backend de rate limit inválido: {backend}')
+
+class RateLimiter:
+    """Regras por rota sobre um store de buckets, com contadores por rota"""
+
+    def __init__(self, store, regras: Dict[str, Regra], enabled: bool = RATE_LIMIT_ENABLED):
+        self.store = store
+        self.regras = regras
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {rota: {'allowed': 0, 'rejected': 0} for rota in regras}
+
+    def verificar(self, rota: str, identidades: Dict[str, Optional[str]]) -> float:
+        """0 se a requisição pode seguir; senão os segundos para o Retry-After
+
+        identidades: valores da requisição já autenticada ('api_key' é o id
+        da chave, nunca a chave; 'user'; 'ip'); a chave do bucket é a
+        primeira identidade da regra que estiver presente.
+        """
+        regra_rota = self.regras.get(rota)
+        if not self.enabled or regra_rota is None:
+            return 0.0
+        for identidade in regra_rota.identidades:
+            valor = identidades.get(identidade)
+            if valor is not None:
+                break
+        else:
+            identidade, valor = 'ip', 'desconhecido'
+
+        espera = self.store.consumir(f'{rota}:{identidade}:{valor}', regra_rota.capacidade, regra_rota.taxa)
+        with self._lock:
+            self._stats[rota]['rejected' if espera else 'allowed'] += 1
+        return espera
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            rotas = {rota: dict(contadores) for rota, contadores in self._stats.items()}
+        return {'enabled': self.enabled, 'routes': rotas, 'store': self.store.stats()}
@@ -0,0 +1,848 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Repositórios de acesso ao banco (uma classe por tabela)
+
+Cada consulta é uma constante SQL da classe, então o cache de statements
+do sqlite3 reaproveita a compilação entre requisições na mesma conexão.
+As linhas voltam como registros imutáveis (namedtuple com __slots__ vazio)
+criados em lote a partir das tuplas do cursor, sem dict nem sqlite3.Row por
+linha; a conversão para JSON acontece uma única vez, em serializar().
+
+As listagens são paginadas por cursor (keyset) em (created_at, id): a
+próxima página continua depois da última linha entregue, usando o índice,
+sem OFFSET. As buscas textuais (services/busca.py) usam a mesma paginação
+com a chave (relevância, id). O total informado é uma contagem limitada a
+PAGINACAO_CONTAGEM_MAXIMA linhas (total_exato = False quando passa disso).
+
+Uso:
+    conn = DatabaseManager().get_connection()
+    pagina = UsuariosRepository(conn).pendentes(filtros_da_query(request.args))
+    conn.close()
+"""
+
+import base64
+import binascii
+import json
+import os
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:  # sem orjson, serializar() usa o json da biblioteca padrão
+    orjson = None
+
+class Registro:
+    """Marcador comum dos tipos de linha criados por registro()"""
+    __slots__ = ()
+
+def registro(nome: str, campos: str, booleanos: Sequence[str] = ()) -> type:
+    """Cria o tipo de linha a partir da lista de colunas
+
+    booleanos lista as colunas guardadas como 0/1 que devem virar bool.
+    """
+    base = namedtuple(nome, campos)
+    tipo = type(nome, (base, Registro), {'__slots__': ()})
+    # tuple.__new__ direto (em C), sem passar pelo __new__ em Python do namedtuple
+    tipo._criar = partial(tuple.__new__, tipo)
+    tipo._booleanos = tuple(base._fields.index(campo) for campo in booleanos)
+    return tipo
+
+def _registros(tipo: type, rows: List[tuple]) -> List[Any]:
+    if tipo._booleanos:
+        convertidas = []
+        for row in rows:
+            valores = list(row)
+            for i in tipo._booleanos:
+                valores[i] = bool(valores[i])
+            convertidas.append(valores)
+        rows = convertidas
+    return list(map(tipo._criar, rows))
+
+def _para_json(obj: Any) -> Any:
+    if isinstance(obj, Registro):
+        return dict(zip(obj._fields, obj))
+    if isinstance(obj, dict):
+        return {chave: _para_json(valor) for chave, valor in obj.items()}
+    if isinstance(obj, list):
+        if obj and isinstance(obj[0], Registro):
+            # Caminho rápido: lista homogênea de registros
+            campos = obj[0]._fields
+            return [dict(zip(campos, linha)) for linha in obj]
+        return [_para_json(valor) for valor in obj]
+    return obj
+
+def _padrao(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat(sep=' ') if isinstance(obj, datetime) else obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, bytes):
+        return obj.decode('utf-8', 'replace')
+    raise TypeError(f'Objeto do tipo {type(obj).__name__} não é serializável em JSON')
+
+def serializar(obj: Any) -> str:
+    """Serializador único das respostas: registros viram objetos JSON"""
+    if orjson is not None:
+        return orjson.dumps(
+            _para_json(obj), default=_padrao,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        ).decode('utf-8')
+    return json.dumps(_para_json(obj), ensure_ascii=False, separators=(',', ':'), default=_padrao)
+
+PAGINACAO_LIMITE_PADRAO = int(os.environ.get('PAGINACAO_LIMITE_PADRAO', 50))
+PAGINACAO_LIMITE_MAXIMO = int(os.environ.get('PAGINACAO_LIMITE_MAXIMO', 200))
+PAGINACAO_CONTAGEM_MAXIMA = int(os.environ.get('PAGINACAO_CONTAGEM_MAXIMA', 10000))
+BUSCA_MAX_RELEVANCIA = int(os.environ.get('BUSCA_MAX_RELEVANCIA', 5000))
+
+class FiltroInvalido(ValueError):
+    """Parâmetro de paginação ou filtro inválido (resposta 400)"""
+
+# Parâmetros de uma listagem; fim já é exclusivo (dia seguinte ao informado)
+Filtros = namedtuple('Filtros', 'limite cursor status tipo_pessoa inicio fim')
+
+# Uma página: itens, cursor da próxima (None na última) e total aproximado
+Pagina = namedtuple('Pagina', 'itens next_cursor total total_exato')
+
+# Partes fixas de uma listagem paginada; campos_cursor são os campos do tipo
+# de linha com os valores da chave e origem_contagem, se houver, substitui a
+# origem na contagem (sem os JOINs que não filtram linhas)
+Listagem = namedtuple('Listagem', 'colunas origem condicoes chave descendente filtros campos_cursor '
+                                  'origem_contagem', defaults=(('created_at', 'id'), None))
+
+def codificar_cursor(*chave: Any) -> str:
+    """Cursor opaco com a chave ((created_at ou relevância,) id) da última linha entregue"""
+    bruto = json.dumps(chave, separators=(',', ':'), default=_padrao).encode('utf-8')
+    return base64.urlsafe_b64encode(bruto).rstrip(b'=').decode('ascii')
+
+def decodificar_cursor(cursor: str) -> Tuple[Any, ...]:
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        chave = json.loads(bruto)
+    except (binascii.Error, ValueError, TypeError):
+        raise FiltroInvalido('Cursor inválido')
+    if not isinstance(chave, list) or len(chave) not in (1, 2) or not isinstance(chave[-1], int):
+        raise FiltroInvalido('Cursor inválido')
+    return tuple(chave)
+
+def _data(valor: Optional[str], nome: str) -> Optional[date]:
+    if not valor:
+        return None
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise FiltroInvalido(f'Data inválida em {nome} (use AAAA-MM-DD)')
+
+def filtros_da_query(args) -> Filtros:
+    """Lê limit, cursor, status, tipo_pessoa, inicio e fim da query string"""
+    try:
+        limite = int(args.get('limit', PAGINACAO_LIMITE_PADRAO))
+    except (TypeError, ValueError):
+        raise FiltroInvalido('limit deve ser um número inteiro')
+    if limite < 1:
+        raise FiltroInvalido('limit deve ser maior que zero')
+
+    cursor = args.get('cursor')
+    inicio = _data(args.get('inicio'), 'inicio')
+    fim = _data(args.get('fim'), 'fim')
+
+    return Filtros(
+        limite=min(limite, PAGINACAO_LIMITE_MAXIMO),
+        cursor=decodificar_cursor(cursor) if cursor else None,
+        status=args.get('status') or None,
+        tipo_pessoa=args.get('tipo_pessoa') or None,
+        inicio=inicio.isoformat() if inicio else None,
+        fim=(fim + timedelta(days=1)).isoformat() if fim else None,
+    )
+
+SEM_FILTROS = Filtros(PAGINACAO_LIMITE_PADRAO, None, None, None, None, None)
+
+# Tipos de linha
+UsuarioResumo = registro('UsuarioResumo', 'id username email tipo created_at status')
+UsuarioDetalhe = registro('UsuarioDetalhe', 'id username email tipo status created_at')
+UsuarioStatus = registro('UsuarioStatus', 'status tipo')
+UsuarioAuth = registro('UsuarioAuth', 'tipo status token_version')
+UsuarioAprovacao = registro('UsuarioAprovacao', 'username email tipo')
+Empresa = registro('Empresa', 'id username email status created_at tipo_pessoa nome_razao_social cpf_cnpj '
+                              'porte_juridico setor_atividade faturamento_mensal kyc_status kyc_created_at '
+                              'status_kyc_display')
+EmpresaBusca = registro('EmpresaBusca', ' '.join(Empresa._fields) + ' relevancia')
+EmpresaResumo = registro('EmpresaResumo', 'id username email status created_at')
+
+KYC_COLUNAS = ('id user_id tipo_pessoa cpf_cnpj nome_razao_social porte_juridico data_nascimento telefone '
+               'endereco cidade estado cep nome_responsavel cpf_responsavel nome_mae data_nascimento_responsavel '
+               'setor_atividade faturamento_mensal documento_responsavel contrato_social documento_frente '
+               'documento_verso comprovante_residencia status observacoes aprovado_por aprovado_em '
+               'created_at updated_at')
+Kyc = registro('Kyc', KYC_COLUNAS)
+KycCadastro = registro('KycCadastro', 'tipo_pessoa nome_razao_social cpf_cnpj porte_juridico nome_responsavel '
+                                      'cpf_responsavel nome_mae data_nascimento_responsavel setor_atividade '
+                                      'faturamento_mensal status')
+KycStatus = registro('KycStatus', 'status tipo_pessoa nome_razao_social cpf_cnpj nome_responsavel cpf_responsavel '
+                                  'nome_mae data_nascimento_responsavel setor_atividade faturamento_mensal '
+                                  'porte_juridico documento_responsavel contrato_social')
+KycRecebedor = registro('KycRecebedor', 'cpf_cnpj nome_razao_social cidade cep')
+KycPendente = registro('KycPendente', 'id user_id username email tipo_pessoa nome_razao_social cpf_cnpj '
+                                      'porte_juridico nome_responsavel cpf_responsavel nome_mae '
+                                      'data_nascimento_responsavel setor_atividade faturamento_mensal '
+                                      'documento_responsavel contrato_social status created_at updated_at')
+
+ProdutoSeller = registro('ProdutoSeller', 'id product_id name price header status show_marketplace views sales '
+                                          'created_at checkout_url', booleanos=('show_marketplace',))
+ProdutoMarketplace = registro('ProdutoMarketplace', 'id product_id name price header product_image views sales '
+                                                    'seller_name created_at checkout_url')
+ProdutoBusca = registro('ProdutoBusca', ' '.join(ProdutoMarketplace._fields) + ' relevancia')
+PRODUTO_COLUNAS = ('id product_id user_id name price header thank_page_type thank_page_url support_email '
+                   'warranty_time warranty_unit product_image product_banner final_banner show_marketplace '
+                   'status views sales created_at updated_at')
+ProdutoCheckout = registro('ProdutoCheckout', PRODUTO_COLUNAS + ' seller_name seller_email')
+
+TRANSACAO_COLUNAS = ('id payment_id transaction_id user_id product_id amount currency payment_method status '
+                     'customer_name customer_email merchant_reference_id valor taxa_cobrada valor_liquido '
+                     'dados_pagamento adquirente dados_retorno created_at updated_at')
+Transacao = registro('Transacao', TRANSACAO_COLUNAS)
+TransacaoStatus = registro('TransacaoStatus', 'status amount currency customer_name created_at')
+
+LogEntrada = registro('LogEntrada', 'acao detalhes created_at')
+
+Meta = registro('Meta', 'id user_id meta_valor valor_atual data_inicio data_fim status created_at')
+
+ApiKey = registro('ApiKey', 'id prefixo created_at expires_at usage_count last_used_at')
+
+Taxa = registro('Taxa', 'id user_id tipo_pagamento taxa_percentual taxa_fixa created_at')
+
+def montar_pagina(listagem: Listagem, filtros: Filtros, params_colunas: Tuple = (),
+                  params_condicoes: Tuple = ()) -> Tuple[str, Tuple, str, Tuple]:
+    """SQL e parâmetros da contagem limitada e da página (limite + 1 linhas)"""
+    condicoes = list(listagem.condicoes)
+    params = list(params_condicoes)
+
+    for nome, operador, valor in (('status', '=', filtros.status),
+                                  ('tipo_pessoa', '=', filtros.tipo_pessoa),
+                                  ('data', '>=', filtros.inicio),
+                                  ('data', '<', filtros.fim)):
+        if valor is None:
+            continue
+        coluna = listagem.filtros.get(nome)
+        if coluna is None:
+            raise FiltroInvalido(f'Filtro não suportado nesta listagem: {"inicio/fim" if nome == "data" else nome}')
+        condicoes.append(f'{coluna} {operador} ?')
+        params.append(valor)
+
+    where = ' AND '.join(condicoes) or '1'
+    sql_contagem = f'SELECT COUNT(*) FROM (SELECT 1 {listagem.origem_contagem or listagem.origem} WHERE {where} LIMIT ?)'
+    params_contagem = tuple(params) + (PAGINACAO_CONTAGEM_MAXIMA + 1,)
+
+    if filtros.cursor is not None:
+        if len(filtros.cursor) != len(listagem.chave):
+            raise FiltroInvalido('Cursor inválido')
+        operador = '<' if listagem.descendente else '>'
+        if len(listagem.chave) == 1:
+            where += f' AND {listagem.chave[0]} {operador} ?'
+        else:
+            where += f' AND ({", ".join(listagem.chave)}) {operador} (?, ?)'
+        params.extend(filtros.cursor)
+
+    direcao = 'DESC' if listagem.descendente else 'ASC'
+    ordem = ', '.join(f'{coluna} {direcao}' for coluna in listagem.chave)
+    sql_pagina = (f'SELECT {listagem.colunas} {listagem.origem} WHERE {where} '
+                  f'ORDER BY {ordem} LIMIT ?')
+    params_pagina = tuple(params_colunas) + tuple(params) + (filtros.limite + 1,)
+    return sql_contagem, params_contagem, sql_pagina, params_pagina
+
+def _colunas(campos: Iterable[str], prefixo: str = '') -> str:
+    return ', '.join(prefixo + campo for campo in campos)
+
+class Repository:
+    """Base: executa as consultas com o row_factory do tipo de linha"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def _cursor(self):
+        # Tuplas puras do sqlite3 (sem sqlite3.Row); o registro é criado depois, em lote
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        return cursor
+
+    def _todos(self, tipo: type, sql: str, params: Tuple = ()) -> List[Any]:
+        return _registros(tipo, self._cursor().execute(sql, params).fetchall())
+
+    def _um(self, tipo: type, sql: str, params: Tuple = ()) -> Optional[Any]:
+        row = self._cursor().execute(sql, params).fetchone()
+        return _registros(tipo, [row])[0] if row is not None else None
+
+    def _escalar(self, sql: str, params: Tuple = ()) -> Any:
+        row = self._cursor().execute(sql, params).fetchone()
+        return row[0] if row else None
+
+    def _executar(self, sql: str, params: Tuple = ()) -> int:
+        """Executa um comando de escrita e retorna as linhas afetadas"""
+        return self.conn.execute(sql, params).rowcount
+
+    def _paginar(self, tipo: type, listagem: Listagem, filtros: Filtros,
+                 params_colunas: Tuple = (), params_condicoes: Tuple = (),
+                 total: Optional[int] = None) -> Pagina:
+        """Uma página da listagem, continuando depois do cursor
+
+        O tipo de linha precisa ter os campos de listagem.campos_cursor.
+        total, quando informado, dispensa a contagem limitada.
+        """
+        sql_contagem, params_contagem, sql_pagina, params_pagina = montar_pagina(
+            listagem, filtros, params_colunas, params_condicoes
+        )
+        if total is None:
+            total = self._escalar(sql_contagem, params_contagem)
+        itens = self._todos(tipo, sql_pagina, params_pagina)
+
+        next_cursor = None
+        if len(itens) > filtros.limite:
+            itens = itens[:filtros.limite]
+            ultimo = itens[-1]
+            next_cursor = codificar_cursor(*(getattr(ultimo, campo) for campo in listagem.campos_cursor))
+
+        return Pagina(itens, next_cursor, min(total, PAGINACAO_CONTAGEM_MAXIMA),
+                      total <= PAGINACAO_CONTAGEM_MAXIMA)
+
+    def _buscar(self, tipo: type, por_relevancia: Listagem, por_recencia: Listagem, expressao: str,
+                filtros: Filtros, params_colunas: Tuple = ()) -> Pagina:
+        """Uma página de busca FTS5 (expressao é o MATCH, primeira condição)
+
+        Ordenar pelo bm25 calcula a relevância de todas as linhas que casam;
+        quando são mais de BUSCA_MAX_RELEVANCIA (termo genérico), a busca
+        devolve as mais recentes, que o FTS5 percorre em ordem de rowid
+        parando na página. A primeira página escolhe o modo pela contagem e o
+        cursor (2 valores: relevância e id; 1 valor: id) o mantém nas seguintes.
+        """
+        total = None
+        if filtros.cursor is None:
+            sql_contagem, params_contagem, _, _ = montar_pagina(por_relevancia, filtros,
+                                                                params_condicoes=(expressao,))
+            total = self._escalar(sql_contagem, params_contagem)
+            listagem = por_relevancia if total <= BUSCA_MAX_RELEVANCIA else por_recencia
+        else:
+            listagem = por_relevancia if len(filtros.cursor) == len(por_relevancia.chave) else por_recencia
+        return self._paginar(tipo, listagem, filtros, params_colunas, (expressao,), total)
+
+class UsuariosRepository(Repository):
+    """Tabela usuarios"""
+
+    PENDENTES = Listagem(
+        colunas='id, username, email, tipo, created_at, status',
+        # Sem ANALYZE o planner prefere (status, created_at) e ordena em B-tree
+        # temporária; o índice parcial já entrega as linhas na ordem da chave
+        origem='FROM usuarios INDEXED BY idx_usuarios_pendentes_created',
+        condicoes=("status IN ('pendente', 'pendente_aprovacao')",),
+        chave=('created_at', 'id'),
+        descendente=True,
+        filtros={'status': 'status', 'data': 'created_at'},
+    )
+    ARQUIVADOS = Listagem(
+        colunas='id, username, email, tipo, created_at, status',
+        origem='FROM usuarios',
+        condicoes=("status = 'rejeitado'",),
+        chave=('created_at', 'id'),
+        descendente=True,
+        filtros={'data': 'created_at'},
+    )
+    DETALHE_SQL = 'SELECT id, username, email, tipo, status, created_at FROM usuarios WHERE id = ?'
+    STATUS_SQL = 'SELECT status, tipo FROM usuarios WHERE id = ?'
+    TIPO_SQL = 'SELECT tipo FROM usuarios WHERE id = ?'
+    AUTH_SQL = 'SELECT tipo, status, token_version FROM usuarios WHERE id = ?'
+    REVOGAR_TOKENS_SQL = 'UPDATE usuarios SET token_version = token_version + 1 WHERE id = ?'
+    # Só troca se o hash não mudou desde o login (troca de senha concorrente vence)
+    ATUALIZAR_HASH_SENHA_SQL = 'UPDATE usuarios SET password_hash = ? WHERE id = ? AND password_hash = ?'
+    PENDENTE_PARA_APROVACAO_SQL = '''
+        SELECT username, email, tipo FROM usuarios
+        WHERE id = ? AND status IN ('pendente', 'pendente_aprovacao')
+    '''
+    ARQUIVADO_SQL = "SELECT username, email, tipo FROM usuarios WHERE id = ? AND status = 'rejeitado'"
+    ATUALIZAR_STATUS_SQL = 'UPDATE usuarios SET status = ? WHERE id = ?'
+    EXCLUIR_SQL = 'DELETE FROM usuarios WHERE id = ?'
+    EMPRESAS = Listagem(
+        colunas='''
+            u.id,
+            u.username,
+            u.email,
+            u.status,
+            u.created_at,
+            COALESCE(k.tipo_pessoa, 'Não informado') as tipo_pessoa,
+            COALESCE(k.nome_razao_social, 'Não informado') as nome_razao_social,
+            COALESCE(k.cpf_cnpj, 'Não informado') as cpf_cnpj,
+            COALESCE(k.porte_juridico, 'Não aplicável') as porte_juridico,
+            COALESCE(k.setor_atividade, 'Não informado') as setor_atividade,
+            COALESCE(k.faturamento_mensal, 'Não informado') as faturamento_mensal,
+            COALESCE(k.status, 'pendente') as kyc_status,
+            COALESCE(k.created_at, u.created_at) as kyc_created_at,
+            CASE
+                WHEN k.status = 'aprovado' THEN 'Aprovado'
+                WHEN k.status = 'rejeitado' THEN 'Rejeitado'
+                WHEN k.status = 'rascunho' THEN 'Rascunho'
+                WHEN k.status = 'pendente' THEN 'Pendente'
+                ELSE 'Pendente'
+            END as status_kyc_display
+        ''',
+        origem='FROM usuarios u LEFT JOIN kyc k ON u.id = k.user_id',
+        condicoes=("u.tipo = 'seller'",),
+        chave=('u.created_at', 'u.id'),
+        descendente=True,
+        filtros={'status': 'u.status', 'tipo_pessoa': 'k.tipo_pessoa', 'data': 'u.created_at'},
+    )
+    # empresas_fts tem rowid = usuarios.id e só indexa sellers
+    BUSCA_EMPRESAS = EMPRESAS._replace(
+        colunas=EMPRESAS.colunas.rstrip() + ', f.rank as relevancia',
+        origem='FROM empresas_fts f JOIN usuarios u ON u.id = f.rowid LEFT JOIN kyc k ON u.id = k.user_id',
+        condicoes=('empresas_fts MATCH ?',),
+        chave=('f.rank', 'f.rowid'),
+        descendente=False,
+        campos_cursor=('relevancia', 'id'),
+    )
+    # Sem rank: o bm25 de uma só linha já percorre todas as ocorrências (IDF)
+    BUSCA_EMPRESAS_RECENTES = BUSCA_EMPRESAS._replace(
+        colunas=EMPRESAS.colunas.rstrip() + ', NULL as relevancia',
+        chave=('f.rowid',),
+        descendente=True,
+        campos_cursor=('id',),
+    )
+    EMPRESA_SQL = "SELECT id, username, email, status, created_at FROM usuarios WHERE id = ? AND tipo = 'seller'"
+    CONTAR_SELLERS_SQL = "SELECT COUNT(*) FROM usuarios WHERE tipo = 'seller'"
+    CONTAR_SELLERS_STATUS_SQL = "SELECT COUNT(*) FROM usuarios WHERE tipo = 'seller' AND status = ?"
+
+    def pendentes(self, filtros: Filtros = SEM_FILTROS) -> Pagina:
+        return self._paginar(UsuarioResumo, self.PENDENTES, filtros)
+
+    def arquivados(self, filtros: Filtros = SEM_FILTROS) -> Pagina:
+        return self._paginar(UsuarioResumo, self.ARQUIVADOS, filtros)
+
+    def detalhe(self, user_id: int) -> Optional[UsuarioDetalhe]:
+        return self._um(UsuarioDetalhe, self.DETALHE_SQL, (user_id,))
+
+    def status(self, user_id: int) -> Optional[UsuarioStatus]:
+        return self._um(UsuarioStatus, self.STATUS_SQL, (user_id,))
+
+    def tipo(self, user_id: int) -> Optional[str]:
+        return self._escalar(self.TIPO_SQL, (user_id,))
+
+    def auth(self, user_id: int) -> Optional[UsuarioAuth]:
+        """Estado usado na autenticação de cada requisição"""
+        return self._um(UsuarioAuth, self.AUTH_SQL, (user_id,))
+
+    def revogar_tokens(self, user_id: int) -> int:
+        """Invalida todos os tokens já emitidos para o usuário"""
+        return self._executar(self.REVOGAR_TOKENS_SQL, (user_id,))
+
+    def atualizar_hash_senha(self, user_id: int, hash_antigo: str, hash_novo: str) -> int:
+        return self._executar(self.ATUALIZAR_HASH_SENHA_SQL, (hash_novo, user_id, hash_antigo))
+
+    def pendente_para_aprovacao(self, user_id: int) -> Optional[UsuarioAprovacao]:
+        return self._um(UsuarioAprovacao, self.PENDENTE_PARA_APROVACAO_SQL, (user_id,))
+
+    def arquivado(self, user_id: int) -> Optional[UsuarioAprovacao]:
+        return self._um(UsuarioAprovacao, self.ARQUIVADO_SQL, (user_id,))
+
+    def atualizar_status(self, user_id: int, status: str) -> int:
+        return self._executar(self.ATUALIZAR_STATUS_SQL, (status, user_id))
+
+    def excluir(self, user_id: int) -> int:
+        return self._executar(self.EXCLUIR_SQL, (user_id,))
+
+    def empresas(self, filtros: Filtros = SEM_FILTROS) -> Pagina:
+        return self._paginar(Empresa, self.EMPRESAS, filtros)
+
+    def buscar_empresas(self, expressao: str, filtros: Filtros = SEM_FILTROS) -> Pagina:
+        """Sellers que casam com a expressão FTS5, do mais relevante ao menos"""
+        return self._buscar(EmpresaBusca, self.BUSCA_EMPRESAS, self.BUSCA_EMPRESAS_RECENTES, expressao, filtros)
+
+    def empresa(self, user_id: int) -> Optional[EmpresaResumo]:
+        return self._um(EmpresaResumo, self.EMPRESA_SQL, (user_id,))
+
+    def contar_sellers(self, status: Optional[str] = None) -> int:
+        if status is None:
+            return self._escalar(self.CONTAR_SELLERS_SQL) or 0
+        return self._escalar(self.CONTAR_SELLERS_STATUS_SQL, (status,)) or 0
+
+class KycRepository(Repository):
+    """Tabela kyc"""
+
+    # Colunas que aceitam upload de documento (UPDATE com nome de coluna dinâmico)
+    COLUNAS_DOCUMENTO = ('documento_responsavel', 'contrato_social', 'documento_frente',
+                         'documento_verso', 'comprovante_residencia')
+
+    POR_USUARIO_SQL = f'SELECT {_colunas(Kyc._fields)} FROM kyc WHERE user_id = ?'
+    CADASTRO_SQL = f'SELECT {_colunas(KycCadastro._fields)} FROM kyc WHERE user_id = ?'
+    STATUS_SQL = f'SELECT {_colunas(KycStatus._fields)} FROM kyc WHERE user_id = ?'
+    ID_POR_USUARIO_SQL = 'SELECT id FROM kyc WHERE user_id = ?'
+    RECEBEDOR_SQL = f"SELECT {_colunas(KycRecebedor._fields)} FROM kyc WHERE user_id = ? AND status = 'aprovado'"
+    PENDENTES = Listagem(
+        colunas='''
+            k.id,
+            k.user_id,
+            u.username,
+            u.email,
+            k.tipo_pessoa,
+            k.nome_razao_social,
+            k.cpf_cnpj,
+            k.porte_juridico,
+            k.nome_responsavel,
+            k.cpf_responsavel,
+            k.nome_mae,
+            k.data_nascimento_responsavel,
+            k.setor_atividade,
+            k.faturamento_mensal,
+            k.documento_responsavel,
+            k.contrato_social,
+            k.status,
+            k.created_at,
+            k.updated_at
+        ''',
+        origem='FROM kyc k INDEXED BY idx_kyc_pendentes_created JOIN usuarios u ON k.user_id = u.id',
+        condicoes=("k.status IN ('pendente', 'rascunho')",),
+        chave=('k.created_at', 'k.id'),
+        descendente=False,
+        filtros={'status': 'k.status', 'tipo_pessoa': 'k.tipo_pessoa', 'data': 'k.created_at'},
+    )
+    ATUALIZAR_SQL = '''
+        UPDATE kyc SET
+            nome_responsavel = ?,
+            cpf_responsavel = ?,
+            nome_mae = ?,
+            data_nascimento_responsavel = ?,
+            setor_atividade = ?,
+            faturamento_mensal = ?,
+            status = ?,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE user_id = ?
+    '''
+    INSERIR_INICIAL_SQL = '''
+        INSERT INTO kyc (
+            user_id, tipo_pessoa, nome_razao_social, cpf_cnpj,
+            porte_juridico, telefone, status
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+    '''
+    INSERIR_SQL = '''
+        INSERT INTO kyc (
+            user_id, tipo_pessoa, cpf_cnpj, nome_razao_social, porte_juridico,
+            nome_responsavel, cpf_responsavel, nome_mae, data_nascimento_responsavel,
+            setor_atividade, faturamento_mensal, status
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    DECIDIR_SQL = '''
+        UPDATE kyc
+        SET status = ?,
+            aprovado_por = ?,
+            aprovado_em = CURRENT_TIMESTAMP,
+            observacoes = ?,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    '''
+    USUARIO_DO_KYC_SQL = 'SELECT user_id FROM kyc WHERE id = ?'
+    EXCLUIR_DO_USUARIO_SQL = 'DELETE FROM kyc WHERE user_id = ?'
+    CONTAR_STATUS_SQL = 'SELECT COUNT(*) FROM kyc WHERE status = ?'
+
+    def por_usuario(self, user_id: int) -> Optional[Kyc]:
+        return self._um(Kyc, self.POR_USUARIO_SQL, (user_id,))
+
+    def cadastro(self, user_id: int) -> Optional[KycCadastro]:
+        return self._um(KycCadastro, self.CADASTRO_SQL, (user_id,))
+
+    def status(self, user_id: int) -> Optional[KycStatus]:
+        return self._um(KycStatus, self.STATUS_SQL, (user_id,))
+
+    def recebedor(self, user_id: int) -> Optional[KycRecebedor]:
+        """Dados do recebedor no BR Code (só KYC aprovado)"""
+        return self._um(KycRecebedor, self.RECEBEDOR_SQL, (user_id,))
+
+    def pendentes(self, filtros: Filtros = SEM_FILTROS) -> Pagina:
+        return self._paginar(KycPendente, self.PENDENTES, filtros)
+
+    def criar_inicial(self, dados: Dict[str, Any]) -> int:
+        """KYC criado no registro do seller"""
+        return self.conn.execute(self.INSERIR_INICIAL_SQL, (
+            dados['user_id'],
+            dados['tipo_pessoa'],
+            dados['nome_razao_social'],
+            dados['cpf_cnpj'],
+            dados['porte_juridico'],
+            dados['telefone'],
+            dados['status']
+        )).lastrowid
+
+    def salvar(self, user_id: int, dados: Dict[str, Any]) -> None:
+        """Atualiza o KYC do usuário ou cria um novo"""
+        status = dados.get('status', 'pendente_aprovacao')
+        if self._escalar(self.ID_POR_USUARIO_SQL, (user_id,)) is not None:
+            self._executar(self.ATUALIZAR_SQL, (
+                dados.get('nome_responsavel'),
+                dados.get('cpf_responsavel'),
+                dados.get('nome_mae'),
+                dados.get('data_nascimento_responsavel'),
+                dados.get('setor_atividade'),
+                dados.get('faturamento_mensal'),
+                status,
+                user_id
+            ))
+        else:
+            self._executar(self.INSERIR_SQL, (
+                user_id,
+                dados.get('tipo_pessoa'),
+                dados.get('cpf_cnpj'),
+                dados.get('nome_razao_social'),
+                dados.get('porte_juridico'),
+                dados.get('nome_responsavel'),
+                dados.get('cpf_responsavel'),
+                dados.get('nome_mae'),
+                dados.get('data_nascimento_responsavel'),
+                dados.get('setor_atividade'),
+                dados.get('faturamento_mensal'),
+                status
+            ))
+
+    def salvar_documento(self, user_id: int, coluna: str, arquivo: str) -> int:
+        if coluna not in self.COLUNAS_DOCUMENTO:
+            raise ValueError(f'Tipo de documento inválido: {coluna}')
+        return self._executar(f'UPDATE kyc SET {coluna} = ? WHERE user_id = ?', (arquivo, user_id))
+
+    def decidir(self, kyc_id: int, status: str, admin_id: int, observacoes: str) -> int:
+        """Registra aprovação/rejeição do KYC"""
+        return self._executar(self.DECIDIR_SQL, (status, admin_id, observacoes, kyc_id))
+
+    def usuario_do_kyc(self, kyc_id: int) -> Optional[int]:
+        return self._escalar(self.USUARIO_DO_KYC_SQL, (kyc_id,))
+
+    def excluir_do_usuario(self, user_id: int) -> int:
+        return self._executar(self.EXCLUIR_DO_USUARIO_SQL, (user_id,))
+
+    def contar(self, status: str) -> int:
+        return self._escalar(self.CONTAR_STATUS_SQL, (status,)) or 0
+
+class ProdutosRepository(Repository):
+    """Tabela produtos"""
+
+    DO_SELLER = Listagem(
+        colunas='''
+            id, product_id, name, price, header, status, show_marketplace,
+            views, sales, created_at, ? || product_id as checkout_url
+        ''',
+        origem='FROM produtos',
+        condicoes=('user_id = ?', "status != 'deletado'"),
+        chave=('created_at', 'id'),
+        descendente=True,
+        filtros={'status': 'status', 'data': 'created_at'},
+    )
+    MARKETPLACE = Listagem(
+        colunas='''
+            p.id, p.product_id, p.name, p.price, p.header, p.product_image,
+            p.views, p.sales, u.username as seller_name, p.created_at,
+            ? || p.product_id as checkout_url
+        ''',
+        origem='FROM produtos p JOIN usuarios u ON p.user_id = u.id',
+        condicoes=('p.show_marketplace = 1', "p.status = 'ativo'"),
+        chave=('p.created_at', 'p.id'),
+        descendente=True,
+        filtros={'data': 'p.created_at'},
+    )
+    # produtos_fts só indexa produtos visíveis no marketplace; rank é o bm25
+    # (negativo: menor = mais relevante)
+    BUSCA_MARKETPLACE = MARKETPLACE._replace(
+        colunas=MARKETPLACE.colunas.rstrip() + ', f.rank as relevancia',
+        origem='FROM produtos_fts f JOIN produtos p ON p.id = f.rowid JOIN usuarios u ON p.user_id = u.id',
+        origem_contagem='FROM produtos_fts f',
+        condicoes=('produtos_fts MATCH ?',),
+        filtros={},
+        chave=('f.rank', 'f.rowid'),
+        descendente=False,
+        campos_cursor=('relevancia', 'id'),
+    )
+    # Sem rank: o bm25 de uma só linha já percorre todas as ocorrências (IDF)
+    BUSCA_MARKETPLACE_RECENTES = BUSCA_MARKETPLACE._replace(
+        colunas=MARKETPLACE.colunas.rstrip() + ', NULL as relevancia',
+        chave=('f.rowid',),
+        descendente=True,
+        campos_cursor=('id',),
+    )
+    CHECKOUT_SQL = f'''
+        SELECT {_colunas(PRODUTO_COLUNAS.split(), 'p.')}, u.username as seller_name, u.email as seller_email
+        FROM produtos p
+        JOIN usuarios u ON p.user_id = u.id
+        WHERE p.product_id = ? AND p.status = 'ativo'
+    '''
+    INSERIR_SQL = '''
+        INSERT INTO produtos (
+            product_id, user_id, name, price, header, thank_page_type,
+            thank_page_url, support_email, warranty_time, warranty_unit,
+            product_image, product_banner, final_banner, show_marketplace
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    REGISTRAR_VISUALIZACAO_SQL = 'UPDATE produtos SET views = views + 1 WHERE product_id = ?'
+
+    def do_seller(self, user_id: int, checkout_base: str, filtros: Filtros = SEM_FILTROS) -> Pagina:
+        """Produtos do seller; checkout_url = checkout_base + product_id"""
+        return self._paginar(ProdutoSeller, self.DO_SELLER, filtros, (checkout_base,), (user_id,))
+
+    def marketplace(self, checkout_base: str, filtros: Filtros = SEM_FILTROS) -> Pagina:
+        return self._paginar(ProdutoMarketplace, self.MARKETPLACE, filtros, (checkout_base,))
+
+    def buscar_marketplace(self, expressao: str, checkout_base: str, filtros: Filtros = SEM_FILTROS) -> Pagina:
+        """Produtos do marketplace que casam com a expressão FTS5, por relevância"""
+        return self._buscar(ProdutoBusca, self.BUSCA_MARKETPLACE, self.BUSCA_MARKETPLACE_RECENTES,
+                            expressao, filtros, (checkout_base,))
+
+    def para_checkout(self, product_id: str) -> Optional[ProdutoCheckout]:
+        return self._um(ProdutoCheckout, self.CHECKOUT_SQL, (product_id,))
+
+    def inserir(self, valores: Tuple) -> int:
+        return self.conn.execute(self.INSERIR_SQL, valores).lastrowid
+
+    def registrar_visualizacao(self, product_id: str) -> int:
+        return self._executar(self.REGISTRAR_VISUALIZACAO_SQL, (product_id,))
+
+class TransacoesRepository(Repository):
+    """Tabela transacoes"""
+
+    RECENTES_SQL = f'''
+        SELECT {_colunas(Transacao._fields)}
+        FROM transacoes
+        WHERE user_id = ?
+        ORDER BY created_at DESC
+        LIMIT ?
+    '''
+    STATUS_PAGAMENTO_SQL = '''
+        SELECT status, amount, currency, customer_name, created_at
+        FROM transacoes
+        WHERE payment_id = ?
+    '''
+    ATUALIZAR_STATUS_PAGAMENTO_SQL = 'UPDATE transacoes SET status = ? WHERE payment_id = ?'
+    PIX_PAYLOAD_SQL = '''
+        SELECT json_extract(dados_retorno, '$.qr_code')
+        FROM transacoes
+        WHERE payment_id = ? AND payment_method = 'pix'
+    '''
+    CRIAR_SQL = '''
+        INSERT INTO transacoes (
+            payment_id, transaction_id, user_id, product_id, amount, currency,
+            payment_method, status, customer_name, customer_email,
+            merchant_reference_id, valor, taxa_cobrada, valor_liquido,
+            dados_pagamento, adquirente, dados_retorno, created_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+
+    def recentes(self, user_id: int, limite: int = 10) -> List[Transacao]:
+        return self._todos(Transacao, self.RECENTES_SQL, (user_id, limite))
+
+    def status_pagamento(self, payment_id: str) -> Optional[TransacaoStatus]:
+        return self._um(TransacaoStatus, self.STATUS_PAGAMENTO_SQL, (payment_id,))
+
+    def atualizar_status_pagamento(self, payment_id: str, status: str) -> int:
+        return self._executar(self.ATUALIZAR_STATUS_PAGAMENTO_SQL, (status, payment_id))
+
+    def criar_lote(self, linhas: Iterable[Tuple]) -> int:
+        """Insere as transações (colunas na ordem de CRIAR_SQL) num único executemany"""
+        return self.conn.executemany(self.CRIAR_SQL, linhas).rowcount
+
+    def pix_payload(self, payment_id: str) -> Optional[str]:
+        """Payload PIX (copia e cola) gravado na criação do pagamento"""
+        return self._escalar(self.PIX_PAYLOAD_SQL, (payment_id,))
+
+class MetasRepository(Repository):
+    """Tabela metas"""
+
+    ATIVAS_SQL = f'''
+        SELECT {_colunas(Meta._fields)}
+        FROM metas
+        WHERE user_id = ? AND status = 'ativa'
+        ORDER BY meta_valor ASC
+    '''
+
+    def ativas(self, user_id: int) -> List[Meta]:
+        return self._todos(Meta, self.ATIVAS_SQL, (user_id,))
+
+class SaquesRepository(Repository):
+    """Tabela saques"""
+
+    CONTAR_STATUS_SQL = 'SELECT COUNT(*) FROM saques WHERE status = ?'
+
+    def contar(self, status: str) -> int:
+        return self._escalar(self.CONTAR_STATUS_SQL, (status,)) or 0
+
+class LogsRepository(Repository):
+    """Tabela logs (a gravação é feita pelo AuditLogWriter)"""
+
+    RECENTES_SQL = '''
+        SELECT acao, detalhes, created_at
+        FROM logs
+        WHERE user_id = ?
+        ORDER BY created_at DESC
+        LIMIT ?
+    '''
+    EXCLUIR_DO_USUARIO_SQL = 'DELETE FROM logs WHERE user_id = ?'
+
+    def recentes(self, user_id: int, limite: int = 10) -> List[LogEntrada]:
+        return self._todos(LogEntrada, self.RECENTES_SQL, (user_id, limite))
+
+    def excluir_do_usuario(self, user_id: int) -> int:
+        return self._executar(self.EXCLUIR_DO_USUARIO_SQL, (user_id,))
+
+class ApiKeysRepository(Repository):
+    """Tabela api_keys (só o hash das chaves; a autenticação usa o ApiKeyIndex)"""
+
+    CRIAR_SQL = 'INSERT INTO api_keys (user_id, key_hash, prefixo) VALUES (?, ?, ?)'
+    # As ativas passam a expirar no fim da carência; as que já estão em carência mantêm o prazo
+    EXPIRAR_ATIVAS_SQL = '''
+        UPDATE api_keys SET expires_at = datetime(?, 'unixepoch')
+        WHERE user_id = ? AND expires_at IS NULL
+    '''
+    ATUALIZAR_CHAVE_USUARIO_SQL = 'UPDATE usuarios SET api_key = ? WHERE id = ?'
+    ACEITAS_SQL = '''
+        SELECT id, prefixo, created_at, expires_at, usage_count, last_used_at
+        FROM api_keys
+        WHERE user_id = ? AND (expires_at IS NULL OR expires_at > datetime('now'))
+        ORDER BY id DESC
+    '''
+    EXCLUIR_DO_USUARIO_SQL = 'DELETE FROM api_keys WHERE user_id = ?'
+
+    def criar(self, user_id: int, key_hash: str, prefixo: str) -> int:
+        return self.conn.execute(self.CRIAR_SQL, (user_id, key_hash, prefixo)).lastrowid
+
+    def rotacionar(self, user_id: int, api_key: str, key_hash: str, prefixo: str, expira_em: float) -> int:
+        """Cadastra a chave nova e põe as ativas anteriores em carência até expira_em"""
+        self._executar(self.EXPIRAR_ATIVAS_SQL, (int(expira_em), user_id))
+        self._executar(self.ATUALIZAR_CHAVE_USUARIO_SQL, (api_key, user_id))
+        return self.criar(user_id, key_hash, prefixo)
+
+    def aceitas(self, user_id: int) -> List[ApiKey]:
+        """Chaves do usuário ainda aceitas (ativa e em carência)"""
+        return self._todos(ApiKey, self.ACEITAS_SQL, (user_id,))
+
+    def excluir_do_usuario(self, user_id: int) -> int:
+        return self._executar(self.EXCLUIR_DO_USUARIO_SQL, (user_id,))
+
+class TaxasRepository(Repository):
+    """Tabela taxas (o cálculo por transação usa o FeeSchedule)"""
+
+    ATIVAS_SQL = '''
+        SELECT id, user_id, tipo_pagamento, taxa_percentual, taxa_fixa, created_at
+        FROM taxas
+        WHERE ativo = 1 AND (user_id IS NULL OR user_id = ?)
+        ORDER BY user_id IS NULL, tipo_pagamento, id DESC
+    '''
+    DESATIVAR_SQL = '''
+        UPDATE taxas SET ativo = 0
+        WHERE ativo = 1 AND user_id IS ? AND tipo_pagamento = ?
+    '''
+    INSERIR_SQL = '''
+        INSERT INTO taxas (user_id, tipo_pagamento, taxa_percentual, taxa_fixa)
+        VALUES (?, ?, ?, ?)
+    '''
+
+    def ativas(self, user_id: Optional[int] = None) -> List[Taxa]:
+        """Taxas ativas do seller (se informado) e os padrões por método"""
+        return self._todos(Taxa, self.ATIVAS_SQL, (user_id,))
+
+    def definir(self, user_id: Optional[int], tipo_pagamento: str, percentual: float, fixa: float) -> int:
+        """Substitui a taxa ativa do seller (ou o padrão, com user_id None) para o método"""
+        self._executar(self.DESATIVAR_SQL, (user_id, tipo_pagamento))
+        return self.conn.execute(self.INSERIR_SQL, (user_id, tipo_pagamento, percentual, fixa)).lastrowid
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rollups diários de vendas (tabela vendas_diarias)
+
+A tabela guarda, por seller, dia e método de pagamento, a quantidade e os
+valores (em centavos) das transações aprovadas. Ela é mantida por triggers
+em transacoes (migração 0003), portanto é atualizada na mesma transação de
+cada INSERT, mudança de status ou DELETE.
+
+Uso:
+    python -m services.rollups rebuild [banco.db]
+    python -m services.rollups check [banco.db]
+"""
+
+import sqlite3
+import sys
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_DATABASE = 'gateway_pagamentos.db'
+
+# Agregação a partir das transações brutas (usada no rebuild e na verificação)
+AGREGADO_TRANSACOES_SQL = '''
+    SELECT IFNULL(user_id, 0) as user_id,
+           DATE(created_at) as dia,
+           payment_method,
+           COUNT(*) as quantidade,
+           SUM(CAST(ROUND(valor * 100) AS INTEGER)) as valor_bruto_centavos,
+           SUM(CAST(ROUND(taxa_cobrada * 100) AS INTEGER)) as taxa_centavos,
+           SUM(CAST(ROUND(valor_liquido * 100) AS INTEGER)) as valor_liquido_centavos
+    FROM transacoes
+    WHERE status = 'aprovado'
+    GROUP BY IFNULL(user_id, 0), DATE(created_at), payment_method
+'''
+
+# Totais por método de pagamento no período (todos os sellers ou um)
+_VENDAS_PERIODO = '''
+    SELECT payment_method,
+           SUM(quantidade), SUM(valor_bruto_centavos),
+           SUM(taxa_centavos), SUM(valor_liquido_centavos)
+    FROM vendas_diarias
+    WHERE {filtro}
+    GROUP BY payment_method
+'''
+VENDAS_PERIODO_SQL = _VENDAS_PERIODO.format(filtro='dia BETWEEN ? AND ?')
+VENDAS_PERIODO_SELLER_SQL = _VENDAS_PERIODO.format(filtro='user_id = ? AND dia BETWEEN ? AND ?')
+
+REBUILD_SQL = '''
+    INSERT INTO vendas_diarias (
+        user_id, dia, payment_method, quantidade,
+        valor_bruto_centavos, taxa_centavos, valor_liquido_centavos
+    )
+''' + AGREGADO_TRANSACOES_SQL
+
+def rebuild(conn: sqlite3.Connection) -> int:
+    """Recria vendas_diarias a partir de transacoes; retorna o número de linhas"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute('DELETE FROM vendas_diarias')
+        conn.execute(REBUILD_SQL)
+        total = conn.execute('SELECT COUNT(*) FROM vendas_diarias').fetchone()[0]
+        conn.commit()
+        return total
+    except Exception:
+        conn.rollback()
+        raise
+
+def check(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    """Compara vendas_diarias com as transações brutas e retorna as divergências"""
+    chave = lambda row: (row[0], row[1], row[2])
+
+    esperado = {chave(row): tuple(row[3:]) for row in conn.execute(AGREGADO_TRANSACOES_SQL)}
+    atual = {
+        chave(row): tuple(row[3:])
+        for row in conn.execute('''
+            SELECT user_id, dia, payment_method, quantidade,
+                   valor_bruto_centavos, taxa_centavos, valor_liquido_centavos
+            FROM vendas_diarias
+            WHERE quantidade != 0 OR valor_bruto_centavos != 0
+        ''')
+    }
+
+    divergencias = []
+    for key in sorted(set(esperado) | set(atual), key=str):
+        if esperado.get(key) != atual.get(key):
+            divergencias.append({
+                'user_id': key[0],
+                'dia': key[1],
+                'payment_method': key[2],
+                'esperado': esperado.get(key),
+                'rollup': atual.get(key),
+            })
+    return divergencias
+
+def vendas_periodo(conn: sqlite3.Connection, user_id: Optional[int],
+                   inicio: str, fim: str) -> Dict[str, Any]:
+    """Totais de vendas aprovadas entre inicio e fim (datas YYYY-MM-DD, inclusivas)
+
+    Com user_id None soma todos os sellers.
+    """
+    if user_id is None:
+        rows = conn.execute(VENDAS_PERIODO_SQL, (inicio, fim)).fetchall()
+    else:
+        rows = conn.execute(VENDAS_PERIODO_SELLER_SQL, (user_id, inicio, fim)).fetchall()
+
+    por_metodo = {}
+    total = bruto = taxa = liquido = 0
+    for metodo, quantidade, valor_bruto, valor_taxa, valor_liquido in rows:
+        por_metodo[metodo] = {
+            'total': quantidade,
+            'valor': valor_bruto / 100,
+            'taxa': valor_taxa / 100,
+            'valor_liquido': valor_liquido / 100,
+        }
+        total += quantidade
+        bruto += valor_bruto
+        taxa += valor_taxa
+        liquido += valor_liquido
+
+    return {
+        'total': total,
+        'valor': bruto / 100,
+        'taxa': taxa / 100,
+        'valor_liquido': liquido / 100,
+        'por_metodo': por_metodo,
+    }
+
+def intervalo_mes(referencia: date) -> Tuple[str, str]:
+    """Primeiro e último dia do mês de referência (YYYY-MM-DD)"""
+    inicio = referencia.replace(day=1)
+    proximo = (inicio + timedelta(days=32)).replace(day=1)
+    return inicio.isoformat(), (proximo - timedelta(days=1)).isoformat()
+
+def main(argv: List[str]) -> int:
+    comando = argv[0] if argv else 'check'
+    database = argv[1] if len(argv) > 1 else DEFAULT_DATABASE
+
+    conn = sqlite3.connect(database)
+    try:
+        if comando == 'rebuild':
+            inicio = datetime.now()
+            total = rebuild(conn)
+            print(f"✅ vendas_diarias recriada: {total} linhas em {(datetime.now() - inicio).total_seconds():.2f}s")
+        elif comando == 'check':
+            divergencias = check(conn)
+            for d in divergencias:
+                print(f"❌ seller {d['user_id']} {d['dia']} {d['payment_method']}: "
+                      f"esperado {d['esperado']} rollup {d['rollup']}")
+            if divergencias:
+                print("💡 Execute: python -m services.rollups rebuild")
+                return 1
+            print("✅ vendas_diarias consistente com transacoes")
+        else:
+            print(__doc__)
+            return 2
+    finally:
+        conn.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
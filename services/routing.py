@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Roteamento de pagamentos entre adquirentes por custo, sucesso e latência
+
+Para cada transação o AcquirerRouter ordena as adquirentes habilitadas para
+o método de pagamento ('metodos' de cada adquirente) pelo custo esperado:
+
+    taxa(valor) / taxa_de_sucesso + ROUTING_LATENCY_WEIGHT * p95_segundos
+
+ou seja, a taxa paga por aprovação (cada falha custa uma nova tentativa)
+mais um custo em R$ por segundo de p95. A adquirente pedida pelo cliente
+(dados['adquirente']) vai à frente das demais. Em erro ou timeout da
+adquirente, o pagamento segue para a próxima rota (até ROUTING_MAX_ATTEMPTS).
+Cada tentativa roda num pool de ROUTING_WORKERS threads com prazo de
+ROUTING_TIMEOUT segundos: sem resposta no prazo (ou respondendo depois
+dele), conta como falha da adquirente.
+
+Taxa de sucesso e p95 vêm de uma janela deslizante por adquirente
+(ROUTING_WINDOW segundos em ROUTING_BUCKETS buckets de tempo, com contadores
+e um histograma de latência por bucket). O resumo da janela é recalculado a
+cada resultado registrado e, sem tráfego, quando um bucket expira; a decisão
+só lê esses resumos, sem percorrer a janela.
+
+Cada decisão vai para a tabela roteamento_decisoes pelo RoutingLogWriter
+(mesma fila em lote dos logs de auditoria; com a fila cheia, descarta).
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+from services.audit_log import AuditLogWriter
+
+ROUTING_WINDOW = float(os.environ.get('ROUTING_WINDOW', 300))  # segundos
+ROUTING_BUCKETS = int(os.environ.get('ROUTING_BUCKETS', 30))
+ROUTING_LATENCY_WEIGHT = float(os.environ.get('ROUTING_LATENCY_WEIGHT', 0.5))  # R$ por segundo de p95
+ROUTING_TIMEOUT = float(os.environ.get('ROUTING_TIMEOUT', 10))  # segundos por tentativa
+ROUTING_MAX_ATTEMPTS = int(os.environ.get('ROUTING_MAX_ATTEMPTS', 3))
+ROUTING_WORKERS = int(os.environ.get('ROUTING_WORKERS', 32))  # chamadas simultâneas às adquirentes
+ROUTING_LOG_OVERFLOW = os.environ.get('ROUTING_LOG_OVERFLOW', 'drop_new')
+
+# Limites superiores (ms) das faixas do histograma de latência
+LIMITES_LATENCIA_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf'))
+
+# Sem histórico, cada adquirente começa como se tivesse PRIOR_AMOSTRAS
+# tentativas com PRIOR_TAXA_SUCESSO (evita descartar uma rota por 1 falha)
+PRIOR_AMOSTRAS = 10
+PRIOR_TAXA_SUCESSO = 0.95
+TAXA_SUCESSO_MINIMA = 0.05
+
+SQLITE_ROUTING = [
+    '''
+        CREATE TABLE IF NOT EXISTS roteamento_decisoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transaction_id TEXT,
+            user_id INTEGER,
+            payment_method TEXT NOT NULL,
+            valor DECIMAL(10,2) NOT NULL,
+            rotas TEXT NOT NULL, -- adquirentes na ordem escolhida, separadas por vírgula
+            adquirente TEXT, -- a que respondeu (NULL se todas falharam)
+            tentativas INTEGER NOT NULL,
+            status TEXT NOT NULL, -- 'aprovado', 'recusado', 'falha'
+            latencia_ms REAL,
+            decisao_us REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    '''
+        CREATE INDEX IF NOT EXISTS idx_roteamento_adquirente_created
+        ON roteamento_decisoes (adquirente, created_at)
+    ''',
+]
+
+INSERT_DECISAO_SQL = '''
+    INSERT INTO roteamento_decisoes (transaction_id, user_id, payment_method, valor, rotas,
+    adquirente, tentativas, status, latencia_ms, decisao_us)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+Rota = namedtuple('Rota', 'adquirente taxa_valor custo')
+Resumo = namedtuple('Resumo', 'taxa_sucesso p95_ms amostras calculado_em')
+
+class JanelaAdquirente:
+    """Tentativas de uma adquirente em buckets de tempo (janela deslizante)"""
+
+    def __init__(self, janela: float = ROUTING_WINDOW, buckets: int = ROUTING_BUCKETS):
+        self.largura = janela / buckets
+        self.buckets = buckets
+        self._indice = [-1] * buckets
+        self._ok = [0] * buckets
+        self._falhas = [0] * buckets
+        self._latencias = [[0] * len(LIMITES_LATENCIA_MS) for _ in range(buckets)]
+
+    def registrar(self, sucesso: bool, latencia_ms: float, agora: float):
+        indice = int(agora // self.largura)
+        slot = indice % self.buckets
+        if self._indice[slot] != indice:
+            # Bucket de uma volta anterior da janela: recomeça
+            self._indice[slot] = indice
+            self._ok[slot] = self._falhas[slot] = 0
+            self._latencias[slot] = [0] * len(LIMITES_LATENCIA_MS)
+        if sucesso:
+            self._ok[slot] += 1
+        else:
+            self._falhas[slot] += 1
+        self._latencias[slot][bisect_left(LIMITES_LATENCIA_MS, latencia_ms)] += 1
+
+    def resumo(self, agora: float, timeout: float = ROUTING_TIMEOUT) -> Resumo:
+        """Taxa de sucesso (com o prior) e p95 dos buckets ainda na janela"""
+        atual = int(agora // self.largura)
+        ok = falhas = 0
+        histograma = [0] * len(LIMITES_LATENCIA_MS)
+        for slot in range(self.buckets):
+            if atual - self._indice[slot] < self.buckets:
+                ok += self._ok[slot]
+                falhas += self._falhas[slot]
+                histograma = [a + b for a, b in zip(histograma, self._latencias[slot])]
+
+        amostras = ok + falhas
+        taxa_sucesso = (ok + PRIOR_AMOSTRAS * PRIOR_TAXA_SUCESSO) / (amostras + PRIOR_AMOSTRAS)
+        p95_ms = 0.0
+        if amostras:
+            # Limite superior da faixa que contém o p95 (a última faixa vale o timeout)
+            alvo, acumulado = 0.95 * amostras, 0
+            for limite, quantidade in zip(LIMITES_LATENCIA_MS, histograma):
+                acumulado += quantidade
+                if acumulado >= alvo:
+                    p95_ms = min(limite, timeout * 1000)
+                    break
+        return Resumo(max(taxa_sucesso, TAXA_SUCESSO_MINIMA), p95_ms, amostras, agora)
+
+class AcquirerRouter:
+    """Escolhe a ordem das adquirentes por transação a partir das janelas"""
+
+    def __init__(self, adquirentes: Dict[str, Dict], janela: float = ROUTING_WINDOW,
+                 buckets: int = ROUTING_BUCKETS, peso_latencia: float = ROUTING_LATENCY_WEIGHT,
+                 timeout: float = ROUTING_TIMEOUT, max_tentativas: int = ROUTING_MAX_ATTEMPTS):
+        self.adquirentes = adquirentes
+        self.peso_latencia = peso_latencia
+        self.timeout = timeout
+        self.max_tentativas = max_tentativas
+        self._janelas = {nome: JanelaAdquirente(janela, buckets) for nome in adquirentes}
+        self._largura = janela / buckets
+        agora = time.monotonic()
+        self._resumos = {nome: j.resumo(agora, timeout) for nome, j in self._janelas.items()}
+        self._lock = threading.Lock()
+        self._stats = {'decisoes': 0, 'failovers': 0, 'sem_rota': 0}
+
+        # Elegibilidade por método, resolvida uma vez
+        self._por_metodo: Dict[str, List[str]] = {}
+        for nome, config in adquirentes.items():
+            for metodo in config.get('metodos', ()):
+                self._por_metodo.setdefault(metodo, []).append(nome)
+
+    def rotas(self, metodo: str, valor: float, preferida: Optional[str] = None) -> List[Rota]:
+        """Adquirentes habilitadas para o método, da melhor para a pior"""
+        agora = time.monotonic()
+        candidatas = []
+        for nome in self._por_metodo.get(metodo, ()):
+            config = self.adquirentes[nome]
+            resumo = self._resumos[nome]
+            if agora - resumo.calculado_em > self._largura:
+                resumo = self._atualizar(nome, agora)
+            taxa_valor = (valor * config['taxa'] / 100) + config['taxa_fixa']
+            custo = taxa_valor / resumo.taxa_sucesso + self.peso_latencia * resumo.p95_ms / 1000
+            candidatas.append(Rota(nome, taxa_valor, custo))
+        candidatas.sort(key=lambda rota: (rota.adquirente != preferida, rota.custo))
+        self._count('decisoes' if candidatas else 'sem_rota')
+        return candidatas
+
+    def registrar(self, adquirente: str, sucesso: bool, latencia_ms: float):
+        """Resultado de uma tentativa; atualiza o resumo da adquirente"""
+        agora = time.monotonic()
+        with self._lock:
+            self._janelas[adquirente].registrar(sucesso, latencia_ms, agora)
+            self._resumos[adquirente] = self._janelas[adquirente].resumo(agora, self.timeout)
+
+    def registrar_failover(self):
+        self._count('failovers')
+
+    def _atualizar(self, nome: str, agora: float) -> Resumo:
+        with self._lock:
+            resumo = self._janelas[nome].resumo(agora, self.timeout)
+            self._resumos[nome] = resumo
+            return resumo
+
+    def _count(self, chave: str):
+        with self._lock:
+            self._stats[chave] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            resumos = dict(self._resumos)
+        stats['adquirentes'] = {
+            nome: {
+                'taxa_sucesso': round(resumo.taxa_sucesso, 4),
+                'p95_ms': resumo.p95_ms,
+                'amostras': resumo.amostras,
+            }
+            for nome, resumo in resumos.items()
+        }
+        return stats
+
+class RoutingLogWriter(AuditLogWriter):
+    """Grava as decisões de roteamento em lote (tabela roteamento_decisoes)"""
+
+    insert_sql = INSERT_DECISAO_SQL
+    thread_name = 'routing-log-writer'
+
+    def __init__(self, write_transaction, overflow: str = ROUTING_LOG_OVERFLOW, **kwargs):
+        super().__init__(write_transaction, overflow=overflow, **kwargs)
+
+    def registrar(self, transaction_id, user_id, metodo: str, valor: float, rotas: List[Rota],
+                  adquirente: Optional[str], tentativas: int, status: str,
+                  latencia_ms: float, decisao_us: float) -> bool:
+        return self._enqueue((transaction_id, user_id, metodo, valor,
+                              ','.join(rota.adquirente for rota in rotas), adquirente,
+                              tentativas, status, latencia_ms, decisao_us))
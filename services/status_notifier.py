@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Status dos pagamentos PIX em memória, com aviso de mudança
+
+O StatusNotifier guarda o último status conhecido de cada pagamento (LRU
+de até PIX_STATUS_CACHE_MAX_ENTRIES, válido por PIX_STATUS_CACHE_TTL
+segundos) e avisa os assinantes do pagamento quando o status muda:
+
+- /api/pix/stream/<id> (Server-Sent Events) assina o pagamento e fica
+  parado no Event da assinatura até publicar() ou o próximo heartbeat;
+  não consulta o banco enquanto espera.
+- /api/pix/status/<id> responde 304 sem abrir conexão com o SQLite quando
+  o If-None-Match é a ETag do status em cache.
+
+Quem muda o status de uma transação chama publicar(). O aviso é só deste
+processo: com vários processos, o TTL limita por quanto tempo o cache de
+um processo pode ficar desatualizado.
+
+Cada assinatura é um objeto com __slots__ e um threading.Event; o custo de
+uma conexão parada é dominado pela thread que a serve.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+PIX_STATUS_CACHE_TTL = float(os.environ.get('PIX_STATUS_CACHE_TTL', 30))  # segundos
+PIX_STATUS_CACHE_MAX_ENTRIES = int(os.environ.get('PIX_STATUS_CACHE_MAX_ENTRIES', 100000))
+PIX_STREAM_MAX = int(os.environ.get('PIX_STREAM_MAX', 10000))  # streams SSE simultâneos
+PIX_STREAM_HEARTBEAT = float(os.environ.get('PIX_STREAM_HEARTBEAT', 15))  # segundos
+PIX_STREAM_MAX_AGE = float(os.environ.get('PIX_STREAM_MAX_AGE', 900))  # segundos; o navegador reconecta
+
+def etag(payment_id: str, status: str) -> str:
+    """ETag do status (igual em todos os processos)"""
+    return hashlib.sha1(f'{payment_id}:{status}'.encode()).hexdigest()[:20]
+
+class LimiteAssinaturas(Exception):
+    """Streams demais abertos (o cliente deve usar o polling)"""
+
+class Assinatura:
+    """Assinatura de um pagamento: esperar() retorna o status quando ele muda"""
+
+    __slots__ = ('notifier', 'payment_id', 'evento', 'status')
+
+    def __init__(self, notifier: 'StatusNotifier', payment_id: str, status: Optional[str]):
+        self.notifier = notifier
+        self.payment_id = payment_id
+        self.evento = threading.Event()
+        self.status = status
+
+    def esperar(self, timeout: float) -> Optional[str]:
+        """Novo status, ou None se não mudou dentro do timeout"""
+        if not self.evento.wait(timeout):
+            return None
+        self.evento.clear()
+        status = self.notifier.status(self.payment_id, validade=None)
+        if status is None or status == self.status:
+            return None
+        self.status = status
+        return status
+
+    def cancelar(self):
+        self.notifier._cancelar(self)
+
+class StatusNotifier:
+    """Cache de status por payment_id e assinantes avisados a cada mudança"""
+
+    def __init__(self, ttl: float = PIX_STATUS_CACHE_TTL, max_entries: int = PIX_STATUS_CACHE_MAX_ENTRIES,
+                 max_assinaturas: int = PIX_STREAM_MAX):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_assinaturas = max_assinaturas
+        self._cache: OrderedDict = OrderedDict()  # payment_id -> (status, gravado_em)
+        self._assinantes: Dict[str, Set[Assinatura]] = {}
+        self._total_assinaturas = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'published': 0, 'notified': 0, 'subscribed': 0,
+                       'rejected': 0, 'evictions': 0}
+
+    def status(self, payment_id: str, validade: Optional[float] = -1) -> Optional[str]:
+        """Status em cache (None se não conhecido ou mais velho que validade; -1 = ttl)"""
+        validade = self.ttl if validade == -1 else validade
+        with self._lock:
+            entrada = self._cache.get(payment_id)
+            if entrada is None or (validade is not None and time.monotonic() - entrada[1] > validade):
+                self._stats['misses'] += 1
+                return None
+            self._cache.move_to_end(payment_id)
+            self._stats['hits'] += 1
+            return entrada[0]
+
+    def lembrar(self, payment_id: str, status: str):
+        """Guarda o status lido do banco (avisa os assinantes se mudou)"""
+        self._gravar(payment_id, status, publicado=False)
+
+    def publicar(self, payment_id: str, status: str):
+        """O status da transação mudou: atualiza o cache e acorda os assinantes"""
+        self._gravar(payment_id, status, publicado=True)
+
+    def _gravar(self, payment_id: str, status: str, publicado: bool):
+        with self._lock:
+            anterior = self._cache.get(payment_id)
+            self._cache[payment_id] = (status, time.monotonic())
+            self._cache.move_to_end(payment_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+                self._stats['evictions'] += 1
+            if publicado:
+                self._stats['published'] += 1
+            assinantes = self._assinantes.get(payment_id, ())
+            if anterior is not None and anterior[0] == status:
+                return
+            self._stats['notified'] += len(assinantes)
+            for assinatura in assinantes:
+                assinatura.evento.set()
+
+    def assinar(self, payment_id: str, status: Optional[str] = None) -> Assinatura:
+        """Assinatura do pagamento (status = o último enviado ao cliente)"""
+        with self._lock:
+            if self._total_assinaturas >= self.max_assinaturas:
+                self._stats['rejected'] += 1
+                raise LimiteAssinaturas('Limite de streams de status atingido')
+            assinatura = Assinatura(self, payment_id, status)
+            self._assinantes.setdefault(payment_id, set()).add(assinatura)
+            self._total_assinaturas += 1
+            self._stats['subscribed'] += 1
+            return assinatura
+
+    def _cancelar(self, assinatura: Assinatura):
+        with self._lock:
+            assinantes = self._assinantes.get(assinatura.payment_id)
+            if assinantes is None or assinatura not in assinantes:
+                return
+            assinantes.discard(assinatura)
+            self._total_assinaturas -= 1
+            if not assinantes:
+                del self._assinantes[assinatura.payment_id]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['cached'] = len(self._cache)
+            stats['streams'] = self._total_assinaturas
+            stats['payments_watched'] = len(self._assinantes)
+        return stats
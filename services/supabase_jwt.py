@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Verificação local dos access tokens do Supabase Auth
+
+Em vez de um get_user() remoto por requisição, o token é validado aqui:
+assinatura, exp, iss e aud. As chaves vêm de uma destas fontes:
+
+    SUPABASE_JWT_SECRET  segredo HS256 do projeto (projetos com chave legada)
+    JWKS                 {SUPABASE_URL}/auth/v1/.well-known/jwks.json, com as
+                         chaves guardadas por SUPABASE_JWKS_CACHE_TTL segundos.
+                         Um kid desconhecido (rotação de chaves) força uma nova
+                         leitura, no máximo uma a cada SUPABASE_JWKS_MIN_REFRESH
+
+Quando o token não pode ser verificado localmente (sem segredo nem JWKS,
+kid desconhecido mesmo depois de recarregar, algoritmo sem suporte) o
+verificador levanta VerificacaoIndisponivel e quem chama usa o caminho
+remoto. Um token verificado e inválido (assinatura, expirado, emissor)
+resulta em None, sem chamada remota.
+
+RS256/ES256 precisam do pacote cryptography (dependência do PyJWT[crypto]);
+chaves HS256 ("oct") funcionam só com o PyJWT.
+"""
+
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Any, Dict, Optional
+
+import jwt
+import requests
+
+SUPABASE_URL = os.environ.get('SUPABASE_URL', 'https://your-project.supabase.co').rstrip('/')
+SUPABASE_JWT_SECRET = os.environ.get('SUPABASE_JWT_SECRET') or None
+SUPABASE_JWT_ISSUER = os.environ.get('SUPABASE_JWT_ISSUER', f'{SUPABASE_URL}/auth/v1')
+SUPABASE_JWT_AUDIENCE = os.environ.get('SUPABASE_JWT_AUDIENCE', 'authenticated')
+SUPABASE_JWKS_URL = os.environ.get('SUPABASE_JWKS_URL', f'{SUPABASE_JWT_ISSUER}/.well-known/jwks.json')
+SUPABASE_JWKS_CACHE_TTL = float(os.environ.get('SUPABASE_JWKS_CACHE_TTL', 600))  # segundos
+SUPABASE_JWKS_MIN_REFRESH = float(os.environ.get('SUPABASE_JWKS_MIN_REFRESH', 30))  # segundos
+SUPABASE_JWKS_TIMEOUT = float(os.environ.get('SUPABASE_JWKS_TIMEOUT', 5))  # segundos
+
+# Dados do usuário que vêm do próprio token (substitui o User do get_user())
+UsuarioToken = namedtuple('UsuarioToken', 'id email role app_metadata user_metadata')
+
+# Chave do JWKS e o algoritmo que ela aceita ("alg" da JWK ou o padrão do kty)
+ChaveAssinatura = namedtuple('ChaveAssinatura', 'algoritmo key')
+ALGORITMO_PADRAO_KTY = {'oct': 'HS256', 'RSA': 'RS256', 'EC': 'ES256', 'OKP': 'EdDSA'}
+
+class VerificacaoIndisponivel(Exception):
+    """O token não pode ser verificado localmente: usar a chamada remota"""
+
+class SigningKeyCache:
+    """kid -> ChaveAssinatura lida do JWKS, com TTL e recarga limitada"""
+
+    def __init__(self, jwks_url: str = SUPABASE_JWKS_URL, ttl: float = SUPABASE_JWKS_CACHE_TTL,
+                 min_refresh: float = SUPABASE_JWKS_MIN_REFRESH, timeout: float = SUPABASE_JWKS_TIMEOUT):
+        self.jwks_url = jwks_url
+        self.ttl = ttl
+        self.min_refresh = min_refresh
+        self.timeout = timeout
+        self._chaves: Dict[str, ChaveAssinatura] = {}
+        self._expira_em = 0.0
+        self._ultima_leitura = float('-inf')
+        self._lendo: Optional[threading.Event] = None  # leitura do JWKS em andamento
+        self._lock = threading.Lock()
+        self._stats = {'fetches': 0, 'fetch_errors': 0, 'unknown_kid': 0}
+
+    def get(self, kid: str) -> ChaveAssinatura:
+        agora = time.monotonic()
+        with self._lock:
+            chave = self._chaves.get(kid)
+            if chave is not None and agora < self._expira_em:
+                return chave
+            # Expirou ou kid novo: relê o JWKS, no máximo a cada min_refresh
+            # (um kid forjado não vira uma leitura por requisição). Uma só
+            # thread lê, fora do lock; as demais seguem com a chave em cache
+            # e só um kid desconhecido espera a leitura em andamento
+            leitura = self._lendo
+            lider = leitura is None and agora - self._ultima_leitura >= self.min_refresh
+            if lider:
+                leitura = self._lendo = threading.Event()
+                self._ultima_leitura = agora
+        if lider:
+            try:
+                self._ler(agora)
+            finally:
+                with self._lock:
+                    self._lendo = None
+                leitura.set()
+        elif chave is None and leitura is not None:
+            leitura.wait(self.timeout)
+
+        with self._lock:
+            # Se a leitura falhar, as chaves anteriores continuam valendo
+            chave = self._chaves.get(kid)
+            if chave is None:
+                self._stats['unknown_kid'] += 1
+                raise VerificacaoIndisponivel(f'Chave {kid!r} não está no JWKS')
+            return chave
+
+    def _ler(self, agora: float):
+        with self._lock:
+            self._stats['fetches'] += 1
+        try:
+            resposta = requests.get(self.jwks_url, timeout=self.timeout)
+            resposta.raise_for_status()
+            chaves = {}
+            for jwk in resposta.json().get('keys', []):
+                try:
+                    algoritmo = jwk.get('alg') or ALGORITMO_PADRAO_KTY.get(jwk.get('kty'))
+                    chaves[jwk['kid']] = ChaveAssinatura(algoritmo, jwt.PyJWK(jwk, algoritmo).key)
+                except (KeyError, jwt.PyJWTError):
+                    continue  # algoritmo sem suporte (ex.: sem cryptography)
+        except (requests.RequestException, ValueError) as e:
+            with self._lock:
+                self._stats['fetch_errors'] += 1
+                if self._chaves:
+                    return
+            raise VerificacaoIndisponivel(f'Erro ao ler JWKS: {e}')
+        with self._lock:
+            self._chaves = chaves
+            self._expira_em = agora + self.ttl
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, keys=len(self._chaves))
+
+class SupabaseTokenVerifier:
+    """Valida access tokens do Supabase sem chamada remota"""
+
+    def __init__(self, jwt_secret: Optional[str] = SUPABASE_JWT_SECRET, jwks: Optional[SigningKeyCache] = None,
+                 issuer: str = SUPABASE_JWT_ISSUER, audience: str = SUPABASE_JWT_AUDIENCE):
+        self.jwt_secret = jwt_secret
+        self.jwks = jwks if jwks is not None else SigningKeyCache()
+        self.issuer = issuer
+        self.audience = audience
+
+    def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """Claims do token válido; None se inválido
+
+        Levanta VerificacaoIndisponivel se não há como verificar aqui.
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError:
+            return None
+
+        algoritmo = header.get('alg')
+        kid = header.get('kid')
+        if algoritmo == 'HS256' and self.jwt_secret:
+            # O JWKS do Supabase não publica o segredo HS256, mesmo com kid
+            chave = self.jwt_secret
+        elif kid:
+            chave = self.jwks.get(kid)
+            # O alg do header precisa ser o da chave (nada de HS256 com chave RSA)
+            if chave.algoritmo != algoritmo:
+                return None
+            chave = chave.key
+        elif algoritmo == 'HS256':
+            raise VerificacaoIndisponivel('Token HS256 sem SUPABASE_JWT_SECRET configurado')
+        else:
+            return None
+
+        try:
+            return jwt.decode(token, chave, algorithms=[algoritmo], audience=self.audience,
+                              issuer=self.issuer, options={'require': ['exp', 'sub']})
+        except jwt.PyJWTError:
+            return None
+
+    @staticmethod
+    def usuario(claims: Dict[str, Any]) -> UsuarioToken:
+        return UsuarioToken(claims['sub'], claims.get('email'), claims.get('role'),
+                            claims.get('app_metadata', {}), claims.get('user_metadata', {}))
+
+    def stats(self) -> Dict[str, int]:
+        return self.jwks.stats()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Webhooks das adquirentes: fila durável no SQLite e aplicação em lote
+
+/webhooks/<adquirente> confere a assinatura, grava o evento em
+webhook_eventos (INSERT OR IGNORE pela chave (adquirente, event_id): um
+evento repetido pela adquirente não entra de novo na fila) e responde;
+nada mais acontece na requisição.
+
+A thread do WebhookQueue (acordada a cada evento recebido, ou a cada
+WEBHOOK_POLL_INTERVAL segundos) aplica os eventos pendentes em ordem de
+chegada, WEBHOOK_BATCH_SIZE por transação:
+
+- os eventos de um mesmo pagamento são aplicados em ordem; só o status
+  final de cada transação é gravado (um UPDATE por transação do lote);
+- produtos.sales soma 1 quando a transação passa a 'aprovado' e subtrai 1
+  quando deixa de estar aprovada, no mesmo UPDATE em lote;
+- o ledger e as vendas diárias acompanham pelos triggers de transacoes;
+- os eventos ficam marcados com o resultado (aplicado, ignorado,
+  sem_pagamento) na mesma transação.
+
+Depois do commit, ao_aplicar(payment_id, status) avisa cada mudança (o
+gateway publica no StatusNotifier dos streams de checkout).
+
+Assinatura: HMAC-SHA256, em hexadecimal, de "<timestamp>." + corpo, com o
+segredo WEBHOOK_SECRET_<ADQUIRENTE>; headers X-Webhook-Timestamp e
+X-Webhook-Signature. Timestamps a mais de WEBHOOK_TOLERANCE segundos são
+recusados. Adquirentes sem segredo configurado não recebem webhooks.
+
+Formatos de evento: o genérico ({"id", "type": "payment.paid", "data":
+{"payment_id"}}) e o da Rapyd ({"id", "type": "PAYMENT_COMPLETED",
+"data": {"merchant_reference_id"}}); a referência é o payment_id ou o
+transaction_id da transação.
+
+Uso:
+    python -m services.webhooks pendentes [banco.db]
+    python -m services.webhooks replay [banco.db] [desde_id] [adquirente]
+    python -m services.webhooks processar [banco.db]
+
+replay marca como pendentes os eventos a partir de desde_id (todos, sem
+desde_id), que são reaplicados em ordem pelo consumidor do gateway ou por
+processar.
+"""
+
+import atexit
+import hashlib
+import hmac
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_DATABASE = 'gateway_pagamentos.db'
+WEBHOOK_BATCH_SIZE = int(os.environ.get('WEBHOOK_BATCH_SIZE', 500))
+WEBHOOK_POLL_INTERVAL = float(os.environ.get('WEBHOOK_POLL_INTERVAL', 1))  # segundos
+WEBHOOK_TOLERANCE = float(os.environ.get('WEBHOOK_TOLERANCE', 300))  # segundos
+WEBHOOK_BATCH_DELAY = float(os.environ.get('WEBHOOK_BATCH_DELAY', 0.005))  # espera para juntar eventos num lote
+PREFIXO_SEGREDO = 'WEBHOOK_SECRET_'
+
+SQLITE_WEBHOOKS = [
+    '''
+        CREATE TABLE IF NOT EXISTS webhook_eventos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, -- ordem de chegada
+            adquirente TEXT NOT NULL,
+            event_id TEXT NOT NULL,
+            referencia TEXT, -- payment_id ou transaction_id da transação
+            tipo TEXT,
+            status TEXT, -- status da transação após o evento (NULL: evento sem efeito)
+            payload TEXT NOT NULL,
+            recebido_em REAL NOT NULL, -- unix time
+            processado_em REAL, -- NULL enquanto está na fila
+            resultado TEXT, -- 'aplicado', 'ignorado', 'sem_pagamento'
+            UNIQUE (adquirente, event_id)
+        )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_webhook_eventos_pendentes ON webhook_eventos (id) WHERE processado_em IS NULL',
+]
+
+INSERIR_SQL = '''
+    INSERT OR IGNORE INTO webhook_eventos (adquirente, event_id, referencia, tipo, status, payload, recebido_em)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+PENDENTES_SQL = '''
+    SELECT id, referencia, status
+    FROM webhook_eventos INDEXED BY idx_webhook_eventos_pendentes
+    WHERE processado_em IS NULL
+    ORDER BY id
+    LIMIT ?
+'''
+TRANSACOES_SQL = '''
+    SELECT id, payment_id, transaction_id, status, product_id
+    FROM transacoes
+    WHERE payment_id IN ({marcadores}) OR transaction_id IN ({marcadores})
+'''
+ATUALIZAR_STATUS_SQL = 'UPDATE transacoes SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?'
+ATUALIZAR_VENDAS_SQL = 'UPDATE produtos SET sales = MAX(0, sales + ?) WHERE product_id = ?'
+CONCLUIR_SQL = 'UPDATE webhook_eventos SET processado_em = ?, resultado = ? WHERE id = ?'
+CONTAR_PENDENTES_SQL = 'SELECT COUNT(*) FROM webhook_eventos WHERE processado_em IS NULL'
+REPLAY_SQL = '''
+    UPDATE webhook_eventos SET processado_em = NULL, resultado = NULL
+    WHERE id >= ? AND (? IS NULL OR adquirente = ?)
+'''
+
+STATUS_PAGO = 'aprovado'
+
+# type do evento -> status da transação
+STATUS_GENERICO = {
+    'payment.paid': 'aprovado',
+    'payment.approved': 'aprovado',
+    'payment.failed': 'rejeitado',
+    'payment.canceled': 'cancelado',
+    'payment.expired': 'cancelado',
+    'payment.refunded': 'estornado',
+}
+STATUS_RAPYD = {
+    'PAYMENT_COMPLETED': 'aprovado',
+    'PAYMENT_SUCCEEDED': 'aprovado',
+    'PAYMENT_FAILED': 'rejeitado',
+    'PAYMENT_CANCELED': 'cancelado',
+    'PAYMENT_EXPIRED': 'cancelado',
+    'REFUND_COMPLETED': 'estornado',
+}
+
+Evento = namedtuple('Evento', 'event_id referencia tipo status')
+
+class AdquirenteDesconhecida(Exception):
+    """Adquirente sem segredo de webhook configurado"""
+
+class AssinaturaInvalida(Exception):
+    """Assinatura ausente, errada ou com timestamp fora da tolerância"""
+
+class EventoInvalido(Exception):
+    """Corpo do webhook sem id ou fora do formato da adquirente"""
+
+def assinar(segredo: str, corpo: bytes, timestamp: str) -> str:
+    """Assinatura esperada em X-Webhook-Signature"""
+    return hmac.new(segredo.encode(), timestamp.encode() + b'.' + corpo, hashlib.sha256).hexdigest()
+
+def evento_generico(payload: Dict) -> Evento:
+    data = payload.get('data') or {}
+    tipo = payload.get('type')
+    return Evento(payload.get('id'), data.get('payment_id'), tipo, STATUS_GENERICO.get(tipo))
+
+def evento_rapyd(payload: Dict) -> Evento:
+    data = payload.get('data') or {}
+    tipo = payload.get('type')
+    return Evento(payload.get('id'), data.get('merchant_reference_id') or data.get('id'), tipo, STATUS_RAPYD.get(tipo))
+
+FORMATOS = {'rapyd': evento_rapyd}
+
+def segredos_do_ambiente(ambiente=os.environ) -> Dict[str, str]:
+    """WEBHOOK_SECRET_<ADQUIRENTE> -> {adquirente: segredo}"""
+    return {nome[len(PREFIXO_SEGREDO):].lower(): valor for nome, valor in ambiente.items()
+            if nome.startswith(PREFIXO_SEGREDO) and valor}
+
+class WebhookQueue:
+    """Recebe os webhooks na tabela webhook_eventos e aplica em lote numa thread"""
+
+    def __init__(self, write_transaction: Callable, segredos: Optional[Dict[str, str]] = None,
+                 ao_aplicar: Optional[Callable[[str, str], None]] = None, batch_size: int = WEBHOOK_BATCH_SIZE,
+                 poll_interval: float = WEBHOOK_POLL_INTERVAL, tolerancia: float = WEBHOOK_TOLERANCE,
+                 batch_delay: float = WEBHOOK_BATCH_DELAY):
+        self.write_transaction = write_transaction
+        self.segredos = segredos_do_ambiente() if segredos is None else segredos
+        self.ao_aplicar = ao_aplicar
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.tolerancia = tolerancia
+        self.batch_delay = batch_delay
+        self._acordar = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {'received': 0, 'duplicates': 0, 'rejected': 0, 'applied': 0, 'ignored': 0,
+                       'unknown_payment': 0, 'batches': 0, 'status_changes': 0, 'failed_batches': 0}
+
+    def receber(self, adquirente: str, corpo: bytes, timestamp: Optional[str], assinatura: Optional[str]) -> bool:
+        """Confere e enfileira o evento; False se o evento já tinha sido recebido"""
+        segredo = self.segredos.get(adquirente)
+        if segredo is None:
+            raise AdquirenteDesconhecida(f'Adquirente sem webhook configurado: {adquirente}')
+        try:
+            atraso = abs(time.time() - float(timestamp))
+        except (TypeError, ValueError):
+            atraso = None
+        if (atraso is None or atraso > self.tolerancia or not assinatura
+                or not hmac.compare_digest(assinar(segredo, corpo, timestamp), assinatura)):
+            self._count('rejected')
+            raise AssinaturaInvalida('Assinatura do webhook inválida')
+
+        try:
+            payload = json.loads(corpo)
+            evento = FORMATOS.get(adquirente, evento_generico)(payload)
+        except (ValueError, AttributeError) as e:
+            raise EventoInvalido(f'Corpo do webhook inválido: {e}')
+        if not evento.event_id:
+            raise EventoInvalido('Evento sem id')
+
+        novo = self.write_transaction(lambda cursor: cursor.execute(INSERIR_SQL, (
+            adquirente, str(evento.event_id), evento.referencia, evento.tipo, evento.status,
+            corpo.decode('utf-8', 'replace'), time.time())).rowcount) == 1
+        self._count('received' if novo else 'duplicates')
+        if novo:
+            self._acordar.set()
+        return novo
+
+    def processar_lote(self) -> int:
+        """Aplica até batch_size eventos pendentes numa transação; retorna quantos"""
+        quantidade, mudancas, contagem = self.write_transaction(self._aplicar)
+        if quantidade:
+            with self._lock:
+                self._stats['batches'] += 1
+                self._stats['status_changes'] += len(mudancas)
+                self._stats['applied'] += contagem['aplicado']
+                self._stats['ignored'] += contagem['ignorado']
+                self._stats['unknown_payment'] += contagem['sem_pagamento']
+        if self.ao_aplicar is not None:
+            for payment_id, status in mudancas:
+                try:
+                    self.ao_aplicar(payment_id, status)
+                except Exception as e:
+                    print(f"⚠️ Erro ao avisar mudança de status de {payment_id}: {e}")
+        return quantidade
+
+    def processar_pendentes(self) -> int:
+        """Aplica lotes até esvaziar a fila"""
+        total = 0
+        while True:
+            quantidade = self.processar_lote()
+            total += quantidade
+            if quantidade < self.batch_size:
+                return total
+
+    def _aplicar(self, cursor) -> Tuple[int, List[Tuple[str, str]], Dict[str, int]]:
+        eventos = cursor.execute(PENDENTES_SQL, (self.batch_size,)).fetchall()
+        if not eventos:
+            return 0, [], {}
+
+        referencias = list({evento[1] for evento in eventos if evento[1] and evento[2]})
+        transacoes = {}  # referência -> [id, payment_id, status inicial, status atual, product_id]
+        if referencias:
+            marcadores = ','.join('?' * len(referencias))
+            for id_, payment_id, transaction_id, status, product_id in cursor.execute(
+                    TRANSACOES_SQL.format(marcadores=marcadores), referencias + referencias):
+                transacao = [id_, payment_id, status, status, product_id]
+                transacoes[payment_id] = transacoes[transaction_id] = transacao
+
+        # Em ordem de chegada: o último evento de cada transação define o status final
+        agora = time.time()
+        concluidos = []
+        contagem = {'aplicado': 0, 'ignorado': 0, 'sem_pagamento': 0}
+        for id_evento, referencia, status in eventos:
+            transacao = transacoes.get(referencia) if status else None
+            if not status:
+                resultado = 'ignorado'
+            elif transacao is None:
+                resultado = 'sem_pagamento'
+            else:
+                transacao[3] = status
+                resultado = 'aplicado'
+            contagem[resultado] += 1
+            concluidos.append((agora, resultado, id_evento))
+
+        alteradas = {id(t): t for t in transacoes.values() if t[2] != t[3]}.values()
+        vendas: Dict[str, int] = {}
+        for _, _, inicial, final, product_id in alteradas:
+            delta = (final == STATUS_PAGO) - (inicial == STATUS_PAGO)
+            if delta and product_id:
+                vendas[product_id] = vendas.get(product_id, 0) + delta
+
+        cursor.executemany(ATUALIZAR_STATUS_SQL, [(t[3], t[0]) for t in alteradas])
+        cursor.executemany(ATUALIZAR_VENDAS_SQL, [(delta, produto) for produto, delta in vendas.items() if delta])
+        cursor.executemany(CONCLUIR_SQL, concluidos)
+        return len(eventos), [(t[1], t[3]) for t in alteradas], contagem
+
+    def replay(self, desde_id: int = 0, adquirente: Optional[str] = None) -> int:
+        """Marca como pendentes os eventos a partir de desde_id (para reaplicar em ordem)"""
+        marcados = self.write_transaction(
+            lambda cursor: cursor.execute(REPLAY_SQL, (desde_id, adquirente, adquirente)).rowcount)
+        self._acordar.set()
+        return marcados
+
+    def start(self) -> 'WebhookQueue':
+        """Inicia a thread que aplica os eventos pendentes"""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='webhook-consumer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        self._acordar.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._acordar.wait(self.poll_interval)
+            if self._stop.is_set():
+                return
+            # Junta os eventos que chegam quase juntos no mesmo lote
+            self._stop.wait(self.batch_delay)
+            self._acordar.clear()
+            try:
+                self.processar_pendentes()
+            except Exception as e:
+                self._count('failed_batches')
+                print(f"⚠️ Erro ao aplicar webhooks: {e}")
+
+    def _count(self, chave: str, quantidade: int = 1):
+        with self._lock:
+            self._stats[chave] += quantidade
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['acquirers'] = sorted(self.segredos)
+        return stats
+
+def main(argv: List[str]) -> int:
+    comando = argv[0] if argv else None
+    database = argv[1] if len(argv) > 1 else DEFAULT_DATABASE
+
+    def write_transaction(func):
+        conn = sqlite3.connect(database, isolation_level=None, timeout=30)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            resultado = func(conn.cursor())
+            conn.execute('COMMIT')
+            return resultado
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    fila = WebhookQueue(write_transaction, segredos={})
+    if comando == 'pendentes':
+        print(f"📬 {write_transaction(lambda cursor: cursor.execute(CONTAR_PENDENTES_SQL).fetchone()[0])} "
+              f"eventos na fila")
+    elif comando == 'replay':
+        desde_id = int(argv[2]) if len(argv) > 2 else 0
+        adquirente = argv[3] if len(argv) > 3 else None
+        print(f"🔁 {fila.replay(desde_id, adquirente)} eventos marcados para reaplicar")
+    elif comando == 'processar':
+        inicio = time.perf_counter()
+        total = fila.processar_pendentes()
+        print(f"✅ {total} eventos aplicados em {time.perf_counter() - inicio:.2f}s ({fila.stats()})")
+    else:
+        print(__doc__)
+        return 2
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
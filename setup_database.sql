@@ -1,218 +1,387 @@
 -- ==================================================
 -- CONFIGURAÇÃO DO BANCO DE DADOS - WHITE LABEL GATEWAY
 -- ==================================================
+-- Gerado por: python -m services.migrations postgres > setup_database.sql
 -- Execute este SQL no SQL Editor do Supabase
 
--- Tabela de usuários
-CREATE TABLE IF NOT EXISTS usuarios (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    username VARCHAR(255) NOT NULL,
-    email VARCHAR(255) UNIQUE NOT NULL,
-    nome_completo VARCHAR(255),
-    telefone VARCHAR(20),
-    tipo_conta VARCHAR(10),
-    cpf VARCHAR(14),
-    razao_social VARCHAR(255),
-    cnpj VARCHAR(18),
-    porte_juridico VARCHAR(50),
-    tipo VARCHAR(50) DEFAULT 'seller',
-    status VARCHAR(50) DEFAULT 'pendente_aprovacao',
-    api_key VARCHAR(255),
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Tabela de KYC
-CREATE TABLE IF NOT EXISTS kyc (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    user_id UUID REFERENCES usuarios(id) ON DELETE CASCADE,
-    documento_tipo VARCHAR(50),
-    documento_numero VARCHAR(255),
-    endereco TEXT,
-    cidade VARCHAR(100),
-    estado VARCHAR(2),
-    cep VARCHAR(10),
-    status VARCHAR(50) DEFAULT 'pendente',
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
+-- 0001_schema_inicial
+DO $migration$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM schema_migrations WHERE version = 1) THEN
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            username VARCHAR(255) NOT NULL,
+            email VARCHAR(255) UNIQUE NOT NULL,
+            nome_completo VARCHAR(255),
+            telefone VARCHAR(20),
+            tipo_conta VARCHAR(10),
+            cpf VARCHAR(14),
+            razao_social VARCHAR(255),
+            cnpj VARCHAR(18),
+            porte_juridico VARCHAR(50),
+            tipo VARCHAR(50) DEFAULT 'seller',
+            status VARCHAR(50) DEFAULT 'pendente_aprovacao',
+            api_key VARCHAR(255),
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        );
 
--- Tabela de produtos
-CREATE TABLE IF NOT EXISTS produtos (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    user_id UUID REFERENCES usuarios(id) ON DELETE CASCADE,
-    nome VARCHAR(255) NOT NULL,
-    descricao TEXT,
-    preco DECIMAL(10,2),
-    imagem_url VARCHAR(500),
-    categoria VARCHAR(100),
-    status VARCHAR(50) DEFAULT 'ativo',
-    show_marketplace BOOLEAN DEFAULT false,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
+        CREATE TABLE IF NOT EXISTS kyc (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID REFERENCES usuarios(id) ON DELETE CASCADE,
+            documento_tipo VARCHAR(50),
+            documento_numero VARCHAR(255),
+            endereco TEXT,
+            cidade VARCHAR(100),
+            estado VARCHAR(2),
+            cep VARCHAR(10),
+            status VARCHAR(50) DEFAULT 'pendente',
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        );
 
--- Tabela de transações
-CREATE TABLE IF NOT EXISTS transacoes (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    user_id UUID REFERENCES usuarios(id) ON DELETE CASCADE,
-    payment_id VARCHAR(255) UNIQUE,
-    amount DECIMAL(10,2),
-    description TEXT,
-    status VARCHAR(50),
-    payment_method VARCHAR(50),
-    gateway_response TEXT,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
+        CREATE TABLE IF NOT EXISTS produtos (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID REFERENCES usuarios(id) ON DELETE CASCADE,
+            nome VARCHAR(255) NOT NULL,
+            descricao TEXT,
+            preco DECIMAL(10,2),
+            imagem_url VARCHAR(500),
+            categoria VARCHAR(100),
+            status VARCHAR(50) DEFAULT 'ativo',
+            show_marketplace BOOLEAN DEFAULT false,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        );
 
--- Tabela de logs
-CREATE TABLE IF NOT EXISTS logs (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    user_id UUID REFERENCES usuarios(id) ON DELETE CASCADE,
-    action VARCHAR(100),
-    target_user_id UUID,
-    description TEXT,
-    ip_address VARCHAR(45),
-    user_agent TEXT,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
+        CREATE TABLE IF NOT EXISTS transacoes (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID REFERENCES usuarios(id) ON DELETE CASCADE,
+            payment_id VARCHAR(255) UNIQUE,
+            amount DECIMAL(10,2),
+            description TEXT,
+            status VARCHAR(50),
+            payment_method VARCHAR(50),
+            gateway_response TEXT,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        );
 
--- Tabela de taxas
-CREATE TABLE IF NOT EXISTS taxas (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    nome VARCHAR(100) NOT NULL,
-    tipo VARCHAR(50) NOT NULL,
-    valor DECIMAL(5,2) NOT NULL,
-    ativo BOOLEAN DEFAULT true,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
+        CREATE TABLE IF NOT EXISTS logs (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID REFERENCES usuarios(id) ON DELETE CASCADE,
+            action VARCHAR(100),
+            target_user_id UUID,
+            description TEXT,
+            ip_address VARCHAR(45),
+            user_agent TEXT,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        );
 
--- Tabela de saques
-CREATE TABLE IF NOT EXISTS saques (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    user_id UUID REFERENCES usuarios(id) ON DELETE CASCADE,
-    valor DECIMAL(10,2) NOT NULL,
-    conta_bancaria TEXT,
-    status VARCHAR(50) DEFAULT 'pendente',
-    data_solicitacao TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    data_processamento TIMESTAMP WITH TIME ZONE,
-    observacoes TEXT
-);
+        CREATE TABLE IF NOT EXISTS taxas (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            nome VARCHAR(100) NOT NULL,
+            tipo VARCHAR(50) NOT NULL,
+            valor DECIMAL(5,2) NOT NULL,
+            ativo BOOLEAN DEFAULT true,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        );
 
--- Tabela de metas
-CREATE TABLE IF NOT EXISTS metas (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    user_id UUID REFERENCES usuarios(id) ON DELETE CASCADE,
-    titulo VARCHAR(255) NOT NULL,
-    descricao TEXT,
-    valor_meta DECIMAL(10,2) NOT NULL,
-    valor_atual DECIMAL(10,2) DEFAULT 0,
-    data_inicio DATE NOT NULL,
-    data_fim DATE NOT NULL,
-    status VARCHAR(50) DEFAULT 'ativa',
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
+        CREATE TABLE IF NOT EXISTS saques (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID REFERENCES usuarios(id) ON DELETE CASCADE,
+            valor DECIMAL(10,2) NOT NULL,
+            conta_bancaria TEXT,
+            status VARCHAR(50) DEFAULT 'pendente',
+            data_solicitacao TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            data_processamento TIMESTAMP WITH TIME ZONE,
+            observacoes TEXT
+        );
 
--- ==================================================
--- HABILITAR RLS (ROW LEVEL SECURITY)
--- ==================================================
+        CREATE TABLE IF NOT EXISTS metas (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID REFERENCES usuarios(id) ON DELETE CASCADE,
+            titulo VARCHAR(255) NOT NULL,
+            descricao TEXT,
+            valor_meta DECIMAL(10,2) NOT NULL,
+            valor_atual DECIMAL(10,2) DEFAULT 0,
+            data_inicio DATE NOT NULL,
+            data_fim DATE NOT NULL,
+            status VARCHAR(50) DEFAULT 'ativa',
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        );
 
-ALTER TABLE usuarios ENABLE ROW LEVEL SECURITY;
-ALTER TABLE kyc ENABLE ROW LEVEL SECURITY;
-ALTER TABLE produtos ENABLE ROW LEVEL SECURITY;
-ALTER TABLE transacoes ENABLE ROW LEVEL SECURITY;
-ALTER TABLE logs ENABLE ROW LEVEL SECURITY;
-ALTER TABLE taxas ENABLE ROW LEVEL SECURITY;
-ALTER TABLE saques ENABLE ROW LEVEL SECURITY;
-ALTER TABLE metas ENABLE ROW LEVEL SECURITY;
+        ALTER TABLE usuarios ENABLE ROW LEVEL SECURITY;
 
--- ==================================================
--- CRIAR POLÍTICAS DE SEGURANÇA
--- ==================================================
+        ALTER TABLE kyc ENABLE ROW LEVEL SECURITY;
 
--- Política para usuários verem apenas seus próprios dados
-CREATE POLICY IF NOT EXISTS "Usuários podem ver seus próprios dados" ON usuarios
-    FOR SELECT USING (auth.uid() = id);
-
--- Política para admins verem todos os usuários
-CREATE POLICY IF NOT EXISTS "Admins podem ver todos os usuários" ON usuarios
-    FOR ALL USING (
-        EXISTS (
-            SELECT 1 FROM usuarios 
-            WHERE id = auth.uid() AND tipo = 'admin'
-        )
-    );
-
--- Política para KYC
-CREATE POLICY IF NOT EXISTS "Usuários podem ver seu próprio KYC" ON kyc
-    FOR ALL USING (auth.uid() = user_id);
-
--- Política para produtos
-CREATE POLICY IF NOT EXISTS "Usuários podem gerenciar seus produtos" ON produtos
-    FOR ALL USING (auth.uid() = user_id);
-
--- Política para transações
-CREATE POLICY IF NOT EXISTS "Usuários podem ver suas transações" ON transacoes
-    FOR ALL USING (auth.uid() = user_id);
-
--- Política para logs (apenas admins)
-CREATE POLICY IF NOT EXISTS "Admins podem ver logs" ON logs
-    FOR ALL USING (
-        EXISTS (
-            SELECT 1 FROM usuarios 
-            WHERE id = auth.uid() AND tipo = 'admin'
-        )
-    );
-
--- Política para taxas (leitura pública)
-CREATE POLICY IF NOT EXISTS "Taxas são públicas" ON taxas
-    FOR SELECT USING (true);
-
--- Política para saques
-CREATE POLICY IF NOT EXISTS "Usuários podem ver seus saques" ON saques
-    FOR ALL USING (auth.uid() = user_id);
-
--- Política para metas
-CREATE POLICY IF NOT EXISTS "Usuários podem gerenciar suas metas" ON metas
-    FOR ALL USING (auth.uid() = user_id);
+        ALTER TABLE produtos ENABLE ROW LEVEL SECURITY;
 
--- ==================================================
--- INSERIR DADOS INICIAIS
--- ==================================================
+        ALTER TABLE transacoes ENABLE ROW LEVEL SECURITY;
 
--- Inserir taxas padrão
-INSERT INTO taxas (nome, tipo, valor) VALUES
-('Taxa PIX', 'pix', 1.99),
-('Taxa Cartão', 'cartao', 2.99),
-('Taxa Boleto', 'boleto', 3.99)
-ON CONFLICT DO NOTHING;
+        ALTER TABLE logs ENABLE ROW LEVEL SECURITY;
 
--- Criar usuário administrador
-INSERT INTO usuarios (id, username, email, nome_completo, tipo, status, api_key) VALUES
-(gen_random_uuid(), 'admin', 'admin@whitelabel.com', 'Administrador', 'admin', 'ativo', 'admin_key_123')
-ON CONFLICT DO NOTHING;
+        ALTER TABLE taxas ENABLE ROW LEVEL SECURITY;
 
--- ==================================================
--- CONFIGURAÇÃO DE STORAGE (OPCIONAL)
--- ==================================================
+        ALTER TABLE saques ENABLE ROW LEVEL SECURITY;
 
--- Política para upload de arquivos
-CREATE POLICY IF NOT EXISTS "Usuários podem fazer upload" ON storage.objects
-    FOR INSERT WITH CHECK (auth.role() = 'authenticated');
+        ALTER TABLE metas ENABLE ROW LEVEL SECURITY;
 
--- Política para visualizar arquivos
-CREATE POLICY IF NOT EXISTS "Arquivos são públicos" ON storage.objects
-    FOR SELECT USING (true);
+        CREATE POLICY "Usuários podem ver seus próprios dados" ON usuarios
+            FOR SELECT USING (auth.uid() = id);
 
--- ==================================================
--- MENSAGEM DE CONFIRMAÇÃO
--- ==================================================
+        CREATE POLICY "Admins podem ver todos os usuários" ON usuarios
+            FOR ALL USING (
+                EXISTS (
+                    SELECT 1 FROM usuarios 
+                    WHERE id = auth.uid() AND tipo = 'admin'
+                )
+            );
+
+        CREATE POLICY "Usuários podem ver seu próprio KYC" ON kyc
+            FOR ALL USING (auth.uid() = user_id);
+
+        CREATE POLICY "Usuários podem gerenciar seus produtos" ON produtos
+            FOR ALL USING (auth.uid() = user_id);
+
+        CREATE POLICY "Usuários podem ver suas transações" ON transacoes
+            FOR ALL USING (auth.uid() = user_id);
+
+        CREATE POLICY "Admins podem ver logs" ON logs
+            FOR ALL USING (
+                EXISTS (
+                    SELECT 1 FROM usuarios 
+                    WHERE id = auth.uid() AND tipo = 'admin'
+                )
+            );
+
+        CREATE POLICY "Taxas são públicas" ON taxas
+            FOR SELECT USING (true);
+
+        CREATE POLICY "Usuários podem ver seus saques" ON saques
+            FOR ALL USING (auth.uid() = user_id);
+
+        CREATE POLICY "Usuários podem gerenciar suas metas" ON metas
+            FOR ALL USING (auth.uid() = user_id);
+
+        INSERT INTO taxas (nome, tipo, valor) VALUES
+        ('Taxa PIX', 'pix', 1.99),
+        ('Taxa Cartão', 'cartao', 2.99),
+        ('Taxa Boleto', 'boleto', 3.99)
+        ON CONFLICT DO NOTHING;
+
+        INSERT INTO usuarios (id, username, email, nome_completo, tipo, status, api_key) VALUES
+        (gen_random_uuid(), 'admin', 'admin@whitelabel.com', 'Administrador', 'admin', 'ativo', 'admin_key_123')
+        ON CONFLICT DO NOTHING;
+
+        CREATE POLICY "Usuários podem fazer upload" ON storage.objects
+            FOR INSERT WITH CHECK (auth.role() = 'authenticated');
+
+        CREATE POLICY "Arquivos são públicos" ON storage.objects
+            FOR SELECT USING (true);
+
+        INSERT INTO schema_migrations (version, name) VALUES (1, 'schema_inicial');
+    END IF;
+END
+$migration$;
+
+-- 0002_indices_consultas_quentes
+DO $migration$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM schema_migrations WHERE version = 2) THEN
+        CREATE INDEX IF NOT EXISTS idx_transacoes_user_status_created
+        ON transacoes (user_id, status, created_at) INCLUDE (amount);
+
+        CREATE INDEX IF NOT EXISTS idx_transacoes_user_created
+        ON transacoes (user_id, created_at);
+
+        CREATE INDEX IF NOT EXISTS idx_metas_user_status
+        ON metas (user_id, status);
+
+        CREATE INDEX IF NOT EXISTS idx_logs_user_created
+        ON logs (user_id, created_at);
+
+        CREATE INDEX IF NOT EXISTS idx_kyc_user
+        ON kyc (user_id);
+
+        CREATE INDEX IF NOT EXISTS idx_kyc_status_created
+        ON kyc (status, created_at);
+
+        CREATE INDEX IF NOT EXISTS idx_produtos_marketplace
+        ON produtos (show_marketplace, status, created_at);
+
+        INSERT INTO schema_migrations (version, name) VALUES (2, 'indices_consultas_quentes');
+    END IF;
+END
+$migration$;
+
+-- 0003_vendas_diarias
+DO $migration$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM schema_migrations WHERE version = 3) THEN
+        CREATE TABLE IF NOT EXISTS vendas_diarias (
+            user_id UUID NOT NULL,
+            dia DATE NOT NULL,
+            payment_method VARCHAR(50) NOT NULL,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            valor_bruto_centavos BIGINT NOT NULL DEFAULT 0,
+            taxa_centavos BIGINT NOT NULL DEFAULT 0,
+            valor_liquido_centavos BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, dia, payment_method)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_vendas_diarias_dia
+        ON vendas_diarias (dia);
+
+        CREATE OR REPLACE FUNCTION vendas_diarias_aplicar() RETURNS TRIGGER AS $fn$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'aprovado' THEN
+                UPDATE vendas_diarias SET
+                    quantidade = quantidade - 1,
+                    valor_bruto_centavos = valor_bruto_centavos - ROUND(OLD.amount * 100),
+                    valor_liquido_centavos = valor_liquido_centavos - ROUND(OLD.amount * 100)
+                WHERE user_id = OLD.user_id
+                  AND dia = OLD.created_at::date
+                  AND payment_method = OLD.payment_method;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'aprovado' THEN
+                INSERT INTO vendas_diarias (user_id, dia, payment_method, quantidade,
+                                            valor_bruto_centavos, taxa_centavos, valor_liquido_centavos)
+                VALUES (NEW.user_id, NEW.created_at::date, NEW.payment_method, 1,
+                        ROUND(NEW.amount * 100), 0, ROUND(NEW.amount * 100))
+                ON CONFLICT (user_id, dia, payment_method) DO UPDATE SET
+                    quantidade = vendas_diarias.quantidade + 1,
+                    valor_bruto_centavos = vendas_diarias.valor_bruto_centavos + excluded.valor_bruto_centavos,
+                    valor_liquido_centavos = vendas_diarias.valor_liquido_centavos + excluded.valor_liquido_centavos;
+            END IF;
+            RETURN NULL;
+        END
+        $fn$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER trg_vendas_diarias
+        AFTER INSERT OR DELETE OR UPDATE OF status, user_id, payment_method, amount, created_at
+        ON transacoes
+        FOR EACH ROW EXECUTE FUNCTION vendas_diarias_aplicar();
+
+        INSERT INTO vendas_diarias (user_id, dia, payment_method, quantidade,
+                                    valor_bruto_centavos, taxa_centavos, valor_liquido_centavos)
+        SELECT user_id, created_at::date, payment_method, COUNT(*),
+               SUM(ROUND(amount * 100)), 0, SUM(ROUND(amount * 100))
+        FROM transacoes
+        WHERE status = 'aprovado' AND user_id IS NOT NULL AND payment_method IS NOT NULL
+        GROUP BY user_id, created_at::date, payment_method
+        ON CONFLICT DO NOTHING;
+
+        INSERT INTO schema_migrations (version, name) VALUES (3, 'vendas_diarias');
+    END IF;
+END
+$migration$;
+
+-- 0004_ledger_saldos
+DO $migration$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM schema_migrations WHERE version = 4) THEN
+        INSERT INTO schema_migrations (version, name) VALUES (4, 'ledger_saldos');
+    END IF;
+END
+$migration$;
+
+-- 0005_indices_paginacao
+DO $migration$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM schema_migrations WHERE version = 5) THEN
+        CREATE INDEX IF NOT EXISTS idx_usuarios_tipo_created
+        ON usuarios (tipo, created_at, id);
+
+        CREATE INDEX IF NOT EXISTS idx_usuarios_tipo_status_created
+        ON usuarios (tipo, status, created_at, id);
+
+        CREATE INDEX IF NOT EXISTS idx_usuarios_status_created
+        ON usuarios (status, created_at, id);
+
+        CREATE INDEX IF NOT EXISTS idx_usuarios_pendentes_created
+        ON usuarios (created_at, id)
+        WHERE status IN ('pendente', 'pendente_aprovacao');
+
+        CREATE INDEX IF NOT EXISTS idx_kyc_pendentes_created
+        ON kyc (created_at, id)
+        WHERE status IN ('pendente', 'rascunho');
+
+        CREATE INDEX IF NOT EXISTS idx_produtos_user_created
+        ON produtos (user_id, created_at, id);
+
+        INSERT INTO schema_migrations (version, name) VALUES (5, 'indices_paginacao');
+    END IF;
+END
+$migration$;
+
+-- 0006_busca_textual
+DO $migration$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM schema_migrations WHERE version = 6) THEN
+        INSERT INTO schema_migrations (version, name) VALUES (6, 'busca_textual');
+    END IF;
+END
+$migration$;
+
+-- 0007_usuarios_token_version
+DO $migration$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM schema_migrations WHERE version = 7) THEN
+        ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0;
+
+        INSERT INTO schema_migrations (version, name) VALUES (7, 'usuarios_token_version');
+    END IF;
+END
+$migration$;
+
+-- 0008_api_keys
+DO $migration$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM schema_migrations WHERE version = 8) THEN
+        INSERT INTO schema_migrations (version, name) VALUES (8, 'api_keys');
+    END IF;
+END
+$migration$;
+
+-- 0009_roteamento_decisoes
+DO $migration$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM schema_migrations WHERE version = 9) THEN
+        INSERT INTO schema_migrations (version, name) VALUES (9, 'roteamento_decisoes');
+    END IF;
+END
+$migration$;
+
+-- 0010_taxas_versao
+DO $migration$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM schema_migrations WHERE version = 10) THEN
+        INSERT INTO schema_migrations (version, name) VALUES (10, 'taxas_versao');
+    END IF;
+END
+$migration$;
+
+-- 0011_idempotency_keys
+DO $migration$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM schema_migrations WHERE version = 11) THEN
+        INSERT INTO schema_migrations (version, name) VALUES (11, 'idempotency_keys');
+    END IF;
+END
+$migration$;
 
--- Verificar se as tabelas foram criadas
-SELECT 
-    'Tabelas criadas com sucesso!' as status,
-    COUNT(*) as total_tabelas
-FROM information_schema.tables 
-WHERE table_schema = 'public' 
-AND table_name IN ('usuarios', 'kyc', 'produtos', 'transacoes', 'logs', 'taxas', 'saques', 'metas');
+-- 0012_webhook_eventos
+DO $migration$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM schema_migrations WHERE version = 12) THEN
+        INSERT INTO schema_migrations (version, name) VALUES (12, 'webhook_eventos');
+    END IF;
+END
+$migration$;